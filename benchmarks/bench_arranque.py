@@ -0,0 +1,106 @@
+"""
+Benchmark de arranque en frío de `wsgi` (lo que paga cada worker de gunicorn)
+
+Mide en procesos nuevos el tiempo de `import wsgi` con las integraciones perezosas
+y, como referencia, el mismo arranque cargando todo al inicio (Cloudinary, Vision,
+Flask-Migrate), equivalente al comportamiento anterior. Con --importtime lista los
+módulos más costosos según `python -X importtime`.
+
+Uso:
+    $ python benchmarks/bench_arranque.py
+    $ python benchmarks/bench_arranque.py --repeticiones 10 --importtime 15 --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+ESCENARIOS = {
+    'perezoso': 'import wsgi',
+    'todo_al_inicio': (
+        'import wsgi, flask_migrate; '
+        'from api.integraciones import precargar; precargar(en_segundo_plano=False)'
+    ),
+}
+
+
+def entorno():
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite:////tmp/bench_arranque.db')
+    env.pop('INTEGRATIONS_PREWARM', None)
+    env.pop('FLASK_RUN_FROM_CLI', None)
+    return env
+
+
+def medir(codigo, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        subprocess.run(
+            [sys.executable, '-c', codigo], cwd=SRC, env=entorno(),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True
+        )
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {
+        'min_ms': round(min(tiempos), 1),
+        'mediana_ms': round(statistics.median(tiempos), 1)
+    }
+
+
+def modulos_costosos(codigo, top):
+    """Módulos de primer nivel con mayor tiempo acumulado de importación"""
+    salida = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo], cwd=SRC, env=entorno(),
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True
+    ).stderr
+    acumulados = {}
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:') or '|' not in linea:
+            continue
+        _, acumulado, modulo = linea.split('|', 2)
+        if not acumulado.strip().isdigit():
+            continue
+        raiz = modulo.strip().split('.')[0]
+        acumulados[raiz] = max(acumulados.get(raiz, 0), int(acumulado) / 1000)
+    return sorted(
+        ({'modulo': m, 'ms': round(t, 1)} for m, t in acumulados.items()),
+        key=lambda x: -x['ms']
+    )[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--importtime', type=int, default=0, metavar='N',
+                        help='Mostrar los N módulos más costosos del arranque perezoso')
+    parser.add_argument('--json', action='store_true', help='Salida legible por máquina')
+    args = parser.parse_args()
+
+    resultados = {nombre: medir(codigo, args.repeticiones) for nombre, codigo in ESCENARIOS.items()}
+    if args.importtime:
+        resultados['importtime'] = modulos_costosos(ESCENARIOS['perezoso'], args.importtime)
+
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+        return
+
+    print(f"{'escenario':<18}{'min ms':>10}{'mediana ms':>12}")
+    for nombre in ESCENARIOS:
+        r = resultados[nombre]
+        print(f"{nombre:<18}{r['min_ms']:>10}{r['mediana_ms']:>12}")
+    ahorro = resultados['todo_al_inicio']['mediana_ms'] - resultados['perezoso']['mediana_ms']
+    print(f"\nAhorro por worker: {ahorro:.1f} ms")
+
+    if args.importtime:
+        print(f"\n{'módulo':<28}{'ms acumulados':>14}")
+        for item in resultados['importtime']:
+            print(f"{item['modulo']:<28}{item['ms']:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Microbenchmark del costo de autenticación por petición (src/api/jwt_utils.py)
+
+Compara la verificación sin cache (jwt.decode con HMAC en cada petición) con el
+cache LRU de tokens verificados, tanto para verify_token como para el decorador
+require_role completo dentro de un request context de Flask.
+
+Uso:
+    $ python benchmarks/bench_auth.py
+    $ python benchmarks/bench_auth.py --iteraciones 50000 --json
+    $ python benchmarks/bench_auth.py --keyring keys/   # firma RS256/EdDSA con 'kid'
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from flask import Flask  # noqa: E402
+from api import jwt_utils  # noqa: E402
+
+
+def medir(fn, iteraciones):
+    """Devuelve microsegundos por llamada (mejor de 5 repeticiones)"""
+    tiempos = timeit.repeat(fn, number=iteraciones, repeat=5)
+    return min(tiempos) / iteraciones * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iteraciones', type=int, default=20000)
+    parser.add_argument('--json', action='store_true', help='Salida legible por máquina')
+    parser.add_argument('--keyring', help='Directorio de claves PEM (por defecto HS256)')
+    args = parser.parse_args()
+
+    if args.keyring:
+        jwt_utils.load_keyring(args.keyring)
+
+    token = jwt_utils.generate_token(1, 'bench@test.com', 'analista')
+
+    app = Flask(__name__)
+
+    @jwt_utils.require_role(['analista', 'supervisor'])
+    def vista():
+        return 'ok'
+
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def peticion():
+        with app.test_request_context('/api/tickets/analista', headers=headers):
+            vista()
+
+    resultados = {}
+
+    # Sin cache: mismo camino que antes de introducir el LRU
+    tamano_original = jwt_utils.TOKEN_CACHE_SIZE
+    jwt_utils.TOKEN_CACHE_SIZE = 0
+    resultados['verify_token_sin_cache_us'] = medir(lambda: jwt_utils.verify_token(token), args.iteraciones)
+    resultados['require_role_sin_cache_us'] = medir(peticion, args.iteraciones // 4)
+
+    # Con cache: la primera verificación llena el LRU, el resto son aciertos
+    jwt_utils.TOKEN_CACHE_SIZE = tamano_original or 4096
+    jwt_utils.clear_token_cache()
+    jwt_utils.verify_token(token)
+    resultados['verify_token_con_cache_us'] = medir(lambda: jwt_utils.verify_token(token), args.iteraciones)
+    resultados['require_role_con_cache_us'] = medir(peticion, args.iteraciones // 4)
+
+    # Costo del request context por sí solo, para aislar el overhead de autenticación
+    def solo_contexto():
+        with app.test_request_context('/api/tickets/analista', headers=headers):
+            pass
+    resultados['request_context_us'] = medir(solo_contexto, args.iteraciones // 4)
+
+    if args.json:
+        print(json.dumps({k: round(v, 3) for k, v in resultados.items()}, indent=2))
+        return
+
+    base = resultados['request_context_us']
+    print(f"{'medición':<32}{'µs/llamada':>12}")
+    for nombre, valor in resultados.items():
+        print(f"{nombre:<32}{valor:>12.2f}")
+    print()
+    print(f"Overhead de auth sin cache: {resultados['require_role_sin_cache_us'] - base:.2f} µs/petición")
+    print(f"Overhead de auth con cache: {resultados['require_role_con_cache_us'] - base:.2f} µs/petición")
+
+
+if __name__ == '__main__':
+    main()
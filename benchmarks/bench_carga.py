@@ -0,0 +1,365 @@
+"""
+Prueba de carga HTTP y Socket.IO contra un servidor local
+
+Lanza N usuarios concurrentes (hilos con su propia sesión HTTP) contra un servidor ya
+arrancado sobre una base sembrada con `flask seed-scale`, mezclando los escenarios
+reales: el cliente crea un ticket, el supervisor lo asigna, el analista lo pasa a
+en_proceso y a solucionado, ráfagas de mensajes en el chat analista-cliente y el
+dashboard del supervisor consultando /tickets/supervisor. Con --oyentes se conectan
+clientes Socket.IO a las salas de chat y se mide también la latencia de entrega del
+evento. Reporta p50/p95/p99 y throughput por operación; --salida guarda el resultado en
+JSON y --comparar lo contrasta con una ejecución anterior (sale con código 1 si alguna
+operación empeora más del umbral).
+
+Uso:
+    $ (cd src && flask seed-scale --clientes 2000 --tickets 200000)
+    $ gunicorn wsgi --chdir ./src --threads 16 -b :3001
+    $ python benchmarks/bench_carga.py --duracion 60 --usuarios 20 --salida carga_base.json
+    $ python benchmarks/bench_carga.py --mezcla flujo=1,dashboard=4 --oyentes 0 --json
+    $ python benchmarks/bench_carga.py --salida carga.json --comparar carga_base.json --umbral 15
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+MEZCLA = 'flujo=3,chat=2,dashboard=5'
+OPERACIONES = (
+    'crear_ticket', 'asignar_ticket', 'estado_en_proceso', 'estado_solucionado',
+    'mensaje_chat', 'entrega_socketio', 'dashboard_supervisor'
+)
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def id_de_token(token):
+    carga = token.split('.')[1]
+    return json.loads(base64.urlsafe_b64decode(carga + '=' * (-len(carga) % 4)))['user_id']
+
+
+class Usuario:
+    def __init__(self, url, rol, email, password):
+        self.url, self.rol, self.email, self.password = url, rol, email, password
+        self.token = None
+        self.id = None
+        self._lock = threading.Lock()
+
+    def login(self):
+        with self._lock:
+            r = requests.post(f'{self.url}/api/login', json={
+                'email': self.email, 'password': self.password, 'role': self.rol
+            }, timeout=30)
+            if r.status_code != 200:
+                raise RuntimeError(f'Login fallido para {self.email} ({self.rol}): {r.status_code} {r.text[:200]}')
+            self.token = r.json()['token']
+            self.id = id_de_token(self.token)
+
+    def cabeceras(self):
+        return {'Authorization': f'Bearer {self.token}'}
+
+
+class Registro:
+    """Muestras (operación, inicio, latencia_ms, ok) compartidas entre hilos"""
+
+    def __init__(self, desde):
+        self.desde = desde
+        self.muestras = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.estados = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def anotar(self, operacion, inicio, latencia_ms, ok, estado=None):
+        if inicio < self.desde:
+            return
+        with self._lock:
+            if ok:
+                self.muestras[operacion].append(latencia_ms)
+            else:
+                self.errores[operacion] += 1
+                self.estados[operacion][str(estado)] += 1
+
+
+class Escenarios:
+    def __init__(self, args, registro, usuarios, tickets_chat, pendientes_socketio):
+        self.args = args
+        self.registro = registro
+        self.usuarios = usuarios
+        self.tickets_chat = tickets_chat
+        self.pendientes = pendientes_socketio
+        self.local = threading.local()
+
+    def sesion(self):
+        if not hasattr(self.local, 'sesion'):
+            self.local.sesion = requests.Session()
+        return self.local.sesion
+
+    def peticion(self, operacion, usuario, metodo, ruta, esperado, **kw):
+        """Ejecutar una petición autenticada; reintenta una vez con login nuevo si el token expiró"""
+        for intento in range(2):
+            inicio = time.perf_counter()
+            try:
+                r = self.sesion().request(
+                    metodo, f'{self.args.url}/api{ruta}', headers=usuario.cabeceras(), timeout=self.args.timeout, **kw
+                )
+                estado = r.status_code
+            except requests.RequestException as e:
+                r, estado = None, type(e).__name__
+            latencia = (time.perf_counter() - inicio) * 1000
+            if estado == 401 and intento == 0:
+                usuario.login()
+                continue
+            ok = estado == esperado
+            self.registro.anotar(operacion, inicio, latencia, ok, estado)
+            return r.json() if ok and r.content else None
+
+    def flujo(self, azar):
+        cliente = azar.choice(self.usuarios['cliente'])
+        supervisor = azar.choice(self.usuarios['supervisor'])
+        analista = azar.choice(self.usuarios['analista'])
+        ticket = self.peticion('crear_ticket', cliente, 'POST', '/tickets', 201, json={
+            'titulo': f'Carga {azar.randrange(10 ** 9)}',
+            'descripcion': 'La impresora de la oficina no imprime desde la actualización',
+            'prioridad': azar.choice(('baja', 'media', 'alta', 'critica'))
+        })
+        if not ticket:
+            return
+        ruta = f"/tickets/{ticket['id']}"
+        if self.peticion('asignar_ticket', supervisor, 'POST', f'{ruta}/asignar', 200,
+                         json={'id_analista': analista.id}) is None:
+            return
+        if self.peticion('estado_en_proceso', analista, 'PUT', f'{ruta}/estado', 200,
+                         json={'estado': 'en_proceso'}) is None:
+            return
+        self.peticion('estado_solucionado', analista, 'PUT', f'{ruta}/estado', 200, json={'estado': 'solucionado'})
+
+    def chat(self, azar):
+        id_ticket, cliente, analista = azar.choice(self.tickets_chat)
+        for i in range(self.args.rafaga):
+            autor = analista if i % 2 else cliente
+            mensaje = f'carga-{threading.get_ident()}-{azar.randrange(10 ** 12)}'
+            inicio = time.perf_counter()
+            if self.pendientes is not None:
+                self.pendientes[mensaje] = inicio
+            if self.peticion('mensaje_chat', autor, 'POST', '/chat-analista-cliente', 201,
+                             json={'id_ticket': id_ticket, 'mensaje': mensaje}) is None and self.pendientes is not None:
+                self.pendientes.pop(mensaje, None)
+
+    def dashboard(self, azar):
+        self.peticion('dashboard_supervisor', azar.choice(self.usuarios['supervisor']), 'GET', '/tickets/supervisor', 200)
+
+
+def conectar_oyentes(args, registro, tickets_chat, pendientes):
+    """Clientes Socket.IO unidos a las salas de chat; anotan la latencia envío → evento"""
+    import socketio
+
+    oyentes = []
+    for i in range(args.oyentes):
+        id_ticket, _, analista = tickets_chat[i % len(tickets_chat)]
+        sio = socketio.Client(reconnection=False)
+
+        @sio.on('nuevo_mensaje_chat_analista_cliente')
+        def al_mensaje(datos):
+            # Con varios oyentes por sala solo cuenta la primera entrega de cada mensaje
+            inicio = pendientes.pop(datos.get('mensaje'), None)
+            if inicio is not None:
+                registro.anotar('entrega_socketio', inicio, (time.perf_counter() - inicio) * 1000, True)
+
+        sio.connect(args.url, auth={'token': analista.token}, wait_timeout=10)
+        sio.emit('join_chat_analista_cliente', {'ticket_id': id_ticket})
+        oyentes.append(sio)
+    return oyentes
+
+
+def preparar(args):
+    usuarios = {}
+    for rol, total in (('cliente', args.clientes), ('analista', args.analistas), ('supervisor', args.supervisores)):
+        usuarios[rol] = [
+            Usuario(args.url, rol, f'{rol}{i}@{args.dominio}', args.password) for i in range(1, total + 1)
+        ]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(Usuario.login, [u for lista in usuarios.values() for u in lista]))
+
+    # Tickets fijos en estado en_proceso para las ráfagas de chat
+    registro = Registro(float('inf'))
+    escenarios = Escenarios(args, registro, usuarios, None, None)
+    azar = random.Random(args.semilla)
+    tickets_chat = []
+    for _ in range(max(args.salas, 1)):
+        cliente = azar.choice(usuarios['cliente'])
+        analista = azar.choice(usuarios['analista'])
+        ticket = escenarios.peticion('crear_ticket', cliente, 'POST', '/tickets', 201, json={
+            'titulo': 'Sala de chat de carga', 'descripcion': 'Ticket para ráfagas de chat', 'prioridad': 'media'
+        })
+        if not ticket:
+            raise RuntimeError('No se pudo crear el ticket de chat')
+        escenarios.peticion('asignar_ticket', azar.choice(usuarios['supervisor']), 'POST',
+                            f"/tickets/{ticket['id']}/asignar", 200, json={'id_analista': analista.id})
+        tickets_chat.append((ticket['id'], cliente, analista))
+    return usuarios, tickets_chat
+
+
+def ejecutar(args):
+    mezcla = {}
+    for parte in args.mezcla.split(','):
+        nombre, peso = parte.split('=')
+        if nombre not in ('flujo', 'chat', 'dashboard'):
+            raise SystemExit(f'Escenario desconocido: {nombre}')
+        mezcla[nombre] = float(peso)
+
+    usuarios, tickets_chat = preparar(args)
+    inicio = time.perf_counter()
+    registro = Registro(inicio + args.calentamiento)
+    pendientes = {} if args.oyentes else None
+    oyentes = conectar_oyentes(args, registro, tickets_chat, pendientes) if args.oyentes else []
+    escenarios = Escenarios(args, registro, usuarios, tickets_chat, pendientes)
+    fin = inicio + args.calentamiento + args.duracion
+    nombres, pesos = list(mezcla), list(mezcla.values())
+
+    def trabajador(indice):
+        azar = random.Random(args.semilla * 1000 + indice)
+        while time.perf_counter() < fin:
+            getattr(escenarios, azar.choices(nombres, pesos)[0])(azar)
+            if args.pausa:
+                time.sleep(args.pausa / 1000)
+
+    with ThreadPoolExecutor(max_workers=args.usuarios) as pool:
+        list(pool.map(trabajador, range(args.usuarios)))
+    # Margen para que lleguen los últimos eventos de Socket.IO
+    time.sleep(1 if oyentes else 0)
+    for sio in oyentes:
+        sio.disconnect()
+
+    operaciones = {}
+    for operacion in OPERACIONES:
+        latencias = registro.muestras.get(operacion, [])
+        errores = registro.errores.get(operacion, 0)
+        if not latencias and not errores:
+            continue
+        operaciones[operacion] = {
+            'peticiones': len(latencias) + errores,
+            'errores': errores,
+            'estados_error': dict(registro.estados.get(operacion, {})),
+            'rps': round(len(latencias) / args.duracion, 1),
+            **({
+                'p50_ms': round(percentil(latencias, 50), 1),
+                'p95_ms': round(percentil(latencias, 95), 1),
+                'p99_ms': round(percentil(latencias, 99), 1),
+                'max_ms': round(max(latencias), 1)
+            } if latencias else {})
+        }
+    if pendientes is not None:
+        operaciones.setdefault('entrega_socketio', {})['sin_entregar'] = len(pendientes)
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'parametros': {
+            'url': args.url, 'usuarios': args.usuarios, 'duracion': args.duracion,
+            'calentamiento': args.calentamiento, 'mezcla': mezcla, 'rafaga': args.rafaga,
+            'salas': args.salas, 'oyentes': args.oyentes, 'pausa_ms': args.pausa, 'semilla': args.semilla
+        },
+        'operaciones': operaciones
+    }
+
+
+def comparar(actual, base, umbral):
+    """Diferencias de p95 y throughput frente a una ejecución base; devuelve las regresiones"""
+    filas, regresiones = [], []
+    for operacion, r in actual['operaciones'].items():
+        b = base.get('operaciones', {}).get(operacion)
+        if not b or 'p95_ms' not in r or 'p95_ms' not in b:
+            continue
+        delta_p95 = (r['p95_ms'] - b['p95_ms']) / b['p95_ms'] * 100 if b['p95_ms'] else 0.0
+        delta_rps = (r['rps'] - b['rps']) / b['rps'] * 100 if b['rps'] else 0.0
+        regresion = delta_p95 > umbral or delta_rps < -umbral
+        filas.append({
+            'operacion': operacion, 'p95_base_ms': b['p95_ms'], 'p95_ms': r['p95_ms'],
+            'delta_p95_pct': round(delta_p95, 1), 'rps_base': b['rps'], 'rps': r['rps'],
+            'delta_rps_pct': round(delta_rps, 1), 'regresion': regresion
+        })
+        if regresion:
+            regresiones.append(operacion)
+    return filas, regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', default=os.getenv('BENCH_URL', 'http://localhost:3001'))
+    parser.add_argument('--usuarios', type=int, default=20, help='Hilos concurrentes')
+    parser.add_argument('--duracion', type=float, default=60, help='Segundos medidos')
+    parser.add_argument('--calentamiento', type=float, default=5, help='Segundos iniciales descartados')
+    parser.add_argument('--mezcla', default=MEZCLA, help='Pesos de los escenarios flujo, chat y dashboard')
+    parser.add_argument('--rafaga', type=int, default=10, help='Mensajes por ráfaga de chat')
+    parser.add_argument('--salas', type=int, default=10, help='Tickets usados para las ráfagas de chat')
+    parser.add_argument('--oyentes', type=int, default=10, help='Clientes Socket.IO escuchando el chat (0 = ninguno)')
+    parser.add_argument('--pausa', type=float, default=0, help='Milisegundos de espera entre escenarios')
+    parser.add_argument('--clientes', type=int, default=50, help='Clientes sembrados usados (cliente1..N)')
+    parser.add_argument('--analistas', type=int, default=10)
+    parser.add_argument('--supervisores', type=int, default=3)
+    parser.add_argument('--dominio', default='seed.test', help='Dominio de los usuarios de seed-scale')
+    parser.add_argument('--password', default='123456')
+    parser.add_argument('--timeout', type=float, default=30, help='Timeout por petición en segundos')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='Guardar el resultado en este archivo JSON')
+    parser.add_argument('--comparar', help='Resultado JSON base contra el que comparar')
+    parser.add_argument('--umbral', type=float, default=10, help='Porcentaje de empeoramiento tolerado')
+    parser.add_argument('--json', action='store_true', help='Salida legible por máquina')
+    args = parser.parse_args()
+    args.url = args.url.rstrip('/')
+
+    resultado = ejecutar(args)
+    regresiones = []
+    parametros_distintos = False
+    if args.comparar:
+        with open(args.comparar) as f:
+            base = json.load(f)
+        resultado['comparacion'], regresiones = comparar(resultado, base, args.umbral)
+        parametros_distintos = base.get('parametros') != resultado['parametros']
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(resultado, f, indent=2)
+
+    if args.json:
+        print(json.dumps(resultado, indent=2))
+    else:
+        p = resultado['parametros']
+        print(f"{p['url']}: {p['usuarios']} usuarios, {p['duracion']:g}s, mezcla {args.mezcla}")
+        print(f"{'operación':<22}{'peticiones':>11}{'errores':>9}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for operacion, r in resultado['operaciones'].items():
+            print(f"{operacion:<22}{r.get('peticiones', 0):>11}{r.get('errores', 0):>9}{r.get('rps', 0):>9}"
+                  f"{r.get('p50_ms', '-'):>9}{r.get('p95_ms', '-'):>9}{r.get('p99_ms', '-'):>9}")
+        if 'sin_entregar' in resultado['operaciones'].get('entrega_socketio', {}):
+            print(f"eventos Socket.IO sin entregar: {resultado['operaciones']['entrega_socketio']['sin_entregar']}")
+        if args.comparar:
+            print(f"\nfrente a {args.comparar} (umbral {args.umbral:g}%)")
+            if parametros_distintos:
+                print("aviso: la ejecución base usó otros parámetros")
+            print(f"{'operación':<22}{'p95 base':>10}{'p95':>9}{'Δp95 %':>9}{'rps base':>10}{'rps':>9}{'Δrps %':>9}")
+            for c in resultado['comparacion']:
+                marca = '  REGRESIÓN' if c['regresion'] else ''
+                print(f"{c['operacion']:<22}{c['p95_base_ms']:>10}{c['p95_ms']:>9}{c['delta_p95_pct']:>9}"
+                      f"{c['rps_base']:>10}{c['rps']:>9}{c['delta_rps_pct']:>9}{marca}")
+    if regresiones:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark de búsquedas por cercanía (src/api/cercania.py)
+
+Genera N clientes agrupados alrededor de varias ciudades (más un 10% repartido por el mundo),
+un ticket por cliente, y mide "tickets abiertos a menos de R km" con el índice de
+cliente.geohash frente al mismo filtro de bbox sin índice (recorrido completo de cliente).
+
+Uso:
+    $ python benchmarks/bench_geo.py                      # 1M clientes en SQLite temporal
+    $ python benchmarks/bench_geo.py --clientes 200000 --radio-km 5 --consultas 100 --json
+    $ DATABASE_URL=postgresql://... python benchmarks/bench_geo.py --no-cargar
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from flask import Flask  # noqa: E402
+from api.models import db, Cliente, Ticket  # noqa: E402
+from api.geo import codificar_geohash  # noqa: E402
+from api import cercania  # noqa: E402
+
+# (lat, lng) de las ciudades alrededor de las que se agrupan los clientes
+CIUDADES = [
+    (4.711, -74.072), (6.244, -75.581), (3.452, -76.532), (10.391, -75.479), (19.432, -99.133),
+    (-34.604, -58.382), (-12.046, -77.043), (-33.449, -70.669), (40.417, -3.704), (-23.551, -46.633)
+]
+ESTADOS = ['creado', 'en_espera', 'en_proceso', 'solucionado', 'reabierto', 'cerrado', 'cerrado_por_supervisor']
+LOTE = 20000
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def punto(azar):
+    if azar.random() < 0.1:
+        return azar.uniform(-60, 70), azar.uniform(-180, 180)
+    lat, lng = azar.choice(CIUDADES)
+    # ~25 km de dispersión alrededor del centro
+    return lat + azar.gauss(0, 0.22), lng + azar.gauss(0, 0.22)
+
+
+def cargar(clientes, azar):
+    ahora = datetime.now()
+    inicio = time.perf_counter()
+    for desde in range(0, clientes, LOTE):
+        filas = []
+        for i in range(desde, min(desde + LOTE, clientes)):
+            lat, lng = punto(azar)
+            filas.append({
+                'id': i + 1, 'direccion': f'Calle {i}', 'latitude': lat, 'longitude': lng,
+                'geohash': codificar_geohash(lat, lng), 'telefono': '0', 'nombre': f'n{i}',
+                'apellido': 'bench', 'email': f'bench{i}@geo.test', 'contraseña_hash': 'x'
+            })
+        db.session.execute(Cliente.__table__.insert(), filas)
+        db.session.execute(Ticket.__table__.insert(), [
+            {'id_cliente': fila['id'], 'estado': azar.choice(ESTADOS), 'titulo': 't', 'descripcion': 'd',
+             'fecha_creacion': ahora, 'prioridad': 'media', 'version': 1}
+            for fila in filas
+        ])
+        db.session.commit()
+    return time.perf_counter() - inicio
+
+
+def medir(centros, radio_km, limite):
+    latencias = []
+    encontrados = 0
+    for lat, lng in centros:
+        inicio = time.perf_counter()
+        total, _ = cercania.tickets_cercanos(lat, lng, radio_km, limite=limite)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        encontrados += total
+    return {
+        'p50_ms': round(percentil(latencias, 50), 2),
+        'p95_ms': round(percentil(latencias, 95), 2),
+        'max_ms': round(max(latencias), 2),
+        'tickets_promedio': round(encontrados / len(centros), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clientes', type=int, default=1000000)
+    parser.add_argument('--radio-km', type=float, default=5.0)
+    parser.add_argument('--consultas', type=int, default=50, help='Centros aleatorios por modo')
+    parser.add_argument('--limite', type=int, default=100)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--no-cargar', action='store_true', help='Usar los datos ya cargados en DATABASE_URL')
+    parser.add_argument('--json', action='store_true', help='Salida legible por máquina')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    url = os.getenv('DATABASE_URL')
+    if not url:
+        url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench_geo_'), 'geo.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    db.init_app(app)
+    azar = random.Random(args.semilla)
+
+    with app.app_context():
+        carga_s = None
+        if not args.no_cargar:
+            db.create_all()
+            carga_s = round(cargar(args.clientes, azar), 1)
+        clientes = db.session.query(Cliente.id).count()
+        motor = db.engine.dialect.name
+
+        centros = [punto(azar) for _ in range(args.consultas)]
+        # Calentar la cache de páginas para que ambos modos partan igual
+        medir(centros[:3], args.radio_km, args.limite)
+        geohash = medir(centros, args.radio_km, args.limite)
+
+        prefijos = cercania.GEO_MAX_PREFIJOS
+        cercania.GEO_MAX_PREFIJOS = 0
+        try:
+            sin_indice = medir(centros, args.radio_km, args.limite)
+        finally:
+            cercania.GEO_MAX_PREFIJOS = prefijos
+
+    resultado = {
+        'motor': motor,
+        'clientes': clientes,
+        'carga_s': carga_s,
+        'radio_km': args.radio_km,
+        'consultas': args.consultas,
+        'geohash': geohash,
+        'sin_indice': sin_indice,
+        'aceleracion_p50': round(sin_indice['p50_ms'] / max(geohash['p50_ms'], 1e-6), 1)
+    }
+    if args.json:
+        print(json.dumps(resultado, indent=2))
+        return
+
+    print(f"{resultado['motor']}: {clientes} clientes (carga {carga_s or '-'} s), radio {args.radio_km} km, "
+          f"{args.consultas} consultas")
+    print(f"{'modo':<14}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'tickets':>10}")
+    for modo in ('geohash', 'sin_indice'):
+        r = resultado[modo]
+        print(f"{modo:<14}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['max_ms']:>10}{r['tickets_promedio']:>10}")
+    print(f"aceleración p50: {resultado['aceleracion_p50']}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark de importación masiva (src/api/importacion.py)
+
+Genera clientes y tickets sintéticos en NDJSON y mide filas por segundo de la importación
+por lotes frente a una fila por transacción con el ORM (lo que hace POST /tickets sin
+los eventos de Socket.IO), que se mide sobre una muestra más pequeña.
+
+Uso:
+    $ python benchmarks/bench_importacion.py                  # 20k clientes, 200k tickets en SQLite temporal
+    $ python benchmarks/bench_importacion.py --tickets 1000000 --lote 5000 --json
+    $ DATABASE_URL=postgresql://... python benchmarks/bench_importacion.py --muestra-orm 5000
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from flask import Flask  # noqa: E402
+from api.models import db, Ticket  # noqa: E402
+from api import importacion  # noqa: E402
+
+PRIORIDADES = ['baja', 'media', 'alta', 'critica']
+ESTADOS = ['creado', 'en_espera', 'en_proceso', 'solucionado', 'cerrado']
+
+
+def ndjson_clientes(total, azar):
+    for i in range(total):
+        yield json.dumps({
+            'nombre': f'Cliente{i}', 'apellido': 'Bench', 'email': f'cliente{i}@import.test',
+            'direccion': f'Calle {i}', 'telefono': '3000000000',
+            'latitude': 4.6 + azar.uniform(-0.3, 0.3), 'longitude': -74.1 + azar.uniform(-0.3, 0.3)
+        }) + '\n'
+
+
+def ndjson_tickets(total, clientes, azar):
+    inicio = datetime(2024, 1, 1)
+    for i in range(total):
+        creado = inicio + timedelta(minutes=azar.randrange(0, 60 * 24 * 365))
+        estado = azar.choice(ESTADOS)
+        fila = {
+            'id_cliente': azar.randint(1, clientes), 'titulo': f'Ticket importado {i}',
+            'descripcion': 'Migrado desde el helpdesk anterior ' * 4, 'prioridad': azar.choice(PRIORIDADES),
+            'estado': estado, 'fecha_creacion': creado.isoformat()
+        }
+        if estado == 'cerrado':
+            fila['fecha_cierre'] = (creado + timedelta(hours=azar.randint(1, 200))).isoformat()
+            fila['calificacion'] = azar.randint(1, 5)
+        yield json.dumps(fila) + '\n'
+
+
+def importar(tipo, lineas, lote):
+    flujo = io.StringIO(''.join(lineas))
+    inicio = time.perf_counter()
+    reporte = importacion.importar(tipo, importacion.leer_filas(flujo, 'ndjson'), tamano_lote=lote)
+    segundos = time.perf_counter() - inicio
+    return {
+        'filas': reporte['procesadas'],
+        'insertadas': reporte['insertadas'],
+        'con_errores': reporte['con_errores'],
+        'segundos': round(segundos, 2),
+        'filas_por_s': round(reporte['procesadas'] / segundos)
+    }
+
+
+def orm_fila_por_fila(lineas):
+    inicio = time.perf_counter()
+    for texto in lineas:
+        fila = json.loads(texto)
+        db.session.add(Ticket(
+            id_cliente=fila['id_cliente'], estado='creado', titulo=fila['titulo'],
+            descripcion=fila['descripcion'], fecha_creacion=datetime.now(), prioridad=fila['prioridad']
+        ))
+        db.session.commit()
+    segundos = time.perf_counter() - inicio
+    return {'filas': len(lineas), 'segundos': round(segundos, 2), 'filas_por_s': round(len(lineas) / segundos)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clientes', type=int, default=20000)
+    parser.add_argument('--tickets', type=int, default=200000)
+    parser.add_argument('--lote', type=int, default=importacion.IMPORT_BATCH_SIZE)
+    parser.add_argument('--muestra-orm', type=int, default=2000, help='Tickets insertados uno a uno con el ORM')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help='Salida legible por máquina')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    url = os.getenv('DATABASE_URL')
+    if not url:
+        url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench_importacion_'), 'importacion.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    db.init_app(app)
+    azar = random.Random(args.semilla)
+
+    with app.app_context():
+        db.create_all()
+        motor = db.engine.dialect.name
+        clientes = importar('clientes', list(ndjson_clientes(args.clientes, azar)), args.lote)
+        tickets = importar('tickets', list(ndjson_tickets(args.tickets, args.clientes, azar)), args.lote)
+        orm = orm_fila_por_fila(list(ndjson_tickets(args.muestra_orm, args.clientes, azar)))
+
+    resultado = {
+        'motor': motor,
+        'lote': args.lote,
+        'clientes': clientes,
+        'tickets': tickets,
+        'orm_fila_por_fila': orm,
+        'aceleracion_tickets': round(tickets['filas_por_s'] / max(orm['filas_por_s'], 1), 1)
+    }
+    if args.json:
+        print(json.dumps(resultado, indent=2))
+        return
+
+    print(f"{motor}: lote {args.lote}")
+    print(f"{'modo':<20}{'filas':>10}{'segundos':>10}{'filas/s':>10}")
+    for nombre, r in (('clientes', clientes), ('tickets', tickets), ('orm_fila_por_fila', orm)):
+        print(f"{nombre:<20}{r['filas']:>10}{r['segundos']:>10}{r['filas_por_s']:>10}")
+    print(f"aceleración tickets: {resultado['aceleracion_tickets']}x")
+
+
+if __name__ == '__main__':
+    main()
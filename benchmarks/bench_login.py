@@ -0,0 +1,100 @@
+"""
+Benchmark de throughput de login con hashing de contraseñas (src/api/contrasenas.py)
+
+Para cada método/costo mide la latencia de un hash aislado y el throughput de
+verificaciones con N clientes concurrentes pasando por el pool acotado del KDF,
+junto con los rechazos por saturación (HTTP 503 en /api/login).
+
+Uso:
+    $ python benchmarks/bench_login.py
+    $ python benchmarks/bench_login.py --metodos scrypt:16384:8:1,scrypt:32768:8:1 --concurrencia 32 --json
+    $ PASSWORD_HASH_WORKERS=8 python benchmarks/bench_login.py
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+from api import contrasenas  # noqa: E402
+
+METODOS = 'pbkdf2:sha256:600000,scrypt:16384:8:1,scrypt:32768:8:1'
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def medir_metodo(metodo, concurrencia, logins):
+    almacenado = generate_password_hash('contraseña-de-prueba', metodo)
+
+    inicio = time.perf_counter()
+    contrasenas.verificar_contrasena(almacenado, 'contraseña-de-prueba')
+    hash_ms = (time.perf_counter() - inicio) * 1000
+
+    latencias = []
+    rechazados = 0
+
+    def login(_):
+        t0 = time.perf_counter()
+        try:
+            contrasenas.verificar_contrasena(almacenado, 'contraseña-de-prueba')
+        except contrasenas.PoolSaturado:
+            return None
+        return (time.perf_counter() - t0) * 1000
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as clientes:
+        for resultado in clientes.map(login, range(logins)):
+            if resultado is None:
+                rechazados += 1
+            else:
+                latencias.append(resultado)
+    duracion = time.perf_counter() - inicio
+
+    return {
+        'metodo': metodo,
+        'hash_ms': round(hash_ms, 2),
+        'logins_por_segundo': round(len(latencias) / duracion, 1),
+        'p50_ms': round(percentil(latencias, 50), 2) if latencias else None,
+        'p95_ms': round(percentil(latencias, 95), 2) if latencias else None,
+        'rechazados_503': rechazados
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--metodos', default=METODOS, help='Métodos werkzeug separados por coma')
+    parser.add_argument('--concurrencia', type=int, default=16, help='Clientes haciendo login a la vez')
+    parser.add_argument('--logins', type=int, default=64, help='Logins por método')
+    parser.add_argument('--json', action='store_true', help='Salida legible por máquina')
+    args = parser.parse_args()
+
+    resultados = [
+        medir_metodo(metodo, args.concurrencia, args.logins)
+        for metodo in args.metodos.split(',')
+    ]
+
+    if args.json:
+        print(json.dumps({
+            'workers': contrasenas.PASSWORD_HASH_WORKERS,
+            'max_pendientes': contrasenas.PASSWORD_HASH_MAX_PENDING,
+            'resultados': resultados
+        }, indent=2))
+        return
+
+    print(f"workers={contrasenas.PASSWORD_HASH_WORKERS} max_pendientes={contrasenas.PASSWORD_HASH_MAX_PENDING} "
+          f"concurrencia={args.concurrencia}")
+    print(f"{'método':<24}{'hash ms':>10}{'login/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'503':>6}")
+    for r in resultados:
+        print(f"{r['metodo']:<24}{r['hash_ms']:>10}{r['logins_por_segundo']:>10}"
+              f"{r['p50_ms'] or '-':>10}{r['p95_ms'] or '-':>10}{r['rechazados_503']:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""
+Microbenchmarks de serialización, tokens, similitud y mapa de calor
+
+Siembra una base SQLite en memoria con `sembrar_escala` (tamaño configurable) y mide,
+al estilo de pytest-benchmark (varias rondas con preparación fuera del tiempo medido,
+mínimo/mediana/media/desviación), los caminos calientes de las rutas: Ticket.serialize
+y Comentarios.serialize (con las cargas perezosas de relaciones y ya en memoria),
+jwt_utils.verify_token (con y sin la caché LRU), calcular_similitud_robusta contra
+los tickets cerrados y la construcción de filas de /heatmap-data. Si existe una base
+guardada (benchmarks/baseline_micro.json por defecto) muestra la variación del
+mínimo y sale con código 1 si alguna empeora más del umbral o ejecuta más consultas SQL
+que en la base (el conteo no depende de la máquina y delata N+1 nuevos). Los tiempos
+solo son comparables en la misma máquina: regenerar la base con --guardar-base antes de un cambio.
+
+Uso:
+    $ python benchmarks/bench_micro.py
+    $ python benchmarks/bench_micro.py --guardar-base
+    $ python benchmarks/bench_micro.py --tickets 20000 --rondas 5 --solo ticket_serialize,similitud --json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from flask import Flask  # noqa: E402
+from api.models import db, Ticket, Cliente, Comentarios  # noqa: E402
+from api import jwt_utils, mapa_calor  # noqa: E402
+from api.consultas import contar_consultas  # noqa: E402
+from api.datos_sinteticos import sembrar_escala  # noqa: E402
+from api.blueprints.ai import calcular_similitud_robusta  # noqa: E402
+
+BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_micro.json')
+# Fin fijo de la historia sembrada para que los datos no dependan del día
+FIN = datetime(2025, 1, 1)
+
+
+def medir(funcion, preparar, rondas):
+    """
+    Ejecutar funcion(preparar()) una vez de calentamiento y `rondas` veces medidas
+
+    Returns:
+        dict: Estadísticas en milisegundos por ronda
+    """
+    funcion(preparar())
+    tiempos = []
+    for _ in range(rondas):
+        datos = preparar()
+        gc.collect()
+        inicio = time.perf_counter()
+        funcion(datos)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {
+        'min_ms': round(min(tiempos), 3),
+        'mediana_ms': round(statistics.median(tiempos), 3),
+        'media_ms': round(statistics.mean(tiempos), 3),
+        'desviacion_ms': round(statistics.stdev(tiempos), 3) if len(tiempos) > 1 else 0.0
+    }
+
+
+def contar(funcion, preparar):
+    """Consultas SQL que ejecuta funcion(preparar()), sin contar la preparación"""
+    datos = preparar()
+    with contar_consultas() as contador:
+        funcion(datos)
+    return contador.total
+
+
+def cargar(consulta):
+    """Preparación que descarta la identity map para que cada ronda pague las cargas perezosas"""
+    def preparar():
+        db.session.expunge_all()
+        return consulta().all()
+    return preparar
+
+
+def en_memoria(consulta, funcion):
+    """Preparación con las relaciones ya cargadas: solo se mide el trabajo en Python"""
+    filas = consulta().all()
+    funcion(filas)
+    return lambda: filas
+
+
+def casos(args):
+    """(nombre, elementos por ronda, función medida, preparación)"""
+    def tickets():
+        return Ticket.query.order_by(Ticket.id).limit(args.serializar)
+
+    def comentarios():
+        return Comentarios.query.order_by(Comentarios.id).limit(args.serializar * 3)
+
+    def serializar(filas):
+        return [fila.serialize() for fila in filas]
+
+    def filas_heatmap():
+        return db.session.query(Ticket, Cliente).join(Cliente, Ticket.id_cliente == Cliente.id).filter(
+            Cliente.latitude.isnot(None), Cliente.longitude.isnot(None)
+        )
+
+    # verify_token no consulta la base: basta con ids distintos para que cada token sea único
+    tokens = [jwt_utils.generate_token(i, f'analista{i}@bench.test', 'analista') for i in range(1, args.tokens + 1)]
+
+    def verificar(lista):
+        for token in lista:
+            if jwt_utils.verify_token(token) is None:
+                raise RuntimeError('token rechazado')
+
+    def tokens_en_cache():
+        jwt_utils.clear_token_cache()
+        verificar(tokens)
+        return tokens
+
+    def tokens_en_frio():
+        jwt_utils.clear_token_cache()
+        return tokens
+
+    actual = Ticket.query.order_by(Ticket.id).first()
+    cerrados = [
+        (titulo, descripcion) for titulo, descripcion in db.session.query(Ticket.titulo, Ticket.descripcion).filter(
+            Ticket.estado.in_(['cerrado', 'cerrado_por_supervisor']), Ticket.id != actual.id
+        ).order_by(Ticket.id).limit(args.candidatos)
+    ]
+
+    def similitud(candidatos):
+        for titulo, descripcion in candidatos:
+            calcular_similitud_robusta(actual.titulo, actual.descripcion, titulo, descripcion)
+
+    n_tickets = tickets().count()
+    n_comentarios = comentarios().count()
+    n_heatmap = filas_heatmap().count()
+    return [
+        ('ticket_serialize', n_tickets, serializar, cargar(tickets)),
+        ('ticket_serialize_en_memoria', n_tickets, serializar, en_memoria(tickets, serializar)),
+        ('comentarios_serialize', n_comentarios, serializar, cargar(comentarios)),
+        ('comentarios_serialize_en_memoria', n_comentarios, serializar, en_memoria(comentarios, serializar)),
+        ('verify_token_cache', len(tokens), verificar, tokens_en_cache),
+        ('verify_token_frio', len(tokens), verificar, tokens_en_frio),
+        ('similitud', len(cerrados), similitud, lambda: cerrados),
+        ('heatmap_filas', n_heatmap, mapa_calor.puntos_por_ticket, cargar(filas_heatmap)),
+    ]
+
+
+def comparar(resultados, base, umbral):
+    """
+    Variación del mínimo frente a la base (el estadístico menos sensible al ruido de la máquina)
+    y del número de consultas SQL, que debe ser idéntico o menor
+
+    Returns:
+        list: Benchmarks que empeoraron más del umbral o ejecutan más consultas
+    """
+    regresiones = []
+    for nombre, r in resultados.items():
+        b = base.get('resultados', {}).get(nombre)
+        if not b or not b['min_ms']:
+            continue
+        r['base_min_ms'] = b['min_ms']
+        r['delta_pct'] = round((r['min_ms'] - b['min_ms']) / b['min_ms'] * 100, 1)
+        r['base_consultas'] = b.get('consultas')
+        if r['delta_pct'] > umbral or (r['base_consultas'] is not None and r['consultas'] > r['base_consultas']):
+            regresiones.append(nombre)
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clientes', type=int, default=200)
+    parser.add_argument('--tickets', type=int, default=5000, help='Tickets sembrados')
+    parser.add_argument('--serializar', type=int, default=500, help='Tickets serializados por ronda (y 3x comentarios)')
+    parser.add_argument('--tokens', type=int, default=1000, help='Tokens distintos verificados por ronda')
+    parser.add_argument('--candidatos', type=int, default=300, help='Tickets cerrados comparados por similitud')
+    parser.add_argument('--rondas', type=int, default=10)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--solo', help='Lista de benchmarks a ejecutar, separados por coma')
+    parser.add_argument('--base', default=BASE, help='Resultado guardado contra el que comparar')
+    parser.add_argument('--guardar-base', action='store_true', help='Guardar este resultado como nueva base')
+    parser.add_argument('--umbral', type=float, default=20, help='Porcentaje de empeoramiento tolerado')
+    parser.add_argument('--json', action='store_true', help='Salida legible por máquina')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    solo = set(args.solo.split(',')) if args.solo else None
+
+    resultados = {}
+    with app.app_context():
+        db.create_all()
+        sembrar_escala(args.clientes, max(args.clientes // 20, 1), max(args.clientes // 100, 1), args.tickets,
+                       semilla=args.semilla, fin=FIN)
+        for nombre, elementos, funcion, preparar in casos(args):
+            if solo and nombre not in solo:
+                continue
+            r = medir(funcion, preparar, args.rondas)
+            r['consultas'] = contar(funcion, preparar)
+            r['elementos'] = elementos
+            r['us_por_elemento'] = round(r['mediana_ms'] * 1000 / elementos, 2) if elementos else None
+            resultados[nombre] = r
+
+    parametros = {k: getattr(args, k) for k in ('clientes', 'tickets', 'serializar', 'tokens', 'candidatos', 'rondas', 'semilla')}
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'maquina': {'python': platform.python_version(), 'plataforma': platform.platform(), 'cpu': platform.processor()},
+        'parametros': parametros,
+        'resultados': resultados
+    }
+
+    regresiones = []
+    base = None
+    if not args.guardar_base and args.base and os.path.exists(args.base):
+        with open(args.base) as f:
+            base = json.load(f)
+        regresiones = comparar(resultados, base, args.umbral)
+    if args.guardar_base:
+        with open(args.base, 'w') as f:
+            json.dump(resultado, f, indent=2)
+            f.write('\n')
+
+    if args.json:
+        print(json.dumps(resultado, indent=2))
+    else:
+        print(f"SQLite en memoria: {args.tickets} tickets, {args.rondas} rondas")
+        if base and base.get('parametros') != parametros:
+            print(f"aviso: {args.base} se generó con otros parámetros")
+        print(f"{'benchmark':<34}{'elem':>6}{'min ms':>10}{'mediana':>10}{'desv':>8}{'µs/elem':>10}"
+              f"{'base min':>10}{'Δ %':>8}{'sql':>6}{'base':>6}")
+        for nombre, r in resultados.items():
+            marca = '  REGRESIÓN' if nombre in regresiones else ''
+            print(f"{nombre:<34}{r['elementos']:>6}{r['min_ms']:>10}{r['mediana_ms']:>10}{r['desviacion_ms']:>8}"
+                  f"{r['us_por_elemento']:>10}{r.get('base_min_ms', '-'):>10}{r.get('delta_pct', '-'):>8}"
+                  f"{r['consultas']:>6}{r.get('base_consultas') if r.get('base_consultas') is not None else '-':>6}{marca}")
+        if args.guardar_base:
+            print(f"base guardada en {args.base}")
+    if regresiones:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
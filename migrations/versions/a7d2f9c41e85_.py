@@ -0,0 +1,55 @@
+"""Unified credencial table for single-lookup login
+
+Revision ID: a7d2f9c41e85
+Revises: f2c6b8e04d19
+Create Date: 2025-10-10 11:26:08.940317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d2f9c41e85'
+down_revision = 'f2c6b8e04d19'
+branch_labels = None
+depends_on = None
+
+
+# Cada rol tiene su propia tabla con el mismo nombre
+ROLES = ['cliente', 'analista', 'supervisor', 'administrador']
+
+
+def upgrade():
+    op.create_table('credencial',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=120), nullable=False),
+    sa.Column('rol', sa.String(length=20), nullable=False),
+    sa.Column('id_usuario', sa.Integer(), nullable=False),
+    sa.Column('contraseña_hash', sa.String(length=255), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email', 'rol', name='uq_credencial_email_rol'),
+    sa.UniqueConstraint('rol', 'id_usuario', name='uq_credencial_rol_usuario')
+    )
+
+    # Poblar desde las tablas de cada rol
+    credencial = sa.table('credencial',
+        sa.column('email', sa.String),
+        sa.column('rol', sa.String),
+        sa.column('id_usuario', sa.Integer),
+        sa.column('contraseña_hash', sa.String)
+    )
+    for rol in ROLES:
+        origen = sa.table(rol,
+            sa.column('id', sa.Integer),
+            sa.column('email', sa.String),
+            sa.column('contraseña_hash', sa.String)
+        )
+        op.execute(credencial.insert().from_select(
+            ['email', 'rol', 'id_usuario', 'contraseña_hash'],
+            sa.select(origen.c.email, sa.literal(rol), origen.c.id, origen.c.contraseña_hash)
+        ))
+
+
+def downgrade():
+    op.drop_table('credencial')
@@ -0,0 +1,57 @@
+"""Cascade ticket deletes at the database level
+
+Revision ID: b3c1f7a9d2e4
+Revises: ce66cad3b595
+Create Date: 2025-10-01 10:12:37.512904
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3c1f7a9d2e4'
+down_revision = 'ce66cad3b595'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('asignacion', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_asignacion_ticket', type_='foreignkey')
+        batch_op.create_foreign_key('fk_asignacion_ticket', 'ticket', ['id_ticket'], ['id'], ondelete='CASCADE')
+
+    with op.batch_alter_table('gestion', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_gestion_ticket', type_='foreignkey')
+        batch_op.create_foreign_key('fk_gestion_ticket', 'ticket', ['id_ticket'], ['id'], ondelete='CASCADE')
+
+    with op.batch_alter_table('comentarios', schema=None) as batch_op:
+        # La FK hacia ticket se creó sin nombre (a92e8190bf39), Postgres le asignó el nombre por defecto
+        batch_op.drop_constraint('comentarios_id_ticket_fkey', type_='foreignkey')
+        batch_op.drop_constraint('fk_comentarios_gestion', type_='foreignkey')
+        batch_op.create_foreign_key('fk_comentarios_ticket', 'ticket', ['id_ticket'], ['id'], ondelete='CASCADE')
+        batch_op.create_foreign_key('fk_comentarios_gestion', 'gestion', ['id_gestion'], ['id'], ondelete='CASCADE')
+
+    # Índices para que las eliminaciones en cascada no recorran las tablas completas
+    op.create_index('ix_asignacion_id_ticket', 'asignacion', ['id_ticket'])
+    op.create_index('ix_gestion_id_ticket', 'gestion', ['id_ticket'])
+    op.create_index('ix_comentarios_id_ticket', 'comentarios', ['id_ticket'])
+
+
+def downgrade():
+    op.drop_index('ix_comentarios_id_ticket', table_name='comentarios')
+    op.drop_index('ix_gestion_id_ticket', table_name='gestion')
+    op.drop_index('ix_asignacion_id_ticket', table_name='asignacion')
+
+    with op.batch_alter_table('comentarios', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_comentarios_gestion', type_='foreignkey')
+        batch_op.drop_constraint('fk_comentarios_ticket', type_='foreignkey')
+        batch_op.create_foreign_key('fk_comentarios_gestion', 'gestion', ['id_gestion'], ['id'])
+        batch_op.create_foreign_key('comentarios_id_ticket_fkey', 'ticket', ['id_ticket'], ['id'])
+
+    with op.batch_alter_table('gestion', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_gestion_ticket', type_='foreignkey')
+        batch_op.create_foreign_key('fk_gestion_ticket', 'ticket', ['id_ticket'], ['id'])
+
+    with op.batch_alter_table('asignacion', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_asignacion_ticket', type_='foreignkey')
+        batch_op.create_foreign_key('fk_asignacion_ticket', 'ticket', ['id_ticket'], ['id'])
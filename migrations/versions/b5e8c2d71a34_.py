@@ -0,0 +1,42 @@
+"""Server-side refresh token sessions
+
+Revision ID: b5e8c2d71a34
+Revises: a7d2f9c41e85
+Create Date: 2025-10-11 09:41:52.207613
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e8c2d71a34'
+down_revision = 'a7d2f9c41e85'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sesion_refresh',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('rol', sa.String(length=20), nullable=False),
+    sa.Column('id_usuario', sa.Integer(), nullable=False),
+    sa.Column('token_hash', sa.String(length=64), nullable=False),
+    sa.Column('token_hash_anterior', sa.String(length=64), nullable=True),
+    sa.Column('fecha_creacion', sa.DateTime(), nullable=False),
+    sa.Column('fecha_expiracion', sa.DateTime(), nullable=False),
+    sa.Column('fecha_rotacion', sa.DateTime(), nullable=True),
+    sa.Column('fecha_revocacion', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token_hash', name='uq_sesion_refresh_token_hash')
+    )
+    op.create_index('ix_sesion_refresh_token_hash_anterior', 'sesion_refresh', ['token_hash_anterior'])
+    op.create_index('ix_sesion_refresh_rol_usuario', 'sesion_refresh', ['rol', 'id_usuario'])
+    op.create_index('ix_sesion_refresh_fecha_revocacion', 'sesion_refresh', ['fecha_revocacion'])
+
+
+def downgrade():
+    op.drop_index('ix_sesion_refresh_fecha_revocacion', table_name='sesion_refresh')
+    op.drop_index('ix_sesion_refresh_rol_usuario', table_name='sesion_refresh')
+    op.drop_index('ix_sesion_refresh_token_hash_anterior', table_name='sesion_refresh')
+    op.drop_table('sesion_refresh')
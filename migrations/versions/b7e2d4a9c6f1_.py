@@ -0,0 +1,33 @@
+"""Especialidad del analista en evento_ticket
+
+Revision ID: b7e2d4a9c6f1
+Revises: f4a7c2e9b1d3
+Create Date: 2025-10-22 09:41:18.204517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d4a9c6f1'
+down_revision = 'f4a7c2e9b1d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('evento_ticket', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('especialidad', sa.String(length=120), nullable=True))
+
+    # Los eventos existentes toman la especialidad vigente, la misma que usaba el rollup de SLA
+    op.execute(
+        "UPDATE evento_ticket SET especialidad = "
+        "(SELECT analista.especialidad FROM analista WHERE analista.id = evento_ticket.id_analista) "
+        "WHERE id_analista IS NOT NULL"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('evento_ticket', schema=None) as batch_op:
+        batch_op.drop_column('especialidad')
@@ -0,0 +1,32 @@
+"""Precomputed heatmap tiles
+
+Revision ID: c3f1a9d6e2b7
+Revises: b5e8c2d71a34
+Create Date: 2025-10-13 10:18:04.551920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f1a9d6e2b7'
+down_revision = 'b5e8c2d71a34'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tile_mapa_calor',
+    sa.Column('z', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('x', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('y', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('datos', sa.Text(), nullable=False),
+    sa.Column('etag', sa.String(length=64), nullable=False),
+    sa.Column('fecha_generacion', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('z', 'x', 'y')
+    )
+
+
+def downgrade():
+    op.drop_table('tile_mapa_calor')
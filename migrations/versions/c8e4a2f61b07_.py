@@ -0,0 +1,52 @@
+"""Archive table for closed tickets
+
+Revision ID: c8e4a2f61b07
+Revises: b3c1f7a9d2e4
+Create Date: 2025-10-03 16:40:11.208733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e4a2f61b07'
+down_revision = 'b3c1f7a9d2e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ticket_archivado',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('id_cliente', sa.Integer(), nullable=False),
+    sa.Column('estado', sa.String(length=50), nullable=False),
+    sa.Column('titulo', sa.String(length=200), nullable=False),
+    sa.Column('descripcion', sa.String(length=1000), nullable=False),
+    sa.Column('fecha_creacion', sa.DateTime(), nullable=False),
+    sa.Column('fecha_cierre', sa.DateTime(), nullable=True),
+    sa.Column('prioridad', sa.String(length=20), nullable=False),
+    sa.Column('calificacion', sa.Integer(), nullable=True),
+    sa.Column('comentario', sa.String(length=500), nullable=True),
+    sa.Column('fecha_evaluacion', sa.DateTime(), nullable=True),
+    sa.Column('url_imagen', sa.String(length=500), nullable=True),
+    sa.Column('fecha_archivado', sa.DateTime(), nullable=False),
+    sa.Column('historial', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['id_cliente'], ['cliente.id'], name='fk_ticket_archivado_cliente', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('ticket_archivado', schema=None) as batch_op:
+        batch_op.create_index('ix_ticket_archivado_id_cliente', ['id_cliente'], unique=False)
+        batch_op.create_index('ix_ticket_archivado_fecha_cierre', ['fecha_cierre'], unique=False)
+
+    # Índice para localizar rápido los candidatos a archivar
+    op.create_index('ix_ticket_estado_fecha_cierre', 'ticket', ['estado', 'fecha_cierre'])
+
+
+def downgrade():
+    op.drop_index('ix_ticket_estado_fecha_cierre', table_name='ticket')
+    with op.batch_alter_table('ticket_archivado', schema=None) as batch_op:
+        batch_op.drop_index('ix_ticket_archivado_fecha_cierre')
+        batch_op.drop_index('ix_ticket_archivado_id_cliente')
+
+    op.drop_table('ticket_archivado')
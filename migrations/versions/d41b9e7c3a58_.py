@@ -0,0 +1,51 @@
+"""Denormalized current assignment on ticket
+
+Revision ID: d41b9e7c3a58
+Revises: c8e4a2f61b07
+Create Date: 2025-10-06 11:27:54.930114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41b9e7c3a58'
+down_revision = 'c8e4a2f61b07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ticket', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('current_asignacion_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('current_analista_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_ticket_current_asignacion', 'asignacion', ['current_asignacion_id'], ['id'], ondelete='SET NULL')
+        batch_op.create_foreign_key('fk_ticket_current_analista', 'analista', ['current_analista_id'], ['id'], ondelete='SET NULL')
+        batch_op.create_index('ix_ticket_current_analista_id', ['current_analista_id'], unique=False)
+
+    # Rellenar con la asignación más reciente de cada ticket
+    op.execute("""
+        UPDATE ticket SET current_asignacion_id = (
+            SELECT a.id FROM asignacion a
+            WHERE a.id_ticket = ticket.id
+            ORDER BY a.fecha_asignacion DESC, a.id DESC
+            LIMIT 1
+        )
+    """)
+    op.execute("""
+        UPDATE ticket SET current_analista_id = (
+            SELECT a.id_analista FROM asignacion a
+            WHERE a.id = ticket.current_asignacion_id
+        )
+        WHERE current_asignacion_id IS NOT NULL
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('ticket', schema=None) as batch_op:
+        batch_op.drop_index('ix_ticket_current_analista_id')
+        batch_op.drop_constraint('fk_ticket_current_analista', type_='foreignkey')
+        batch_op.drop_constraint('fk_ticket_current_asignacion', type_='foreignkey')
+        batch_op.drop_column('current_analista_id')
+        batch_op.drop_column('current_asignacion_id')
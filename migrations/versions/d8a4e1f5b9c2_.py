@@ -0,0 +1,88 @@
+"""Geohash index on cliente coordinates and ticket lookup by cliente
+
+Revision ID: d8a4e1f5b9c2
+Revises: c3f1a9d6e2b7
+Create Date: 2025-10-14 09:41:37.205118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a4e1f5b9c2'
+down_revision = 'c3f1a9d6e2b7'
+branch_labels = None
+depends_on = None
+
+
+# Filas por UPDATE al poblar la columna
+LOTE = 5000
+# Copia fija de api.geo: la migración no importa código de la app, que puede cambiar
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION_GEOHASH = 9
+
+
+def codificar_geohash(lat, lng, precision=PRECISION_GEOHASH):
+    rango_lat = [-90.0, 90.0]
+    rango_lng = [-180.0, 180.0]
+    caracteres = []
+    bits = 0
+    valor = 0
+    es_lng = True
+    while len(caracteres) < precision:
+        rango, coordenada = (rango_lng, lng) if es_lng else (rango_lat, lat)
+        medio = (rango[0] + rango[1]) / 2
+        valor <<= 1
+        if coordenada >= medio:
+            valor |= 1
+            rango[0] = medio
+        else:
+            rango[1] = medio
+        es_lng = not es_lng
+        bits += 1
+        if bits == 5:
+            caracteres.append(BASE32[valor])
+            bits = 0
+            valor = 0
+    return ''.join(caracteres)
+
+
+def upgrade():
+    with op.batch_alter_table('cliente', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+        batch_op.create_index('ix_cliente_geohash', ['geohash'], unique=False)
+
+    with op.batch_alter_table('ticket', schema=None) as batch_op:
+        batch_op.create_index('ix_ticket_cliente_estado', ['id_cliente', 'estado'], unique=False)
+
+    # Poblar los clientes existentes; el geohash se calcula en Python para no depender de extensiones
+    cliente = sa.table('cliente',
+        sa.column('id', sa.Integer),
+        sa.column('latitude', sa.Float),
+        sa.column('longitude', sa.Float),
+        sa.column('geohash', sa.String)
+    )
+    conexion = op.get_bind()
+    filas = conexion.execute(
+        sa.select(cliente.c.id, cliente.c.latitude, cliente.c.longitude).where(
+            cliente.c.latitude.isnot(None), cliente.c.longitude.isnot(None)
+        )
+    ).fetchall()
+    actualizar = cliente.update().where(cliente.c.id == sa.bindparam('_id')).values(
+        geohash=sa.bindparam('_geohash')
+    )
+    for inicio in range(0, len(filas), LOTE):
+        conexion.execute(actualizar, [
+            {'_id': id_cliente, '_geohash': codificar_geohash(lat, lng)}
+            for id_cliente, lat, lng in filas[inicio:inicio + LOTE]
+        ])
+
+
+def downgrade():
+    with op.batch_alter_table('ticket', schema=None) as batch_op:
+        batch_op.drop_index('ix_ticket_cliente_estado')
+
+    with op.batch_alter_table('cliente', schema=None) as batch_op:
+        batch_op.drop_index('ix_cliente_geohash')
+        batch_op.drop_column('geohash')
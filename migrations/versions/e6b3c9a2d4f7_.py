@@ -0,0 +1,72 @@
+"""Materialized ticket statistics
+
+Revision ID: e6b3c9a2d4f7
+Revises: d8a4e1f5b9c2
+Create Date: 2025-10-14 16:02:51.318446
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b3c9a2d4f7'
+down_revision = 'd8a4e1f5b9c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('estadistica_ticket_estado',
+    sa.Column('estado', sa.String(length=50), nullable=False),
+    sa.Column('prioridad', sa.String(length=20), nullable=False),
+    sa.Column('id_analista', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('estado', 'prioridad', 'id_analista')
+    )
+    op.create_table('estadistica_ticket_dia',
+    sa.Column('dia', sa.Date(), nullable=False),
+    sa.Column('prioridad', sa.String(length=20), nullable=False),
+    sa.Column('id_analista', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('creados', sa.Integer(), nullable=False),
+    sa.Column('solucionados', sa.Integer(), nullable=False),
+    sa.Column('cerrados', sa.Integer(), nullable=False),
+    sa.Column('reabiertos', sa.Integer(), nullable=False),
+    sa.Column('segundos_cierre', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('dia', 'prioridad', 'id_analista')
+    )
+    op.create_table('histograma_ticket_dia',
+    sa.Column('dia', sa.Date(), nullable=False),
+    sa.Column('prioridad', sa.String(length=20), nullable=False),
+    sa.Column('id_analista', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('metrica', sa.String(length=20), nullable=False),
+    sa.Column('cubeta', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('dia', 'prioridad', 'id_analista', 'metrica', 'cubeta')
+    )
+
+    # Foto de los tickets activos; el histórico por día se llena con `flask rebuild-ticket-stats`
+    ticket = sa.table('ticket',
+        sa.column('estado', sa.String),
+        sa.column('prioridad', sa.String),
+        sa.column('current_analista_id', sa.Integer)
+    )
+    estadistica = sa.table('estadistica_ticket_estado',
+        sa.column('estado', sa.String),
+        sa.column('prioridad', sa.String),
+        sa.column('id_analista', sa.Integer),
+        sa.column('total', sa.Integer)
+    )
+    analista = sa.func.coalesce(ticket.c.current_analista_id, 0)
+    op.execute(estadistica.insert().from_select(
+        ['estado', 'prioridad', 'id_analista', 'total'],
+        sa.select(ticket.c.estado, ticket.c.prioridad, analista, sa.func.count()).group_by(
+            ticket.c.estado, ticket.c.prioridad, analista
+        )
+    ))
+
+
+def downgrade():
+    op.drop_table('histograma_ticket_dia')
+    op.drop_table('estadistica_ticket_dia')
+    op.drop_table('estadistica_ticket_estado')
@@ -0,0 +1,69 @@
+"""Typed ticket event log
+
+Revision ID: e9a7d3c51f26
+Revises: d41b9e7c3a58
+Create Date: 2025-10-08 09:14:02.671530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9a7d3c51f26'
+down_revision = 'd41b9e7c3a58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('evento_ticket',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('id_ticket', sa.Integer(), nullable=False),
+    sa.Column('tipo', sa.String(length=30), nullable=False),
+    sa.Column('estado_anterior', sa.String(length=50), nullable=True),
+    sa.Column('estado_nuevo', sa.String(length=50), nullable=True),
+    sa.Column('id_analista', sa.Integer(), nullable=True),
+    sa.Column('rol_usuario', sa.String(length=20), nullable=True),
+    sa.Column('id_usuario', sa.Integer(), nullable=True),
+    sa.Column('fecha', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['id_ticket'], ['ticket.id'], name='fk_evento_ticket_ticket', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['id_analista'], ['analista.id'], name='fk_evento_ticket_analista', ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('evento_ticket', schema=None) as batch_op:
+        batch_op.create_index('ix_evento_ticket_ticket_tipo_fecha', ['id_ticket', 'tipo', 'fecha'], unique=False)
+        batch_op.create_index('ix_evento_ticket_analista_tipo_fecha', ['id_analista', 'tipo', 'fecha'], unique=False)
+
+    # Historial existente: asignaciones vigentes y comentarios automáticos de la máquina de estados
+    op.execute("""
+        INSERT INTO evento_ticket (id_ticket, tipo, estado_nuevo, id_analista, rol_usuario, id_usuario, fecha)
+        SELECT id_ticket, 'asignado', 'en_espera', id_analista, 'supervisor', id_supervisor, fecha_asignacion
+        FROM asignacion
+    """)
+    for texto, tipo, estado in [
+        ('Ticket escalado al supervisor', 'escalado', 'en_espera'),
+        ('Ticket solucionado', 'solucionado', 'solucionado'),
+        ('Ticket reabierto por cliente', 'reabierto', 'reabierto'),
+        ('Ticket reabierto por supervisor', 'reabierto', 'reabierto'),
+        ('Ticket cerrado por cliente', 'cerrado', 'cerrado'),
+    ]:
+        op.execute(f"""
+            INSERT INTO evento_ticket (id_ticket, tipo, estado_nuevo, id_analista, rol_usuario, id_usuario, fecha)
+            SELECT id_ticket, '{tipo}', '{estado}', id_analista,
+                   CASE WHEN id_cliente IS NOT NULL THEN 'cliente'
+                        WHEN id_analista IS NOT NULL THEN 'analista'
+                        ELSE 'supervisor' END,
+                   COALESCE(id_cliente, id_analista, id_supervisor),
+                   fecha_comentario
+            FROM comentarios
+            WHERE texto = '{texto}'
+        """)
+
+
+def downgrade():
+    with op.batch_alter_table('evento_ticket', schema=None) as batch_op:
+        batch_op.drop_index('ix_evento_ticket_analista_tipo_fecha')
+        batch_op.drop_index('ix_evento_ticket_ticket_tipo_fecha')
+
+    op.drop_table('evento_ticket')
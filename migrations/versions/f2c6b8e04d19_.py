@@ -0,0 +1,26 @@
+"""Ticket version column for optimistic concurrency
+
+Revision ID: f2c6b8e04d19
+Revises: e9a7d3c51f26
+Create Date: 2025-10-09 18:03:45.118402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6b8e04d19'
+down_revision = 'e9a7d3c51f26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ticket', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('ticket', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,40 @@
+"""SLA rollup per day
+
+Revision ID: f4a7c2e9b1d3
+Revises: e6b3c9a2d4f7
+Create Date: 2025-10-15 10:24:07.582913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a7c2e9b1d3'
+down_revision = 'e6b3c9a2d4f7'
+branch_labels = None
+depends_on = None
+
+COLUMNAS_SLA = (
+    'hasta_1h', 'hasta_4h', 'hasta_8h', 'hasta_24h', 'hasta_48h',
+    'hasta_72h', 'hasta_7d', 'hasta_14d', 'hasta_30d', 'mas_30d'
+)
+
+
+def upgrade():
+    # Se llena con `flask rebuild-sla-rollup`; desde ahí lo mantienen los eventos de evento_ticket
+    op.create_table('metrica_sla_dia',
+    sa.Column('dia', sa.Date(), nullable=False),
+    sa.Column('metrica', sa.String(length=20), nullable=False),
+    sa.Column('id_analista', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('especialidad', sa.String(length=120), nullable=False),
+    sa.Column('prioridad', sa.String(length=20), nullable=False),
+    sa.Column('muestras', sa.Integer(), nullable=False),
+    sa.Column('suma_segundos', sa.Float(), nullable=False),
+    *[sa.Column(columna, sa.Integer(), nullable=False) for columna in COLUMNAS_SLA],
+    sa.PrimaryKeyConstraint('dia', 'metrica', 'id_analista', 'especialidad', 'prioridad')
+    )
+
+
+def downgrade():
+    op.drop_table('metrica_sla_dia')
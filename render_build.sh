@@ -35,6 +35,7 @@ pip install sqlalchemy==2.0.23
 
 # Paquetes específicos de TiBACK
 pip install PyJWT==2.8.0
+pip install cryptography==41.0.7
 pip install requests==2.31.0
 pip install python-socketio==5.8.0
 pip install flask-socketio==5.3.6
@@ -1,9 +1,18 @@
 import os
 from flask_admin import Admin
 from .models import db, User, Cliente, Analista, Supervisor, Ticket
+from .contrasenas import hashear_contrasena
 from flask_admin.contrib.sqla import ModelView
 
 
+class UsuarioView(ModelView):
+    # El campo contraseña_hash del formulario recibe la contraseña en texto plano
+    def on_model_change(self, form, model, is_created):
+        campo = getattr(form, 'contraseña_hash', None)
+        if campo is not None and campo.data and (is_created or campo.data != campo.object_data):
+            model.contraseña_hash = hashear_contrasena(campo.data)
+
+
 def setup_admin(app):
     app.secret_key = os.environ.get('FLASK_APP_KEY', 'sample key')
     app.config['FLASK_ADMIN_SWATCH'] = 'cerulean'
@@ -11,9 +20,9 @@ def setup_admin(app):
 
     # Add your models here, for example this is how we add a the User model to the admin
     admin.add_view(ModelView(User, db.session))
-    admin.add_view(ModelView(Cliente, db.session))
-    admin.add_view(ModelView(Analista, db.session))
-    admin.add_view(ModelView(Supervisor, db.session))
+    admin.add_view(UsuarioView(Cliente, db.session))
+    admin.add_view(UsuarioView(Analista, db.session))
+    admin.add_view(UsuarioView(Supervisor, db.session))
     admin.add_view(ModelView(Ticket, db.session))
 
     # You can duplicate that line to add mew models
@@ -0,0 +1,157 @@
+"""
+Archivo de tickets cerrados para TiBACK
+Mueve tickets cerrados fuera de las tablas activas y permite leerlos de forma transparente
+"""
+import json
+import zlib
+from datetime import datetime, timedelta
+from sqlalchemy.orm import selectinload
+from api.models import db, Ticket, TicketArchivado, Comentarios, Asignacion, Gestion, EventoTicket, ESTADOS_CIERRE
+
+
+def purgar_tickets(ticket_ids):
+    """
+    Elimina un lote de tickets y sus dependencias con sentencias DELETE masivas,
+    sin cargar asignaciones, comentarios ni gestiones en memoria.
+
+    En Postgres las FK tienen ON DELETE CASCADE; los DELETE explícitos mantienen
+    el mismo comportamiento en motores que no aplican las FK (SQLite).
+
+    Args:
+        ticket_ids (list): IDs de los tickets a eliminar
+
+    Returns:
+        int: Número de tickets eliminados
+    """
+    if not ticket_ids:
+        return 0
+
+    gestiones_ids = db.session.query(Gestion.id).filter(Gestion.id_ticket.in_(ticket_ids))
+    Comentarios.query.filter(
+        (Comentarios.id_ticket.in_(ticket_ids)) | (Comentarios.id_gestion.in_(gestiones_ids))
+    ).delete(synchronize_session=False)
+    Asignacion.query.filter(Asignacion.id_ticket.in_(ticket_ids)).delete(synchronize_session=False)
+    Gestion.query.filter(Gestion.id_ticket.in_(ticket_ids)).delete(synchronize_session=False)
+    EventoTicket.query.filter(EventoTicket.id_ticket.in_(ticket_ids)).delete(synchronize_session=False)
+    eliminados = Ticket.query.filter(Ticket.id.in_(ticket_ids)).delete(synchronize_session=False)
+
+    # Los objetos ya cargados en la sesión quedarían obsoletos tras los DELETE masivos
+    db.session.expire_all()
+    return eliminados
+
+
+def comprimir_historial(ticket):
+    """
+    Serializa comentarios, gestiones, asignaciones y eventos de un ticket en JSON comprimido
+
+    Args:
+        ticket (Ticket): Ticket con sus relaciones cargadas
+
+    Returns:
+        bytes: Historial comprimido con zlib
+    """
+    datos = ticket.serialize()
+    historial = {
+        "asignacion_actual": datos["asignacion_actual"],
+        "comentarios": datos["comentarios"],
+        "asignaciones": [a.serialize() for a in ticket.asignaciones],
+        "gestiones": [g.serialize() for g in ticket.gestiones],
+        "eventos": [e.serialize() for e in ticket.eventos]
+    }
+    return zlib.compress(json.dumps(historial, ensure_ascii=False).encode('utf-8'))
+
+
+def archivar_tickets(ticket_ids):
+    """
+    Copia un lote de tickets a ticket_archivado y los elimina de las tablas activas.
+    No hace commit; el llamador decide el límite de la transacción.
+
+    Args:
+        ticket_ids (list): IDs de los tickets a archivar
+
+    Returns:
+        int: Número de tickets archivados
+    """
+    if not ticket_ids:
+        return 0
+
+    tickets = Ticket.query.options(
+        selectinload(Ticket.cliente),
+        selectinload(Ticket.comentarios).selectinload(Comentarios.cliente),
+        selectinload(Ticket.comentarios).selectinload(Comentarios.analista),
+        selectinload(Ticket.comentarios).selectinload(Comentarios.supervisor),
+        selectinload(Ticket.asignacion_vigente).selectinload(Asignacion.analista),
+        selectinload(Ticket.asignacion_vigente).selectinload(Asignacion.supervisor),
+        selectinload(Ticket.asignaciones).selectinload(Asignacion.analista),
+        selectinload(Ticket.asignaciones).selectinload(Asignacion.supervisor),
+        selectinload(Ticket.gestiones),
+        selectinload(Ticket.eventos)
+    ).filter(Ticket.id.in_(ticket_ids)).all()
+
+    ahora = datetime.now()
+    db.session.add_all([
+        TicketArchivado(
+            id=ticket.id,
+            id_cliente=ticket.id_cliente,
+            estado=ticket.estado,
+            titulo=ticket.titulo,
+            descripcion=ticket.descripcion,
+            fecha_creacion=ticket.fecha_creacion,
+            fecha_cierre=ticket.fecha_cierre,
+            prioridad=ticket.prioridad,
+            calificacion=ticket.calificacion,
+            comentario=ticket.comentario,
+            fecha_evaluacion=ticket.fecha_evaluacion,
+            url_imagen=ticket.url_imagen,
+            fecha_archivado=ahora,
+            historial=comprimir_historial(ticket)
+        )
+        for ticket in tickets
+    ])
+    db.session.flush()
+
+    purgar_tickets([ticket.id for ticket in tickets])
+    return len(tickets)
+
+
+def archivar_tickets_cerrados(dias, tamano_lote=500):
+    """
+    Archiva por lotes los tickets cerrados hace más de `dias` días,
+    confirmando cada lote en su propia transacción.
+
+    Args:
+        dias (int): Antigüedad mínima del cierre en días
+        tamano_lote (int): Tickets por transacción
+
+    Yields:
+        int: Tickets archivados en cada lote
+    """
+    limite = datetime.now() - timedelta(days=dias)
+    while True:
+        lote = [row[0] for row in db.session.query(Ticket.id).filter(
+            Ticket.estado.in_(ESTADOS_CIERRE),
+            Ticket.fecha_cierre.isnot(None),
+            Ticket.fecha_cierre < limite
+        ).order_by(Ticket.id).limit(tamano_lote).all()]
+        if not lote:
+            break
+        try:
+            archivados = archivar_tickets(lote)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        yield archivados
+
+
+def obtener_ticket_archivado(ticket_id):
+    """
+    Buscar un ticket en el archivo
+
+    Args:
+        ticket_id (int): ID del ticket
+
+    Returns:
+        TicketArchivado: Ticket archivado si existe, None en caso contrario
+    """
+    return db.session.get(TicketArchivado, ticket_id)
@@ -0,0 +1,3 @@
+"""
+Blueprints de la API por área, registrables por separado (ver api/routes.py)
+"""
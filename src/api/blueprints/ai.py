@@ -0,0 +1,383 @@
+"""
+Rutas de IA: tickets similares y recomendaciones con OpenAI
+"""
+import os
+import re
+import json
+from difflib import SequenceMatcher
+from flask import jsonify, Blueprint
+from sqlalchemy import func, or_
+from api.models import Ticket, TicketArchivado
+from api.integraciones import integracion
+from api.metricas import medir_integracion
+from api.jwt_utils import require_auth, get_user_from_token
+from flask_cors import CORS
+
+api = Blueprint('ai', __name__)
+
+# Allow CORS requests to this API
+CORS(api, origins="*", allow_headers=["Content-Type", "Authorization"], methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
+
+# Candidatos puntuados por cada tabla (tickets cerrados activos y archivados), los más recientes primero
+SIMILARES_MAX_CANDIDATOS = int(os.getenv('SIMILARES_MAX_CANDIDATOS', '300'))
+# Palabras del ticket usadas para prefiltrar candidatos en SQL (las más largas)
+SIMILARES_MAX_PALABRAS = int(os.getenv('SIMILARES_MAX_PALABRAS', '6'))
+
+PALABRAS_VACIAS = {'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'es', 'se', 'no', 'te', 'lo', 'le', 'da', 'su', 'por', 'son', 'con', 'para', 'al', 'del', 'los', 'las', 'una', 'como', 'pero', 'sus', 'muy', 'sin', 'sobre', 'entre', 'hasta', 'desde', 'durante', 'mediante', 'según', 'ante', 'bajo', 'contra', 'hacia', 'tras', 'durante', 'excepto', 'salvo', 'menos', 'más', 'todo', 'todos', 'toda', 'todas', 'este', 'esta', 'estos', 'estas', 'ese', 'esa', 'esos', 'esas', 'aquel', 'aquella', 'aquellos', 'aquellas', 'mi', 'mis', 'tu', 'tus', 'su', 'sus', 'nuestro', 'nuestra', 'nuestros', 'nuestras', 'vuestro', 'vuestra', 'vuestros', 'vuestras'}
+
+
+def _limpiar_texto(texto):
+    if not texto:
+        return ""
+    # Remover caracteres especiales y normalizar espacios
+    texto_limpio = re.sub(r'[^\w\s]', ' ', str(texto).lower())
+    texto_limpio = re.sub(r'\s+', ' ', texto_limpio).strip()
+    return texto_limpio
+
+
+def _palabras(texto):
+    return set(p for p in texto.split() if len(p) > 2 and p not in PALABRAS_VACIAS)
+
+
+def calcular_similitud_robusta(titulo1, descripcion1, titulo2, descripcion2):
+    """Algoritmo robusto de similitud semántica mejorado (0 a 1) entre dos tickets"""
+    # Limpiar textos
+    texto1 = _limpiar_texto(titulo1) + " " + _limpiar_texto(descripcion1)
+    texto2 = _limpiar_texto(titulo2) + " " + _limpiar_texto(descripcion2)
+    
+    if not texto1 or not texto2:
+        return 0
+    
+    # Dividir en palabras y filtrar palabras vacías
+    palabras1 = _palabras(texto1)
+    palabras2 = _palabras(texto2)
+    
+    if not palabras1 or not palabras2:
+        return 0
+    
+    # 1. Similitud de Jaccard (palabras exactas)
+    interseccion = palabras1.intersection(palabras2)
+    union = palabras1.union(palabras2)
+    jaccard = len(interseccion) / len(union) if union else 0
+    
+    # 2. Similitud de secuencia (para palabras similares)
+    palabras1_list = list(palabras1)
+    palabras2_list = list(palabras2)
+    similitud_secuencia = 0
+    coincidencias = 0
+    
+    for p1 in palabras1_list:
+        mejor_similitud = 0
+        for p2 in palabras2_list:
+            sim = SequenceMatcher(None, p1, p2).ratio()
+            if sim > mejor_similitud:
+                mejor_similitud = sim
+        if mejor_similitud > 0.8:  # Umbral para considerar palabras similares
+            coincidencias += mejor_similitud
+    
+    similitud_secuencia = coincidencias / len(palabras1_list) if palabras1_list else 0
+    
+    # 3. Similitud de título (peso mayor)
+    titulo1_limpio = _limpiar_texto(titulo1)
+    titulo2_limpio = _limpiar_texto(titulo2)
+    similitud_titulo = SequenceMatcher(None, titulo1_limpio, titulo2_limpio).ratio()
+    
+    # 4. Similitud de descripción
+    desc1_limpio = _limpiar_texto(descripcion1)
+    desc2_limpio = _limpiar_texto(descripcion2)
+    similitud_descripcion = SequenceMatcher(None, desc1_limpio, desc2_limpio).ratio()
+    
+    # Combinar métricas con pesos
+    similitud_final = (
+        jaccard * 0.3 +           # 30% palabras exactas
+        similitud_secuencia * 0.2 + # 20% palabras similares
+        similitud_titulo * 0.3 +    # 30% similitud de título
+        similitud_descripcion * 0.2 # 20% similitud de descripción
+    )
+    
+    return min(1.0, similitud_final)  # Asegurar que no exceda 1.0
+
+
+def _candidatos_similares(modelo, ticket_actual, filtros):
+    """
+    Tickets cerrados que comparten alguna palabra clave con el actual, los más recientes
+    primero y como mucho SIMILARES_MAX_CANDIDATOS, para que el costo de puntuar no crezca
+    con el histórico
+
+    Args:
+        modelo: Ticket o TicketArchivado
+        ticket_actual (Ticket): Ticket para el que se buscan similares
+        filtros (list): Condiciones adicionales de la consulta
+
+    Returns:
+        list: Candidatos a puntuar
+    """
+    palabras = sorted(
+        _palabras(_limpiar_texto(ticket_actual.titulo) + " " + _limpiar_texto(ticket_actual.descripcion)),
+        key=lambda p: (-len(p), p)
+    )[:SIMILARES_MAX_PALABRAS]
+    query = modelo.query.filter(
+        modelo.id != ticket_actual.id,
+        modelo.titulo.isnot(None),
+        modelo.descripcion.isnot(None),
+        modelo.titulo != '',
+        modelo.descripcion != '',
+        *filtros
+    )
+    if palabras:
+        query = query.filter(or_(*[
+            func.lower(columna).contains(palabra, autoescape=True)
+            for palabra in palabras for columna in (modelo.titulo, modelo.descripcion)
+        ]))
+    return query.order_by(modelo.fecha_cierre.desc().nullslast(), modelo.id.desc()).limit(SIMILARES_MAX_CANDIDATOS).all()
+
+
+@api.route('/tickets/<int:ticket_id>/recomendaciones-similares', methods=['GET'])
+@require_auth
+def obtener_tickets_similares(ticket_id):
+    """Obtener tickets similares basados en algoritmo robusto de similitud semántica"""
+    try:
+        # Validaciones robustas del ticket actual
+        if not ticket_id or ticket_id <= 0:
+            return jsonify({"message": "ID de ticket inválido"}), 400
+            
+        ticket_actual = Ticket.query.get(ticket_id)
+        if not ticket_actual:
+            return jsonify({"message": "Ticket no encontrado"}), 404
+        
+        # Validar que el ticket tenga contenido válido
+        if not ticket_actual.titulo or not ticket_actual.descripcion:
+            return jsonify({
+                "tickets_similares": [],
+                "total_encontrados": 0,
+                "ticket_actual": ticket_actual.serialize(),
+                "mensaje": "Ticket sin contenido suficiente para análisis"
+            }), 200
+        
+        # Candidatos acotados: tickets cerrados activos y archivados con palabras en común
+        tickets_cerrados = _candidatos_similares(
+            Ticket, ticket_actual, [Ticket.estado.in_(['cerrado', 'cerrado_por_supervisor'])]
+        )
+        tickets_cerrados += _candidatos_similares(TicketArchivado, ticket_actual, [])
+        
+        if not tickets_cerrados:
+            return jsonify({
+                "tickets_similares": [],
+                "total_encontrados": 0,
+                "ticket_actual": ticket_actual.serialize(),
+                "mensaje": "No hay tickets cerrados disponibles para comparación"
+            }), 200
+        
+        # Calcular similitud para cada ticket cerrado con validaciones
+        puntuados = []
+        for ticket in tickets_cerrados:
+            try:
+                similitud = calcular_similitud_robusta(
+                    ticket_actual.titulo, ticket_actual.descripcion,
+                    ticket.titulo, ticket.descripcion
+                )
+                
+                # Umbral más bajo pero con validaciones adicionales
+                if similitud > 0.05:  # Umbral reducido para capturar más similitudes
+                    puntuados.append((similitud, ticket))
+                    
+            except Exception as e:
+                print(f"Error calculando similitud para ticket {ticket.id}: {str(e)}")
+                continue
+        
+        # Ordenar por similitud descendente y serializar solo los 8 más similares
+        puntuados.sort(key=lambda x: x[0], reverse=True)
+        tickets_similares = []
+        for similitud, ticket in puntuados[:8]:
+            ticket_data = ticket.serialize()
+            ticket_data['similitud'] = round(similitud, 4)
+            ticket_data['nivel_similitud'] = (
+                'Alta' if similitud > 0.3 else
+                'Media' if similitud > 0.15 else
+                'Baja'
+            )
+            tickets_similares.append(ticket_data)
+        
+        # Validar que tenemos resultados
+        if not tickets_similares:
+            return jsonify({
+                "tickets_similares": [],
+                "total_encontrados": 0,
+                "ticket_actual": ticket_actual.serialize(),
+                "mensaje": "No se encontraron tickets con similitud suficiente"
+            }), 200
+        
+        return jsonify({
+            "tickets_similares": tickets_similares,
+            "total_encontrados": len(tickets_similares),
+            "ticket_actual": ticket_actual.serialize(),
+            "algoritmo": "similitud_semantica_robusta_v2",
+            "umbral_minimo": 0.05
+        }), 200
+        
+    except Exception as e:
+        print(f"Error en obtener_tickets_similares: {str(e)}")
+        return jsonify({"message": f"Error al obtener tickets similares: {str(e)}"}), 500
+
+
+@api.route('/tickets/<int:ticket_id>/recomendacion-ia', methods=['POST'])
+@require_auth
+def generar_recomendacion_ia(ticket_id):
+    """Generar recomendación usando OpenAI basada en el título y descripción del ticket"""
+    requests = integracion('requests')
+    try:
+        # Obtener el ticket
+        ticket = Ticket.query.get(ticket_id)
+        if not ticket:
+            return jsonify({"message": "Ticket no encontrado"}), 404
+        
+        # Verificar que el usuario tenga acceso al ticket
+        user = get_user_from_token()
+        if not user:
+            return jsonify({"message": "Token inválido o expirado"}), 401
+        
+        user_id = user['id']
+        user_role = user['role']
+        
+        # Solo el cliente propietario, analista asignado, supervisor o administrador pueden ver recomendaciones
+        if (user_role == 'cliente' and ticket.id_cliente != user_id) and \
+           (user_role == 'analista' and not any(a.id_analista == user_id for a in ticket.asignaciones)) and \
+           user_role not in ['supervisor', 'administrador']:
+            return jsonify({"message": "No tienes permisos para ver este ticket"}), 403
+        
+        # Obtener API key de OpenAI
+        api_key = os.getenv('API_KEY_IA')
+        
+        # Si no hay API key válida, generar recomendación básica
+        if not api_key or api_key.strip() == '' or api_key == 'clave api':
+            recomendacion_basica = {
+                "diagnostico": f"Análisis del ticket: {ticket.titulo}. {ticket.descripcion[:200]}...",
+                "pasos_solucion": [
+                    "1. Revisar la descripción del problema detalladamente",
+                    "2. Verificar si es un problema conocido en la base de conocimientos",
+                    "3. Consultar con el equipo técnico especializado",
+                    "4. Probar soluciones estándar según el tipo de problema",
+                    "5. Documentar la solución encontrada"
+                ],
+                "tiempo_estimado": "2-4 horas",
+                "recursos_necesarios": [
+                    "Acceso a la base de conocimientos",
+                    "Herramientas de diagnóstico",
+                    "Colaboración con el equipo técnico"
+                ],
+                "nivel_dificultad": "Media",
+                "recomendaciones_adicionales": "Para obtener recomendaciones más específicas con IA, configure una API Key válida de OpenAI en las variables de entorno."
+            }
+            
+            return jsonify({
+                "message": "Recomendación generada (modo básico)",
+                "recomendacion": recomendacion_basica,
+                "ticket_id": ticket_id
+            }), 200
+        
+        # Crear el prompt para OpenAI
+        prompt = f"""
+        Como experto en soporte técnico, analiza el siguiente ticket y proporciona una recomendación detallada para resolver el problema.
+        
+        Título del ticket: {ticket.titulo}
+        Descripción: {ticket.descripcion}
+        Prioridad: {ticket.prioridad}
+        Estado actual: {ticket.estado}
+        
+        Por favor, proporciona una recomendación estructurada en formato JSON con los siguientes campos:
+        - diagnostico: Un análisis del problema identificado
+        - pasos_solucion: Array de pasos específicos para resolver el problema
+        - tiempo_estimado: Tiempo estimado para resolver (en horas)
+        - recursos_necesarios: Lista de recursos o herramientas necesarias
+        - nivel_dificultad: Baja, Media o Alta
+        - recomendaciones_adicionales: Consejos adicionales o mejores prácticas
+        
+        Responde únicamente con el JSON, sin texto adicional.
+        """
+        
+        # Configurar la solicitud a OpenAI
+        headers = {
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json'
+        }
+        
+        data = {
+            'model': 'gpt-3.5-turbo',
+            'messages': [
+                {
+                    'role': 'system',
+                    'content': 'Eres un experto en soporte técnico especializado en resolver problemas de tickets. Responde siempre en formato JSON válido.'
+                },
+                {
+                    'role': 'user',
+                    'content': prompt
+                }
+            ],
+            'max_tokens': 1000,
+            'temperature': 0.7
+        }
+        
+        # Realizar la solicitud a OpenAI
+        with medir_integracion('openai'):
+            response = requests.post(
+                'https://api.openai.com/v1/chat/completions',
+                headers=headers,
+                json=data,
+                timeout=30
+            )
+        
+        if response.status_code != 200:
+            error_message = f"Error en la API de OpenAI: {response.status_code}"
+            try:
+                error_data = response.json()
+                if 'error' in error_data:
+                    error_message += f" - {error_data['error'].get('message', 'Error desconocido')}"
+            except:
+                error_message += f" - {response.text}"
+            
+            return jsonify({
+                "message": error_message,
+                "error": response.text
+            }), 500
+        
+        # Procesar la respuesta
+        try:
+            openai_response = response.json()
+            if 'choices' not in openai_response or len(openai_response['choices']) == 0:
+                raise ValueError("Respuesta de OpenAI sin contenido")
+            
+            recomendacion_texto = openai_response['choices'][0]['message']['content'].strip()
+            if not recomendacion_texto:
+                raise ValueError("Respuesta de OpenAI vacía")
+        except (KeyError, ValueError, IndexError) as e:
+            return jsonify({
+                "message": f"Error procesando respuesta de OpenAI: {str(e)}",
+                "error": "Respuesta de API inválida"
+            }), 500
+        
+        # Intentar parsear el JSON de la respuesta
+        try:
+            recomendacion_json = json.loads(recomendacion_texto)
+        except json.JSONDecodeError:
+            # Si no es JSON válido, crear una estructura con el texto
+            recomendacion_json = {
+                "diagnostico": "Análisis generado por IA",
+                "pasos_solucion": [recomendacion_texto],
+                "tiempo_estimado": "No especificado",
+                "recursos_necesarios": ["Consultar con el equipo técnico"],
+                "nivel_dificultad": "Media",
+                "recomendaciones_adicionales": "Revisar la respuesta generada por la IA"
+            }
+        
+        return jsonify({
+            "message": "Recomendación generada exitosamente",
+            "recomendacion": recomendacion_json,
+            "ticket_id": ticket_id
+        }), 200
+        
+    except requests.exceptions.Timeout:
+        return jsonify({"message": "Timeout en la solicitud a OpenAI"}), 408
+    except requests.exceptions.RequestException as e:
+        return jsonify({"message": f"Error de conexión con OpenAI: {str(e)}"}), 500
+    except Exception as e:
+        return jsonify({"message": f"Error interno: {str(e)}"}), 500
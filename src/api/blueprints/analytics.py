@@ -0,0 +1,340 @@
+"""
+Rutas de analítica: mapa de calor de tickets, búsquedas por cercanía y estadísticas
+"""
+from datetime import date
+from flask import request, jsonify, Blueprint, Response
+from api.models import db, Cliente, Ticket
+from api.jwt_utils import require_auth, require_role
+from api import mapa_calor, cercania, estadisticas, sla
+from api.geo import tile_valido
+from flask_cors import CORS
+
+api = Blueprint('analytics', __name__)
+
+# Allow CORS requests to this API
+CORS(api, origins="*", allow_headers=["Content-Type", "Authorization"], methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
+
+
+# ==================== RUTAS DE MAPA DE CALOR ====================
+
+@api.route('/heatmap-data', methods=['GET'])
+@require_auth
+def get_heatmap_data():
+    """
+    Obtener datos de coordenadas de tickets para el mapa de calor (un punto por ticket).
+    El mapa usa /heatmap, que agrega en celdas; se mantiene por compatibilidad.
+    """
+    try:
+        # Obtener todos los tickets con sus clientes que tengan coordenadas válidas
+        tickets = db.session.query(Ticket, Cliente).join(
+            Cliente, Ticket.id_cliente == Cliente.id
+        ).filter(
+            Cliente.latitude.isnot(None),
+            Cliente.longitude.isnot(None)
+        ).all()
+        
+        heatmap_data = mapa_calor.puntos_por_ticket(tickets)
+        
+        return jsonify({
+            "message": "Datos de mapa de calor de tickets obtenidos exitosamente",
+            "data": heatmap_data,
+            "total_points": len(heatmap_data)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            "message": "Error al obtener datos del mapa de calor",
+            "error": str(e)
+        }), 500
+
+
+def _lista_param(nombre):
+    valor = request.args.get(nombre)
+    return [x.strip() for x in valor.split(',') if x.strip()] if valor else None
+
+
+@api.route('/heatmap', methods=['GET'])
+@require_role(['administrador', 'supervisor', 'analista'])
+def get_heatmap_agregado():
+    """
+    Mapa de calor agregado en celdas de grilla para un zoom y bbox
+    Query: zoom, bbox=oeste,sur,este,norte, desglose=estado,prioridad, estado, prioridad
+    """
+    try:
+        bbox = mapa_calor.normalizar_bbox(request.args.get('bbox'))
+        zoom_pedido = request.args.get('zoom', default=6, type=int)
+        desglose = tuple(_lista_param('desglose') or ())
+        invalidos = set(desglose) - set(mapa_calor.DESGLOSES)
+        if invalidos:
+            return jsonify({"message": f"desglose no soportado: {', '.join(sorted(invalidos))}"}), 400
+    except ValueError as e:
+        return jsonify({"message": f"Parámetros inválidos: {e}"}), 400
+
+    try:
+        zoom = mapa_calor.zoom_efectivo(zoom_pedido, bbox)
+        celdas = mapa_calor.agregar_celdas(
+            zoom, bbox, desglose,
+            estados=_lista_param('estado'),
+            prioridades=_lista_param('prioridad')
+        )
+        return jsonify({
+            "zoom": zoom,
+            "zoom_pedido": zoom_pedido,
+            "bbox": list(bbox),
+            "tamano_celda": mapa_calor.tamano_celda(zoom),
+            "celdas": celdas,
+            "total_celdas": len(celdas),
+            "total_tickets": sum(celda["total"] for celda in celdas)
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": "Error al obtener el mapa de calor",
+            "error": str(e)
+        }), 500
+
+
+@api.route('/heatmap/celdas/<celda>', methods=['GET'])
+@require_role(['administrador', 'supervisor', 'analista'])
+def get_heatmap_celda(celda):
+    """Tickets de una celda del mapa de calor (al hacer click), paginados con limite/offset"""
+    limite = min(max(request.args.get('limite', default=50, type=int), 1), 200)
+    offset = max(request.args.get('offset', default=0, type=int), 0)
+    try:
+        total, tickets = mapa_calor.tickets_en_celda(
+            celda,
+            estados=_lista_param('estado'),
+            prioridades=_lista_param('prioridad'),
+            limite=limite,
+            offset=offset
+        )
+        return jsonify({
+            "celda": celda,
+            "total": total,
+            "tickets": tickets,
+            "limite": limite,
+            "offset": offset
+        }), 200
+    except mapa_calor.CeldaInvalida:
+        return jsonify({"message": "Celda inválida"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": "Error al obtener los tickets de la celda",
+            "error": str(e)
+        }), 500
+
+
+@api.route('/heatmap/tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+@require_role(['administrador', 'supervisor', 'analista'])
+def get_heatmap_tile(z, x, y):
+    """Tile XYZ de densidad de tickets por celda y estado, cacheado y con ETag"""
+    if z > mapa_calor.ZOOM_MAXIMO or not tile_valido(z, x, y):
+        return jsonify({"message": "Tile fuera de rango"}), 404
+    try:
+        datos, etag, cacheado = mapa_calor.obtener_tile(z, x, y)
+        response = Response(datos, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, max-age=60'
+        response.headers['Vary'] = 'Authorization'
+        response.headers['X-Tile-Cache'] = 'HIT' if cacheado else 'MISS'
+        return response.make_conditional(request)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": "Error al obtener el tile del mapa de calor",
+            "error": str(e)
+        }), 500
+
+
+@api.route('/heatmap/tickets/<int:ticket_id>', methods=['GET'])
+@require_role(['administrador', 'supervisor', 'analista'])
+def get_heatmap_punto(ticket_id):
+    """Detalle de un punto del mapa de calor"""
+    try:
+        fila = db.session.query(Ticket, Cliente).join(
+            Cliente, Ticket.id_cliente == Cliente.id
+        ).filter(Ticket.id == ticket_id).first()
+        if not fila:
+            return jsonify({"message": "Ticket no encontrado"}), 404
+
+        ticket, cliente = fila
+        return jsonify({
+            'lat': cliente.latitude,
+            'lng': cliente.longitude,
+            'ticket_id': ticket.id,
+            'ticket_titulo': ticket.titulo,
+            'ticket_descripcion': ticket.descripcion or 'Sin descripción',
+            'ticket_estado': ticket.estado,
+            'ticket_prioridad': ticket.prioridad,
+            'ticket_fecha_creacion': ticket.fecha_creacion.isoformat() if ticket.fecha_creacion else None,
+            'cliente_id': cliente.id,
+            'cliente_nombre': cliente.nombre,
+            'cliente_apellido': cliente.apellido,
+            'cliente_direccion': cliente.direccion or 'Dirección no disponible'
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": "Error al obtener el detalle del punto",
+            "error": str(e)
+        }), 500
+
+
+# ==================== RUTAS DE CERCANÍA ====================
+
+@api.route('/geo/tickets-cercanos', methods=['GET'])
+@require_role(['administrador', 'supervisor', 'analista'])
+def get_tickets_cercanos():
+    """
+    Tickets abiertos a menos de radio_km de un punto, ordenados por distancia
+    Query: lat, lng, radio_km (5 por defecto), estado, prioridad, limite
+    """
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    radio_km = request.args.get('radio_km', default=5.0, type=float)
+    limite = min(max(request.args.get('limite', default=100, type=int), 1), 500)
+    if lat is None or lng is None:
+        return jsonify({"message": "lat y lng son requeridos"}), 400
+
+    try:
+        total, tickets = cercania.tickets_cercanos(
+            lat, lng, radio_km,
+            estados=_lista_param('estado'),
+            prioridades=_lista_param('prioridad'),
+            limite=limite
+        )
+        return jsonify({
+            "centro": {"lat": lat, "lng": lng},
+            "radio_km": radio_km,
+            "total": total,
+            "tickets": tickets,
+            "limite": limite
+        }), 200
+    except ValueError as e:
+        return jsonify({"message": f"Parámetros inválidos: {e}"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": "Error al buscar tickets cercanos",
+            "error": str(e)
+        }), 500
+
+
+@api.route('/geo/clientes', methods=['GET'])
+@require_role(['administrador', 'supervisor', 'analista'])
+def get_clientes_en_bbox():
+    """
+    Clientes con ubicación dentro de un bbox
+    Query: bbox=oeste,sur,este,norte (requerido), limite
+    """
+    if not request.args.get('bbox'):
+        return jsonify({"message": "bbox es requerido"}), 400
+    try:
+        bbox = mapa_calor.normalizar_bbox(request.args.get('bbox'))
+    except ValueError as e:
+        return jsonify({"message": f"Parámetros inválidos: {e}"}), 400
+    limite = min(max(request.args.get('limite', default=500, type=int), 1), 2000)
+
+    try:
+        total, clientes = cercania.clientes_en_bbox(bbox, limite)
+        return jsonify({
+            "bbox": list(bbox),
+            "total": total,
+            "clientes": clientes,
+            "limite": limite
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": "Error al buscar clientes en el bbox",
+            "error": str(e)
+        }), 500
+
+
+# ==================== RUTAS DE ESTADÍSTICAS ====================
+
+# Días máximos por consulta de estadísticas
+ESTADISTICAS_MAX_DIAS = 731
+
+
+@api.route('/estadisticas/tickets', methods=['GET'])
+@require_role(['supervisor', 'administrador'])
+def get_estadisticas_tickets():
+    """
+    Estadísticas de tickets desde las tablas agregadas (tiempo constante respecto al número de tickets)
+    Query: desde, hasta (YYYY-MM-DD; por defecto los últimos 30 días), id_analista (0 = sin asignar), prioridad
+    """
+    try:
+        desde, hasta = _rango_estadisticas()
+    except ValueError as e:
+        return jsonify({"message": f"Parámetros inválidos: {e}"}), 400
+
+    try:
+        return jsonify(estadisticas.resumen(
+            desde, hasta,
+            id_analista=request.args.get('id_analista', type=int),
+            prioridad=request.args.get('prioridad')
+        )), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": "Error al obtener las estadísticas de tickets",
+            "error": str(e)
+        }), 500
+
+
+def _rango_estadisticas():
+    desde, hasta = estadisticas.rango_por_defecto()
+    if request.args.get('desde'):
+        desde = date.fromisoformat(request.args['desde'])
+    if request.args.get('hasta'):
+        hasta = date.fromisoformat(request.args['hasta'])
+    if desde > hasta:
+        raise ValueError("desde es posterior a hasta")
+    if (hasta - desde).days >= ESTADISTICAS_MAX_DIAS:
+        raise ValueError(f"el rango no puede superar {ESTADISTICAS_MAX_DIAS} días")
+    return desde, hasta
+
+
+@api.route('/sla', methods=['GET'])
+@require_role(['supervisor', 'administrador'])
+def get_sla():
+    """
+    Tiempos hasta la primera asignación, solución y cierre desde el rollup metrica_sla_dia
+    Query: desde, hasta (YYYY-MM-DD; por defecto los últimos 30 días),
+    agrupar (analista, especialidad, prioridad, dia, semana, mes), metrica (asignacion, solucion, cierre),
+    id_analista (0 = sin analista), especialidad, prioridad
+    """
+    try:
+        desde, hasta = _rango_estadisticas()
+        agrupar = request.args.get('agrupar') or None
+        if agrupar and agrupar not in sla.AGRUPACIONES:
+            raise ValueError(f"agrupar debe ser uno de {', '.join(sla.AGRUPACIONES)}")
+        metrica = request.args.get('metrica') or None
+        if metrica and metrica not in sla.METRICAS:
+            raise ValueError(f"metrica debe ser una de {', '.join(sla.METRICAS)}")
+    except ValueError as e:
+        return jsonify({"message": f"Parámetros inválidos: {e}"}), 400
+
+    try:
+        resultado = sla.consultar(
+            desde, hasta,
+            agrupar=agrupar,
+            metrica=metrica,
+            id_analista=request.args.get('id_analista', type=int),
+            especialidad=request.args.get('especialidad'),
+            prioridad=request.args.get('prioridad')
+        )
+        return jsonify({
+            "desde": desde.isoformat(),
+            "hasta": hasta.isoformat(),
+            "agrupar": agrupar,
+            **resultado
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": "Error al obtener las métricas de SLA",
+            "error": str(e)
+        }), 500
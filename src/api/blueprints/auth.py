@@ -0,0 +1,275 @@
+"""
+Rutas de autenticación: registro, login, sesiones de refresh y claves públicas JWT
+"""
+from flask import request, jsonify, Blueprint
+from api.models import db, Cliente, Credencial, ROLES_POR_MODELO
+from api.contrasenas import verificar_contrasena, hashear_contrasena, PoolSaturado
+from api.sesiones import crear_sesion, rotar_sesion, revocar_por_refresh_token, revocar_sesiones_usuario
+from api.jwt_utils import require_role, get_user_from_token, get_jwks
+from api.blueprints.common import handle_pool_saturado, validar_coordenadas
+from flask_cors import CORS
+
+api = Blueprint('auth', __name__)
+
+# Allow CORS requests to this API
+CORS(api, origins="*", allow_headers=["Content-Type", "Authorization"], methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
+
+
+# RUTAS DE AUTENTICACION
+
+
+#cliente
+ 
+
+@api.route('/register', methods=['POST'])
+def register():
+    """Registrar nuevo cliente con JWT - Soporte para registro en dos pasos"""
+    body = request.get_json(silent=True) or {}
+    
+    # Verificar si el email ya existe
+    if Credencial.buscar(body['email'], 'cliente'):
+        return jsonify({"message": "Email ya registrado"}), 400
+    
+    try:
+        # Si es un cliente con datos básicos (registro en dos pasos)
+        if body.get('role') == 'cliente' and body.get('nombre') == 'Pendiente':
+            # Crear cliente básico solo con email y contraseña
+            cliente_data = {
+                'nombre': 'Pendiente',
+                'apellido': 'Pendiente', 
+                'email': body['email'],
+                'contraseña_hash': hashear_contrasena(body['password']),
+                'direccion': 'Pendiente',
+                'telefono': '0000000000'
+            }
+            
+            cliente = Cliente(**cliente_data)
+            db.session.add(cliente)
+            db.session.commit()
+            
+            return jsonify({
+                "message": "Cliente básico creado. Completa tu información.",
+                "success": True
+            }), 201
+            
+        else:
+            # Registro completo (otros roles o cliente con datos completos)
+            required = ["nombre", "apellido", "email", "password", "direccion", "telefono"]
+            missing = [k for k in required if not body.get(k)]
+            if missing:
+                return jsonify({"message": f"Faltan campos: {', '.join(missing)}"}), 400
+            error_coordenadas = validar_coordenadas(body)
+            if error_coordenadas:
+                return jsonify({"message": error_coordenadas}), 400
+            
+            # Crear cliente con datos completos
+            cliente_data = {
+                'nombre': body['nombre'],
+                'apellido': body['apellido'],
+                'email': body['email'],
+                'contraseña_hash': hashear_contrasena(body['password']),
+                'direccion': body['direccion'],
+                'telefono': body['telefono']
+            }
+            
+            # Agregar coordenadas si están presentes
+            if 'latitude' in body:
+                cliente_data['latitude'] = body['latitude']
+            if 'longitude' in body:
+                cliente_data['longitude'] = body['longitude']
+            
+            cliente = Cliente(**cliente_data)
+            db.session.add(cliente)
+            db.session.commit()
+            
+            return jsonify({
+                "message": "Cliente registrado exitosamente. Por favor inicia sesión con tus credenciales.",
+                "success": True
+            }), 201
+        
+    except PoolSaturado:
+        db.session.rollback()
+        return handle_pool_saturado()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al registrar: {str(e)}"}), 500
+
+
+@api.route('/complete-client-info', methods=['POST'])
+@require_role(['cliente'])
+def complete_client_info():
+    """Completar información del cliente después del registro básico"""
+    body = request.get_json(silent=True) or {}
+    user = get_user_from_token()
+    
+    required = ["nombre", "apellido", "direccion", "telefono"]
+    missing = [k for k in required if not body.get(k)]
+    if missing:
+        return jsonify({"message": f"Faltan campos: {', '.join(missing)}"}), 400
+    error_coordenadas = validar_coordenadas(body)
+    if error_coordenadas:
+        return jsonify({"message": error_coordenadas}), 400
+    
+    try:
+        cliente = db.session.get(Cliente, user['id'])
+        if not cliente:
+            return jsonify({"message": "Cliente no encontrado"}), 404
+        
+        # Actualizar información del cliente
+        cliente.nombre = body['nombre']
+        cliente.apellido = body['apellido']
+        cliente.direccion = body['direccion']
+        cliente.telefono = body['telefono']
+        
+        # Agregar coordenadas si están presentes
+        if 'latitude' in body:
+            cliente.latitude = body['latitude']
+        if 'longitude' in body:
+            cliente.longitude = body['longitude']
+        
+        # Actualizar contraseña si se proporciona
+        if 'password' in body and body['password']:
+            cliente.contraseña_hash = hashear_contrasena(body['password'])
+        
+        db.session.commit()
+        
+        return jsonify({
+            "message": "Información completada exitosamente",
+            "cliente": cliente.serialize()
+        }), 200
+        
+    except PoolSaturado:
+        db.session.rollback()
+        return handle_pool_saturado()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al completar información: {str(e)}"}), 500
+
+
+def rehashear_contrasena(role, user_id, password):
+    """Regenerar el hash con el método y costo actuales tras un login válido"""
+    modelo = {rol: m for m, rol in ROLES_POR_MODELO.items()}[role]
+    try:
+        user = db.session.get(modelo, user_id)
+        if user:
+            # after_update del modelo sincroniza la credencial
+            user.contraseña_hash = hashear_contrasena(password)
+            db.session.commit()
+    except Exception as e:
+        # El login no debe fallar si el rehash no se pudo guardar
+        db.session.rollback()
+        print(f"Error al regenerar hash de contraseña: {e}")
+
+
+@api.route('/login', methods=['POST'])
+def login():
+    """Iniciar sesión con JWT"""
+    body = request.get_json(silent=True) or {}
+    email = body.get('email')
+    password = body.get('password')
+    role = body.get('role', 'cliente')
+    
+    if not email or not password:
+        return jsonify({"message": "Email y contraseña requeridos"}), 400
+    
+    if role not in ('cliente', 'analista', 'supervisor', 'administrador'):
+        return jsonify({"message": "Rol inválido"}), 400
+
+    try:
+        # Una sola búsqueda por (email, rol) en la tabla de credenciales
+        credencial = Credencial.buscar(email, role)
+        if not credencial:
+            return jsonify({"message": "Credenciales inválidas"}), 401
+
+        valida, rehash = verificar_contrasena(credencial.contraseña_hash, password)
+        if not valida:
+            return jsonify({"message": "Credenciales inválidas"}), 401
+
+        if rehash:
+            rehashear_contrasena(role, credencial.id_usuario, password)
+
+        tokens = crear_sesion(role, credencial.id_usuario, credencial.email)
+        db.session.commit()
+
+        return jsonify({
+            "message": "Login exitoso",
+            **tokens
+            # "user": user.serialize(),
+            # "role": role
+        }), 200
+
+    except PoolSaturado:
+        return handle_pool_saturado()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error en login: {str(e)}"}), 500
+
+
+@api.route('/refresh', methods=['POST'])
+def refresh_token_endpoint():
+    """Canjear un refresh token por un access token nuevo (rota el refresh token salvo en la ventana de gracia)"""
+    body = request.get_json(silent=True) or {}
+    refresh_token = body.get('refresh_token')
+    
+    if not refresh_token:
+        return jsonify({"message": "Refresh token requerido"}), 400
+    
+    try:
+        tokens = rotar_sesion(refresh_token)
+        # Confirmar también cuando se revocó la sesión por reutilización del token
+        db.session.commit()
+        
+        if not tokens:
+            return jsonify({"message": "Refresh token inválido, expirado o revocado"}), 401
+        
+        return jsonify(tokens), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al refrescar token: {str(e)}"}), 500
+
+
+@api.route('/logout', methods=['POST'])
+def logout():
+    """Cerrar la sesión del refresh token; sus access tokens dejan de aceptarse"""
+    body = request.get_json(silent=True) or {}
+    refresh_token = body.get('refresh_token')
+    
+    if not refresh_token:
+        return jsonify({"message": "Refresh token requerido"}), 400
+    
+    try:
+        revocar_por_refresh_token(refresh_token)
+        db.session.commit()
+        return jsonify({"message": "Sesión cerrada"}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al cerrar sesión: {str(e)}"}), 500
+
+
+@api.route('/sesiones/revocar', methods=['POST'])
+@require_role(['administrador'])
+def revocar_sesiones():
+    """Revocar todas las sesiones de un usuario (solo administradores)"""
+    body = request.get_json(silent=True) or {}
+    rol = body.get('rol')
+    id_usuario = body.get('id_usuario')
+    
+    if rol not in ROLES_POR_MODELO.values() or not isinstance(id_usuario, int):
+        return jsonify({"message": "Se requieren rol e id_usuario válidos"}), 400
+    
+    try:
+        revocadas = revocar_sesiones_usuario(rol, id_usuario)
+        db.session.commit()
+        return jsonify({"message": "Sesiones revocadas", "revocadas": revocadas}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al revocar sesiones: {str(e)}"}), 500
+
+
+@api.route('/.well-known/jwks.json', methods=['GET'])
+def jwks():
+    """Claves públicas de firma JWT para verificadores externos"""
+    response = jsonify(get_jwks())
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response, 200
@@ -0,0 +1,186 @@
+"""
+Helpers compartidos por los blueprints de la API: emisión de eventos WebSocket,
+registro de eventos de ticket y manejo de errores
+"""
+from flask import jsonify
+from api.models import db, Ticket, EventoTicket
+from api.metricas import registrar_emision, registrar_error_emision
+from sqlalchemy.exc import IntegrityError
+
+from datetime import datetime
+
+
+# Función para obtener la instancia de socketio
+def get_socketio():
+    try:
+        from app import get_socketio as get_socketio_from_app
+        socketio_instance = get_socketio_from_app()
+        return socketio_instance
+    except ImportError:
+        return None
+    except Exception as e:
+        # Log del error pero no interrumpir la funcionalidad
+        return None
+
+# Función helper mejorada para emitir eventos WebSocket de manera segura
+def emit_websocket_event(event_name, data, room=None, include_self=False, callback=None):
+    """
+    Emite eventos WebSocket de manera robusta con manejo de errores
+    
+    Args:
+        event_name (str): Nombre del evento
+        data (dict): Datos a enviar
+        room (str, optional): Room específica. Si es None, envía a todos
+        include_self (bool): Si incluir al emisor en el broadcast
+        callback (callable, optional): Callback para manejar confirmación
+    """
+    try:
+        socketio = get_socketio()
+        if socketio:
+            # Agregar timestamp si no existe
+            if 'timestamp' not in data:
+                data['timestamp'] = datetime.now().isoformat()
+            
+            if room:
+                socketio.emit(event_name, data, room=room, include_self=include_self, callback=callback)
+                print(f"📤 Evento '{event_name}' enviado a room '{room}'")
+            else:
+                socketio.emit(event_name, data, callback=callback)
+                print(f"📤 Evento '{event_name}' enviado globalmente")
+                
+            registrar_emision(event_name, data, room)
+            return True
+    except Exception as e:
+        print(f"❌ Error enviando WebSocket '{event_name}': {e}")
+        registrar_error_emision(event_name)
+        # En caso de error, podrías implementar un sistema de cola aquí
+        return False
+    
+    return False
+
+def emit_websocket_to_role(event_name, data, role, include_self=False):
+    """Emite evento a todos los usuarios de un rol específico"""
+    role_room = f'role_{role}'
+    return emit_websocket_event(event_name, data, room=role_room, include_self=include_self)
+
+def emit_websocket_to_user(event_name, data, user_id):
+    """Emite evento a un usuario específico"""
+    user_room = f'user_{user_id}'
+    return emit_websocket_event(event_name, data, room=user_room)
+
+def emit_websocket_to_ticket(event_name, data, ticket_id, include_self=False):
+    """Emite evento a todos los usuarios conectados a un ticket"""
+    ticket_room = f'room_ticket_{ticket_id}'
+    return emit_websocket_event(event_name, data, room=ticket_room, include_self=include_self)
+
+def emit_critical_ticket_action(ticket_id, action, user_data):
+    """Emite evento crítico de ticket a todos los roles críticos"""
+    critical_roles = ['cliente', 'analista', 'supervisor']
+    
+    # Emitir a roles críticos
+    for role in critical_roles:
+        emit_websocket_to_role('critical_ticket_update', {
+            'ticket_id': ticket_id,
+            'action': action,
+            'user_id': user_data['id'],
+            'role': user_data['role'],
+            'priority': 'critical'
+        }, role, include_self=False)
+    
+    # Emitir al room del ticket
+    emit_websocket_to_ticket('critical_ticket_update', {
+        'ticket_id': ticket_id,
+        'action': action,
+        'user_id': user_data['id'],
+        'role': user_data['role'],
+        'priority': 'critical'
+    }, ticket_id, include_self=False)
+    
+    print(f'🚨 Evento crítico emitido: {action} en ticket {ticket_id} por {user_data["role"]} (ID: {user_data["id"]})')
+    return True
+
+def registrar_evento_ticket(ticket, tipo, user, estado_anterior=None, id_analista=None):
+    """
+    Registra un evento tipado de la máquina de estados del ticket (sin hacer commit)
+
+    Args:
+        ticket (Ticket): Ticket afectado
+        tipo (str): Una de las constantes de EventoTicket
+        user (dict): Usuario autenticado que provoca la transición
+        estado_anterior (str, optional): Estado antes de la transición
+        id_analista (int, optional): Analista afectado; por defecto el actor si es analista
+            o el analista con la asignación vigente
+    """
+    if id_analista is None:
+        id_analista = user['id'] if user['role'] == 'analista' else ticket.current_analista_id
+
+    evento = EventoTicket(
+        id_ticket=ticket.id,
+        tipo=tipo,
+        estado_anterior=estado_anterior,
+        estado_nuevo=ticket.estado,
+        id_analista=id_analista,
+        rol_usuario=user['role'],
+        id_usuario=user['id'],
+        fecha=datetime.now()
+    )
+    db.session.add(evento)
+    return evento
+
+# Funciones helper para manejo de errores
+def handle_database_error(e, operation="operación"):
+    """Maneja errores de base de datos de manera consistente"""
+    db.session.rollback()
+    if isinstance(e, IntegrityError):
+        return jsonify({"message": "Error de integridad en la base de datos"}), 400
+    else:
+        return jsonify({"message": f"Error en {operation}: {str(e)}"}), 500
+
+def handle_general_error(e, operation="operación"):
+    """Maneja errores generales de manera consistente"""
+    return jsonify({"message": f"Error en {operation}: {str(e)}"}), 500
+
+def handle_pool_saturado():
+    """503 con Retry-After cuando el pool de hashing de contraseñas está lleno (PoolSaturado)"""
+    response = jsonify({"message": "Servidor ocupado, intenta de nuevo en unos segundos"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def validar_coordenadas(body):
+    """Mensaje de error si latitude/longitude del body no son números en rango; None si son válidas o no vienen"""
+    for campo, limite in (('latitude', 90), ('longitude', 180)):
+        if body.get(campo) is None:
+            continue
+        try:
+            valor = float(body[campo])
+        except (TypeError, ValueError):
+            return f"{campo} debe ser numérica"
+        if not -limite <= valor <= limite:
+            return f"{campo} fuera de rango (±{limite})"
+    return None
+
+def version_en_conflicto(ticket, body):
+    """
+    Control de concurrencia optimista: si el cliente envía la versión que leyó
+    y ya no coincide con la actual, devuelve la respuesta 409; si no, None.
+    """
+    version_esperada = body.get('version')
+    if version_esperada is None:
+        return None
+    try:
+        version_esperada = int(version_esperada)
+    except (TypeError, ValueError):
+        return jsonify({"message": "version debe ser un entero"}), 400
+    if version_esperada != ticket.version:
+        return handle_conflicto_version(ticket.id)
+    return None
+
+def handle_conflicto_version(ticket_id):
+    """Responde 409 cuando otro usuario modificó el ticket antes que esta petición"""
+    db.session.rollback()
+    ticket = db.session.get(Ticket, ticket_id)
+    return jsonify({
+        "message": "El ticket fue modificado por otro usuario. Recarga e intenta de nuevo.",
+        "version_actual": ticket.version if ticket else None,
+        "ticket": ticket.serialize() if ticket else None
+    }), 409
@@ -0,0 +1,431 @@
+"""
+Rutas de personas: CRUD de clientes, analistas, supervisores y administradores
+"""
+from flask import request, jsonify, Blueprint
+from api.models import db, Cliente, Analista, Supervisor, Administrador
+from api.contrasenas import hashear_contrasena, PoolSaturado
+from api.jwt_utils import require_role, get_user_from_token
+from api.blueprints.common import get_socketio, handle_general_error, handle_pool_saturado, validar_coordenadas
+from flask_cors import CORS
+from sqlalchemy.exc import IntegrityError
+
+from datetime import datetime
+
+api = Blueprint('people', __name__)
+
+# Allow CORS requests to this API
+CORS(api, origins="*", allow_headers=["Content-Type", "Authorization"], methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
+
+
+def _hashear_body(body):
+    """Copia del body con la contraseña recibida en 'contraseña_hash' ya convertida a hash"""
+    if body.get('contraseña_hash'):
+        return {**body, 'contraseña_hash': hashear_contrasena(str(body['contraseña_hash']))}
+    return body
+
+
+@api.route('/clientes', methods=['GET'])
+@require_role(['administrador', 'cliente'])
+def listar_clientes():
+    clientes = Cliente.query.all()
+    return jsonify([c.serialize() for c in clientes]), 200
+
+
+@api.route('/clientes', methods=['POST'])
+@require_role(['administrador', 'cliente'])
+def create_cliente():
+    body = request.get_json(silent=True) or {}
+    required = ["direccion", "telefono", "nombre",
+                "apellido", "email", "contraseña_hash"]
+    missing = [k for k in required if not body.get(k)]
+    if missing:
+        return jsonify({"message": f"Faltan campos: {', '.join(missing)}"}), 400
+    error_coordenadas = validar_coordenadas(body)
+    if error_coordenadas:
+        return jsonify({"message": error_coordenadas}), 400
+    try:
+        body = _hashear_body(body)
+        # Preparar datos del cliente incluyendo coordenadas opcionales
+        cliente_data = {k: body[k] for k in required}
+        if 'latitude' in body:
+            cliente_data['latitude'] = body['latitude']
+        if 'longitude' in body:
+            cliente_data['longitude'] = body['longitude']
+        if 'url_imagen' in body:
+            cliente_data['url_imagen'] = body['url_imagen']
+            
+        cliente = Cliente(**cliente_data)
+        db.session.add(cliente)
+        db.session.commit()
+        return jsonify(cliente.serialize()), 201
+    except PoolSaturado:
+        db.session.rollback()
+        return handle_pool_saturado()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Email ya existe"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error inesperado: {str(e)}"}), 500
+
+
+@api.route('/clientes/<int:id>', methods=['GET'])
+@require_role(['administrador', 'cliente'])
+def get_cliente(id):
+    cliente = db.session.get(Cliente, id)
+    if not cliente:
+        return jsonify({"message": "Cliente no encontrado"}), 404
+    return jsonify(cliente.serialize()), 200
+
+
+@api.route('/clientes/<int:id>', methods=['PUT'])
+@require_role(['administrador', 'cliente'])
+def update_cliente(id):
+    body = request.get_json(silent=True) or {}
+    cliente = db.session.get(Cliente, id)
+    if not cliente:
+        return jsonify({"message": "Cliente no encontrado"}), 404
+    error_coordenadas = validar_coordenadas(body)
+    if error_coordenadas:
+        return jsonify({"message": error_coordenadas}), 400
+    try:
+        body = _hashear_body(body)
+        for field in ["direccion", "telefono", "nombre", "apellido", "email", "contraseña_hash", "latitude", "longitude", "url_imagen"]:
+            if field in body:
+                setattr(cliente, field, body[field])
+        db.session.commit()
+        return jsonify(cliente.serialize()), 200
+    except PoolSaturado:
+        db.session.rollback()
+        return handle_pool_saturado()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Email duplicado"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error inesperado: {str(e)}"}), 500
+
+
+@api.route('/clientes/<int:id>', methods=['DELETE'])
+@require_role(['administrador', 'cliente'])
+def delete_cliente(id):
+    cliente = db.session.get(Cliente, id)
+    if not cliente:
+        return jsonify({"message": "Cliente no encontrado"}), 404
+    try:
+        db.session.delete(cliente)
+        db.session.commit()
+        return jsonify({"message": "Cliente eliminado"}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al eliminar: {str(e)}"}), 500
+
+
+# analista
+
+@api.route('/analistas', methods=['GET'])
+@require_role(['administrador', 'analista', 'supervisor'])
+def listar_analistas():
+    try:
+        analistas = Analista.query.all()
+        return jsonify([a.serialize() for a in analistas]), 200
+    except Exception as e:
+        return handle_general_error(e, "listar analistas")
+
+
+@api.route('/analistas', methods=['POST'])
+@require_role(['administrador', 'analista'])
+def create_analista():
+    body = request.get_json(silent=True) or {}
+    required = ["especialidad", "nombre",
+                "apellido", "email", "contraseña_hash"]
+    missing = [k for k in required if not body.get(k)]
+    if missing:
+        return jsonify({"message": f"Faltan campos: {', '.join(missing)}"}), 400
+    try:
+        body = _hashear_body(body)
+        analista = Analista(**{k: body[k] for k in required})
+        db.session.add(analista)
+        db.session.commit()
+        
+        # Emitir evento WebSocket para notificar creación de analista
+        socketio = get_socketio()
+        if socketio:
+            try:
+                # Enviar a supervisores y administradores (rooms generales solo para gestión de usuarios)
+                socketio.emit('analista_creado', {
+                    'analista': analista.serialize(),
+                    'tipo': 'analista_creado',
+                    'timestamp': datetime.now().isoformat()
+                }, room='supervisores')
+                
+                socketio.emit('analista_creado', {
+                    'analista': analista.serialize(),
+                    'tipo': 'analista_creado',
+                    'timestamp': datetime.now().isoformat()
+                }, room='administradores')
+                
+            except Exception as e:
+                print(f"Error enviando WebSocket: {e}")
+        
+        return jsonify(analista.serialize()), 201
+    except PoolSaturado:
+        db.session.rollback()
+        return handle_pool_saturado()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Email ya existe"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error inesperado: {str(e)}"}), 500
+
+
+@api.route('/analistas/<int:id>', methods=['GET'])
+@require_role(['administrador', 'analista', 'supervisor'])
+def get_analista(id):
+    try:
+        analista = db.session.get(Analista, id)
+        if not analista:
+            return jsonify({"message": "Analista no encontrado"}), 404
+        return jsonify(analista.serialize()), 200
+    except Exception as e:
+        return handle_general_error(e, "obtener analista")
+
+
+@api.route('/analistas/<int:id>', methods=['PUT'])
+@require_role(['administrador', 'analista'])
+def update_analista(id):
+    body = request.get_json(silent=True) or {}
+    analista = db.session.get(Analista, id)
+    if not analista:
+        return jsonify({"message": "Analista no encontrado"}), 404
+    try:
+        body = _hashear_body(body)
+        for field in ["especialidad", "nombre", "apellido", "email", "contraseña_hash"]:
+            if field in body:
+                setattr(analista, field, body[field])
+        db.session.commit()
+        return jsonify(analista.serialize()), 200
+    except PoolSaturado:
+        db.session.rollback()
+        return handle_pool_saturado()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Email duplicado"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error inesperado: {str(e)}"}), 500
+
+
+@api.route('/analistas/<int:id>', methods=['DELETE'])
+@require_role(['administrador', 'analista'])
+def delete_analista(id):
+    analista = db.session.get(Analista, id)
+    if not analista:
+        return jsonify({"message": "Analista no encontrado"}), 404
+    try:
+        # Guardar información del analista antes de eliminarlo para las notificaciones WebSocket
+        analista_info = {
+            'id': analista.id,
+            'nombre': analista.nombre,
+            'apellido': analista.apellido,
+            'email': analista.email,
+            'especialidad': analista.especialidad
+        }
+        
+        db.session.delete(analista)
+        db.session.commit()
+        
+        # Enviar notificación WebSocket
+        socketio = get_socketio()
+        if socketio:
+            try:
+                user = get_user_from_token()
+                eliminacion_data = {
+                    'analista_id': id,
+                    'analista_info': analista_info,
+                    'tipo': 'analista_eliminado',
+                    'usuario': user['role'],
+                    'timestamp': datetime.now().isoformat()
+                }
+                
+                # Notificar a todos los roles sobre la eliminación del analista
+                socketio.emit('analista_eliminado', eliminacion_data, room='clientes')
+                socketio.emit('analista_eliminado', eliminacion_data, room='analistas')
+                socketio.emit('analista_eliminado', eliminacion_data, room='supervisores')
+                socketio.emit('analista_eliminado', eliminacion_data, room='administradores')
+                
+                    
+            except Exception as e:
+                print(f"Error enviando WebSocket: {e}")
+        
+        return jsonify({"message": "Analista eliminado"}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al eliminar: {str(e)}"}), 500
+
+
+# supervisor
+@api.route('/supervisores', methods=['GET'])
+@require_role(['administrador', 'supervisor'])
+def listar_supervisores():
+    supervisores = Supervisor.query.all()
+    return jsonify([s.serialize() for s in supervisores]), 200
+
+
+@api.route('/supervisores', methods=['POST'])
+@require_role(['administrador', 'supervisor'])
+def create_supervisor():
+    body = request.get_json(silent=True) or {}
+    required = ["area_responsable", "nombre",
+                "apellido", "email", "contraseña_hash"]
+    missing = [k for k in required if not body.get(k)]
+    if missing:
+        return jsonify({"message": f"Faltan campos: {', '.join(missing)}"}), 400
+    try:
+        body = _hashear_body(body)
+        supervisor = Supervisor(**{k: body[k] for k in required})
+        db.session.add(supervisor)
+        db.session.commit()
+        return jsonify(supervisor.serialize()), 201
+    except PoolSaturado:
+        db.session.rollback()
+        return handle_pool_saturado()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Email ya existe"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error inesperado: {str(e)}"}), 500
+
+
+@api.route('/supervisores/<int:id>', methods=['GET'])
+@require_role(['administrador', 'supervisor'])
+def get_supervisor(id):
+    supervisor = db.session.get(Supervisor, id)
+    if not supervisor:
+        return jsonify({"message": "Supervisor no encontrado"}), 404
+    return jsonify(supervisor.serialize()), 200
+
+
+@api.route('/supervisores/<int:id>', methods=['PUT'])
+@require_role(['administrador', 'supervisor'])
+def update_supervisor(id):
+    body = request.get_json(silent=True) or {}
+    supervisor = db.session.get(Supervisor, id)
+    if not supervisor:
+        return jsonify({"message": "Supervisor no encontrado"}), 404
+    try:
+        body = _hashear_body(body)
+        for field in ["area_responsable", "nombre", "apellido", "email", "contraseña_hash"]:
+            if field in body:
+                setattr(supervisor, field, body[field])
+        db.session.commit()
+        return jsonify(supervisor.serialize()), 200
+    except PoolSaturado:
+        db.session.rollback()
+        return handle_pool_saturado()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Email duplicado"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error inesperado: {str(e)}"}), 500
+
+
+@api.route('/supervisores/<int:id>', methods=['DELETE'])
+@require_role(['administrador', 'supervisor'])
+def delete_supervisor(id):
+    supervisor = db.session.get(Supervisor, id)
+    if not supervisor:
+        return jsonify({"message": "Supervisor no encontrado"}), 404
+    try:
+        db.session.delete(supervisor)
+        db.session.commit()
+        return jsonify({"message": "Supervisor eliminado"}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al eliminar: {str(e)}"}), 500
+
+
+# Administrador
+
+@api.route('/administradores', methods=['GET'])
+@require_role(['administrador'])
+def listar_administradores():
+    administradores = Administrador.query.all()
+    return jsonify([a.serialize() for a in administradores]), 200
+
+
+@api.route('/administradores', methods=['POST'])
+@require_role(['administrador'])
+def create_administrador():
+    body = request.get_json(silent=True) or {}
+    required = ["permisos_especiales", "email", "contraseña_hash"]
+    missing = [k for k in required if not body.get(k)]
+    if missing:
+        return jsonify({"message": f"Faltan campos: {', '.join(missing)}"}), 400
+    try:
+        body = _hashear_body(body)
+        administrador = Administrador(**{k: body[k] for k in required})
+        db.session.add(administrador)
+        db.session.commit()
+        return jsonify(administrador.serialize()), 201
+    except PoolSaturado:
+        db.session.rollback()
+        return handle_pool_saturado()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Email ya existe"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error inesperado: {str(e)}"}), 500
+
+
+@api.route('/administradores/<int:id>', methods=['GET'])
+@require_role(['administrador'])
+def get_administrador(id):
+    administrador = db.session.get(Administrador, id)
+    if not administrador:
+        return jsonify({"message": "Administrador no encontrado"}), 404
+    return jsonify(administrador.serialize()), 200
+
+
+@api.route('/administradores/<int:id>', methods=['PUT'])
+@require_role(['administrador'])
+def update_administrador(id):
+    body = request.get_json(silent=True) or {}
+    administrador = db.session.get(Administrador, id)
+    if not administrador:
+        return jsonify({"message": "Administrador no encontrado"}), 404
+    try:
+        body = _hashear_body(body)
+        for field in ["permisos_especiales", "email", "contraseña_hash"]:
+            if field in body:
+                setattr(administrador, field, body[field])
+        db.session.commit()
+        return jsonify(administrador.serialize()), 200
+    except PoolSaturado:
+        db.session.rollback()
+        return handle_pool_saturado()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Email duplicado"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error inesperado: {str(e)}"}), 500
+
+
+@api.route('/administradores/<int:id>', methods=['DELETE'])
+@require_role(['administrador'])
+def delete_administrador(id):
+    administrador = db.session.get(Administrador, id)
+    if not administrador:
+        return jsonify({"message": "Administrador no encontrado"}), 404
+    try:
+        db.session.delete(administrador)
+        db.session.commit()
+        return jsonify({"message": "Administrador eliminado"}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al eliminar: {str(e)}"}), 500
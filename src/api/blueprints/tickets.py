@@ -0,0 +1,1426 @@
+"""
+Rutas de tickets: CRUD, comentarios, asignaciones, gestiones, colas por rol y máquina de estados
+"""
+from flask import request, jsonify, Blueprint, Response, stream_with_context
+from api.models import db, Analista, Comentarios, Asignacion, Ticket, Gestion, EventoTicket
+from api.archivo import purgar_tickets, obtener_ticket_archivado
+from api import exportacion, importacion
+from api.contrasenas import PoolSaturado
+from api.jwt_utils import require_role, get_user_from_token
+from api.blueprints.common import (
+    get_socketio,
+    emit_websocket_to_role,
+    emit_websocket_to_ticket,
+    emit_critical_ticket_action,
+    registrar_evento_ticket,
+    handle_general_error,
+    handle_pool_saturado,
+    version_en_conflicto,
+    handle_conflicto_version
+)
+from flask_cors import CORS
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
+
+from datetime import datetime, timedelta
+import io
+
+api = Blueprint('tickets', __name__)
+
+# Allow CORS requests to this API
+CORS(api, origins="*", allow_headers=["Content-Type", "Authorization"], methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
+
+
+# Comentarios
+
+@api.route('/comentarios', methods=['GET'])
+@require_role(['analista', 'supervisor', 'administrador', 'cliente'])
+def listar_comentarios():
+    comentarios = Comentarios.query.all()
+    return jsonify([c.serialize() for c in comentarios]), 200
+
+
+@api.route('/tickets/<int:id>/comentarios', methods=['GET'])
+@require_role(['cliente', 'analista', 'supervisor', 'administrador'])
+def get_ticket_comentarios(id):
+    """Obtener comentarios de un ticket específico"""
+    try:
+        user = get_user_from_token()
+        ticket = db.session.get(Ticket, id)
+        
+        if not ticket:
+            return jsonify({"message": "Ticket no encontrado"}), 404
+        
+        # Verificar permisos
+        if user['role'] == 'cliente' and ticket.id_cliente != user['id']:
+            return jsonify({"message": "No tienes permisos para ver este ticket"}), 403
+        
+        # Para analistas, verificar que el ticket esté asignado a ellos
+        if user['role'] == 'analista':
+            asignacion = Asignacion.query.filter_by(id_ticket=id, id_analista=user['id']).first()
+            if not asignacion:
+                return jsonify({"message": "No tienes permisos para ver este ticket"}), 403
+        
+        comentarios = Comentarios.query.filter_by(id_ticket=id).order_by(Comentarios.fecha_comentario).all()
+        return jsonify([c.serialize() for c in comentarios]), 200
+        
+    except Exception as e:
+        return jsonify({"message": f"Error al obtener comentarios: {str(e)}"}), 500
+
+
+@api.route('/comentarios', methods=['POST'])
+@require_role(['analista', 'supervisor', 'cliente', 'administrador'])
+def create_comentario():
+    body = request.get_json(silent=True) or {}
+    user = get_user_from_token()
+    
+    required = ["id_ticket", "texto"]
+    missing = [k for k in required if not body.get(k)]
+    if missing:
+        return jsonify({"message": f"Faltan campos: {', '.join(missing)}"}), 400
+    
+    try:
+        # Determinar quién está comentando
+        id_cliente = user['id'] if user['role'] == 'cliente' else body.get('id_cliente')
+        id_analista = user['id'] if user['role'] == 'analista' else body.get('id_analista')
+        id_supervisor = user['id'] if user['role'] == 'supervisor' else body.get('id_supervisor')
+        id_gestion = body.get('id_gestion')
+        
+        comentario = Comentarios(
+            id_ticket=body["id_ticket"],
+            id_gestion=id_gestion,
+            id_cliente=id_cliente,
+            id_analista=id_analista,
+            id_supervisor=id_supervisor,
+            texto=body["texto"],
+            fecha_comentario=datetime.now()
+        )
+        db.session.add(comentario)
+        db.session.commit()
+        
+        # Emitir evento crítico para nuevo comentario
+        emit_critical_ticket_action(comentario.id_ticket, 'comentario_agregado', user)
+        
+        # También emitir evento normal para compatibilidad
+        emit_websocket_to_ticket('nuevo_comentario', {
+            'comentario': comentario.serialize(),
+            'tipo': 'comentario_agregado',
+            'usuario': user['role'],
+            'usuario_id': user['id']
+        }, comentario.id_ticket, include_self=False)
+        
+        return jsonify(comentario.serialize()), 201
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Error de integridad en la base de datos"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error inesperado: {str(e)}"}), 500
+
+
+@api.route('/comentarios/<int:id>', methods=['GET'])
+@require_role(['analista', 'supervisor', 'administrador', 'cliente'])
+def get_comentario(id):
+    comentario = db.session.get(Comentarios, id)
+    if not comentario:
+        return jsonify({"message": "Comentario no encontrado"}), 404
+    return jsonify(comentario.serialize()), 200
+
+
+@api.route('/comentarios/<int:id>', methods=['PUT'])
+@require_role(['analista', 'supervisor', 'administrador', 'cliente'])
+def update_comentario(id):
+    body = request.get_json(silent=True) or {}
+    comentario = db.session.get(Comentarios, id)
+    if not comentario:
+        return jsonify({"message": "Comentario no encontrado"}), 404
+    try:
+        for field in ["id_gestion", "id_cliente", "id_analista", "id_supervisor", "texto", "fecha_comentario"]:
+            if field in body:
+                value = body[field]
+                if field == "fecha_comentario" and value:
+                    value = datetime.fromisoformat(value)
+                setattr(comentario, field, value)
+        db.session.commit()
+        return jsonify(comentario.serialize()), 200
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Error de integridad en la base de datos"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error inesperado: {str(e)}"}), 500
+
+
+@api.route('/comentarios/<int:id>', methods=['DELETE'])
+@require_role(['analista', 'supervisor', 'administrador', 'cliente'])
+def delete_comentario(id):
+    comentario = db.session.get(Comentarios, id)
+    if not comentario:
+        return jsonify({"message": "Comentario no encontrado"}), 404
+    try:
+        db.session.delete(comentario)
+        db.session.commit()
+        return jsonify({"message": "Comentario eliminado"}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al eliminar: {str(e)}"}), 500
+
+
+# Asignacion
+
+@api.route('/asignaciones', methods=['GET'])
+@require_role(['supervisor', 'administrador', 'analista'])
+def listar_asignaciones():
+    asignaciones = Asignacion.query.all()
+    return jsonify([a.serialize() for a in asignaciones]), 200
+
+
+@api.route('/asignaciones', methods=['POST'])
+@require_role(['supervisor', 'administrador', 'analista'])
+def create_asignacion():
+    body = request.get_json(silent=True) or {}
+    required = ["id_ticket", "id_supervisor",
+                "id_analista", "fecha_asignacion"]
+    missing = [k for k in required if not body.get(k)]
+    if missing:
+        return jsonify({"message": f"Faltan campos: {', '.join(missing)}"}), 400
+    try:
+        asignacion = Asignacion(
+            id_ticket=body["id_ticket"],
+            id_supervisor=body["id_supervisor"],
+            id_analista=body["id_analista"],
+            fecha_asignacion=datetime.fromisoformat(body["fecha_asignacion"])
+        )
+        db.session.add(asignacion)
+        db.session.flush()
+        ticket = db.session.get(Ticket, asignacion.id_ticket)
+        if ticket:
+            ticket.actualizar_asignacion_actual()
+        db.session.commit()
+        return jsonify(asignacion.serialize()), 201
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Error de integridad en la base de datos"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error inesperado: {str(e)}"}), 500
+
+
+@api.route('/asignaciones/<int:id>', methods=['GET'])
+@require_role(['supervisor', 'administrador', 'analista'])
+def get_asignacion(id):
+    asignacion = db.session.get(Asignacion, id)
+    if not asignacion:
+        return jsonify({"message": "Asignación no encontrada"}), 404
+    return jsonify(asignacion.serialize()), 200
+
+
+@api.route('/asignaciones/<int:id>', methods=['PUT'])
+@require_role(['supervisor', 'administrador', 'analista'])
+def update_asignacion(id):
+    body = request.get_json(silent=True) or {}
+    asignacion = db.session.get(Asignacion, id)
+    if not asignacion:
+        return jsonify({"message": "Asignación no encontrada"}), 404
+    try:
+        for field in ["id_ticket", "id_supervisor", "id_analista", "fecha_asignacion"]:
+            if field in body:
+                value = body[field]
+                if field == "fecha_asignacion" and value:
+                    value = datetime.fromisoformat(value)
+                setattr(asignacion, field, value)
+        db.session.flush()
+        # Recalcular la asignación vigente del ticket actual y, si cambió, del anterior
+        for ticket in Ticket.query.filter(
+            (Ticket.id == asignacion.id_ticket) | (Ticket.current_asignacion_id == asignacion.id)
+        ).all():
+            ticket.actualizar_asignacion_actual()
+        db.session.commit()
+        return jsonify(asignacion.serialize()), 200
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Error de integridad en la base de datos"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error inesperado: {str(e)}"}), 500
+
+
+@api.route('/asignaciones/<int:id>', methods=['DELETE'])
+@require_role(['supervisor', 'administrador', 'analista'])
+def delete_asignacion(id):
+    asignacion = db.session.get(Asignacion, id)
+    if not asignacion:
+        return jsonify({"message": "Asignación no encontrada"}), 404
+    try:
+        ticket = db.session.get(Ticket, asignacion.id_ticket)
+        if ticket and ticket.current_asignacion_id == asignacion.id:
+            ticket.current_asignacion_id = None
+            ticket.current_analista_id = None
+            db.session.flush()
+        db.session.delete(asignacion)
+        db.session.flush()
+        if ticket:
+            ticket.actualizar_asignacion_actual()
+        db.session.commit()
+        return jsonify({"message": "Asignación eliminada"}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al eliminar: {str(e)}"}), 500
+
+
+# Tickets
+
+@api.route('/tickets', methods=['GET'])
+@require_role(['administrador', 'supervisor', 'analista'])
+def listar_tickets():
+    try:
+        print("Iniciando consulta de tickets...")
+        tickets = Ticket.query.all()
+        print(f"Tickets encontrados: {len(tickets)}")
+        
+        # Serializar tickets uno por uno para identificar problemas
+        serialized_tickets = []
+        for i, ticket in enumerate(tickets):
+            try:
+                serialized_ticket = ticket.serialize()
+                serialized_tickets.append(serialized_ticket)
+            except Exception as serialize_error:
+                print(f"Error serializando ticket {ticket.id}: {str(serialize_error)}")
+                # Agregar ticket básico sin relaciones problemáticas
+                serialized_tickets.append({
+                    "id": ticket.id,
+                    "id_cliente": ticket.id_cliente,
+                    "estado": ticket.estado,
+                    "titulo": ticket.titulo,
+                    "descripcion": ticket.descripcion,
+                    "fecha_creacion": ticket.fecha_creacion.isoformat() if ticket.fecha_creacion else None,
+                    "fecha_cierre": ticket.fecha_cierre.isoformat() if ticket.fecha_cierre else None,
+                    "prioridad": ticket.prioridad,
+                    "calificacion": ticket.calificacion,
+                    "comentario": ticket.comentario,
+                    "fecha_evaluacion": ticket.fecha_evaluacion.isoformat() if ticket.fecha_evaluacion else None,
+                    "url_imagen": ticket.url_imagen,
+                    "cliente": None,
+                    "asignacion_actual": None
+                })
+        
+        print(f"Tickets serializados exitosamente: {len(serialized_tickets)}")
+        return jsonify(serialized_tickets), 200
+    except Exception as e:
+        print(f"Error en listar_tickets: {str(e)}")
+        return handle_general_error(e, "listar tickets")
+
+
+@api.route('/tickets', methods=['POST'])
+@require_role(['cliente', 'administrador'])
+def create_ticket():
+    body = request.get_json(silent=True) or {}
+    user = get_user_from_token()
+
+    if user['role'] == 'cliente':
+        required = ["titulo", "descripcion", "prioridad"]
+        missing = [k for k in required if not body.get(k)]
+        if missing:
+            return jsonify({"message": f"Faltan campos: {', '.join(missing)}"}), 400
+
+        ticket = Ticket(
+            id_cliente=user['id'],
+            estado="creado",
+            titulo=body['titulo'],
+            descripcion=body['descripcion'],
+            fecha_creacion=datetime.now(),
+            prioridad=body['prioridad'],
+            url_imagen=body.get('url_imagen')
+        )
+        db.session.add(ticket)
+        db.session.commit()
+        
+        # Emitir evento WebSocket para notificar nuevo ticket
+        # Datos del ticket para notificaciones
+        ticket_data = {
+            'ticket_id': ticket.id,
+            'ticket_estado': ticket.estado,
+            'ticket_titulo': ticket.titulo,
+            'ticket_prioridad': ticket.prioridad,
+            'cliente_id': ticket.id_cliente,
+            'tipo': 'creado'
+        }
+        
+        # Emitir evento crítico para nuevo ticket
+        user_data = get_user_from_token()
+        emit_critical_ticket_action(ticket.id, 'ticket_creado', user_data)
+        
+        # Notificar al room del ticket
+        emit_websocket_to_ticket('nuevo_ticket', ticket_data, ticket.id, include_self=False)
+        
+        # Notificar a supervisores y administradores para asignación
+        emit_websocket_to_role('nuevo_ticket_disponible', ticket_data, 'supervisor', include_self=False)
+        emit_websocket_to_role('nuevo_ticket_disponible', ticket_data, 'administrador', include_self=False)
+        
+        # Notificar a administradores para actualizar CRUD de tickets
+        emit_websocket_to_role('nuevo_ticket', ticket_data, 'administrador', include_self=False)
+        
+        return jsonify(ticket.serialize()), 201
+
+    required = ["id_cliente", "estado", "titulo",
+                "descripcion", "fecha_creacion", "prioridad"]
+    missing = [k for k in required if not body.get(k)]
+    if missing:
+        return jsonify({"message": f"Faltan campos: {', '.join(missing)}"}), 400
+    try:
+        ticket = Ticket(
+            id_cliente=body["id_cliente"],
+            estado=body["estado"],
+            titulo=body["titulo"],
+            descripcion=body["descripcion"],
+            fecha_creacion=datetime.fromisoformat(body["fecha_creacion"]),
+            prioridad=body["prioridad"],
+            url_imagen=body.get("url_imagen")
+        )
+        db.session.add(ticket)
+        db.session.commit()
+        return jsonify(ticket.serialize()), 201
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Error de integridad en la base de datos"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error inesperado: {str(e)}"}), 500
+
+
+@api.route('/tickets/<int:id>', methods=['GET'])
+@require_role(['cliente', 'analista', 'supervisor', 'administrador'])
+def get_ticket(id):
+    ticket = db.session.get(Ticket, id)
+    if not ticket:
+        # Lectura transparente de tickets cerrados que ya fueron archivados
+        ticket = obtener_ticket_archivado(id)
+    if not ticket:
+        return jsonify({"message": "Ticket no encontrado"}), 404
+    return jsonify(ticket.serialize()), 200
+
+
+@api.route('/tickets/<int:id>', methods=['PUT'])
+@require_role(['cliente', 'analista', 'supervisor', 'administrador'])
+def update_ticket(id):
+    body = request.get_json(silent=True) or {}
+    ticket = db.session.get(Ticket, id)
+    if not ticket:
+        return jsonify({"message": "Ticket no encontrado"}), 404
+    conflicto = version_en_conflicto(ticket, body)
+    if conflicto:
+        return conflicto
+    try:
+        for field in ["id_cliente", "estado", "titulo", "descripcion", "fecha_creacion",
+                      "fecha_cierre", "prioridad", "calificacion", "comentario", "fecha_evaluacion", "url_imagen"]:
+            if field in body:
+                value = body[field]
+                if field in ["fecha_creacion", "fecha_cierre", "fecha_evaluacion"] and value:
+                    value = datetime.fromisoformat(value)
+                setattr(ticket, field, value)
+        db.session.commit()
+        
+        # Emitir evento crítico para actualización de ticket
+        user = get_user_from_token()
+        emit_critical_ticket_action(ticket.id, 'ticket_actualizado', user)
+        
+        # También emitir evento normal para compatibilidad
+        emit_websocket_to_ticket('ticket_actualizado', {
+            'ticket': ticket.serialize(),
+            'tipo': 'actualizado',
+            'usuario': user['role'],
+            'usuario_id': user['id']
+        }, ticket.id, include_self=False)
+        
+        return jsonify(ticket.serialize()), 200
+    except StaleDataError:
+        return handle_conflicto_version(id)
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Error de integridad en la base de datos"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error inesperado: {str(e)}"}), 500
+
+
+@api.route('/tickets/<int:id>', methods=['DELETE'])
+@require_role(['administrador'])
+def delete_ticket(id):
+    ticket = db.session.get(Ticket, id)
+    if not ticket:
+        return jsonify({"message": "Ticket no encontrado"}), 404
+    try:
+        # Guardar información del ticket antes de eliminarlo para las notificaciones WebSocket
+        ticket_info = {
+            'id': ticket.id,
+            'id_cliente': ticket.id_cliente,
+            'titulo': ticket.titulo,
+            'estado': ticket.estado
+        }
+        
+        # Analista de la asignación vigente (columna desnormalizada)
+        analista_asignado_id = ticket.current_analista_id
+        
+        purgar_tickets([id])
+        db.session.commit()
+        
+        # Emitir evento WebSocket para notificar eliminación a todos los roles
+        socketio = get_socketio()
+        if socketio:
+            try:
+                user = get_user_from_token()
+                eliminacion_data = {
+                    'ticket_id': id,
+                    'ticket_info': ticket_info,
+                    'tipo': 'eliminado',
+                    'usuario': user['role'],
+                    'timestamp': datetime.now().isoformat()
+                }
+                
+                # Notificar a todos los roles sobre la eliminación
+                socketio.emit('ticket_eliminado', eliminacion_data, room='clientes')
+                socketio.emit('ticket_eliminado', eliminacion_data, room='analistas')
+                socketio.emit('ticket_eliminado', eliminacion_data, room='supervisores')
+                socketio.emit('ticket_eliminado', eliminacion_data, room='administradores')
+                
+                # Notificar específicamente al analista asignado si existe
+                if analista_asignado_id:
+                    socketio.emit('ticket_eliminado', eliminacion_data, room=f'analista_{analista_asignado_id}')
+                
+                # Notificar al room del ticket (si hay usuarios conectados)
+                ticket_room = f'room_ticket_{id}'
+                socketio.emit('ticket_eliminado', eliminacion_data, room=ticket_room)
+                
+                    
+            except Exception as e:
+                print(f"Error enviando WebSocket: {e}")
+        
+        return jsonify({"message": "Ticket eliminado"}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al eliminar: {str(e)}"}), 500
+
+
+@api.route('/tickets/purgar', methods=['POST'])
+@require_role(['administrador'])
+def purgar_tickets_lote():
+    """
+    Eliminar muchos tickets por lotes, confirmando cada lote por separado
+    para no mantener una transacción gigante abierta.
+
+    Body:
+        ids (list, opcional): IDs concretos a eliminar
+        estados (list, opcional): Estados a purgar (ej. ['cerrado', 'cerrado_por_supervisor'])
+        cerrados_antes (str, opcional): Fecha ISO; solo tickets con fecha_cierre anterior
+        tamano_lote (int, opcional): Tickets por transacción (por defecto 500)
+    """
+    body = request.get_json(silent=True) or {}
+    ids = body.get('ids')
+    estados = body.get('estados')
+    cerrados_antes = body.get('cerrados_antes')
+
+    if not ids and not estados and not cerrados_antes:
+        return jsonify({"message": "Debe indicar ids, estados o cerrados_antes"}), 400
+
+    # Validar tipos antes de filtrar: un string en ids se iteraría carácter por carácter
+    # y borraría otros tickets (bool es subclase de int, se rechaza aparte)
+    if ids is not None and not (
+        isinstance(ids, list) and all(isinstance(i, int) and not isinstance(i, bool) for i in ids)
+    ):
+        return jsonify({"message": "ids debe ser una lista de enteros"}), 400
+    if estados is not None and not (isinstance(estados, list) and all(isinstance(e, str) for e in estados)):
+        return jsonify({"message": "estados debe ser una lista de textos"}), 400
+    if cerrados_antes is not None and not isinstance(cerrados_antes, str):
+        return jsonify({"message": "cerrados_antes debe ser una fecha ISO"}), 400
+
+    try:
+        tamano_lote = int(body.get('tamano_lote', 500))
+        if tamano_lote < 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        return jsonify({"message": "tamano_lote debe ser un entero positivo"}), 400
+
+    filtros = []
+    try:
+        if ids:
+            filtros.append(Ticket.id.in_(ids))
+        if estados:
+            filtros.append(Ticket.estado.in_(estados))
+        if cerrados_antes:
+            filtros.append(Ticket.fecha_cierre < datetime.fromisoformat(cerrados_antes))
+    except (TypeError, ValueError):
+        return jsonify({"message": "Parámetros de filtro inválidos"}), 400
+
+    total_eliminados = 0
+    lotes = 0
+    try:
+        while True:
+            lote = [row[0] for row in db.session.query(Ticket.id).filter(*filtros)
+                    .order_by(Ticket.id).limit(tamano_lote).all()]
+            if not lote:
+                break
+            total_eliminados += purgar_tickets(lote)
+            db.session.commit()
+            lotes += 1
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": f"Error al purgar tickets: {str(e)}",
+            "eliminados": total_eliminados,
+            "lotes": lotes
+        }), 500
+
+    if total_eliminados:
+        user = get_user_from_token()
+        emit_websocket_to_role('tickets_purgados', {
+            'eliminados': total_eliminados,
+            'tipo': 'purgado',
+            'usuario': user['role'],
+            'usuario_id': user['id']
+        }, 'administrador')
+
+    return jsonify({
+        "message": "Tickets purgados exitosamente",
+        "eliminados": total_eliminados,
+        "lotes": lotes
+    }), 200
+
+
+# Gestión
+
+@api.route('/gestiones', methods=['GET'])
+@require_role(['analista', 'supervisor', 'administrador', 'cliente'])
+def obtener_gestiones():
+    gestiones = Gestion.query.all()
+    return jsonify([t.serialize() for t in gestiones]), 200
+
+
+@api.route('/gestiones', methods=['POST'])
+@require_role(['analista', 'supervisor', 'administrador', 'cliente'])
+def crear_gestion():
+    body = request.get_json(silent=True) or {}
+    required = ["id_ticket", "fecha_cambio", "Nota_de_caso",]
+    missing = [k for k in required if not body.get(k)]
+    if missing:
+        return jsonify({"message": f"Faltan campos: {', '.join(missing)}"}), 400
+    try:
+        gestion = Gestion(
+            id_ticket=body["id_ticket"],
+            fecha_cambio=datetime.fromisoformat(body["fecha_cambio"]),
+            Nota_de_caso=body["Nota_de_caso"],
+        )
+        db.session.add(gestion)
+        db.session.commit()
+        return jsonify(gestion.serialize()), 201
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Error de integridad en la base de datos"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error inesperado: {str(e)}"}), 500
+
+
+@api.route('/gestiones/<int:id>', methods=['GET'])
+@require_role(['analista', 'supervisor', 'administrador', 'cliente'])
+def ver_gestion(id):
+    gestion = db.session.get(Gestion, id)
+    if not gestion:
+        return jsonify({"message": "Gestión no existe"}), 404
+    return jsonify(gestion.serialize()), 200
+
+
+@api.route('/gestiones/<int:id>', methods=['PUT'])
+@require_role(['analista', 'supervisor', 'administrador', 'cliente'])
+def actualizar_gestion(id):
+    body = request.get_json(silent=True) or {}
+    gestion = db.session.get(Gestion, id)
+    if not gestion:
+        return jsonify({"message": "Gestión no existe"}), 404
+    try:
+        for field in ["id_ticket", "fecha_cambio", "Nota_de_caso",]:
+            if field in body:
+                value = body[field]
+                if field == "fecha_cambio" and value:
+                    value = datetime.fromisoformat(value)
+                setattr(gestion, field, value)
+        db.session.commit()
+        return jsonify(gestion.serialize()), 200
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"message": "Error de integridad en la base de datos"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error inesperado: {str(e)}"}), 500
+
+
+@api.route('/gestiones/<int:id>', methods=['DELETE'])
+@require_role(['analista', 'supervisor', 'administrador', 'cliente'])
+def eliminar_gestion(id):
+    gestion = db.session.get(Gestion, id)
+    if not gestion:
+        return jsonify({"message": "Gestión no existe"}), 404
+    try:
+        db.session.delete(gestion)
+        db.session.commit()
+        return jsonify({"message": "Gestion eliminada"}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al eliminar: {str(e)}"}), 500
+
+
+@api.route('/tickets/cliente', methods=['GET'])
+@require_role(['cliente'])
+def get_cliente_tickets():
+    """Obtener tickets del cliente autenticado con JWT"""
+    try:
+        # Obtener usuario del token JWT
+        user = get_user_from_token()
+        if not user or user['role'] != 'cliente':
+            return jsonify({"message": "Acceso denegado"}), 403
+        
+        # Obtener tickets del cliente, excluyendo los cerrados por supervisor y cerrados por cliente
+        tickets = Ticket.query.filter(
+            Ticket.id_cliente == user['id'],
+            Ticket.estado != 'cerrado_por_supervisor',
+            Ticket.estado != 'cerrado'
+        ).all()
+        
+        return jsonify([t.serialize() for t in tickets]), 200
+        
+    except Exception as e:
+        return jsonify({"message": f"Error al obtener tickets: {str(e)}"}), 500
+
+
+@api.route('/tickets/analista/<int:id>', methods=['GET'])
+@require_role(['supervisor', 'administrador'])
+def get_analista_tickets_by_id(id):
+    """Obtener tickets de un analista específico por ID"""
+    try:
+        # Verificar que el analista existe
+        analista = db.session.get(Analista, id)
+        if not analista:
+            return jsonify({"message": "Analista no encontrado"}), 404
+        
+        # Obtener todos los tickets asignados actualmente al analista
+        tickets = Ticket.query.options(
+            selectinload(Ticket.asignacion_vigente)
+        ).filter(Ticket.current_analista_id == id).all()
+        
+        return jsonify([t.serialize() for t in tickets]), 200
+        
+    except Exception as e:
+        return handle_general_error(e, "obtener tickets del analista")
+
+
+@api.route('/tickets/analista', methods=['GET'])
+@require_role(['analista', 'administrador'])
+def get_analista_tickets():
+    """Obtener tickets asignados al analista autenticado (excluyendo tickets escalados)"""
+    try:
+        user = get_user_from_token()
+        if not user:
+            return jsonify({"message": "Token inválido o expirado"}), 401
+        if user['role'] not in ['analista', 'administrador']:
+            return jsonify({"message": "Acceso denegado"}), 403
+        
+        # Escalaciones del analista posteriores a la asignación vigente (índice analista/tipo/fecha)
+        escalado_despues = db.session.query(EventoTicket.id).filter(
+            EventoTicket.id_ticket == Ticket.id,
+            EventoTicket.id_analista == user['id'],
+            EventoTicket.tipo == EventoTicket.ESCALADO,
+            EventoTicket.fecha > Asignacion.fecha_asignacion
+        ).exists()
+        
+        # Cola del analista: tickets cuya asignación vigente es suya, en estado trabajable y sin escalar
+        tickets_filtrados = Ticket.query.join(
+            Asignacion, Asignacion.id == Ticket.current_asignacion_id
+        ).options(
+            selectinload(Ticket.asignacion_vigente)
+        ).filter(
+            Ticket.current_analista_id == user['id'],
+            func.lower(Ticket.estado).in_(['creado', 'en_espera', 'en_proceso']),
+            ~escalado_despues
+        ).all()
+        
+        return jsonify([t.serialize() for t in tickets_filtrados]), 200
+        
+    except Exception as e:
+        # Log del error para debugging
+        return handle_general_error(e, "obtener tickets del analista")
+
+
+@api.route('/tickets/supervisor', methods=['GET'])
+@require_role(['supervisor', 'administrador'])
+def get_supervisor_tickets():
+    """Obtener todos los tickets activos para el supervisor"""
+    try:
+        # Obtener solo tickets activos (excluyendo cerrados)
+        tickets = Ticket.query.filter(
+            Ticket.estado != 'cerrado',
+            Ticket.estado != 'cerrado_por_supervisor'
+        ).all()
+        return jsonify([t.serialize() for t in tickets]), 200
+        
+    except Exception as e:
+        return jsonify({"message": f"Error al obtener tickets: {str(e)}"}), 500
+
+
+@api.route('/tickets/supervisor/cerrados', methods=['GET'])
+@require_role(['supervisor', 'administrador'])
+def get_supervisor_closed_tickets():
+    """Obtener tickets cerrados para el supervisor"""
+    try:
+        # Obtener solo tickets cerrados
+        tickets = Ticket.query.filter(
+            Ticket.estado.in_(['cerrado', 'cerrado_por_supervisor'])
+        ).all()
+        return jsonify([t.serialize() for t in tickets]), 200
+        
+    except Exception as e:
+        return jsonify({"message": f"Error al obtener tickets cerrados: {str(e)}"}), 500
+
+
+@api.route('/tickets/<int:id>/estado', methods=['PUT'])
+@require_role(['analista', 'supervisor', 'cliente', 'administrador'])
+def cambiar_estado_ticket(id):
+    """Cambiar el estado de un ticket"""
+    body = request.get_json(silent=True) or {}
+    user = get_user_from_token()
+    
+    nuevo_estado = body.get('estado')
+    if not nuevo_estado:
+        return jsonify({"message": "Estado requerido"}), 400
+    
+    try:
+        ticket = db.session.get(Ticket, id)
+        if not ticket:
+            return jsonify({"message": "Ticket no encontrado"}), 404
+        
+        # Verificar permisos según el rol
+        if user['role'] == 'cliente' and ticket.id_cliente != user['id']:
+            return jsonify({"message": "No tienes permisos para modificar este ticket"}), 403
+        
+        conflicto = version_en_conflicto(ticket, body)
+        if conflicto:
+            return conflicto
+        
+        # Validar transiciones de estado según el flujo especificado
+        estado_anterior = ticket.estado
+        estado_actual = ticket.estado.lower()
+        nuevo_estado_lower = nuevo_estado.lower()
+        
+        # Flujo: Creado → En espera → En proceso → Solucionado → Cerrado → Reabierto
+        
+        # Cliente puede: cerrar tickets solucionados (con evaluación) y solicitar reapertura de solucionados
+        if user['role'] == 'cliente':
+            if nuevo_estado_lower == 'cerrado' and estado_actual == 'solucionado':
+                ticket.estado = nuevo_estado
+                ticket.fecha_cierre = datetime.now()
+                # Incluir evaluación automática al cerrar
+                calificacion = body.get('calificacion')
+                comentario = body.get('comentario', '')
+                if calificacion and 1 <= calificacion <= 5:
+                    ticket.calificacion = calificacion
+                    ticket.comentario = comentario
+                    ticket.fecha_evaluacion = datetime.now()
+                
+                # Crear comentario automático de cierre
+                comentario_cierre = Comentarios(
+                    id_ticket=id,
+                    id_cliente=user['id'],
+                    texto="Ticket cerrado por cliente",
+                    fecha_comentario=datetime.now()
+                )
+                db.session.add(comentario_cierre)
+                
+                # Notificar inmediatamente a supervisores sobre el cierre
+                socketio = get_socketio()
+                if socketio:
+                    try:
+                        cierre_data = {
+                            'ticket_id': ticket.id,
+                            'ticket_estado': ticket.estado,
+                            'ticket_titulo': ticket.titulo,
+                            'ticket_prioridad': ticket.prioridad,
+                            'cliente_id': ticket.id_cliente,
+                            'calificacion': calificacion,
+                            'tipo': 'cerrado',
+                            'timestamp': datetime.now().isoformat()
+                        }
+                        
+                        # Notificar a supervisores y administradores sobre el cierre
+                        socketio.emit('ticket_cerrado', cierre_data, room='supervisores')
+                        socketio.emit('ticket_cerrado', cierre_data, room='administradores')
+                        
+                        # También notificar al room del ticket
+                        ticket_room = f'room_ticket_{ticket.id}'
+                        socketio.emit('ticket_cerrado', cierre_data, room=ticket_room)
+                        
+                        print(f"📤 TICKET CERRADO NOTIFICADO: {cierre_data}")
+                    except Exception as ws_error:
+                        print(f"Error enviando WebSocket de cierre: {ws_error}")
+            elif nuevo_estado_lower == 'solicitar_reapertura' and estado_actual == 'solucionado':
+                # No cambiar estado, solo crear comentario de solicitud
+                comentario_solicitud = Comentarios(
+                    id_ticket=id,
+                    id_cliente=user['id'],
+                    texto="Cliente solicita reapertura del ticket",
+                    fecha_comentario=datetime.now()
+                )
+                db.session.add(comentario_solicitud)
+                
+                # Notificar al room del ticket y a supervisores sobre la solicitud de reapertura
+                socketio = get_socketio()
+                if socketio:
+                    try:
+                        solicitud_data = {
+                            'ticket_id': ticket.id,
+                            'ticket_estado': ticket.estado,
+                            'ticket_titulo': ticket.titulo,
+                            'ticket_prioridad': ticket.prioridad,
+                            'tipo': 'solicitud_reapertura',
+                            'cliente_id': user['id'],
+                            'timestamp': datetime.now().isoformat()
+                        }
+                        
+                        # Notificar a supervisores y administradores sobre la solicitud de reapertura
+                        socketio.emit('solicitud_reapertura', solicitud_data, room='supervisores')
+                        socketio.emit('solicitud_reapertura', solicitud_data, room='administradores')
+                        
+                        # También notificar al room del ticket
+                        ticket_room = f'room_ticket_{ticket.id}'
+                        socketio.emit('solicitud_reapertura', solicitud_data, room=ticket_room)
+                        
+                        print(f"📤 SOLICITUD DE REAPERTURA NOTIFICADA: {solicitud_data}")
+                    except Exception as ws_error:
+                        print(f"Error enviando WebSocket de solicitud reapertura: {ws_error}")
+            elif nuevo_estado_lower == 'reabierto' and estado_actual == 'cerrado':
+                ticket.estado = nuevo_estado
+                ticket.fecha_cierre = None  # Reset fecha de cierre
+                
+                # Crear comentario automático de reapertura
+                comentario_reapertura = Comentarios(
+                    id_ticket=id,
+                    id_cliente=user['id'],
+                    texto="Ticket reabierto por cliente",
+                    fecha_comentario=datetime.now()
+                )
+                db.session.add(comentario_reapertura)
+                
+                # Notificar inmediatamente a supervisores sobre la reapertura
+                socketio = get_socketio()
+                if socketio:
+                    try:
+                        reapertura_data = {
+                            'ticket_id': ticket.id,
+                            'ticket_estado': ticket.estado,
+                            'ticket_titulo': ticket.titulo,
+                            'ticket_prioridad': ticket.prioridad,
+                            'cliente_id': ticket.id_cliente,
+                            'tipo': 'reabierto',
+                            'timestamp': datetime.now().isoformat()
+                        }
+                        
+                        # Notificar a supervisores y administradores sobre la reapertura
+                        socketio.emit('ticket_reabierto', reapertura_data, room='supervisores')
+                        socketio.emit('ticket_reabierto', reapertura_data, room='administradores')
+                        
+                        # También notificar al room del ticket
+                        ticket_room = f'room_ticket_{ticket.id}'
+                        socketio.emit('ticket_reabierto', reapertura_data, room=ticket_room)
+                        
+                        print(f"📤 TICKET REABIERTO NOTIFICADO: {reapertura_data}")
+                    except Exception as ws_error:
+                        print(f"Error enviando WebSocket de reapertura: {ws_error}")
+            else:
+                return jsonify({"message": "Transición de estado no válida para cliente"}), 400
+        
+        # Analista puede: cambiar a en_proceso, solucionado, o escalar (en_espera)
+        elif user['role'] == 'analista':
+            if nuevo_estado_lower == 'en_proceso' and estado_actual in ['creado', 'en_espera']:
+                ticket.estado = nuevo_estado
+            elif nuevo_estado_lower == 'solucionado' and estado_actual == 'en_proceso':
+                ticket.estado = nuevo_estado
+                
+                # Crear comentario automático de solución
+                comentario_solucion = Comentarios(
+                    id_ticket=ticket.id,
+                    id_analista=user['id'],
+                    texto="Ticket solucionado",
+                    fecha_comentario=datetime.now()
+                )
+                db.session.add(comentario_solucion)
+            elif nuevo_estado_lower == 'en_espera' and estado_actual in ['en_proceso', 'en_espera']:  # Escalar al supervisor
+                # Si está escalando desde 'en_espera', significa que no puede resolverlo sin iniciarlo
+                # Si está escalando desde 'en_proceso', significa que ya lo trabajó pero no puede resolverlo
+                ticket.estado = nuevo_estado
+                
+                # Eliminar todas las asignaciones del analista para este ticket
+                if ticket.current_analista_id == user['id']:
+                    ticket.current_asignacion_id = None
+                    ticket.current_analista_id = None
+                    db.session.flush()
+                Asignacion.query.filter_by(
+                    id_ticket=ticket.id, 
+                    id_analista=user['id']
+                ).delete(synchronize_session=False)
+                ticket.actualizar_asignacion_actual()
+                
+                # Crear comentario automático de escalación
+                comentario_escalacion = Comentarios(
+                    id_ticket=ticket.id,
+                    id_analista=user['id'],
+                    texto="Ticket escalado al supervisor",
+                    fecha_comentario=datetime.now()
+                )
+                db.session.add(comentario_escalacion)
+                
+                # Notificar inmediatamente a supervisores sobre la escalación
+                socketio = get_socketio()
+                if socketio:
+                    try:
+                        escalacion_data = {
+                            'ticket_id': ticket.id,
+                            'ticket_estado': ticket.estado,
+                            'ticket_titulo': ticket.titulo,
+                            'ticket_prioridad': ticket.prioridad,
+                            'cliente_id': ticket.id_cliente,
+                            'analista_id': user['id'],
+                            'tipo': 'escalado',
+                            'timestamp': datetime.now().isoformat()
+                        }
+                        
+                        # Notificar a supervisores y administradores sobre la escalación
+                        socketio.emit('ticket_escalado', escalacion_data, room='supervisores')
+                        socketio.emit('ticket_escalado', escalacion_data, room='administradores')
+                        
+                        # También notificar al room del ticket
+                        ticket_room = f'room_ticket_{ticket.id}'
+                        socketio.emit('ticket_escalado', escalacion_data, room=ticket_room)
+                        
+                        print(f"📤 TICKET ESCALADO NOTIFICADO: {escalacion_data}")
+                    except Exception as ws_error:
+                        print(f"Error enviando WebSocket de escalación: {ws_error}")
+            else:
+                return jsonify({"message": "Transición de estado no válida para analista"}), 400
+        
+        # Supervisor puede: cambiar a en_espera, cerrar o reabrir tickets solucionados, cerrar tickets reabiertos
+        elif user['role'] == 'supervisor':
+            if nuevo_estado_lower == 'en_espera' and estado_actual in ['creado', 'reabierto']:
+                ticket.estado = nuevo_estado
+            elif nuevo_estado_lower == 'cerrado' and estado_actual in ['solucionado', 'reabierto']:
+                ticket.estado = 'cerrado_por_supervisor'  # Estado especial que oculta el ticket al cliente
+                ticket.fecha_cierre = datetime.now()
+            elif nuevo_estado_lower == 'reabierto' and estado_actual == 'solucionado':
+                ticket.estado = nuevo_estado
+                ticket.fecha_cierre = None  # Reset fecha de cierre
+                
+                # Crear comentario automático de reapertura
+                comentario_reapertura = Comentarios(
+                    id_ticket=ticket.id,
+                    id_supervisor=user['id'],
+                    texto="Ticket reabierto por supervisor",
+                    fecha_comentario=datetime.now()
+                )
+                db.session.add(comentario_reapertura)
+            else:
+                return jsonify({"message": "Transición de estado no válida para supervisor"}), 400
+        
+        # Administrador puede cambiar cualquier estado
+        elif user['role'] == 'administrador':
+            ticket.estado = nuevo_estado
+            if nuevo_estado_lower == 'cerrado':
+                ticket.fecha_cierre = datetime.now()
+            elif nuevo_estado_lower == 'reabierto':
+                ticket.fecha_cierre = None
+        
+        # Registrar el evento tipado de la transición
+        if user['role'] == 'analista' and nuevo_estado_lower == 'en_espera':
+            registrar_evento_ticket(ticket, EventoTicket.ESCALADO, user, estado_anterior)
+        elif ticket.estado != estado_anterior:
+            registrar_evento_ticket(ticket, EventoTicket.tipo_para_estado(ticket.estado), user, estado_anterior)
+        
+        db.session.commit()
+        
+        # Emitir evento WebSocket para notificar cambios de estado al room del ticket
+        socketio = get_socketio()
+        if socketio:
+            try:
+                # Datos para notificaciones
+                estado_data = {
+                    'ticket_id': ticket.id,
+                    'ticket_estado': ticket.estado,
+                    'tipo': 'estado_cambiado',
+                    'nuevo_estado': nuevo_estado,
+                    'usuario': user['role'],
+                    'timestamp': datetime.now().isoformat()
+                }
+                
+                # Notificar a todos los usuarios conectados al room del ticket
+                ticket_room = f'room_ticket_{ticket.id}'
+                socketio.emit('ticket_actualizado', estado_data, room=ticket_room)
+                
+                print(f"📤 Estado de ticket actualizado enviado al room: {ticket_room}")
+                    
+            except Exception as e:
+                print(f"Error enviando WebSocket: {e}")
+        
+        return jsonify(ticket.serialize()), 200
+        
+    except StaleDataError:
+        return handle_conflicto_version(id)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al cambiar estado: {str(e)}"}), 500
+
+
+@api.route('/tickets/<int:id>/evaluar', methods=['POST'])
+@require_role(['cliente'])
+def evaluar_ticket(id):
+    """Evaluar un ticket cerrado"""
+    body = request.get_json(silent=True) or {}
+    user = get_user_from_token()
+    
+    calificacion = body.get('calificacion')
+    comentario = body.get('comentario', '')
+    
+    if not calificacion or calificacion < 1 or calificacion > 5:
+        return jsonify({"message": "Calificación debe estar entre 1 y 5"}), 400
+    
+    try:
+        ticket = db.session.get(Ticket, id)
+        if not ticket:
+            return jsonify({"message": "Ticket no encontrado"}), 404
+        
+        if ticket.id_cliente != user['id']:
+            return jsonify({"message": "No tienes permisos para evaluar este ticket"}), 403
+        
+        conflicto = version_en_conflicto(ticket, body)
+        if conflicto:
+            return conflicto
+        
+        if ticket.estado.lower() != 'cerrado':
+            return jsonify({"message": "Solo se pueden evaluar tickets cerrados"}), 400
+        
+        ticket.calificacion = calificacion
+        ticket.comentario = comentario
+        ticket.fecha_evaluacion = datetime.now()
+        
+        db.session.commit()
+        
+        # Emitir evento WebSocket para notificar evaluación al room del ticket
+        socketio = get_socketio()
+        if socketio:
+            try:
+                # Notificar a todos los usuarios conectados al room del ticket
+                ticket_room = f'room_ticket_{ticket.id}'
+                socketio.emit('ticket_actualizado', {
+                    'ticket': ticket.serialize(),
+                    'tipo': 'evaluado',
+                    'calificacion': calificacion,
+                    'comentario': comentario,
+                    'timestamp': datetime.now().isoformat()
+                }, room=ticket_room)
+                
+                print(f"📤 Evaluación de ticket enviada al room: {ticket_room}")
+                    
+            except Exception as e:
+                print(f"Error enviando WebSocket: {e}")
+        
+        return jsonify(ticket.serialize()), 200
+        
+    except StaleDataError:
+        return handle_conflicto_version(id)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al evaluar ticket: {str(e)}"}), 500
+
+
+@api.route('/tickets/<int:id>/asignacion-status', methods=['GET'])
+@require_role(['supervisor', 'administrador'])
+def get_ticket_asignacion_status(id):
+    """Obtener el estado de asignación de un ticket para el supervisor"""
+    try:
+        ticket = db.session.get(Ticket, id)
+        if not ticket:
+            return jsonify({"message": "Ticket no encontrado"}), 404
+        
+        # Verificar si el ticket ya tiene una asignación vigente
+        asignacion_mas_reciente = ticket.asignacion_vigente if ticket.current_asignacion_id else None
+        
+        if not asignacion_mas_reciente:
+            return jsonify({
+                "tiene_asignacion": False,
+                "accion": "asignar",
+                "ticket": ticket.serialize()
+            }), 200
+        else:
+            return jsonify({
+                "tiene_asignacion": True,
+                "accion": "reasignar",
+                "asignacion_actual": asignacion_mas_reciente.serialize(),
+                "ticket": ticket.serialize()
+            }), 200
+            
+    except Exception as e:
+        return jsonify({"message": f"Error al obtener estado de asignación: {str(e)}"}), 500
+
+
+@api.route('/tickets/<int:id>/asignar', methods=['POST'])
+@require_role(['supervisor', 'administrador'])
+def asignar_ticket(id):
+    """Asignar o reasignar ticket a un analista"""
+    body = request.get_json(silent=True) or {}
+    user = get_user_from_token()
+    
+    id_analista = body.get('id_analista')
+    comentario = body.get('comentario')
+    es_reasignacion = body.get('es_reasignacion', False)
+    
+    if not id_analista:
+        return jsonify({"message": "ID del analista requerido"}), 400
+    
+    try:
+        ticket = db.session.get(Ticket, id)
+        if not ticket:
+            return jsonify({"message": "Ticket no encontrado"}), 404
+        
+        conflicto = version_en_conflicto(ticket, body)
+        if conflicto:
+            return conflicto
+        
+        # Verificar que el analista existe
+        analista = db.session.get(Analista, id_analista)
+        if not analista:
+            return jsonify({"message": "Analista no encontrado"}), 404
+        
+        # Verificar que el ticket está en un estado válido para asignación
+        estados_validos = ['creado', 'en_espera', 'reabierto', 'solucionado']
+        if ticket.estado.lower() not in estados_validos:
+            return jsonify({
+                "message": f"El ticket no puede ser asignado en estado '{ticket.estado}'. Estados válidos: {', '.join(estados_validos)}"
+            }), 400
+        
+        # El analista existe y está disponible (no hay campo activo en el modelo)
+        
+        # Eliminar todas las asignaciones anteriores para este ticket
+        ticket.current_asignacion_id = None
+        ticket.current_analista_id = None
+        db.session.flush()
+        Asignacion.query.filter_by(id_ticket=id).delete(synchronize_session=False)
+        
+        # Si es reasignación, no eliminar comentarios anteriores para evitar conflictos
+        # Los comentarios de escalación se mantienen para trazabilidad
+        
+        # Crear nueva asignación
+        asignacion = Asignacion(
+            id_ticket=id,
+            id_supervisor=user['id'],
+            id_analista=id_analista,
+            fecha_asignacion=datetime.now()
+        )
+
+        # Cambiar estado del ticket a "en_espera" según el flujo especificado
+        estado_anterior = ticket.estado
+        ticket.estado = 'en_espera'
+
+        db.session.add(asignacion)
+        db.session.flush()
+
+        # Mantener la asignación vigente desnormalizada en la misma transacción
+        ticket.current_asignacion_id = asignacion.id
+        ticket.current_analista_id = asignacion.id_analista
+        registrar_evento_ticket(ticket, EventoTicket.ASIGNADO, user, estado_anterior, id_analista=id_analista)
+
+        # Crear comentario automático de asignación
+        accion_texto = f"Ticket {'reasignado' if es_reasignacion else 'asignado'} a {analista.nombre} {analista.apellido}"
+        comentario_asignacion = Comentarios(
+            id_ticket=id,
+            id_supervisor=user['id'],
+            texto=accion_texto,
+            fecha_comentario=datetime.now()
+        )
+        db.session.add(comentario_asignacion)
+
+        # Agregar comentario del supervisor si se proporciona
+        if comentario:
+            nuevo_comentario = Comentarios(
+                id_ticket=id,
+                id_supervisor=user['id'],
+                texto=comentario,
+                fecha_comentario=datetime.now()
+            )
+            db.session.add(nuevo_comentario)
+
+        db.session.commit()
+
+        # Emitir evento WebSocket para notificar asignación
+        socketio = get_socketio()
+        if socketio:
+            try:
+                # Crear datos de asignación con estructura consistente
+                asignacion_data = {
+                    'id': ticket.id,
+                    'ticket_id': ticket.id,
+                    'estado': ticket.estado,
+                    'titulo': ticket.titulo,
+                    'prioridad': ticket.prioridad,
+                    'descripcion': ticket.descripcion,
+                    'fecha_creacion': ticket.fecha_creacion.isoformat() if ticket.fecha_creacion else None,
+                    'id_cliente': ticket.id_cliente,
+                    'id_analista': id_analista,
+                    'analista_nombre': f"{analista.nombre} {analista.apellido}",
+                    'tipo': 'asignado',
+                    'accion': "reasignado" if es_reasignacion else "asignado",
+                    'timestamp': datetime.now().isoformat()
+                }
+                
+                # Notificar específicamente al analista asignado
+                socketio.emit('ticket_asignado_a_mi', asignacion_data, room=f'analista_{id_analista}')
+                
+                # Notificar a todos los usuarios conectados al room del ticket
+                ticket_room = f'room_ticket_{ticket.id}'
+                socketio.emit('ticket_asignado', asignacion_data, room=ticket_room)
+                
+                # Notificar a supervisores y administradores sobre la asignación
+                socketio.emit('ticket_asignado', asignacion_data, room='supervisores')
+                socketio.emit('ticket_asignado', asignacion_data, room='administradores')
+                
+                print(f"📤 Asignación de ticket notificada: {asignacion_data}")
+                    
+            except Exception as e:
+                print(f"Error enviando WebSocket: {e}")
+
+        accion = "reasignado" if es_reasignacion else "asignado"
+        return jsonify({
+            "message": f"Ticket {accion} exitosamente",
+            "ticket": ticket.serialize(),
+            "asignacion": asignacion.serialize()
+        }), 200
+        
+    except StaleDataError:
+        return handle_conflicto_version(id)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al asignar ticket: {str(e)}"}), 500
+
+
+# Exportación
+
+def _fecha_param(nombre, fin=False):
+    """Fecha u hora ISO del query string; una fecha sola como fin de rango incluye todo ese día"""
+    valor = request.args.get(nombre)
+    if not valor:
+        return None
+    momento = datetime.fromisoformat(valor)
+    if fin and len(valor) == 10:
+        momento += timedelta(days=1)
+    return momento
+
+
+def _respuesta_exportacion(nombre, filas, columnas, formato):
+    extension = 'csv' if formato == 'csv' else 'ndjson'
+    response = Response(
+        stream_with_context(exportacion.generar(filas, columnas, formato)),
+        content_type=exportacion.FORMATOS[formato]
+    )
+    response.headers['Content-Disposition'] = (
+        f'attachment; filename="{nombre}-{datetime.now().strftime("%Y%m%d-%H%M%S")}.{extension}"'
+    )
+    # Que un proxy (nginx) no acumule la respuesta completa antes de reenviarla
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api.route('/exportar/tickets', methods=['GET'])
+@require_role(['administrador', 'supervisor'])
+def exportar_tickets():
+    """
+    Exportar tickets en streaming
+    Query: formato (csv | ndjson), estado y prioridad (listas separadas por comas),
+    id_cliente, id_analista, desde y hasta (fecha de creación, ISO; hasta incluye el día)
+    """
+    formato = request.args.get('formato', 'csv')
+    if formato not in exportacion.FORMATOS:
+        return jsonify({"message": f"formato debe ser uno de {', '.join(exportacion.FORMATOS)}"}), 400
+    try:
+        estados = request.args.get('estado')
+        prioridades = request.args.get('prioridad')
+        query = exportacion.consulta_tickets(
+            estados=[e.strip() for e in estados.split(',') if e.strip()] if estados else None,
+            prioridades=[p.strip() for p in prioridades.split(',') if p.strip()] if prioridades else None,
+            id_cliente=request.args.get('id_cliente', type=int),
+            id_analista=request.args.get('id_analista', type=int),
+            desde=_fecha_param('desde'),
+            hasta=_fecha_param('hasta', fin=True)
+        )
+    except ValueError as e:
+        return jsonify({"message": f"Parámetros inválidos: {e}"}), 400
+    return _respuesta_exportacion(
+        'tickets', exportacion.filas_tickets(query), exportacion.COLUMNAS_TICKET, formato
+    )
+
+
+@api.route('/exportar/comentarios', methods=['GET'])
+@require_role(['administrador', 'supervisor'])
+def exportar_comentarios():
+    """
+    Exportar comentarios en streaming
+    Query: formato (csv | ndjson), id_ticket, id_cliente (dueño del ticket),
+    desde y hasta (fecha del comentario, ISO; hasta incluye el día)
+    """
+    formato = request.args.get('formato', 'csv')
+    if formato not in exportacion.FORMATOS:
+        return jsonify({"message": f"formato debe ser uno de {', '.join(exportacion.FORMATOS)}"}), 400
+    try:
+        query = exportacion.consulta_comentarios(
+            id_ticket=request.args.get('id_ticket', type=int),
+            id_cliente=request.args.get('id_cliente', type=int),
+            desde=_fecha_param('desde'),
+            hasta=_fecha_param('hasta', fin=True)
+        )
+    except ValueError as e:
+        return jsonify({"message": f"Parámetros inválidos: {e}"}), 400
+    return _respuesta_exportacion(
+        'comentarios', exportacion.filas_comentarios(query), exportacion.COLUMNAS_COMENTARIO, formato
+    )
+
+
+# Importación
+
+@api.route('/importar/<tipo>', methods=['POST'])
+@require_role(['administrador'])
+def importar_datos(tipo):
+    """
+    Importar clientes o tickets en lote desde el cuerpo de la petición (NDJSON o CSV con cabecera).
+    Las filas válidas se insertan por lotes sin emitir eventos de tiempo real; las inválidas
+    se reportan con su número de línea. Para archivos muy grandes usar `flask import-data`.
+    Query: formato (ndjson | csv; por defecto según Content-Type), lote, solo_validar
+    """
+    if tipo not in importacion.TIPOS:
+        return jsonify({"message": f"tipo debe ser uno de {', '.join(importacion.TIPOS)}"}), 404
+    formato = request.args.get('formato') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+    if formato not in importacion.FORMATOS:
+        return jsonify({"message": f"formato debe ser uno de {', '.join(importacion.FORMATOS)}"}), 400
+    lote = min(max(request.args.get('lote', default=importacion.IMPORT_BATCH_SIZE, type=int), 1), 10000)
+    solo_validar = request.args.get('solo_validar', '').lower() in ('1', 'true', 'si')
+
+    try:
+        # Se lee el cuerpo como flujo: el archivo nunca está entero en memoria
+        flujo = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+        reporte = importacion.importar(
+            tipo, importacion.leer_filas(flujo, formato), tamano_lote=lote, solo_validar=solo_validar
+        )
+        return jsonify(reporte), 200
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({"message": "El archivo debe estar en UTF-8"}), 400
+    except PoolSaturado:
+        # Columna password con el pool de hashing lleno; los lotes ya confirmados se conservan
+        db.session.rollback()
+        return handle_pool_saturado()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": f"Error al importar {tipo}: {str(e)}"}), 500
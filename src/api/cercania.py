@@ -0,0 +1,148 @@
+"""
+Búsquedas por cercanía para TiBACK
+Tickets abiertos en un radio y clientes en un bbox usando el índice de cliente.geohash:
+los prefijos que cubren la zona se consultan como rangos del B-tree (portable entre SQLite
+y Postgres, sin PostGIS) y la distancia exacta se calcula con haversine sobre los candidatos
+"""
+import os
+from sqlalchemy import and_, or_
+from api.models import db, Ticket, Cliente, ESTADOS_CIERRE
+from api.geo import cubrir_bbox, siguiente_prefijo, bbox_de_radio, distancia_km
+
+# Radio máximo aceptado por tickets_cercanos
+GEO_MAX_RADIUS_KM = float(os.getenv('GEO_MAX_RADIUS_KM', '100'))
+# Prefijos geohash por consulta: más prefijos = celdas más finas y menos candidatos, pero un OR más largo
+GEO_MAX_PREFIJOS = int(os.getenv('GEO_MAX_PREFIJOS', '16'))
+
+
+def _rangos_geohash(bbox):
+    """Condición sobre cliente.geohash que cubre el bbox; None si hace falta recorrer todo"""
+    prefijos = cubrir_bbox(*bbox, max_celdas=GEO_MAX_PREFIJOS)
+    if not prefijos:
+        return None
+    rangos = []
+    for prefijo in prefijos:
+        siguiente = siguiente_prefijo(prefijo)
+        if siguiente is None:
+            rangos.append(Cliente.geohash >= prefijo)
+        else:
+            rangos.append(and_(Cliente.geohash >= prefijo, Cliente.geohash < siguiente))
+    return or_(*rangos)
+
+
+def _filtrar_bbox(query, bbox):
+    oeste, sur, este, norte = bbox
+    condicion = _rangos_geohash(bbox)
+    if condicion is not None:
+        query = query.filter(condicion)
+    query = query.filter(Cliente.latitude.between(sur, norte))
+    if oeste <= este:
+        return query.filter(Cliente.longitude.between(oeste, este))
+    return query.filter(or_(Cliente.longitude >= oeste, Cliente.longitude <= este))
+
+
+def tickets_cercanos(lat, lng, radio_km, estados=None, prioridades=None, limite=100):
+    """
+    Tickets de clientes a menos de radio_km de un punto, del más cercano al más lejano
+
+    Args:
+        lat (float): Latitud del centro
+        lng (float): Longitud del centro
+        radio_km (float): Radio en kilómetros (hasta GEO_MAX_RADIUS_KM)
+        estados (list, optional): Estados a incluir; por defecto los abiertos
+        prioridades (list, optional): Filtrar por prioridades
+        limite (int): Máximo de tickets devueltos
+
+    Returns:
+        tuple: (total dentro del radio, lista de tickets con distancia_km)
+
+    Raises:
+        ValueError: Si el centro o el radio no son válidos
+    """
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("centro fuera de rango")
+    if not 0 < radio_km <= GEO_MAX_RADIUS_KM:
+        raise ValueError(f"radio_km debe estar entre 0 y {GEO_MAX_RADIUS_KM:g}")
+
+    # Primera pasada solo con id y coordenadas: en zonas densas hay miles de candidatos
+    query = db.session.query(Ticket.id, Cliente.latitude, Cliente.longitude).join(
+        Ticket, Ticket.id_cliente == Cliente.id
+    )
+    query = _filtrar_bbox(query, bbox_de_radio(lat, lng, radio_km))
+    if estados:
+        query = query.filter(Ticket.estado.in_(estados))
+    else:
+        query = query.filter(Ticket.estado.notin_(ESTADOS_CIERRE))
+    if prioridades:
+        query = query.filter(Ticket.prioridad.in_(prioridades))
+
+    # El bbox deja pasar las esquinas; la distancia exacta filtra y ordena
+    encontrados = []
+    for id_ticket, lat_cliente, lng_cliente in query:
+        distancia = distancia_km(lat, lng, lat_cliente, lng_cliente)
+        if distancia <= radio_km:
+            encontrados.append((distancia, id_ticket))
+    if not encontrados:
+        return 0, []
+    encontrados.sort()
+    pagina = encontrados[:limite]
+
+    filas = {
+        fila.id: fila for fila in db.session.query(
+            Ticket.id, Ticket.titulo, Ticket.estado, Ticket.prioridad, Ticket.fecha_creacion,
+            Cliente.id.label('id_cliente'), Cliente.nombre, Cliente.apellido, Cliente.direccion,
+            Cliente.latitude, Cliente.longitude
+        ).join(Cliente, Ticket.id_cliente == Cliente.id).filter(
+            Ticket.id.in_([id_ticket for _, id_ticket in pagina])
+        )
+    }
+    tickets = []
+    for distancia, id_ticket in pagina:
+        fila = filas.get(id_ticket)
+        if fila is None:
+            continue
+        tickets.append({
+            "ticket_id": fila.id,
+            "ticket_titulo": fila.titulo,
+            "ticket_estado": fila.estado,
+            "ticket_prioridad": fila.prioridad,
+            "ticket_fecha_creacion": fila.fecha_creacion.isoformat() if fila.fecha_creacion else None,
+            "cliente_id": fila.id_cliente,
+            "cliente_nombre": fila.nombre,
+            "cliente_apellido": fila.apellido,
+            "cliente_direccion": fila.direccion,
+            "lat": fila.latitude,
+            "lng": fila.longitude,
+            "distancia_km": round(distancia, 3)
+        })
+    return len(encontrados), tickets
+
+
+def clientes_en_bbox(bbox, limite=500):
+    """
+    Clientes con ubicación dentro de un bbox
+
+    Args:
+        bbox (tuple): (oeste, sur, este, norte) normalizado; oeste > este si cruza el antimeridiano
+        limite (int): Máximo de clientes devueltos
+
+    Returns:
+        tuple: (total en el bbox, lista de clientes)
+    """
+    query = _filtrar_bbox(db.session.query(
+        Cliente.id, Cliente.nombre, Cliente.apellido, Cliente.direccion,
+        Cliente.latitude, Cliente.longitude
+    ), bbox)
+    total = query.count()
+    filas = query.order_by(Cliente.id).limit(limite).all()
+    return total, [
+        {
+            "id": fila.id,
+            "nombre": fila.nombre,
+            "apellido": fila.apellido,
+            "direccion": fila.direccion,
+            "lat": fila.latitude,
+            "lng": fila.longitude
+        }
+        for fila in filas
+    ]
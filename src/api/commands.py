@@ -1,6 +1,12 @@
-
+import os
+import json
+import time
 import click
-from api.models import db, User, Cliente, Analista, Supervisor, Administrador
+from datetime import datetime
+from api.models import db, User, Cliente, Analista, Supervisor, Administrador, Credencial, ROLES_POR_MODELO
+from api.contrasenas import es_hash, hashear_contrasena
+from api.archivo import archivar_tickets_cerrados
+from api.sesiones import purgar_sesiones_expiradas
 
 """
 In this file, you can add as many commands as you want using the @app.cli.command decorator
@@ -32,6 +38,7 @@ def setup_commands(app):
     @app.cli.command("insert-test-data")
     def insert_test_data():
         print("Creating test data for all roles")
+        contrasena_hash = hashear_contrasena("123456")
         
         # Crear 3 clientes de prueba
         clientes_data = [
@@ -64,7 +71,7 @@ def setup_commands(app):
                     nombre=cliente_data["nombre"],
                     apellido=cliente_data["apellido"],
                     email=cliente_data["email"],
-                    contraseña_hash="123456",
+                    contraseña_hash=contrasena_hash,
                     direccion=cliente_data["direccion"],
                     telefono=cliente_data["telefono"]
                 )
@@ -101,7 +108,7 @@ def setup_commands(app):
                     nombre=analista_data["nombre"],
                     apellido=analista_data["apellido"],
                     email=analista_data["email"],
-                    contraseña_hash="123456",
+                    contraseña_hash=contrasena_hash,
                     especialidad=analista_data["especialidad"]
                 )
                 db.session.add(analista)
@@ -131,7 +138,7 @@ def setup_commands(app):
                     nombre=supervisor_data["nombre"],
                     apellido=supervisor_data["apellido"],
                     email=supervisor_data["email"],
-                    contraseña_hash="123456",
+                    contraseña_hash=contrasena_hash,
                     area_responsable=supervisor_data["area_responsable"]
                 )
                 db.session.add(supervisor)
@@ -143,7 +150,7 @@ def setup_commands(app):
         try:
             administrador = Administrador(
                 email="admin@test.com",
-                contraseña_hash="123456",
+                contraseña_hash=contrasena_hash,
                 permisos_especiales="Gestión completa del sistema"
             )
             db.session.add(administrador)
@@ -174,6 +181,8 @@ def setup_commands(app):
             Analista.query.filter(Analista.email.like('%@test.com')).delete()
             Supervisor.query.filter(Supervisor.email.like('%@test.com')).delete()
             Administrador.query.filter(Administrador.email.like('%@test.com')).delete()
+            # Los DELETE masivos no disparan los eventos que sincronizan credencial
+            Credencial.query.filter(Credencial.email.like('%@test.com')).delete()
             
             db.session.commit()
             print("Datos de prueba eliminados exitosamente!")
@@ -184,6 +193,7 @@ def setup_commands(app):
     @app.cli.command("reset-test-data")
     def reset_test_data():
         print("Reiniciando datos de prueba...")
+        contrasena_hash = hashear_contrasena("123456")
         
         # Primero limpiar datos existentes
         try:
@@ -191,6 +201,8 @@ def setup_commands(app):
             Analista.query.filter(Analista.email.like('%@test.com')).delete()
             Supervisor.query.filter(Supervisor.email.like('%@test.com')).delete()
             Administrador.query.filter(Administrador.email.like('%@test.com')).delete()
+            # Los DELETE masivos no disparan los eventos que sincronizan credencial
+            Credencial.query.filter(Credencial.email.like('%@test.com')).delete()
             db.session.commit()
             print("Datos existentes eliminados.")
         except Exception as e:
@@ -231,7 +243,7 @@ def setup_commands(app):
                     nombre=cliente_data["nombre"],
                     apellido=cliente_data["apellido"],
                     email=cliente_data["email"],
-                    contraseña_hash="123456",
+                    contraseña_hash=contrasena_hash,
                     direccion=cliente_data["direccion"],
                     telefono=cliente_data["telefono"]
                 )
@@ -268,7 +280,7 @@ def setup_commands(app):
                     nombre=analista_data["nombre"],
                     apellido=analista_data["apellido"],
                     email=analista_data["email"],
-                    contraseña_hash="123456",
+                    contraseña_hash=contrasena_hash,
                     especialidad=analista_data["especialidad"]
                 )
                 db.session.add(analista)
@@ -298,7 +310,7 @@ def setup_commands(app):
                     nombre=supervisor_data["nombre"],
                     apellido=supervisor_data["apellido"],
                     email=supervisor_data["email"],
-                    contraseña_hash="123456",
+                    contraseña_hash=contrasena_hash,
                     area_responsable=supervisor_data["area_responsable"]
                 )
                 db.session.add(supervisor)
@@ -310,7 +322,7 @@ def setup_commands(app):
         try:
             administrador = Administrador(
                 email="admin@test.com",
-                contraseña_hash="123456",
+                contraseña_hash=contrasena_hash,
                 permisos_especiales="Gestión completa del sistema"
             )
             db.session.add(administrador)
@@ -329,4 +341,260 @@ def setup_commands(app):
             print("Contraseña para todos: 123456")
         except Exception as e:
             db.session.rollback()
-            print(f"Error al guardar usuarios: {e}")
\ No newline at end of file
+            print(f"Error al guardar usuarios: {e}")
+
+    """
+    Mueve a ticket_archivado los tickets cerrados hace más de N días, por lotes:
+    $ flask archive-closed-tickets --dias 90 --lote 500
+    """
+    @app.cli.command("archive-closed-tickets")
+    @click.option("--dias", default=90, show_default=True, help="Antigüedad mínima del cierre en días")
+    @click.option("--lote", default=500, show_default=True, help="Tickets por transacción")
+    def archive_closed_tickets(dias, lote):
+        print(f"Archivando tickets cerrados hace más de {dias} días (lotes de {lote})...")
+
+        total = 0
+        try:
+            for archivados in archivar_tickets_cerrados(dias, lote):
+                total += archivados
+                print(f"Lote archivado: {archivados} tickets (total: {total})")
+        except Exception as e:
+            print(f"Error archivando tickets: {e}")
+            return
+
+        print(f"Archivado completado. Tickets archivados: {total}")
+
+    """
+    Genera una clave de firma JWT en el keyring para rotación:
+    $ flask generate-jwt-key 2025-10 --algoritmo RS256 --directorio keys/
+    Luego apuntar JWT_ACTIVE_KID al nuevo kid; para retirar la clave anterior
+    basta con dejar solo su <kid>.pub.pem hasta que expiren sus tokens.
+    """
+    @app.cli.command("generate-jwt-key")
+    @click.argument("kid")
+    @click.option("--algoritmo", type=click.Choice(["RS256", "EdDSA"]), default="RS256", show_default=True)
+    @click.option("--directorio", default=lambda: os.getenv("JWT_KEYRING_DIR", "keys"), help="Directorio del keyring")
+    def generate_jwt_key(kid, algoritmo, directorio):
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa, ed25519
+
+        if algoritmo == "RS256":
+            private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        else:
+            private_key = ed25519.Ed25519PrivateKey.generate()
+
+        os.makedirs(directorio, exist_ok=True)
+        private_path = os.path.join(directorio, f"{kid}.pem")
+        public_path = os.path.join(directorio, f"{kid}.pub.pem")
+        if os.path.exists(private_path) or os.path.exists(public_path):
+            print(f"Ya existe una clave con kid '{kid}' en {directorio}")
+            return
+
+        with open(private_path, "wb") as pem:
+            pem.write(private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            ))
+        os.chmod(private_path, 0o600)
+        with open(public_path, "wb") as pem:
+            pem.write(private_key.public_key().public_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo
+            ))
+
+        print(f"Clave {algoritmo} '{kid}' creada en {directorio}")
+        print(f"Para firmar con ella: JWT_ACTIVE_KID={kid}")
+
+    """
+    Convierte a hash las contraseñas que aún estén en texto plano, por lotes.
+    Recorre cada tabla por id y usa el mismo criterio que el login (es_hash).
+    Las cuentas activas también se migran solas en su siguiente login:
+    $ flask hash-passwords --lote 200
+    """
+    @app.cli.command("hash-passwords")
+    @click.option("--lote", default=200, show_default=True, help="Usuarios revisados por transacción")
+    def hash_passwords(lote):
+        total = 0
+        for modelo, rol in ROLES_POR_MODELO.items():
+            ultimo_id = 0
+            while True:
+                usuarios = modelo.query.filter(modelo.id > ultimo_id).order_by(modelo.id).limit(lote).all()
+                if not usuarios:
+                    break
+                ultimo_id = usuarios[-1].id
+                convertidos = 0
+                try:
+                    for usuario in usuarios:
+                        if not es_hash(usuario.contraseña_hash):
+                            usuario.contraseña_hash = hashear_contrasena(usuario.contraseña_hash or '')
+                            convertidos += 1
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error al convertir contraseñas de {rol}: {e}")
+                    return
+                if convertidos:
+                    total += convertidos
+                    print(f"{rol}: {convertidos} contraseñas convertidas (total: {total})")
+                db.session.expunge_all()
+
+        print(f"Conversión completada. Contraseñas convertidas: {total}")
+
+    """
+    Elimina sesiones de refresh expiradas o revocadas:
+    $ flask purge-expired-sessions
+    """
+    @app.cli.command("purge-expired-sessions")
+    def purge_expired_sessions():
+        try:
+            eliminadas = purgar_sesiones_expiradas()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error al purgar sesiones: {e}")
+            return
+
+        print(f"Sesiones eliminadas: {eliminadas}")
+
+    """
+    Precalcula los tiles del mapa de calor con tickets hasta un zoom
+    (los demás se generan en la primera lectura):
+    $ flask precompute-heatmap-tiles --zoom-maximo 8
+    """
+    @app.cli.command("precompute-heatmap-tiles")
+    @click.option("--zoom-maximo", default=8, show_default=True, help="Último zoom a precalcular")
+    def precompute_heatmap_tiles(zoom_maximo):
+        # Módulos de blueprints opcionales: se importan solo al ejecutar el comando
+        from api.mapa_calor import precalcular_tiles
+        try:
+            generados = precalcular_tiles(zoom_maximo)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error al precalcular tiles: {e}")
+            return
+
+        print(f"Tiles generados: {generados}")
+
+    """
+    Reconstruye las tablas de estadísticas de tickets (foto de activos, transiciones por día
+    e histogramas) desde tickets, archivo y evento_ticket; para después de cargas masivas:
+    $ flask rebuild-ticket-stats
+    """
+    @app.cli.command("rebuild-ticket-stats")
+    def rebuild_ticket_stats():
+        from api.estadisticas import recalcular_estadisticas
+        try:
+            filas = recalcular_estadisticas()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error al reconstruir las estadísticas: {e}")
+            return
+
+        for tabla, total in filas.items():
+            print(f"{tabla}: {total} filas")
+
+    """
+    Reconstruye el rollup de SLA (metrica_sla_dia) desde evento_ticket y el archivo;
+    para llenarlo la primera vez y después de cargas masivas:
+    $ flask rebuild-sla-rollup
+    """
+    @app.cli.command("rebuild-sla-rollup")
+    @click.option("--lote", default=5000, show_default=True, help="Filas leídas por lote")
+    def rebuild_sla_rollup(lote):
+        from api.sla import recalcular_sla
+        try:
+            filas = recalcular_sla(tamano_lote=lote)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error al reconstruir el rollup de SLA: {e}")
+            return
+
+        print(f"metrica_sla_dia: {filas} filas")
+
+    """
+    Importa clientes o tickets desde NDJSON o CSV por lotes, sin eventos de tiempo real;
+    los errores por fila se escriben en --errores (NDJSON):
+    $ flask import-data clientes clientes.csv
+    $ flask import-data tickets tickets.ndjson --lote 5000 --errores errores.ndjson
+    """
+    @app.cli.command("import-data")
+    # Las mismas opciones que importacion.TIPOS y FORMATOS, sin importar el módulo al registrar el comando
+    @click.argument("tipo", type=click.Choice(('clientes', 'tickets')))
+    @click.argument("archivo", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--formato", type=click.Choice(('ndjson', 'csv')), default=None, help="Por defecto según la extensión")
+    @click.option("--lote", default=1000, show_default=True, help="Filas por INSERT y por transacción")
+    @click.option("--solo-validar", is_flag=True, help="Validar sin escribir")
+    @click.option("--errores", "archivo_errores", type=click.Path(dir_okay=False), default=None,
+                  help="Archivo NDJSON con todos los errores por fila")
+    def import_data(tipo, archivo, formato, lote, solo_validar, archivo_errores):
+        from api.importacion import importar, leer_filas
+        formato = formato or ('csv' if archivo.lower().endswith('.csv') else 'ndjson')
+        salida_errores = open(archivo_errores, 'w', encoding='utf-8') if archivo_errores else None
+        inicio = time.perf_counter()
+        try:
+            with open(archivo, encoding='utf-8-sig', newline='') as flujo:
+                reporte = importar(
+                    tipo, leer_filas(flujo, formato), tamano_lote=lote, solo_validar=solo_validar,
+                    al_error=(lambda error: salida_errores.write(json.dumps(error, ensure_ascii=False) + '\n'))
+                    if salida_errores else None
+                )
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error al importar {tipo}: {e}")
+            return
+        finally:
+            if salida_errores:
+                salida_errores.close()
+
+        segundos = max(time.perf_counter() - inicio, 1e-6)
+        escritas = reporte.get("validas", reporte.get("insertadas"))
+        print(f"{tipo}: {reporte['procesadas']} filas procesadas, "
+              f"{escritas} {'válidas' if solo_validar else 'insertadas'}, {reporte['con_errores']} con errores "
+              f"({reporte['procesadas'] / segundos:.0f} filas/s)")
+        for error in reporte["errores"][:10]:
+            print(f"  línea {error['linea']}: {'; '.join(error['errores'])}")
+
+    """
+    Genera un conjunto de datos sintético de tamaño de producción con inserciones por lotes y
+    semilla fija (usuarios <rol><id>@seed.test, contraseña 123456 por defecto):
+    $ flask seed-scale --tickets 1000000 --clientes 100000 --analistas 200 --supervisores 20
+    """
+    @app.cli.command("seed-scale")
+    @click.option("--clientes", default=10000, show_default=True)
+    @click.option("--analistas", default=50, show_default=True)
+    @click.option("--supervisores", default=10, show_default=True)
+    @click.option("--tickets", default=100000, show_default=True)
+    @click.option("--comentarios", default=3.0, show_default=True, help="Promedio de comentarios por ticket")
+    @click.option("--mensajes", default=2.0, show_default=True, help="Promedio de mensajes de chat por ticket asignado")
+    @click.option("--dias", default=365, show_default=True, help="Días de historia")
+    @click.option("--semilla", default=42, show_default=True)
+    @click.option("--fin", default=None, help="Fecha más reciente (YYYY-MM-DD); por defecto hoy")
+    @click.option("--password", default="123456", show_default=True, help="Contraseña de los usuarios creados")
+    @click.option("--lote", default=5000, show_default=True, help="Tickets por transacción")
+    def seed_scale(clientes, analistas, supervisores, tickets, comentarios, mensajes, dias, semilla, fin,
+                   password, lote):
+        from api.datos_sinteticos import sembrar_escala, DOMINIO
+        inicio = time.perf_counter()
+
+        def progreso(hechos, total):
+            if hechos == total or hechos % (lote * 20) == 0:
+                print(f"  {hechos}/{total} tickets ({time.perf_counter() - inicio:.0f} s)")
+
+        try:
+            creados = sembrar_escala(
+                clientes, analistas, supervisores, tickets,
+                comentarios_por_ticket=comentarios, mensajes_por_ticket=mensajes, dias=dias, semilla=semilla,
+                fin=datetime.fromisoformat(fin) if fin else None, contrasena=password, tamano_lote=lote,
+                progreso=progreso
+            )
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error al generar datos sintéticos: {e}")
+            return
+
+        print(f"Datos generados en {time.perf_counter() - inicio:.0f} s (usuarios @{DOMINIO}):")
+        for tabla, total in creados.items():
+            print(f"  {tabla}: {total}")
@@ -0,0 +1,239 @@
+"""
+Instrumentación de consultas SQL por petición para TiBACK
+Cuenta sentencias y tiempo de base de datos con eventos de SQLAlchemy, detecta patrones N+1
+(la misma forma de sentencia repetida en una petición), agrega Server-Timing y aplica
+un presupuesto de consultas por petición; contar_consultas mide un bloque (benchmarks/bench_micro.py)
+"""
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SQL_INSTRUMENTATION = os.getenv('SQL_INSTRUMENTATION', '1') == '1'
+# Repeticiones de una misma forma de sentencia en una petición a partir de las que se marca N+1
+SQL_N1_THRESHOLD = int(os.getenv('SQL_N1_THRESHOLD', '5'))
+# Máximo de consultas por petición (0 = sin límite)
+SQL_QUERY_BUDGET = int(os.getenv('SQL_QUERY_BUDGET', '0'))
+# Con 1, exceder el presupuesto lanza PresupuestoConsultasExcedido (para tests y CI)
+SQL_QUERY_BUDGET_STRICT = os.getenv('SQL_QUERY_BUDGET_STRICT', '0') == '1'
+# Máximo de formas N+1 distintas que se guardan para el reporte
+SQL_N1_MAX_REPORTADAS = 200
+
+_local = threading.local()
+_detecciones = {}
+_detecciones_lock = threading.Lock()
+
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+_ESPACIOS = re.compile(r'\s+')
+
+
+class PresupuestoConsultasExcedido(Exception):
+    """Una petición o bloque ejecutó más consultas SQL de las permitidas"""
+
+
+@lru_cache(maxsize=1024)
+def forma_sentencia(sentencia):
+    """
+    Forma normalizada de una sentencia: sin literales ni tamaño de listas IN,
+    para que dos consultas que solo cambian de parámetros cuenten como la misma
+
+    Args:
+        sentencia (str): SQL enviado al driver
+
+    Returns:
+        str: SQL normalizado
+    """
+    forma = _LITERALES.sub('?', sentencia)
+    forma = _LISTAS.sub('(?)', forma)
+    return _ESPACIOS.sub(' ', forma).strip()
+
+
+class ContadorConsultas:
+    """Consultas y tiempo de base de datos acumulados en una petición o bloque"""
+
+    def __init__(self):
+        self.total = 0
+        self.tiempo_ms = 0.0
+        self.formas = {}
+
+    def registrar(self, sentencia, duracion_ms):
+        self.total += 1
+        self.tiempo_ms += duracion_ms
+        acumulado = self.formas.get(sentencia)
+        if acumulado is None:
+            self.formas[sentencia] = [1, duracion_ms]
+        else:
+            acumulado[0] += 1
+            acumulado[1] += duracion_ms
+
+    def repetidas(self, umbral=None):
+        """
+        Formas de sentencia ejecutadas al menos `umbral` veces (sospechas de N+1)
+
+        Args:
+            umbral (int, optional): Repeticiones mínimas; por defecto SQL_N1_THRESHOLD
+
+        Returns:
+            list: [{"forma", "repeticiones", "tiempo_ms"}] de más a menos repetida
+        """
+        umbral = umbral or SQL_N1_THRESHOLD
+        agrupadas = {}
+        for sentencia, (veces, ms) in self.formas.items():
+            forma = forma_sentencia(sentencia)
+            actual = agrupadas.setdefault(forma, [0, 0.0])
+            actual[0] += veces
+            actual[1] += ms
+        return sorted(
+            ({"forma": forma, "repeticiones": veces, "tiempo_ms": round(ms, 2)}
+             for forma, (veces, ms) in agrupadas.items() if veces >= umbral),
+            key=lambda x: -x["repeticiones"]
+        )
+
+    def serialize(self):
+        return {
+            "consultas": self.total,
+            "tiempo_ms": round(self.tiempo_ms, 2),
+            "n1": self.repetidas()
+        }
+
+
+def _activos():
+    activos = getattr(_local, 'contadores', None)
+    if activos is None:
+        activos = _local.contadores = []
+    return activos
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    if _activos():
+        conn.info.setdefault('_inicio_consulta', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    activos = _activos()
+    inicios = conn.info.get('_inicio_consulta')
+    if not activos or not inicios:
+        return
+    duracion_ms = (time.perf_counter() - inicios.pop()) * 1000
+    for contador in activos:
+        contador.registrar(statement, duracion_ms)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _error_al_ejecutar(contexto):
+    # Una sentencia que falla no llega a after_cursor_execute: descartar su inicio
+    conexion = contexto.connection
+    inicios = conexion.info.get('_inicio_consulta') if conexion is not None else None
+    if inicios:
+        inicios.pop()
+
+
+def _verificar_presupuesto(contador, maximo, origen):
+    if maximo and contador.total > maximo:
+        mensaje = f"{origen}: {contador.total} consultas SQL (presupuesto {maximo})"
+        if SQL_QUERY_BUDGET_STRICT:
+            raise PresupuestoConsultasExcedido(mensaje)
+        print(f"⚠️ Presupuesto de consultas excedido en {mensaje}")
+
+
+@contextmanager
+def contar_consultas(maximo=None):
+    """
+    Contar las consultas ejecutadas por este hilo dentro del bloque
+
+    Args:
+        maximo (int, optional): Presupuesto; si se excede se lanza PresupuestoConsultasExcedido
+
+    Yields:
+        ContadorConsultas: Contador del bloque
+    """
+    contador = ContadorConsultas()
+    activos = _activos()
+    activos.append(contador)
+    try:
+        yield contador
+    finally:
+        activos.remove(contador)
+    if maximo is not None and contador.total > maximo:
+        raise PresupuestoConsultasExcedido(f"{contador.total} consultas SQL (presupuesto {maximo})")
+
+
+def _registrar_deteccion(endpoint, repetidas):
+    with _detecciones_lock:
+        for item in repetidas:
+            clave = (endpoint, item["forma"])
+            actual = _detecciones.get(clave)
+            if actual is None:
+                if len(_detecciones) >= SQL_N1_MAX_REPORTADAS:
+                    continue
+                actual = _detecciones[clave] = {
+                    "endpoint": endpoint, "forma": item["forma"],
+                    "peticiones": 0, "max_repeticiones": 0
+                }
+            actual["peticiones"] += 1
+            actual["max_repeticiones"] = max(actual["max_repeticiones"], item["repeticiones"])
+
+
+def reporte():
+    """
+    Sospechas de N+1 detectadas desde el arranque del proceso
+
+    Returns:
+        list: Detecciones por endpoint y forma de sentencia, de más a menos frecuente
+    """
+    with _detecciones_lock:
+        detecciones = [dict(item) for item in _detecciones.values()]
+    return sorted(detecciones, key=lambda x: (-x["peticiones"], -x["max_repeticiones"]))
+
+
+def init_app(app):
+    """
+    Instrumentar las peticiones de la app: contador por petición, Server-Timing,
+    detección de N+1 y presupuesto de consultas
+
+    Args:
+        app (Flask): Aplicación
+    """
+    if not SQL_INSTRUMENTATION:
+        return
+
+    @app.before_request
+    def _iniciar_contador():
+        g.inicio_peticion = time.perf_counter()
+        g.contador_consultas = ContadorConsultas()
+        _activos().append(g.contador_consultas)
+
+    @app.after_request
+    def _reportar_consultas(response):
+        contador = g.get('contador_consultas')
+        if contador is None:
+            return response
+        total_ms = (time.perf_counter() - g.inicio_peticion) * 1000
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={contador.tiempo_ms:.2f};desc="{contador.total} consultas", app;dur={total_ms:.2f}'
+        )
+
+        endpoint = request.endpoint or request.path
+        repetidas = contador.repetidas()
+        if repetidas:
+            _registrar_deteccion(endpoint, repetidas)
+            peor = repetidas[0]
+            print(f"⚠️ Posible N+1 en {endpoint}: {peor['repeticiones']}x {peor['forma'][:160]}")
+
+        _verificar_presupuesto(contador, SQL_QUERY_BUDGET, endpoint)
+        return response
+
+    @app.teardown_request
+    def _cerrar_contador(exc):
+        contador = g.pop('contador_consultas', None)
+        if contador is not None and contador in _activos():
+            _activos().remove(contador)
@@ -0,0 +1,126 @@
+"""
+Hashing de contraseñas para TiBACK
+Ejecuta el KDF en un pool acotado de hilos, con costo configurable y rehash transparente en el login
+"""
+import hmac
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Método y costo en formato werkzeug: 'scrypt:N:r:p' o 'pbkdf2:sha256:iteraciones'
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+# hashlib libera el GIL durante scrypt/pbkdf2, así que los hilos corren en paralelo real
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Máximo de cálculos en cola + en curso; por encima se rechaza en lugar de acumular latencia
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', str(PASSWORD_HASH_WORKERS * 8)))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))
+
+# Formato completo de werkzeug: 'scrypt:N:r:p$sal$hex' o 'pbkdf2:algoritmo:iteraciones$sal$hex'
+_FORMATO_HASH = re.compile(r'(scrypt:\d+:\d+:\d+|pbkdf2:[a-z0-9_]+:\d+)\$[^$]+\$[0-9a-f]+')
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='kdf')
+_cupos = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+
+class PoolSaturado(Exception):
+    """El pool de hashing tiene más trabajos pendientes de los permitidos"""
+
+
+def _ejecutar(fn, *args):
+    """
+    Ejecutar una función del KDF en el pool y esperar su resultado
+
+    Args:
+        fn: Función a ejecutar
+        *args: Argumentos de la función
+
+    Returns:
+        Resultado de la función
+
+    Raises:
+        PoolSaturado: Si se alcanzó PASSWORD_HASH_MAX_PENDING
+    """
+    if not _cupos.acquire(blocking=False):
+        raise PoolSaturado()
+    try:
+        future = _executor.submit(fn, *args)
+    except Exception:
+        _cupos.release()
+        raise
+    future.add_done_callback(lambda _: _cupos.release())
+    return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+
+
+def es_hash(valor):
+    """
+    Indica si un valor almacenado es un hash de werkzeug completo ('metodo:parametros$sal$hash').
+    Solo sirve para clasificar lo que ya está guardado (cuentas legadas en texto plano);
+    lo que escribe un usuario se hashea siempre con hashear_contrasena.
+
+    Args:
+        valor (str): Valor de contraseña_hash
+
+    Returns:
+        bool: True si es un hash, False si es texto plano
+    """
+    return bool(valor) and _FORMATO_HASH.fullmatch(valor) is not None
+
+
+@lru_cache(maxsize=None)
+def _metodo_canonico(metodo):
+    # werkzeug completa los parámetros por defecto ('pbkdf2' -> 'pbkdf2:sha256:600000')
+    return generate_password_hash('', metodo).split('$', 1)[0]
+
+
+def hashear_contrasena(contrasena):
+    """
+    Generar el hash de una contraseña con el método configurado
+
+    Args:
+        contrasena (str): Contraseña en texto plano
+
+    Returns:
+        str: Hash en formato werkzeug
+    """
+    return _ejecutar(generate_password_hash, contrasena, PASSWORD_HASH_METHOD)
+
+
+def necesita_rehash(almacenado):
+    """
+    Indica si un valor almacenado no corresponde al método y costo configurados
+
+    Args:
+        almacenado (str): Valor de contraseña_hash
+
+    Returns:
+        bool: True si debe regenerarse en el próximo login
+    """
+    if not es_hash(almacenado):
+        return True
+    return almacenado.split('$', 1)[0] != _metodo_canonico(PASSWORD_HASH_METHOD)
+
+
+def verificar_contrasena(almacenado, contrasena):
+    """
+    Verificar una contraseña contra el valor almacenado.
+    Acepta texto plano para las cuentas creadas antes del hashing.
+
+    Args:
+        almacenado (str): Valor de contraseña_hash
+        contrasena (str): Contraseña recibida
+
+    Returns:
+        tuple: (valida, necesita_rehash)
+    """
+    if not almacenado or contrasena is None:
+        return False, False
+
+    if not es_hash(almacenado):
+        valida = hmac.compare_digest(almacenado.encode('utf-8'), contrasena.encode('utf-8'))
+        return valida, valida
+
+    valida = _ejecutar(check_password_hash, almacenado, contrasena)
+    return valida, valida and necesita_rehash(almacenado)
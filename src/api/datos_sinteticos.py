@@ -0,0 +1,294 @@
+"""
+Datos sintéticos a escala para pruebas de carga de TiBACK
+Genera clientes, analistas, supervisores y tickets con ciclo de vida realista (asignaciones,
+eventos, comentarios y mensajes de chat) con inserciones por lotes y una semilla fija: la misma
+semilla y fecha final producen los mismos datos. Como no pasa por el ORM, escribe también las
+credenciales y el geohash y al final reconstruye estadísticas y rollup de SLA
+"""
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, func, text
+from api.models import (
+    db, Cliente, Analista, Supervisor, Administrador, Credencial, Ticket, Asignacion, Comentarios,
+    EventoTicket, TileMapaCalor
+)
+from api.contrasenas import hashear_contrasena
+from api.geo import codificar_geohash
+from api.estadisticas import recalcular_estadisticas
+from api.sla import recalcular_sla
+
+DOMINIO = 'seed.test'
+# (lat, lng, peso) de las ciudades alrededor de las que se agrupan los clientes
+CIUDADES = [
+    (4.711, -74.072, 40), (6.244, -75.581, 18), (3.452, -76.532, 14), (10.391, -75.479, 8),
+    (11.004, -74.807, 8), (7.119, -73.123, 6), (4.813, -75.696, 3), (5.070, -75.513, 3)
+]
+NOMBRES = [
+    'Juan', 'Ana', 'Luis', 'María', 'Carlos', 'Laura', 'Pedro', 'Sofía', 'Andrés', 'Camila', 'Jorge',
+    'Valentina', 'Diego', 'Paula', 'Felipe', 'Daniela', 'Santiago', 'Natalia', 'Miguel', 'Carolina'
+]
+APELLIDOS = [
+    'Pérez', 'García', 'Martínez', 'Rodríguez', 'López', 'González', 'Hernández', 'Gómez', 'Díaz',
+    'Torres', 'Ramírez', 'Vargas', 'Castro', 'Rojas', 'Moreno', 'Jiménez', 'Ruiz', 'Ortiz'
+]
+ESPECIALIDADES = ['Soporte Técnico', 'Redes', 'Infraestructura', 'Desarrollo de Software', 'Bases de Datos']
+AREAS = ['Soporte y Mantenimiento', 'Desarrollo y Calidad', 'Infraestructura', 'Atención al Cliente']
+PROBLEMAS = [
+    ('Impresora no imprime', 'La impresora de la oficina muestra error de papel atascado y no imprime'),
+    ('Sin conexión a internet', 'El equipo no tiene acceso a internet desde esta mañana, el router parpadea'),
+    ('Correo no sincroniza', 'Outlook no descarga los correos nuevos y pide la contraseña repetidamente'),
+    ('Computador lento', 'El computador tarda varios minutos en encender y las aplicaciones se congelan'),
+    ('Error al iniciar sesión', 'El sistema dice usuario o contraseña incorrectos aunque son correctos'),
+    ('Pantalla azul', 'El equipo se reinicia con pantalla azul al abrir el programa de facturación'),
+    ('VPN no conecta', 'La VPN se desconecta cada pocos minutos cuando trabajo desde casa'),
+    ('Instalar software', 'Necesito instalar el programa de diseño en el equipo del área comercial'),
+    ('Teléfono IP sin tono', 'El teléfono de escritorio no tiene tono y la pantalla dice registrando'),
+    ('Archivo compartido bloqueado', 'No puedo guardar cambios en la carpeta compartida del servidor'),
+    ('Factura electrónica rechazada', 'El sistema rechaza las facturas electrónicas con error de firma'),
+    ('Wifi intermitente', 'La red inalámbrica del segundo piso se cae varias veces al día'),
+]
+COMENTARIOS = [
+    'Ya reinicié el equipo y el problema continúa', 'Adjunto captura del error', 'Estamos revisando el caso',
+    '¿Puede indicar desde cuándo ocurre?', 'Se aplicó la actualización, por favor validar',
+    'El problema se presenta también en otro equipo', 'Gracias, quedo atento', 'Se programó visita técnica',
+]
+MENSAJES_CHAT = [
+    'Hola, ¿me confirma el número de serie del equipo?', 'Ya está funcionando, gracias',
+    '¿Puede reiniciar el router y contarme qué luces quedan encendidas?', 'Voy a conectarme remotamente',
+    'Necesito escalar esto a redes', 'Le asigné prioridad alta por el impacto', '¿Algún avance?',
+]
+# (valor, peso) de prioridad, estado final y calificación
+PRIORIDADES = [('baja', 30), ('media', 40), ('alta', 22), ('critica', 8)]
+ESTADOS = [
+    ('creado', 8), ('en_espera', 4), ('en_proceso', 10), ('solucionado', 8), ('reabierto', 2),
+    ('cerrado', 63), ('cerrado_por_supervisor', 5)
+]
+CALIFICACIONES = [(1, 5), (2, 7), (3, 15), (4, 33), (5, 40)]
+# Horas promedio de cada tramo por prioridad: (asignación, solución, cierre tras la solución)
+HORAS_TRAMO = {'critica': (0.5, 4, 6), 'alta': (2, 12, 12), 'media': (6, 36, 24), 'baja': (18, 96, 48)}
+
+
+def _pesos(opciones):
+    return [valor for valor, _ in opciones], [peso for _, peso in opciones]
+
+
+def _siguiente_id(modelo):
+    return (db.session.query(func.max(modelo.id)).scalar() or 0) + 1
+
+
+def _insertar(connection, modelo, filas):
+    if filas:
+        connection.execute(modelo.__table__.insert(), filas)
+
+
+def _usuarios(connection, modelo, rol, total, contrasena_hash, azar, extra):
+    """Insertar usuarios de un rol con sus credenciales; devuelve sus ids"""
+    primero = _siguiente_id(modelo)
+    filas = []
+    for id_usuario in range(primero, primero + total):
+        fila = {
+            'id': id_usuario,
+            'email': f'{rol}{id_usuario}@{DOMINIO}',
+            'contraseña_hash': contrasena_hash,
+            **extra(id_usuario)
+        }
+        if modelo is not Administrador:
+            fila['nombre'] = azar.choice(NOMBRES)
+            fila['apellido'] = azar.choice(APELLIDOS)
+        filas.append(fila)
+    for inicio in range(0, len(filas), 5000):
+        lote = filas[inicio:inicio + 5000]
+        _insertar(connection, modelo, lote)
+        _insertar(connection, Credencial, [
+            {'email': f['email'], 'rol': rol, 'id_usuario': f['id'], 'contraseña_hash': contrasena_hash}
+            for f in lote
+        ])
+    return list(range(primero, primero + total))
+
+
+def _datos_cliente(azar):
+    ciudades, pesos = [(lat, lng) for lat, lng, _ in CIUDADES], [peso for _, _, peso in CIUDADES]
+
+    def datos(id_cliente):
+        lat, lng = azar.choices(ciudades, pesos)[0]
+        lat, lng = round(lat + azar.gauss(0, 0.05), 6), round(lng + azar.gauss(0, 0.05), 6)
+        return {
+            'direccion': f'Calle {azar.randint(1, 200)} # {azar.randint(1, 99)}-{azar.randint(1, 99)}',
+            'telefono': f'3{azar.randint(100000000, 999999999)}',
+            'latitude': lat,
+            'longitude': lng,
+            'geohash': codificar_geohash(lat, lng)
+        }
+    return datos
+
+
+def _horas(azar, media):
+    # Tiempos con cola larga como los reales: la mayoría rápidos y algunos muy lentos
+    return timedelta(hours=azar.lognormvariate(0, 1) * media / 1.65)
+
+
+def sembrar_escala(clientes, analistas, supervisores, tickets, comentarios_por_ticket=3, mensajes_por_ticket=2,
+                   dias=365, semilla=42, fin=None, contrasena='123456', tamano_lote=5000, progreso=None):
+    """
+    Generar un conjunto de datos sintético del tamaño pedido
+
+    Args:
+        clientes (int): Clientes a crear
+        analistas (int): Analistas a crear
+        supervisores (int): Supervisores a crear (además se crea un administrador)
+        tickets (int): Tickets a crear, repartidos entre los clientes nuevos
+        comentarios_por_ticket (float): Promedio de comentarios por ticket
+        mensajes_por_ticket (float): Promedio de mensajes de chat por ticket asignado
+        dias (int): Días de historia antes de fin
+        semilla (int): Semilla del generador
+        fin (datetime, optional): Momento más reciente de los datos; por defecto hoy a medianoche
+        contrasena (str): Contraseña de todos los usuarios creados
+        tamano_lote (int): Tickets por transacción
+        progreso (callable, optional): Se llama con (tickets creados, total) tras cada lote
+
+    Returns:
+        dict: Filas creadas por tabla
+    """
+    if min(clientes, analistas, supervisores) < 1:
+        raise ValueError("se necesita al menos un cliente, un analista y un supervisor")
+    azar = random.Random(semilla)
+    fin = fin or datetime.combine(datetime.now().date(), datetime.min.time())
+    inicio_historia = fin - timedelta(days=dias)
+    contrasena_hash = hashear_contrasena(contrasena)
+    connection = db.session.connection()
+    creados = {}
+
+    ids_clientes = _usuarios(connection, Cliente, 'cliente', clientes, contrasena_hash, azar, _datos_cliente(azar))
+    ids_analistas = _usuarios(connection, Analista, 'analista', analistas, contrasena_hash, azar,
+                              lambda _: {'especialidad': azar.choice(ESPECIALIDADES)})
+    ids_supervisores = _usuarios(connection, Supervisor, 'supervisor', supervisores, contrasena_hash, azar,
+                                 lambda _: {'area_responsable': azar.choice(AREAS)})
+    _usuarios(connection, Administrador, 'administrador', 1, contrasena_hash, azar,
+              lambda _: {'permisos_especiales': 'Gestión completa del sistema'})
+    db.session.commit()
+    creados.update(cliente=clientes, analista=analistas, supervisor=supervisores, administrador=1)
+
+    prioridades, pesos_prioridad = _pesos(PRIORIDADES)
+    estados, pesos_estado = _pesos(ESTADOS)
+    calificaciones, pesos_calificacion = _pesos(CALIFICACIONES)
+    segundos_historia = int((fin - inicio_historia).total_seconds())
+    actualizar_vigente = Ticket.__table__.update().where(
+        Ticket.__table__.c.id == bindparam('b_id')
+    ).values(current_asignacion_id=bindparam('b_asignacion'), current_analista_id=bindparam('b_analista'))
+
+    id_ticket = _siguiente_id(Ticket)
+    id_asignacion = _siguiente_id(Asignacion)
+    totales = {'ticket': 0, 'asignacion': 0, 'evento_ticket': 0, 'comentarios': 0, 'mensajes_chat': 0}
+    for inicio_lote in range(0, tickets, tamano_lote):
+        connection = db.session.connection()
+        filas_ticket, filas_asignacion, filas_evento, filas_comentario, vigentes = [], [], [], [], []
+        for _ in range(min(tamano_lote, tickets - inicio_lote)):
+            id_cliente = azar.choice(ids_clientes)
+            prioridad = azar.choices(prioridades, pesos_prioridad)[0]
+            estado = azar.choices(estados, pesos_estado)[0]
+            titulo, descripcion = azar.choice(PROBLEMAS)
+            creado = inicio_historia + timedelta(seconds=azar.randrange(segundos_historia))
+            horas_asignacion, horas_solucion, horas_cierre = HORAS_TRAMO[prioridad]
+            ticket = {
+                'id': id_ticket, 'id_cliente': id_cliente, 'estado': estado, 'titulo': titulo,
+                'descripcion': descripcion, 'fecha_creacion': creado, 'prioridad': prioridad,
+                'fecha_cierre': None, 'calificacion': None, 'comentario': None, 'fecha_evaluacion': None
+            }
+            filas_ticket.append(ticket)
+            ultimo = creado
+
+            def evento(tipo, momento, anterior, nuevo, id_analista, rol, id_usuario):
+                filas_evento.append({
+                    'id_ticket': ticket['id'], 'tipo': tipo, 'estado_anterior': anterior, 'estado_nuevo': nuevo,
+                    'id_analista': id_analista, 'rol_usuario': rol, 'id_usuario': id_usuario, 'fecha': momento
+                })
+
+            id_analista = None
+            if estado != 'creado':
+                id_analista = azar.choice(ids_analistas)
+                id_supervisor = azar.choice(ids_supervisores)
+                asignado = min(creado + _horas(azar, horas_asignacion), fin)
+                filas_asignacion.append({
+                    'id': id_asignacion, 'id_ticket': id_ticket, 'id_supervisor': id_supervisor,
+                    'id_analista': id_analista, 'fecha_asignacion': asignado
+                })
+                vigentes.append({'b_id': id_ticket, 'b_asignacion': id_asignacion, 'b_analista': id_analista})
+                id_asignacion += 1
+                evento(EventoTicket.ASIGNADO, asignado, 'creado', 'en_proceso', id_analista, 'supervisor', id_supervisor)
+                ultimo = asignado
+                if estado == 'en_espera':
+                    ultimo = min(asignado + _horas(azar, horas_asignacion), fin)
+                    evento(EventoTicket.ESCALADO, ultimo, 'en_proceso', 'en_espera', id_analista, 'analista', id_analista)
+                if estado in ('solucionado', 'reabierto', 'cerrado', 'cerrado_por_supervisor'):
+                    ultimo = min(asignado + _horas(azar, horas_solucion), fin)
+                    evento(EventoTicket.SOLUCIONADO, ultimo, 'en_proceso', 'solucionado', id_analista,
+                           'analista', id_analista)
+                if estado == 'reabierto':
+                    ultimo = min(ultimo + _horas(azar, horas_cierre), fin)
+                    evento(EventoTicket.REABIERTO, ultimo, 'solucionado', 'reabierto', id_analista, 'cliente', id_cliente)
+                if estado in ('cerrado', 'cerrado_por_supervisor'):
+                    ultimo = min(ultimo + _horas(azar, horas_cierre), fin)
+                    por_supervisor = estado == 'cerrado_por_supervisor'
+                    evento(EventoTicket.CERRADO, ultimo, 'solucionado', estado, id_analista,
+                           'supervisor' if por_supervisor else 'cliente',
+                           id_supervisor if por_supervisor else id_cliente)
+                    ticket['fecha_cierre'] = ultimo
+                    if not por_supervisor and azar.random() < 0.7:
+                        ticket['calificacion'] = azar.choices(calificaciones, pesos_calificacion)[0]
+                        ticket['fecha_evaluacion'] = min(ultimo + timedelta(minutes=azar.randint(1, 600)), fin)
+
+            duracion = max((ultimo - creado).total_seconds(), 60)
+            for _ in range(azar.randint(0, int(2 * comentarios_por_ticket))):
+                autor = 'id_cliente' if id_analista is None or azar.random() < 0.5 else 'id_analista'
+                filas_comentario.append({
+                    'id_ticket': id_ticket, 'id_cliente': None, 'id_analista': None, 'id_supervisor': None,
+                    autor: id_cliente if autor == 'id_cliente' else id_analista,
+                    'texto': azar.choice(COMENTARIOS),
+                    'fecha_comentario': creado + timedelta(seconds=azar.uniform(0, duracion))
+                })
+                totales['comentarios'] += 1
+            if id_analista is not None:
+                for _ in range(azar.randint(0, int(2 * mensajes_por_ticket))):
+                    con_cliente = azar.random() < 0.6
+                    if con_cliente:
+                        autor = {'id_cliente': id_cliente} if azar.random() < 0.5 else {'id_analista': id_analista}
+                        prefijo = 'CHAT_ANALISTA_CLIENTE:'
+                    else:
+                        autor = {'id_analista': id_analista} if azar.random() < 0.5 else {'id_supervisor': id_supervisor}
+                        prefijo = 'CHAT_SUPERVISOR_ANALISTA:'
+                    filas_comentario.append({
+                        'id_ticket': id_ticket, 'id_cliente': None, 'id_analista': None, 'id_supervisor': None,
+                        **autor, 'texto': prefijo + azar.choice(MENSAJES_CHAT),
+                        'fecha_comentario': creado + timedelta(seconds=azar.uniform(0, duracion))
+                    })
+                    totales['mensajes_chat'] += 1
+            id_ticket += 1
+
+        # La asignación vigente apunta a asignacion y asignacion a ticket: se enlazan después
+        _insertar(connection, Ticket, filas_ticket)
+        _insertar(connection, Asignacion, filas_asignacion)
+        if vigentes:
+            connection.execute(actualizar_vigente, vigentes)
+        _insertar(connection, EventoTicket, filas_evento)
+        _insertar(connection, Comentarios, filas_comentario)
+        db.session.commit()
+        totales['ticket'] += len(filas_ticket)
+        totales['asignacion'] += len(filas_asignacion)
+        totales['evento_ticket'] += len(filas_evento)
+        if progreso:
+            progreso(totales['ticket'], tickets)
+
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        # Los ids se dieron explícitos: las secuencias deben continuar después del máximo
+        for modelo in (Cliente, Analista, Supervisor, Administrador, Ticket, Asignacion):
+            tabla = modelo.__tablename__
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), COALESCE((SELECT MAX(id) FROM {tabla}), 1))"
+            ))
+    connection.execute(TileMapaCalor.__table__.delete())
+    recalcular_estadisticas()
+    recalcular_sla()
+    db.session.commit()
+    creados.update(totales)
+    return creados
@@ -0,0 +1,253 @@
+"""
+Estadísticas de tickets para los tableros de supervisión de TiBACK
+Lee las tablas agregadas que mantienen los eventos de Ticket en models.py (foto de activos
+por estado/prioridad/analista, transiciones por día e histogramas de cierre y calificación),
+así que el costo depende de los días y analistas del rango y no del número de tickets
+"""
+import json
+import zlib
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from api.models import (
+    db, Ticket, EventoTicket, TicketArchivado, EstadisticaTicketEstado, EstadisticaTicketDia,
+    HistogramaTicketDia, CUBETAS_CIERRE_HORAS, ESTADOS_CIERRE, SIN_ANALISTA, cubeta_cierre,
+    recalcular_estadisticas_estado
+)
+
+CONTADORES = ('creados', 'solucionados', 'cerrados', 'reabiertos')
+PERCENTILES = (50, 90, 95)
+# Calificación mínima que cuenta como cliente satisfecho
+CALIFICACION_SATISFECHO = 4
+
+
+def percentil_histograma(conteos, p, limites=CUBETAS_CIERRE_HORAS):
+    """
+    Percentil aproximado de un histograma de tiempos, interpolando dentro de la cubeta
+
+    Args:
+        conteos (dict): Cubeta -> total
+        p (float): Percentil entre 0 y 100
+        limites (tuple): Límites superiores de las cubetas en horas (la última cubeta es abierta)
+
+    Returns:
+        float: Horas, o None si el histograma está vacío
+    """
+    total = sum(conteos.values())
+    if not total:
+        return None
+    objetivo = total * p / 100
+    acumulado = 0
+    for cubeta in sorted(conteos):
+        conteo = conteos[cubeta]
+        if conteo and acumulado + conteo >= objetivo:
+            inferior = limites[cubeta - 1] if cubeta > 0 else 0.0
+            if cubeta >= len(limites):
+                # Cubeta abierta: solo se sabe el mínimo
+                return inferior
+            superior = limites[cubeta]
+            return round(inferior + (superior - inferior) * (objetivo - acumulado) / conteo, 2)
+        acumulado += conteo
+    return limites[-1]
+
+
+def _contadores_vacios():
+    return {**{nombre: 0 for nombre in CONTADORES}, "segundos_cierre": 0.0}
+
+
+def _resumen_periodo(contadores, cierre, calificacion):
+    muestras_cierre = sum(cierre.values())
+    calificaciones = sum(calificacion.values())
+    return {
+        **{nombre: contadores[nombre] for nombre in CONTADORES},
+        "tiempo_cierre_horas": {
+            "muestras": muestras_cierre,
+            "promedio": round(contadores["segundos_cierre"] / muestras_cierre / 3600, 2) if muestras_cierre else None,
+            **{f"p{p}": percentil_histograma(cierre, p) for p in PERCENTILES}
+        },
+        "calificacion": {
+            "total": calificaciones,
+            "promedio": round(sum(c * n for c, n in calificacion.items()) / calificaciones, 2) if calificaciones else None,
+            "satisfaccion": round(
+                100 * sum(n for c, n in calificacion.items() if c >= CALIFICACION_SATISFECHO) / calificaciones, 1
+            ) if calificaciones else None,
+            "distribucion": {str(c): calificacion.get(c, 0) for c in range(1, 6)}
+        }
+    }
+
+
+def resumen(desde, hasta, id_analista=None, prioridad=None):
+    """
+    Estadísticas de tickets: foto actual de los activos y transiciones en un rango de días
+
+    Args:
+        desde (date): Primer día del rango
+        hasta (date): Último día del rango (incluido)
+        id_analista (int, optional): Solo este analista (0 = sin asignar)
+        prioridad (str, optional): Solo esta prioridad
+
+    Returns:
+        dict: {"actual", "periodo", "por_dia", "por_analista"}
+    """
+    filtros_estado = []
+    filtros_dia = [EstadisticaTicketDia.dia.between(desde, hasta)]
+    filtros_histograma = [HistogramaTicketDia.dia.between(desde, hasta)]
+    if id_analista is not None:
+        filtros_estado.append(EstadisticaTicketEstado.id_analista == id_analista)
+        filtros_dia.append(EstadisticaTicketDia.id_analista == id_analista)
+        filtros_histograma.append(HistogramaTicketDia.id_analista == id_analista)
+    if prioridad:
+        filtros_estado.append(EstadisticaTicketEstado.prioridad == prioridad)
+        filtros_dia.append(EstadisticaTicketDia.prioridad == prioridad)
+        filtros_histograma.append(HistogramaTicketDia.prioridad == prioridad)
+
+    por_estado = defaultdict(int)
+    por_prioridad = defaultdict(int)
+    activos_analista = defaultdict(lambda: defaultdict(int))
+    for fila in EstadisticaTicketEstado.query.filter(*filtros_estado, EstadisticaTicketEstado.total != 0):
+        por_estado[fila.estado] += fila.total
+        por_prioridad[fila.prioridad] += fila.total
+        activos_analista[fila.id_analista][fila.estado] += fila.total
+
+    total = _contadores_vacios()
+    dias = defaultdict(_contadores_vacios)
+    analistas = defaultdict(_contadores_vacios)
+    for fila in EstadisticaTicketDia.query.filter(*filtros_dia):
+        for destino in (total, dias[fila.dia], analistas[fila.id_analista]):
+            for nombre in CONTADORES:
+                destino[nombre] += getattr(fila, nombre)
+            destino["segundos_cierre"] += fila.segundos_cierre
+
+    histogramas = defaultdict(lambda: defaultdict(int))
+    for fila in HistogramaTicketDia.query.filter(*filtros_histograma):
+        histogramas[(None, fila.metrica)][fila.cubeta] += fila.total
+        histogramas[(fila.id_analista, fila.metrica)][fila.cubeta] += fila.total
+
+    ids_analistas = sorted(set(activos_analista) | set(analistas))
+    return {
+        "actual": {
+            "total": sum(por_estado.values()),
+            "por_estado": dict(por_estado),
+            "por_prioridad": dict(por_prioridad)
+        },
+        "periodo": {
+            "desde": desde.isoformat(),
+            "hasta": hasta.isoformat(),
+            **_resumen_periodo(total, histogramas[(None, 'cierre')], histogramas[(None, 'calificacion')])
+        },
+        "por_dia": [
+            {"dia": dia.isoformat(), **{nombre: contadores[nombre] for nombre in CONTADORES}}
+            for dia, contadores in sorted(dias.items())
+        ],
+        "por_analista": [
+            {
+                "id_analista": analista if analista != SIN_ANALISTA else None,
+                "activos": sum(activos_analista[analista].values()),
+                "activos_por_estado": dict(activos_analista[analista]),
+                **_resumen_periodo(
+                    analistas[analista],
+                    histogramas[(analista, 'cierre')],
+                    histogramas[(analista, 'calificacion')]
+                )
+            }
+            for analista in ids_analistas
+        ]
+    }
+
+
+def _analista_archivado(historial):
+    asignacion = historial.get("asignacion_actual") or {}
+    return asignacion.get("id_analista") or SIN_ANALISTA
+
+
+def recalcular_estadisticas(tamano_lote=5000):
+    """
+    Reconstruir todas las tablas de estadísticas desde tickets activos, archivados y evento_ticket.
+    Para reparar desvíos (cargas masivas fuera del ORM, datos anteriores a las tablas);
+    cada ticket cuenta un solo cierre (el último) aunque se haya reabierto y cerrado varias veces.
+    No hace commit.
+
+    Args:
+        tamano_lote (int): Filas leídas por lote
+
+    Returns:
+        dict: Filas escritas por tabla
+    """
+    dias = defaultdict(_contadores_vacios)
+    histogramas = defaultdict(int)
+
+    def sumar_ticket(prioridad, analista, fecha_creacion, estado, fecha_cierre, calificacion, fecha_evaluacion):
+        if fecha_creacion:
+            dias[(fecha_creacion.date(), prioridad, SIN_ANALISTA)]["creados"] += 1
+        if (estado or '').lower() in ESTADOS_CIERRE and fecha_cierre:
+            contadores = dias[(fecha_cierre.date(), prioridad, analista)]
+            contadores["cerrados"] += 1
+            if fecha_creacion:
+                segundos = max((fecha_cierre - fecha_creacion).total_seconds(), 0)
+                contadores["segundos_cierre"] += segundos
+                histogramas[(fecha_cierre.date(), prioridad, analista, 'cierre', cubeta_cierre(segundos))] += 1
+        if calificacion:
+            momento = fecha_evaluacion or fecha_cierre or fecha_creacion
+            histogramas[(momento.date(), prioridad, analista, 'calificacion', calificacion)] += 1
+
+    def sumar_evento(tipo, fecha, prioridad, analista):
+        if tipo == EventoTicket.SOLUCIONADO:
+            dias[(fecha.date(), prioridad, analista)]["solucionados"] += 1
+        elif tipo == EventoTicket.REABIERTO:
+            dias[(fecha.date(), prioridad, analista)]["reabiertos"] += 1
+
+    activos = db.session.query(
+        Ticket.prioridad, Ticket.current_analista_id, Ticket.fecha_creacion, Ticket.estado,
+        Ticket.fecha_cierre, Ticket.calificacion, Ticket.fecha_evaluacion
+    ).execution_options(yield_per=tamano_lote)
+    for fila in activos:
+        sumar_ticket(fila[0], fila[1] or SIN_ANALISTA, *fila[2:])
+
+    eventos = db.session.query(
+        EventoTicket.tipo, EventoTicket.fecha, Ticket.prioridad, EventoTicket.id_analista
+    ).join(Ticket, EventoTicket.id_ticket == Ticket.id).filter(
+        EventoTicket.tipo.in_([EventoTicket.SOLUCIONADO, EventoTicket.REABIERTO])
+    ).execution_options(yield_per=tamano_lote)
+    for tipo, fecha, prioridad, id_analista in eventos:
+        sumar_evento(tipo, fecha, prioridad, id_analista or SIN_ANALISTA)
+
+    archivados = db.session.query(
+        TicketArchivado.prioridad, TicketArchivado.historial, TicketArchivado.fecha_creacion,
+        TicketArchivado.estado, TicketArchivado.fecha_cierre, TicketArchivado.calificacion,
+        TicketArchivado.fecha_evaluacion
+    ).execution_options(yield_per=tamano_lote)
+    for prioridad, comprimido, *campos in archivados:
+        historial = json.loads(zlib.decompress(comprimido).decode('utf-8'))
+        analista = _analista_archivado(historial)
+        sumar_ticket(prioridad, analista, *campos)
+        for evento in historial.get("eventos", []):
+            if evento.get("fecha"):
+                sumar_evento(evento["tipo"], datetime.fromisoformat(evento["fecha"]), prioridad,
+                             evento.get("id_analista") or SIN_ANALISTA)
+
+    connection = db.session.connection()
+    recalcular_estadisticas_estado(connection)
+    connection.execute(EstadisticaTicketDia.__table__.delete())
+    connection.execute(HistogramaTicketDia.__table__.delete())
+    filas_dia = [
+        {"dia": dia, "prioridad": prioridad, "id_analista": analista, **contadores}
+        for (dia, prioridad, analista), contadores in dias.items()
+    ]
+    filas_histograma = [
+        {"dia": dia, "prioridad": prioridad, "id_analista": analista, "metrica": metrica,
+         "cubeta": cubeta, "total": total}
+        for (dia, prioridad, analista, metrica, cubeta), total in histogramas.items()
+    ]
+    for inicio in range(0, len(filas_dia), tamano_lote):
+        connection.execute(EstadisticaTicketDia.__table__.insert(), filas_dia[inicio:inicio + tamano_lote])
+    for inicio in range(0, len(filas_histograma), tamano_lote):
+        connection.execute(HistogramaTicketDia.__table__.insert(), filas_histograma[inicio:inicio + tamano_lote])
+    return {
+        "estadistica_ticket_estado": db.session.query(EstadisticaTicketEstado).count(),
+        "estadistica_ticket_dia": len(filas_dia),
+        "histograma_ticket_dia": len(filas_histograma)
+    }
+
+
+def rango_por_defecto(dias=30):
+    hasta = date.today()
+    return hasta - timedelta(days=dias - 1), hasta
@@ -0,0 +1,177 @@
+"""
+Exportación en streaming de tickets y comentarios para TiBACK
+Las filas se leen con un cursor del servidor (yield_per) y se escriben como CSV o NDJSON
+en bloques, así que la memoria no depende del número de filas y la descarga empieza
+con el primer bloque
+"""
+import csv
+import io
+import json
+import os
+from sqlalchemy.orm import aliased
+from api.models import db, Ticket, Cliente, Analista, Supervisor, Comentarios
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8'
+}
+# Filas pedidas al cursor por vuelta
+EXPORT_YIELD_PER = int(os.getenv('EXPORT_YIELD_PER', '2000'))
+# Caracteres acumulados antes de entregar un bloque de la respuesta
+EXPORT_CHUNK_BYTES = int(os.getenv('EXPORT_CHUNK_BYTES', '65536'))
+
+COLUMNAS_TICKET = (
+    'id', 'id_cliente', 'cliente_nombre', 'cliente_apellido', 'cliente_email', 'estado', 'prioridad',
+    'titulo', 'descripcion', 'fecha_creacion', 'fecha_cierre', 'id_analista', 'calificacion',
+    'comentario', 'fecha_evaluacion', 'url_imagen'
+)
+COLUMNAS_COMENTARIO = (
+    'id', 'id_ticket', 'id_gestion', 'autor_rol', 'id_autor', 'autor_nombre', 'fecha_comentario', 'texto'
+)
+
+
+# Primer carácter con el que Excel/LibreOffice interpretan una celda como fórmula (OWASP CSV injection)
+INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _valor(valor):
+    return valor.isoformat() if hasattr(valor, 'isoformat') else valor
+
+
+def _celda_csv(valor):
+    """Anteponer ' al texto que una hoja de cálculo evaluaría como fórmula"""
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def consulta_tickets(estados=None, prioridades=None, id_cliente=None, id_analista=None, desde=None, hasta=None):
+    """
+    Consulta por columnas de tickets a exportar, ordenada por id
+
+    Args:
+        estados (list, optional): Estados a incluir
+        prioridades (list, optional): Prioridades a incluir
+        id_cliente (int, optional): Solo tickets de este cliente
+        id_analista (int, optional): Solo tickets asignados actualmente a este analista
+        desde (datetime, optional): Creados desde este momento
+        hasta (datetime, optional): Creados antes de este momento
+
+    Returns:
+        Query: Filas con las columnas de COLUMNAS_TICKET
+    """
+    query = db.session.query(
+        Ticket.id, Ticket.id_cliente, Cliente.nombre, Cliente.apellido, Cliente.email, Ticket.estado,
+        Ticket.prioridad, Ticket.titulo, Ticket.descripcion, Ticket.fecha_creacion, Ticket.fecha_cierre,
+        Ticket.current_analista_id, Ticket.calificacion, Ticket.comentario, Ticket.fecha_evaluacion,
+        Ticket.url_imagen
+    ).join(Cliente, Ticket.id_cliente == Cliente.id)
+    if estados:
+        query = query.filter(Ticket.estado.in_(estados))
+    if prioridades:
+        query = query.filter(Ticket.prioridad.in_(prioridades))
+    if id_cliente is not None:
+        query = query.filter(Ticket.id_cliente == id_cliente)
+    if id_analista is not None:
+        query = query.filter(Ticket.current_analista_id == id_analista)
+    if desde:
+        query = query.filter(Ticket.fecha_creacion >= desde)
+    if hasta:
+        query = query.filter(Ticket.fecha_creacion < hasta)
+    return query.order_by(Ticket.id)
+
+
+def consulta_comentarios(id_ticket=None, id_cliente=None, desde=None, hasta=None):
+    """
+    Consulta por columnas de comentarios a exportar con el nombre del autor, ordenada por id
+
+    Args:
+        id_ticket (int, optional): Solo comentarios de este ticket
+        id_cliente (int, optional): Solo comentarios en tickets de este cliente
+        desde (datetime, optional): Escritos desde este momento
+        hasta (datetime, optional): Escritos antes de este momento
+
+    Returns:
+        Query: Filas (comentario, autores) para filas_comentarios
+    """
+    autor_cliente = aliased(Cliente)
+    query = db.session.query(
+        Comentarios.id, Comentarios.id_ticket, Comentarios.id_gestion, Comentarios.id_cliente,
+        Comentarios.id_analista, Comentarios.id_supervisor, Comentarios.fecha_comentario, Comentarios.texto,
+        autor_cliente.nombre, autor_cliente.apellido, Analista.nombre, Analista.apellido,
+        Supervisor.nombre, Supervisor.apellido
+    ).outerjoin(autor_cliente, Comentarios.id_cliente == autor_cliente.id).outerjoin(
+        Analista, Comentarios.id_analista == Analista.id
+    ).outerjoin(Supervisor, Comentarios.id_supervisor == Supervisor.id)
+    if id_ticket is not None:
+        query = query.filter(Comentarios.id_ticket == id_ticket)
+    if id_cliente is not None:
+        query = query.filter(Comentarios.id_ticket.in_(
+            db.session.query(Ticket.id).filter(Ticket.id_cliente == id_cliente)
+        ))
+    if desde:
+        query = query.filter(Comentarios.fecha_comentario >= desde)
+    if hasta:
+        query = query.filter(Comentarios.fecha_comentario < hasta)
+    return query.order_by(Comentarios.id)
+
+
+def filas_tickets(query):
+    for fila in query.execution_options(yield_per=EXPORT_YIELD_PER):
+        yield dict(zip(COLUMNAS_TICKET, (_valor(valor) for valor in fila)))
+
+
+def filas_comentarios(query):
+    for fila in query.execution_options(yield_per=EXPORT_YIELD_PER):
+        (id_comentario, id_ticket, id_gestion, id_cliente, id_analista, id_supervisor, fecha, texto,
+         nombre_cliente, apellido_cliente, nombre_analista, apellido_analista,
+         nombre_supervisor, apellido_supervisor) = fila
+        if id_cliente:
+            rol, id_autor, nombre = 'cliente', id_cliente, (nombre_cliente, apellido_cliente)
+        elif id_analista:
+            rol, id_autor, nombre = 'analista', id_analista, (nombre_analista, apellido_analista)
+        elif id_supervisor:
+            rol, id_autor, nombre = 'supervisor', id_supervisor, (nombre_supervisor, apellido_supervisor)
+        else:
+            rol, id_autor, nombre = None, None, (None, None)
+        yield {
+            'id': id_comentario,
+            'id_ticket': id_ticket,
+            'id_gestion': id_gestion,
+            'autor_rol': rol,
+            'id_autor': id_autor,
+            'autor_nombre': ' '.join(parte for parte in nombre if parte) or None,
+            'fecha_comentario': _valor(fecha),
+            'texto': texto
+        }
+
+
+def generar(filas, columnas, formato):
+    """
+    Serializar filas en bloques de unos EXPORT_CHUNK_BYTES caracteres
+
+    Args:
+        filas (iterable): Diccionarios con las columnas
+        columnas (tuple): Orden de las columnas (cabecera del CSV)
+        formato (str): 'csv' (texto que empieza como fórmula se prefija con ') o 'ndjson'
+
+    Yields:
+        str: Bloques de la respuesta
+    """
+    buffer = io.StringIO()
+    escritor = None
+    if formato == 'csv':
+        escritor = csv.DictWriter(buffer, fieldnames=columnas, lineterminator='\n')
+        escritor.writeheader()
+    for fila in filas:
+        if escritor:
+            escritor.writerow({columna: _celda_csv(valor) for columna, valor in fila.items()})
+        else:
+            buffer.write(json.dumps(fila, ensure_ascii=False))
+            buffer.write('\n')
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,253 @@
+"""
+Utilidades geográficas para TiBACK
+Tiles XYZ de Web Mercator (los de Google Maps / OSM) y geohash para búsquedas por cercanía;
+sin dependencias de la base de datos
+"""
+import math
+
+# Latitud máxima representable en Web Mercator
+LAT_MAXIMA = 85.05112878
+
+
+def coordenadas(lat, lng):
+    """
+    Convertir a float un par (lat, lng) que puede venir como texto desde el JSON de la petición
+
+    Args:
+        lat: Latitud
+        lng: Longitud
+
+    Returns:
+        tuple: (lat, lng) como float, o None si falta alguno, no es numérico o está fuera de rango
+    """
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+    # Las comparaciones descartan también NaN
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0):
+        return None
+    return lat, lng
+
+
+def tile_de_punto(lat, lng, zoom):
+    """
+    Tile XYZ que contiene un punto
+
+    Args:
+        lat (float): Latitud (se acota a ±LAT_MAXIMA)
+        lng (float): Longitud
+        zoom (int): Nivel de zoom
+
+    Returns:
+        tuple: (x, y)
+    """
+    n = 1 << zoom
+    lat = max(min(lat, LAT_MAXIMA), -LAT_MAXIMA)
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def latitud_de_fila(y, zoom):
+    """
+    Latitud del borde superior de una fila de tiles (acepta filas fraccionarias)
+
+    Args:
+        y (float): Fila del tile
+        zoom (int): Nivel de zoom
+
+    Returns:
+        float: Latitud en grados
+    """
+    return math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y / (1 << zoom)))))
+
+
+def limites_tile(zoom, x, y):
+    """
+    Bbox de un tile
+
+    Args:
+        zoom (int): Nivel de zoom
+        x (int): Columna
+        y (int): Fila
+
+    Returns:
+        tuple: (oeste, sur, este, norte)
+    """
+    n = 1 << zoom
+    return (
+        x / n * 360.0 - 180.0,
+        latitud_de_fila(y + 1, zoom),
+        (x + 1) / n * 360.0 - 180.0,
+        latitud_de_fila(y, zoom)
+    )
+
+
+def tile_valido(zoom, x, y):
+    n = 1 << zoom
+    return 0 <= x < n and 0 <= y < n
+
+
+# ==================== GEOHASH ====================
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Precisión guardada en cliente.geohash (~4.8 m x 4.8 m)
+PRECISION_GEOHASH = 9
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = 111.32
+
+
+def codificar_geohash(lat, lng, precision=PRECISION_GEOHASH):
+    """
+    Geohash de un punto
+
+    Args:
+        lat (float): Latitud
+        lng (float): Longitud
+        precision (int): Caracteres del geohash
+
+    Returns:
+        str: Geohash en base32
+    """
+    rango_lat = [-90.0, 90.0]
+    rango_lng = [-180.0, 180.0]
+    caracteres = []
+    bits = 0
+    valor = 0
+    es_lng = True
+    while len(caracteres) < precision:
+        rango, coordenada = (rango_lng, lng) if es_lng else (rango_lat, lat)
+        medio = (rango[0] + rango[1]) / 2
+        valor <<= 1
+        if coordenada >= medio:
+            valor |= 1
+            rango[0] = medio
+        else:
+            rango[1] = medio
+        es_lng = not es_lng
+        bits += 1
+        if bits == 5:
+            caracteres.append(BASE32[valor])
+            bits = 0
+            valor = 0
+    return ''.join(caracteres)
+
+
+def tamano_geohash(precision):
+    """
+    Tamaño de una celda geohash en grados
+
+    Args:
+        precision (int): Caracteres del geohash
+
+    Returns:
+        tuple: (alto en grados de latitud, ancho en grados de longitud)
+    """
+    bits = 5 * precision
+    return 180.0 / (1 << (bits // 2)), 360.0 / (1 << ((bits + 1) // 2))
+
+
+def _celdas_geohash(oeste, sur, este, norte, precision):
+    alto, ancho = tamano_geohash(precision)
+    celdas = set()
+    lat = sur
+    while True:
+        lng = oeste
+        while True:
+            celdas.add(codificar_geohash(min(lat, 90.0), ((lng + 180.0) % 360.0) - 180.0, precision))
+            if lng >= este:
+                break
+            lng = min(lng + ancho, este)
+        if lat >= norte:
+            break
+        lat = min(lat + alto, norte)
+    return celdas
+
+
+def cubrir_bbox(oeste, sur, este, norte, max_celdas=32):
+    """
+    Prefijos geohash que cubren un bbox, con la mayor precisión que no pase de max_celdas
+
+    Args:
+        oeste, sur, este, norte (float): Bbox en grados (este < oeste si cruza el antimeridiano)
+        max_celdas (int): Máximo de prefijos
+
+    Returns:
+        list: Prefijos ordenados; vacía si ni con un carácter alcanza (usar la consulta sin índice)
+    """
+    if este < oeste:
+        este += 360.0
+    mejor = []
+    for precision in range(1, PRECISION_GEOHASH + 1):
+        alto, ancho = tamano_geohash(precision)
+        # Cota inferior del número de celdas: evita recorrer grillas enormes
+        if ((este - oeste) / ancho + 1) * ((norte - sur) / alto + 1) > max_celdas:
+            break
+        celdas = _celdas_geohash(oeste, sur, este, norte, precision)
+        if len(celdas) > max_celdas:
+            break
+        mejor = sorted(celdas)
+    return mejor
+
+
+def siguiente_prefijo(prefijo):
+    """
+    Menor cadena mayor que todos los geohash con ese prefijo (cota superior de un rango en B-tree)
+
+    Args:
+        prefijo (str): Prefijo geohash
+
+    Returns:
+        str: Cota superior exclusiva, o None si no hay (prefijo de solo 'z')
+    """
+    caracteres = list(prefijo)
+    while caracteres:
+        posicion = BASE32.index(caracteres[-1])
+        if posicion < len(BASE32) - 1:
+            caracteres[-1] = BASE32[posicion + 1]
+            return ''.join(caracteres)
+        caracteres.pop()
+    return None
+
+
+def bbox_de_radio(lat, lng, radio_km):
+    """
+    Bbox que contiene un círculo
+
+    Args:
+        lat (float): Latitud del centro
+        lng (float): Longitud del centro
+        radio_km (float): Radio en kilómetros
+
+    Returns:
+        tuple: (oeste, sur, este, norte)
+    """
+    delta_lat = radio_km / KM_POR_GRADO
+    coseno = math.cos(math.radians(lat))
+    if coseno < 1e-6 or abs(lat) + delta_lat >= 90.0:
+        # El círculo contiene un polo: abarca todas las longitudes
+        delta_lng = 180.0
+    else:
+        delta_lng = min(180.0, radio_km / (KM_POR_GRADO * coseno))
+    oeste, este = lng - delta_lng, lng + delta_lng
+    if delta_lng >= 180.0:
+        oeste, este = -180.0, 180.0
+    else:
+        oeste = oeste + 360.0 if oeste < -180.0 else oeste
+        este = este - 360.0 if este > 180.0 else este
+    return oeste, max(lat - delta_lat, -90.0), este, min(lat + delta_lat, 90.0)
+
+
+def distancia_km(lat1, lng1, lat2, lng2):
+    """
+    Distancia haversine entre dos puntos
+
+    Returns:
+        float: Kilómetros
+    """
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dlat = p2 - p1
+    dlng = math.radians(lng2 - lng1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dlng / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(a)))
@@ -0,0 +1,379 @@
+"""
+Importación masiva de clientes y tickets para TiBACK
+Lee NDJSON o CSV fila a fila, valida cada fila y las inserta por lotes con executemany.
+No pasa por el ORM: aquí se replica lo que hacen los eventos del mapper (geohash y
+credencial de clientes, estadísticas y tiles del mapa de calor de tickets) y no se
+emite ningún evento de tiempo real
+"""
+import csv
+import json
+import os
+import secrets
+from collections import defaultdict
+from datetime import datetime
+from werkzeug.security import generate_password_hash
+from api.models import (
+    db, Cliente, Credencial, Ticket, EstadisticaTicketEstado, EstadisticaTicketDia,
+    HistogramaTicketDia, ESTADOS_CIERRE, SIN_ANALISTA, cubeta_cierre, sumar_estadisticas, invalidar_tiles_clientes
+)
+from api.contrasenas import es_hash, hashear_contrasena
+from api.geo import codificar_geohash
+
+TIPOS = ('clientes', 'tickets')
+FORMATOS = ('ndjson', 'csv')
+ESTADOS_TICKET = (
+    'creado', 'en_espera', 'en_proceso', 'solucionado', 'reabierto', 'cerrado', 'cerrado_por_supervisor'
+)
+PRIORIDADES = ('baja', 'media', 'alta', 'critica')
+# Filas por INSERT (executemany) y por transacción
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '1000'))
+# Errores por fila guardados en el reporte; los demás solo se cuentan
+IMPORT_MAX_ERRORES = int(os.getenv('IMPORT_MAX_ERRORES', '1000'))
+
+
+def leer_filas(flujo, formato):
+    """
+    Filas de un archivo NDJSON o CSV, sin cargarlo entero
+
+    Args:
+        flujo: Archivo de texto (abierto con newline='' para CSV)
+        formato (str): 'ndjson' o 'csv'
+
+    Yields:
+        tuple: (línea, dict o None, error o None)
+    """
+    if formato == 'csv':
+        lector = csv.DictReader(flujo)
+        for fila in lector:
+            if None in fila:
+                yield lector.line_num, None, "más columnas que la cabecera"
+                continue
+            # En CSV una celda vacía es un valor ausente
+            yield lector.line_num, {k: v for k, v in fila.items() if v not in ('', None)}, None
+        return
+    for linea, texto in enumerate(flujo, start=1):
+        if not texto.strip():
+            continue
+        try:
+            fila = json.loads(texto)
+        except ValueError as e:
+            yield linea, None, f"JSON inválido: {e}"
+            continue
+        if not isinstance(fila, dict):
+            yield linea, None, "cada línea debe ser un objeto JSON"
+            continue
+        yield linea, fila, None
+
+
+# ==================== VALIDACIÓN ====================
+
+def _texto(fila, campo, maximo, errores, requerido=True):
+    valor = fila.get(campo)
+    if valor is None or (isinstance(valor, str) and not valor.strip()):
+        if requerido:
+            errores.append(f"{campo} es requerido")
+        return None
+    valor = str(valor).strip()
+    if len(valor) > maximo:
+        errores.append(f"{campo} supera {maximo} caracteres")
+    return valor
+
+
+def _fecha(fila, campo, errores):
+    valor = fila.get(campo)
+    if valor is None:
+        return None
+    try:
+        return datetime.fromisoformat(str(valor))
+    except ValueError:
+        errores.append(f"{campo} no es una fecha ISO")
+        return None
+
+
+def _numero(fila, campo, tipo, minimo, maximo, errores):
+    valor = fila.get(campo)
+    if valor is None:
+        return None
+    try:
+        numero = tipo(valor)
+    except (TypeError, ValueError):
+        errores.append(f"{campo} no es numérico")
+        return None
+    if not minimo <= numero <= maximo:
+        errores.append(f"{campo} fuera de rango ({minimo} a {maximo})")
+    return numero
+
+
+def _contrasena(fila, errores):
+    almacenado = fila.get('contraseña_hash')
+    if almacenado is not None:
+        if not es_hash(str(almacenado)):
+            errores.append("contraseña_hash no es un hash de werkzeug (usar password para texto plano)")
+        return almacenado
+    if fila.get('password'):
+        # Un KDF por fila: para volúmenes grandes conviene traer los hashes ya calculados
+        return hashear_contrasena(str(fila['password']))
+    # Sin contraseña: hash de un secreto aleatorio que nadie conoce (la cuenta queda sin acceso
+    # hasta que se le asigne una); una iteración basta porque el secreto no se puede adivinar
+    return generate_password_hash(secrets.token_urlsafe(32), 'pbkdf2:sha256:1')
+
+
+def validar_cliente(fila):
+    """
+    Normalizar una fila de cliente
+
+    Args:
+        fila (dict): nombre, apellido, email, direccion, telefono; opcionales latitude, longitude,
+            url_imagen y contraseña_hash (hash de werkzeug) o password (texto plano)
+
+    Returns:
+        tuple: (valores para la tabla cliente, lista de errores)
+    """
+    errores = []
+    valores = {
+        'nombre': _texto(fila, 'nombre', 50, errores),
+        'apellido': _texto(fila, 'apellido', 50, errores),
+        'email': _texto(fila, 'email', 120, errores),
+        'direccion': _texto(fila, 'direccion', 500, errores),
+        'telefono': _texto(fila, 'telefono', 20, errores),
+        'url_imagen': _texto(fila, 'url_imagen', 500, errores, requerido=False),
+        'latitude': _numero(fila, 'latitude', float, -90, 90, errores),
+        'longitude': _numero(fila, 'longitude', float, -180, 180, errores)
+    }
+    if valores['email'] and '@' not in valores['email']:
+        errores.append("email inválido")
+    if (valores['latitude'] is None) != (valores['longitude'] is None):
+        errores.append("latitude y longitude van juntas")
+    if errores:
+        return valores, errores
+    valores['email'] = valores['email'].lower()
+    valores['geohash'] = (
+        codificar_geohash(valores['latitude'], valores['longitude'])
+        if valores['latitude'] is not None else None
+    )
+    valores['contraseña_hash'] = _contrasena(fila, errores)
+    return valores, errores
+
+
+def validar_ticket(fila):
+    """
+    Normalizar una fila de ticket
+
+    Args:
+        fila (dict): id_cliente o cliente_email, titulo, descripcion, prioridad; opcionales estado
+            (creado por defecto), fecha_creacion (ahora por defecto), fecha_cierre, calificacion,
+            comentario, fecha_evaluacion, url_imagen
+
+    Returns:
+        tuple: (valores para la tabla ticket, lista de errores)
+    """
+    errores = []
+    valores = {
+        'id_cliente': _numero(fila, 'id_cliente', int, 1, 2 ** 31 - 1, errores),
+        'titulo': _texto(fila, 'titulo', 200, errores),
+        'descripcion': _texto(fila, 'descripcion', 1000, errores),
+        'prioridad': (_texto(fila, 'prioridad', 20, errores) or '').lower() or None,
+        'estado': (_texto(fila, 'estado', 50, errores, requerido=False) or 'creado').lower(),
+        'fecha_creacion': _fecha(fila, 'fecha_creacion', errores) or datetime.now(),
+        'fecha_cierre': _fecha(fila, 'fecha_cierre', errores),
+        'calificacion': _numero(fila, 'calificacion', int, 1, 5, errores),
+        'comentario': _texto(fila, 'comentario', 500, errores, requerido=False),
+        'fecha_evaluacion': _fecha(fila, 'fecha_evaluacion', errores),
+        'url_imagen': _texto(fila, 'url_imagen', 500, errores, requerido=False)
+    }
+    email = fila.get('cliente_email')
+    if valores['id_cliente'] is None and not email:
+        errores.append("id_cliente o cliente_email es requerido")
+    if valores['prioridad'] and valores['prioridad'] not in PRIORIDADES:
+        errores.append(f"prioridad debe ser una de {', '.join(PRIORIDADES)}")
+    if valores['estado'] not in ESTADOS_TICKET:
+        errores.append(f"estado debe ser uno de {', '.join(ESTADOS_TICKET)}")
+    if valores['fecha_cierre'] and valores['fecha_cierre'] < valores['fecha_creacion']:
+        errores.append("fecha_cierre es anterior a fecha_creacion")
+    # Se resuelve contra la base por lote en _resolver_clientes
+    valores['cliente_email'] = str(email).strip().lower() if email and valores['id_cliente'] is None else None
+    return valores, errores
+
+
+# ==================== INSERCIÓN ====================
+
+def _filtrar_clientes_existentes(lote):
+    emails = [valores['email'] for _, valores in lote]
+    existentes = {
+        email for (email,) in db.session.query(Credencial.email).filter(
+            Credencial.rol == 'cliente', Credencial.email.in_(emails)
+        )
+    }
+    validas, errores, vistos = [], [], set()
+    for linea, valores in lote:
+        if valores['email'] in existentes or valores['email'] in vistos:
+            errores.append((linea, ["email ya registrado"]))
+        else:
+            vistos.add(valores['email'])
+            validas.append((linea, valores))
+    return validas, errores
+
+
+def _resolver_clientes(lote):
+    ids = {valores['id_cliente'] for _, valores in lote if valores['id_cliente'] is not None}
+    emails = {valores['cliente_email'] for _, valores in lote if valores['cliente_email']}
+    existentes = {
+        id_cliente for (id_cliente,) in db.session.query(Cliente.id).filter(Cliente.id.in_(ids))
+    } if ids else set()
+    por_email = dict(
+        db.session.query(Cliente.email, Cliente.id).filter(Cliente.email.in_(emails))
+    ) if emails else {}
+    validas, errores = [], []
+    for linea, valores in lote:
+        email = valores.pop('cliente_email')
+        if email:
+            valores['id_cliente'] = por_email.get(email)
+            if valores['id_cliente'] is None:
+                errores.append((linea, [f"no existe un cliente con email {email}"]))
+                continue
+        elif valores['id_cliente'] not in existentes:
+            errores.append((linea, [f"no existe el cliente {valores['id_cliente']}"]))
+            continue
+        validas.append((linea, valores))
+    return validas, errores
+
+
+def _insertar_clientes(filas):
+    connection = db.session.connection()
+    connection.execute(Cliente.__table__.insert(), filas)
+    ids = dict(db.session.query(Cliente.email, Cliente.id).filter(
+        Cliente.email.in_([fila['email'] for fila in filas])
+    ))
+    # Lo que haría _insertar_credencial por cada cliente
+    connection.execute(Credencial.__table__.insert(), [
+        {'email': fila['email'], 'rol': 'cliente', 'id_usuario': ids[fila['email']],
+         'contraseña_hash': fila['contraseña_hash']}
+        for fila in filas
+    ])
+
+
+def _insertar_tickets(filas):
+    connection = db.session.connection()
+    connection.execute(Ticket.__table__.insert(), filas)
+
+    # Lo que sumarían los eventos de estadísticas de Ticket, agrupado por clave
+    activos = defaultdict(int)
+    dias = defaultdict(lambda: {'creados': 0, 'cerrados': 0, 'segundos_cierre': 0.0})
+    histogramas = defaultdict(int)
+    for fila in filas:
+        prioridad = fila['prioridad']
+        activos[(fila['estado'], prioridad)] += 1
+        dias[(fila['fecha_creacion'].date(), prioridad)]['creados'] += 1
+        if fila['estado'] in ESTADOS_CIERRE and fila['fecha_cierre']:
+            segundos = (fila['fecha_cierre'] - fila['fecha_creacion']).total_seconds()
+            cierre = dias[(fila['fecha_cierre'].date(), prioridad)]
+            cierre['cerrados'] += 1
+            cierre['segundos_cierre'] += segundos
+            histogramas[(fila['fecha_cierre'].date(), prioridad, 'cierre', cubeta_cierre(segundos))] += 1
+        if fila['calificacion']:
+            momento = fila['fecha_evaluacion'] or fila['fecha_cierre'] or fila['fecha_creacion']
+            histogramas[(momento.date(), prioridad, 'calificacion', fila['calificacion'])] += 1
+    sumar_estadisticas(connection, EstadisticaTicketEstado, [
+        ({'estado': estado, 'prioridad': prioridad, 'id_analista': SIN_ANALISTA}, {'total': total})
+        for (estado, prioridad), total in activos.items()
+    ])
+    sumar_estadisticas(connection, EstadisticaTicketDia, [
+        ({'dia': dia, 'prioridad': prioridad, 'id_analista': SIN_ANALISTA}, deltas)
+        for (dia, prioridad), deltas in dias.items()
+    ])
+    sumar_estadisticas(connection, HistogramaTicketDia, [
+        ({'dia': dia, 'prioridad': prioridad, 'id_analista': SIN_ANALISTA, 'metrica': metrica, 'cubeta': cubeta},
+         {'total': total})
+        for (dia, prioridad, metrica, cubeta), total in histogramas.items()
+    ])
+
+    # Solo los tiles de los clientes del lote
+    invalidar_tiles_clientes(connection, (fila['id_cliente'] for fila in filas))
+
+
+VALIDADORES = {'clientes': validar_cliente, 'tickets': validar_ticket}
+PREPARADORES = {'clientes': _filtrar_clientes_existentes, 'tickets': _resolver_clientes}
+INSERTORES = {'clientes': _insertar_clientes, 'tickets': _insertar_tickets}
+
+
+def importar(tipo, filas, tamano_lote=IMPORT_BATCH_SIZE, solo_validar=False, al_error=None):
+    """
+    Validar e insertar filas por lotes; cada lote se confirma por separado y las filas con
+    errores se saltan. Si un lote falla en la base se reintenta fila por fila para
+    reportar solo las que fallan.
+
+    Args:
+        tipo (str): 'clientes' o 'tickets'
+        filas (iterable): (línea, dict o None, error o None), como las entrega leer_filas
+        tamano_lote (int): Filas por INSERT y por transacción
+        solo_validar (bool): Validar sin escribir nada
+        al_error (callable, optional): Se llama con cada error {"linea", "errores"}
+
+    Returns:
+        dict: Reporte con procesadas, insertadas (o validas), con_errores y los primeros errores
+    """
+    validar, preparar, insertar = VALIDADORES[tipo], PREPARADORES[tipo], INSERTORES[tipo]
+    reporte = {
+        "tipo": tipo,
+        "solo_validar": solo_validar,
+        "procesadas": 0,
+        "validas" if solo_validar else "insertadas": 0,
+        "con_errores": 0,
+        "errores": []
+    }
+    contador = "validas" if solo_validar else "insertadas"
+
+    def registrar(linea, errores):
+        reporte["con_errores"] += 1
+        error = {"linea": linea, "errores": errores}
+        if len(reporte["errores"]) < IMPORT_MAX_ERRORES:
+            reporte["errores"].append(error)
+        if al_error:
+            al_error(error)
+
+    def escribir(lote):
+        try:
+            insertar([valores for _, valores in lote])
+            db.session.commit()
+            reporte[contador] += len(lote)
+        except Exception as e:
+            db.session.rollback()
+            if len(lote) == 1:
+                registrar(lote[0][0], [f"error de base de datos: {e.__class__.__name__}: {e}".splitlines()[0]])
+                return
+            for fila in lote:
+                escribir([fila])
+
+    def procesar(lote):
+        validas, errores = preparar(lote)
+        for linea, mensajes in errores:
+            registrar(linea, mensajes)
+        if not validas:
+            return
+        if solo_validar:
+            reporte[contador] += len(validas)
+            return
+        escribir(validas)
+
+    lote = []
+    for linea, fila, error in filas:
+        reporte["procesadas"] += 1
+        if error:
+            registrar(linea, [error])
+            continue
+        valores, errores = validar(fila)
+        if errores:
+            registrar(linea, errores)
+            continue
+        lote.append((linea, valores))
+        if len(lote) >= tamano_lote:
+            procesar(lote)
+            lote = []
+    if lote:
+        procesar(lote)
+    if solo_validar:
+        db.session.rollback()
+
+    reporte["errores"].sort(key=lambda error: error["linea"])
+    reporte["errores_truncados"] = reporte["con_errores"] > len(reporte["errores"])
+    return reporte
@@ -0,0 +1,250 @@
+"""
+Registro de integraciones opcionales para TiBACK
+Carga los SDK pesados (Cloudinary, requests, Google Cloud Vision) la primera vez que se usan,
+con precarga opcional en segundo plano en los procesos que atienden peticiones y un reporte de tiempos
+"""
+import os
+import threading
+import time
+from functools import lru_cache
+
+# Integraciones a precargar en segundo plano al arrancar cada worker: 'all' o lista separada por comas
+INTEGRATIONS_PREWARM = os.getenv('INTEGRATIONS_PREWARM', '')
+
+
+class Integracion:
+    """Integración que se importa y configura una sola vez, en el primer uso"""
+
+    def __init__(self, nombre, cargador):
+        self.nombre = nombre
+        self.cargador = cargador
+        self.modulo = None
+        self.error = None
+        self.tiempo_ms = None
+        self.origen = None
+        self._lock = threading.Lock()
+
+    def obtener(self, origen='primer uso'):
+        """
+        Devolver la integración, cargándola si aún no se cargó
+
+        Args:
+            origen (str): Quién dispara la carga, para el reporte
+
+        Returns:
+            El objeto devuelto por el cargador (normalmente el módulo)
+        """
+        if self.modulo is not None:
+            return self.modulo
+        with self._lock:
+            if self.modulo is None:
+                inicio = time.perf_counter()
+                try:
+                    self.modulo = self.cargador()
+                    self.error = None
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                finally:
+                    self.tiempo_ms = round((time.perf_counter() - inicio) * 1000, 1)
+                    self.origen = origen
+        return self.modulo
+
+    def serialize(self):
+        return {
+            "nombre": self.nombre,
+            "cargada": self.modulo is not None,
+            "tiempo_ms": self.tiempo_ms,
+            "origen": self.origen,
+            "error": self.error
+        }
+
+
+_registro = {}
+# Componentes que se inicializan al arrancar la app (admin, migraciones): solo se miden
+_arranque = {}
+
+
+def registrar(nombre, cargador):
+    """
+    Registrar una integración perezosa
+
+    Args:
+        nombre (str): Nombre de la integración
+        cargador: Función sin argumentos que importa y configura el SDK
+    """
+    _registro[nombre] = Integracion(nombre, cargador)
+
+
+def integracion(nombre):
+    """
+    Obtener una integración registrada, importándola en el primer uso
+
+    Args:
+        nombre (str): Nombre de la integración
+
+    Returns:
+        El módulo o cliente de la integración
+    """
+    return _registro[nombre].obtener()
+
+
+def medir_arranque(nombre, fn, *args, **kwargs):
+    """
+    Ejecutar un paso de arranque y registrar su duración en el reporte
+
+    Args:
+        nombre (str): Nombre del componente
+        fn: Función de inicialización
+
+    Returns:
+        El resultado de fn
+    """
+    inicio = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _arranque[nombre] = round((time.perf_counter() - inicio) * 1000, 1)
+
+
+def precargar(nombres=None, en_segundo_plano=True):
+    """
+    Cargar integraciones antes de la primera petición que las necesite
+
+    Args:
+        nombres (list, optional): Integraciones a cargar; None carga todas
+        en_segundo_plano (bool): Cargar en un hilo daemon sin bloquear el arranque
+
+    Returns:
+        threading.Thread: Hilo de precarga, o None si se cargó en primer plano
+    """
+    pendientes = [_registro[n] for n in (nombres or list(_registro)) if n in _registro]
+
+    def cargar():
+        for item in pendientes:
+            try:
+                item.obtener(origen='precarga')
+            except Exception as e:
+                print(f"Error precargando integración {item.nombre}: {e}")
+
+    if not en_segundo_plano:
+        cargar()
+        return None
+
+    hilo = threading.Thread(target=cargar, name='precarga-integraciones', daemon=True)
+    hilo.start()
+    return hilo
+
+
+def iniciar_precarga(app):
+    """
+    Precargar según INTEGRATIONS_PREWARM sin arrancar hilos en un proceso que luego hará fork:
+    en cada hijo justo después del fork (gunicorn --preload) y, en el proceso que importó la app,
+    con su primera petición (el padre de --preload nunca atiende peticiones)
+
+    Args:
+        app (Flask): Aplicación
+    """
+    if not INTEGRATIONS_PREWARM:
+        return
+    nombres = None if INTEGRATIONS_PREWARM == 'all' else [
+        n.strip() for n in INTEGRATIONS_PREWARM.split(',') if n.strip()
+    ]
+    estado = {"iniciada": False}
+    lock = threading.Lock()
+
+    def precargar_una_vez():
+        if estado["iniciada"]:
+            return
+        with lock:
+            if not estado["iniciada"]:
+                estado["iniciada"] = True
+                precargar(nombres)
+
+    def tras_fork():
+        # El hijo hereda el estado del padre, que nunca precargó
+        nonlocal lock
+        lock = threading.Lock()
+        precargar_una_vez()
+
+    app.before_request(precargar_una_vez)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=tras_fork)
+
+
+def reporte():
+    """
+    Tiempos de carga de integraciones perezosas y de componentes de arranque
+
+    Returns:
+        dict: integraciones y arranque
+    """
+    return {
+        "integraciones": [item.serialize() for item in _registro.values()],
+        "arranque": [{"nombre": n, "tiempo_ms": t} for n, t in _arranque.items()]
+    }
+
+
+def configurar_cloudinary(cloudinary):
+    """
+    Aplicar la configuración de Cloudinary desde variables de entorno
+
+    Args:
+        cloudinary: Módulo cloudinary
+
+    Returns:
+        bool: True si quedó configurado
+    """
+    cloudinary_url = os.getenv('CLOUDINARY_URL')
+    cloudinary_cloud_name = os.getenv('CLOUDINARY_CLOUD_NAME')
+    cloudinary_api_key = os.getenv('CLOUDINARY_API_KEY')
+    cloudinary_api_secret = os.getenv('CLOUDINARY_API_SECRET')
+
+    if cloudinary_url:
+        cloudinary.config(cloudinary_url=cloudinary_url)
+        return True
+    if cloudinary_cloud_name and cloudinary_api_key and cloudinary_api_secret:
+        cloudinary.config(
+            cloud_name=cloudinary_cloud_name,
+            api_key=cloudinary_api_key,
+            api_secret=cloudinary_api_secret
+        )
+        return True
+    return False
+
+
+def _cargar_cloudinary():
+    import cloudinary
+    import cloudinary.uploader
+    configurar_cloudinary(cloudinary)
+    return cloudinary
+
+
+def _cargar_requests():
+    import requests
+    return requests
+
+
+def _cargar_vision():
+    from google.cloud import vision
+    return vision
+
+
+@lru_cache(maxsize=4)
+def cliente_vision(api_key):
+    """
+    Cliente de Cloud Vision reutilizable entre peticiones (crear el canal es costoso)
+
+    Args:
+        api_key (str): API key de Cloud Vision
+
+    Returns:
+        vision.ImageAnnotatorClient: Cliente configurado
+    """
+    vision = integracion('vision')
+    return vision.ImageAnnotatorClient(client_options={'api_key': api_key})
+
+
+registrar('cloudinary', _cargar_cloudinary)
+registrar('requests', _cargar_requests)
+registrar('vision', _cargar_vision)
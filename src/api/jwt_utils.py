@@ -4,23 +4,168 @@ Provides secure token generation and validation functionality
 """
 import jwt
 import os
+import glob
+import secrets
+import time
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify
 
 # JWT Configuration
-JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-super-secret-jwt-key-change-in-production')
+JWT_SECRET_PLACEHOLDER = 'your-super-secret-jwt-key-change-in-production'
+# Sin JWT_SECRET_KEY (o con el valor de ejemplo, que es público) se usa un secreto aleatorio
+# por proceso: nunca se firma ni se acepta HS256 con un secreto conocido. Con varios workers
+# hay que configurarlo (o usar el keyring) para que todos acepten los mismos tokens
+JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', '')
+if JWT_SECRET_KEY in ('', JWT_SECRET_PLACEHOLDER):
+    print("⚠️ JWT_SECRET_KEY no configurado: se usa un secreto aleatorio de este proceso")
+    JWT_SECRET_KEY = secrets.token_urlsafe(32)
 JWT_ALGORITHM = 'HS256'
-TOKEN_EXPIRE_HOURS = 24  # 24 hours
+# Access tokens de vida corta; la sesión se extiende con refresh tokens opacos (api/sesiones.py)
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', '15'))
 
-def generate_token(user_id, email, role):
+# Cache LRU de tokens ya verificados: token -> payload (válido hasta su 'exp')
+TOKEN_CACHE_SIZE = int(os.getenv('JWT_CACHE_SIZE', '4096'))  # 0 desactiva el cache
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+# Denylist en memoria de sesiones revocadas: sid -> epoch hasta el que se rechaza.
+# Se sincroniza desde la base cada JWT_DENYLIST_SYNC_SECONDS, nunca por petición.
+JWT_DENYLIST_SYNC_SECONDS = int(os.getenv('JWT_DENYLIST_SYNC_SECONDS', '30'))
+_denylist = {}
+_denylist_sync = {'cargador': None, 'ultima': 0.0}
+_denylist_lock = threading.Lock()
+
+# Keyring asimétrico (RS256/EdDSA). Directorio con un PEM por clave:
+#   <kid>.pem      -> clave privada: firma (si es la activa) y verifica
+#   <kid>.pub.pem  -> solo clave pública: verifica tokens de una clave en retiro
+JWT_KEYRING_DIR = os.getenv('JWT_KEYRING_DIR')
+JWT_ACTIVE_KID = os.getenv('JWT_ACTIVE_KID')
+# Tokens HS256 sin 'kid' con un keyring de firma cargado: 'true' los acepta siempre,
+# 'false' nunca; sin valor solo se aceptan los emitidos antes de cargar el keyring y hasta
+# que expiran (como mucho ACCESS_TOKEN_EXPIRE_MINUTES después de la carga)
+JWT_ACCEPT_HS256 = os.getenv('JWT_ACCEPT_HS256', '').lower()
+
+# Estado inmutable del keyring; load_keyring lo reemplaza completo de una sola asignación
+_keyring = {
+    'signing': None,        # (kid, algorithm, private_key) o None -> firma HS256
+    'verification': {},     # kid -> (algorithm, public_key)
+    'jwks': {'keys': []},
+    'cargado': None         # epoch de carga del keyring de firma
+}
+
+def _algorithm_for_key(key):
+    """
+    Infer the JWT algorithm for a key object (RSA -> RS256, Ed25519 -> EdDSA)
+    
+    Args:
+        key: Private or public key from cryptography
+    
+    Returns:
+        str: JWT algorithm name
+    """
+    from cryptography.hazmat.primitives.asymmetric import rsa, ed25519
+    
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return 'RS256'
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return 'EdDSA'
+    raise ValueError(f'Tipo de clave no soportado: {type(key).__name__}')
+
+def _public_jwk(kid, algorithm, public_key):
+    """
+    Build the public JWK entry published for a key
+    
+    Args:
+        kid (str): Key ID
+        algorithm (str): JWT algorithm
+        public_key: Public key from cryptography
+    
+    Returns:
+        dict: JWK with kid, alg and use
     """
-    Generate a secure JWT token
+    from jwt.algorithms import RSAAlgorithm, OKPAlgorithm
+    
+    codec = RSAAlgorithm if algorithm == 'RS256' else OKPAlgorithm
+    jwk = codec.to_jwk(public_key, as_dict=True)
+    jwk.update({'kid': kid, 'alg': algorithm, 'use': 'sig'})
+    return jwk
+
+def load_keyring(directory=None, active_kid=None):
+    """
+    Load the asymmetric keyring from PEM files, once at startup or on rotation
+    
+    Args:
+        directory (str, optional): Keyring directory (defaults to JWT_KEYRING_DIR)
+        active_kid (str, optional): Signing key ID (defaults to JWT_ACTIVE_KID,
+            then the last private key by name)
+    
+    Returns:
+        dict: Loaded keyring; with no directory, tokens keep using HS256
+    """
+    global _keyring
+    
+    directory = directory or JWT_KEYRING_DIR
+    active_kid = active_kid or JWT_ACTIVE_KID
+    
+    private_keys = {}
+    verification = {}
+    if directory:
+        from cryptography.hazmat.primitives import serialization
+        
+        for path in sorted(glob.glob(os.path.join(directory, '*.pem'))):
+            name = os.path.basename(path)
+            with open(path, 'rb') as pem:
+                data = pem.read()
+            if name.endswith('.pub.pem'):
+                kid = name[:-len('.pub.pem')]
+                public_key = serialization.load_pem_public_key(data)
+            else:
+                kid = name[:-len('.pem')]
+                private_key = serialization.load_pem_private_key(data, password=None)
+                private_keys[kid] = private_key
+                public_key = private_key.public_key()
+            verification[kid] = (_algorithm_for_key(public_key), public_key)
+    
+    signing = None
+    if private_keys:
+        kid = active_kid or sorted(private_keys)[-1]
+        if kid not in private_keys:
+            raise ValueError(f'JWT_ACTIVE_KID "{kid}" no tiene clave privada en el keyring')
+        signing = (kid, verification[kid][0], private_keys[kid])
+    elif active_kid:
+        raise ValueError(f'JWT_ACTIVE_KID "{active_kid}" no tiene clave privada en el keyring')
+    
+    _keyring = {
+        'signing': signing,
+        'verification': verification,
+        'jwks': {'keys': [_public_jwk(kid, alg, key) for kid, (alg, key) in verification.items()]},
+        'cargado': time.time() if signing else None
+    }
+    # Un token cacheado podría haber sido firmado por una clave que ya no está
+    clear_token_cache()
+    return _keyring
+
+def get_jwks():
+    """
+    Public keys of the keyring in JWKS format, for stateless verifiers
+    
+    Returns:
+        dict: {'keys': [...]} with one JWK per active or retiring key
+    """
+    return _keyring['jwks']
+
+def generate_token(user_id, email, role, session_id=None):
+    """
+    Generate a short-lived JWT access token
     
     Args:
         user_id (int): User ID
         email (str): User email
         role (str): User role
+        session_id (int, optional): Refresh session the token belongs to ('sid' claim)
     
     Returns:
         str: JWT token
@@ -30,14 +175,41 @@ def generate_token(user_id, email, role):
         'email': email,
         'role': role,
         'iat': datetime.utcnow(),
-        'exp': datetime.utcnow() + timedelta(hours=TOKEN_EXPIRE_HOURS)
+        'exp': datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     }
+    if session_id is not None:
+        payload['sid'] = session_id
+    
+    signing = _keyring['signing']
+    if signing:
+        kid, algorithm, private_key = signing
+        return jwt.encode(payload, private_key, algorithm=algorithm, headers={'kid': kid})
     
     return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
 
-def verify_token(token):
+# Tokens without 'exp' are rejected: the cache keys validity on it
+_DECODE_OPTIONS = {"require": ["exp"]}
+
+def _hs256_previo_al_keyring(payload):
     """
-    Verify and decode a JWT token
+    Token HS256 emitido antes de cargar el keyring de firma y que no puede vivir más allá
+    de la transición (acota también lo que alguien con el secreto compartido podría forjar)
+
+    Args:
+        payload (dict): Claims ya verificados con el secreto compartido
+
+    Returns:
+        bool: True si se acepta
+    """
+    cargado = _keyring['cargado']
+    fin_transicion = cargado + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    # iat viene en segundos enteros: un token del mismo segundo de la carga ya no cuenta como previo
+    return payload['iat'] < int(cargado) and payload['exp'] <= fin_transicion and time.time() < fin_transicion
+
+def _decode_token(token):
+    """
+    Decode and verify a JWT token signature and expiry (no cache).
+    The verification key is picked by the 'kid' header with a dict lookup.
     
     Args:
         token (str): JWT token to verify
@@ -46,14 +218,24 @@ def verify_token(token):
         dict: Decoded token payload if valid, None if invalid
     """
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        
-        # Verify token is not expired
-        if datetime.utcnow() > datetime.fromtimestamp(payload['exp']):
-            return None
-            
-        return payload
+        kid = jwt.get_unverified_header(token).get('kid')
+        if kid is not None:
+            entry = _keyring['verification'].get(kid)
+            if entry is None:
+                return None
+            algorithm, public_key = entry
+            return jwt.decode(token, public_key, algorithms=[algorithm], options=_DECODE_OPTIONS)
         
+        # Tokens sin 'kid': HS256 con el secreto compartido (legado)
+        if _keyring['signing'] and JWT_ACCEPT_HS256 != 'true':
+            if JWT_ACCEPT_HS256 == 'false':
+                return None
+            payload = jwt.decode(
+                token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM], options={"require": ["exp", "iat"]}
+            )
+            return payload if _hs256_previo_al_keyring(payload) else None
+        # jwt.decode already rejects expired tokens via the 'exp' claim
+        return jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM], options=_DECODE_OPTIONS)
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
@@ -61,6 +243,134 @@ def verify_token(token):
     except Exception:
         return None
 
+def register_denylist_loader(loader):
+    """
+    Register the function that reads revoked sessions from the database
+    
+    Args:
+        loader: Callable returning a dict {sid: epoch until which it is rejected}
+    """
+    _denylist_sync['cargador'] = loader
+    _denylist_sync['ultima'] = 0.0
+
+def revoke_session_id(sid, until=None):
+    """
+    Reject access tokens of a session in this process right away
+    (other workers pick it up on their next denylist sync)
+    
+    Args:
+        sid (int): Session ID ('sid' claim)
+        until (float, optional): Epoch until which to reject; defaults to the access token lifetime
+    """
+    with _denylist_lock:
+        _denylist[sid] = until or time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+def _sync_denylist(now):
+    """
+    Reload the denylist from the registered loader if the sync interval elapsed
+    
+    Args:
+        now (float): Current epoch
+    """
+    global _denylist
+    
+    loader = _denylist_sync['cargador']
+    if loader is None or now - _denylist_sync['ultima'] < JWT_DENYLIST_SYNC_SECONDS:
+        return
+    with _denylist_lock:
+        if now - _denylist_sync['ultima'] < JWT_DENYLIST_SYNC_SECONDS:
+            return
+        _denylist_sync['ultima'] = now
+    try:
+        loaded = loader()
+    except Exception:
+        # Si la base no responde se mantiene la denylist actual
+        return
+    with _denylist_lock:
+        # Conservar revocaciones locales aún no visibles en la carga
+        for sid, until in _denylist.items():
+            if until > now and sid not in loaded:
+                loaded[sid] = until
+        _denylist = loaded
+
+def is_session_revoked(sid):
+    """
+    Check the in-memory denylist for a session (no database access on this path)
+    
+    Args:
+        sid (int): Session ID ('sid' claim), None for tokens without session
+    
+    Returns:
+        bool: True if the session was revoked
+    """
+    if sid is None:
+        return False
+    now = time.time()
+    _sync_denylist(now)
+    until = _denylist.get(sid)
+    return until is not None and until > now
+
+def verify_token(token):
+    """
+    Verify and decode a JWT token, reusing cached results for tokens already verified
+    
+    Args:
+        token (str): JWT token to verify
+    
+    Returns:
+        dict: Decoded token payload if valid, None if invalid or its session was revoked
+    """
+    payload = _verify_signature(token)
+    if payload is None or is_session_revoked(payload.get('sid')):
+        return None
+    return payload
+
+def _verify_signature(token):
+    """
+    Signature and expiry check backed by the verified-token LRU
+    
+    Args:
+        token (str): JWT token to verify
+    
+    Returns:
+        dict: Copy of the decoded token payload if valid (callers may mutate it), None if invalid
+    """
+    if TOKEN_CACHE_SIZE <= 0:
+        return _decode_token(token)
+
+    now = time.time()
+    with _token_cache_lock:
+        cached = _token_cache.get(token)
+        if cached is not None:
+            payload, exp = cached
+            if now < exp:
+                _token_cache.move_to_end(token)
+                return dict(payload)
+            del _token_cache[token]
+
+    payload = _decode_token(token)
+    if payload is None:
+        return None
+
+    with _token_cache_lock:
+        _token_cache[token] = (payload, payload['exp'])
+        _token_cache.move_to_end(token)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+
+    return dict(payload)
+
+def clear_token_cache():
+    """
+    Empty the verified-token cache (e.g. after rotating JWT_SECRET_KEY)
+    """
+    with _token_cache_lock:
+        _token_cache.clear()
+
+# Las claves se leen una sola vez al importar el módulo
+if JWT_KEYRING_DIR:
+    load_keyring()
+
 def get_token_from_request():
     """
     Extract JWT token from Authorization header
@@ -73,6 +383,37 @@ def get_token_from_request():
         return auth_header.split(' ')[1]
     return None
 
+def authenticate_request(allowed_roles=None):
+    """
+    Shared authentication path for require_auth and require_role
+    
+    Args:
+        allowed_roles (iterable, optional): Roles allowed; None accepts any role
+    
+    Returns:
+        tuple: Error response if authentication fails, None otherwise
+    """
+    token = get_token_from_request()
+    
+    if not token:
+        return jsonify({'message': 'Token de autorización requerido'}), 401
+    
+    payload = verify_token(token)
+    if not payload:
+        return jsonify({'message': 'Token inválido o expirado'}), 401
+    
+    # Check if user has required role
+    if allowed_roles is not None and payload['role'] not in allowed_roles:
+        return jsonify({'message': 'Permisos insuficientes'}), 403
+    
+    # Add user info to request context
+    request.current_user = {
+        'id': payload['user_id'],
+        'email': payload['email'],
+        'role': payload['role']
+    }
+    return None
+
 def require_auth(f):
     """
     Decorator to require authentication for API endpoints
@@ -85,22 +426,9 @@ def require_auth(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = get_token_from_request()
-        
-        if not token:
-            return jsonify({'message': 'Token de autorización requerido'}), 401
-        
-        payload = verify_token(token)
-        if not payload:
-            return jsonify({'message': 'Token inválido o expirado'}), 401
-        
-        # Add user info to request context
-        request.current_user = {
-            'id': payload['user_id'],
-            'email': payload['email'],
-            'role': payload['role']
-        }
-        
+        error = authenticate_request()
+        if error:
+            return error
         return f(*args, **kwargs)
     
     return decorated_function
@@ -115,59 +443,19 @@ def require_role(allowed_roles):
     Returns:
         Decorator function
     """
+    allowed_roles = frozenset(allowed_roles)
+
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            token = get_token_from_request()
-            
-            if not token:
-                return jsonify({'message': 'Token de autorización requerido'}), 401
-            
-            payload = verify_token(token)
-            if not payload:
-                return jsonify({'message': 'Token inválido o expirado'}), 401
-            
-            # Check if user has required role
-            if payload['role'] not in allowed_roles:
-                return jsonify({'message': 'Permisos insuficientes'}), 403
-            
-            # Add user info to request context
-            request.current_user = {
-                'id': payload['user_id'],
-                'email': payload['email'],
-                'role': payload['role']
-            }
-            
+            error = authenticate_request(allowed_roles)
+            if error:
+                return error
             return f(*args, **kwargs)
         
         return decorated_function
     return decorator
 
-def refresh_token(token):
-    """
-    Generate new token from existing token
-    
-    Args:
-        token (str): Valid token
-    
-    Returns:
-        dict: New token if valid, None if invalid
-    """
-    payload = verify_token(token)
-    if not payload:
-        return None
-    
-    # Generate new token
-    new_token = generate_token(
-        payload['user_id'], 
-        payload['email'], 
-        payload['role']
-    )
-    
-    return {
-        'token': new_token
-    }
-
 def get_user_from_token():
     """
     Get current user info from token in request
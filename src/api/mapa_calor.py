@@ -0,0 +1,409 @@
+"""
+Agregación del mapa de calor de tickets para TiBACK
+Agrupa los tickets por la ubicación de su cliente en celdas de una grilla cuyo tamaño
+depende del zoom, directamente en SQL, para no enviar un punto por ticket al navegador.
+También construye y cachea tiles XYZ de densidad (tabla tile_mapa_calor).
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import func, cast, Integer, or_, case
+from sqlalchemy.exc import IntegrityError
+from api.models import db, Ticket, Cliente, TileMapaCalor, HEATMAP_TILE_MAX_ZOOM
+from api.geo import coordenadas, limites_tile, latitud_de_fila, tile_de_punto
+
+# Celdas por lado de un tile de mapa (256 px): 8 = celdas de ~32 px en pantalla
+HEATMAP_CELLS_PER_TILE = int(os.getenv('HEATMAP_CELLS_PER_TILE', '8'))
+# Máximo de celdas por respuesta; si el bbox pedido da más, se baja el zoom
+HEATMAP_MAX_CELLS = int(os.getenv('HEATMAP_MAX_CELLS', '4096'))
+ZOOM_MAXIMO = 20
+DESGLOSES = ('estado', 'prioridad')
+# Celdas por lado de cada tile XYZ
+HEATMAP_TILE_GRID = int(os.getenv('HEATMAP_TILE_GRID', '16'))
+# Vida máxima de un tile guardado aunque no se haya invalidado (cubre carreras con escrituras concurrentes)
+HEATMAP_TILE_TTL = int(os.getenv('HEATMAP_TILE_TTL', '900'))
+
+
+class CeldaInvalida(ValueError):
+    """Identificador de celda mal formado"""
+
+
+def tamano_celda(zoom):
+    """
+    Lado de una celda en grados para un zoom de mapa web
+
+    Args:
+        zoom (int): Nivel de zoom (0 = mundo entero en un tile)
+
+    Returns:
+        float: Grados por celda
+    """
+    return 360.0 / ((1 << zoom) * HEATMAP_CELLS_PER_TILE)
+
+
+def normalizar_bbox(bbox):
+    """
+    Validar un bbox 'oeste,sur,este,norte'
+
+    Args:
+        bbox (str): Bounding box en grados; None para el mundo entero
+
+    Returns:
+        tuple: (oeste, sur, este, norte); oeste > este si cruza el antimeridiano
+
+    Raises:
+        ValueError: Si el formato o los rangos no son válidos
+    """
+    if not bbox:
+        return (-180.0, -90.0, 180.0, 90.0)
+    partes = [float(x) for x in bbox.split(',')]
+    if len(partes) != 4:
+        raise ValueError("bbox debe ser 'oeste,sur,este,norte'")
+    oeste, sur, este, norte = partes
+    if not (-180 <= oeste <= 180 and -180 <= este <= 180 and -90 <= sur < norte <= 90):
+        raise ValueError("bbox fuera de rango")
+    return oeste, sur, este, norte
+
+
+def _ancho(bbox):
+    oeste, _, este, _ = bbox
+    return este - oeste if este >= oeste else 360 - oeste + este
+
+
+def zoom_efectivo(zoom, bbox):
+    """
+    Zoom más cercano al pedido que no supera HEATMAP_MAX_CELLS en el bbox
+
+    Args:
+        zoom (int): Zoom pedido
+        bbox (tuple): Bbox normalizado
+
+    Returns:
+        int: Zoom a usar
+    """
+    zoom = max(0, min(ZOOM_MAXIMO, zoom))
+    alto = bbox[3] - bbox[1]
+    while zoom > 0:
+        tam = tamano_celda(zoom)
+        if (_ancho(bbox) / tam + 1) * (alto / tam + 1) <= HEATMAP_MAX_CELLS:
+            break
+        zoom -= 1
+    return zoom
+
+
+def puntos_por_ticket(filas):
+    """
+    Un punto del mapa de calor por ticket (respuesta de /heatmap-data)
+
+    Args:
+        filas (iterable): Pares (Ticket, Cliente)
+
+    Returns:
+        list: Puntos con datos del ticket y del cliente; omite coordenadas inválidas
+    """
+    puntos = []
+    for ticket, cliente in filas:
+        try:
+            # Convertir coordenadas a float
+            lat = float(cliente.latitude)
+            lng = float(cliente.longitude)
+        except (ValueError, TypeError):
+            # Saltar coordenadas inválidas
+            continue
+        # Verificar que las coordenadas sean válidas
+        if -90 <= lat <= 90 and -180 <= lng <= 180:
+            puntos.append({
+                'lat': lat,
+                'lng': lng,
+                'ticket_id': ticket.id,
+                'ticket_titulo': ticket.titulo,
+                'ticket_descripcion': ticket.descripcion or 'Sin descripción',
+                'ticket_estado': ticket.estado,
+                'ticket_prioridad': ticket.prioridad,
+                'ticket_fecha_creacion': ticket.fecha_creacion.isoformat() if ticket.fecha_creacion else None,
+                'cliente_nombre': cliente.nombre,
+                'cliente_apellido': cliente.apellido,
+                'cliente_email': cliente.email,
+                'cliente_direccion': cliente.direccion or 'Dirección no disponible',
+                'cliente_telefono': cliente.telefono,
+                'cliente_id': cliente.id
+            })
+    return puntos
+
+
+def _piso(expr):
+    # CAST a entero redondea en Postgres y trunca en SQLite; los valores son >= 0
+    if db.engine.dialect.name == 'sqlite':
+        return cast(expr, Integer)
+    return cast(func.floor(expr), Integer)
+
+
+def _indices(zoom):
+    tam = tamano_celda(zoom)
+    return (
+        _piso((Cliente.longitude + 180) / tam),
+        _piso((Cliente.latitude + 90) / tam)
+    )
+
+
+def id_celda(zoom, cx, cy):
+    return f"{zoom}:{cx}:{cy}"
+
+
+def limites_celda(celda):
+    """
+    Zoom e índices de una celda y su bbox
+
+    Args:
+        celda (str): Identificador 'zoom:cx:cy'
+
+    Returns:
+        tuple: (zoom, cx, cy, (oeste, sur, este, norte))
+
+    Raises:
+        CeldaInvalida: Si el identificador no es válido
+    """
+    try:
+        zoom, cx, cy = (int(x) for x in celda.split(':'))
+    except ValueError:
+        raise CeldaInvalida(celda)
+    if not 0 <= zoom <= ZOOM_MAXIMO or cx < 0 or cy < 0:
+        raise CeldaInvalida(celda)
+    tam = tamano_celda(zoom)
+    return zoom, cx, cy, (cx * tam - 180, cy * tam - 90, (cx + 1) * tam - 180, (cy + 1) * tam - 90)
+
+
+def _filtrar(query, bbox=None, estados=None, prioridades=None):
+    query = query.filter(
+        Cliente.latitude.isnot(None),
+        Cliente.longitude.isnot(None),
+        Cliente.latitude.between(-90, 90),
+        Cliente.longitude.between(-180, 180)
+    )
+    if bbox is not None:
+        oeste, sur, este, norte = bbox
+        query = query.filter(Cliente.latitude.between(sur, norte))
+        if oeste <= este:
+            query = query.filter(Cliente.longitude.between(oeste, este))
+        else:
+            query = query.filter(or_(Cliente.longitude >= oeste, Cliente.longitude <= este))
+    if estados:
+        query = query.filter(Ticket.estado.in_(estados))
+    if prioridades:
+        query = query.filter(Ticket.prioridad.in_(prioridades))
+    return query
+
+
+def agregar_celdas(zoom, bbox=None, desglose=(), estados=None, prioridades=None):
+    """
+    Contar tickets por celda de la grilla del zoom dentro de un bbox
+
+    Args:
+        zoom (int): Zoom (ya acotado con zoom_efectivo)
+        bbox (tuple, optional): Bbox normalizado
+        desglose (tuple): Subconjunto de DESGLOSES para contar por estado/prioridad
+        estados (list, optional): Filtrar por estados
+        prioridades (list, optional): Filtrar por prioridades
+
+    Returns:
+        list: Celdas {"id", "lat", "lng", "total"[, "por_estado"][, "por_prioridad"]},
+            con lat/lng en el centroide de sus tickets
+    """
+    cx, cy = _indices(zoom)
+    grupos = [cx.label('cx'), cy.label('cy')]
+    if 'estado' in desglose:
+        grupos.append(Ticket.estado)
+    if 'prioridad' in desglose:
+        grupos.append(Ticket.prioridad)
+
+    query = db.session.query(
+        *grupos,
+        func.count(Ticket.id),
+        func.sum(Cliente.latitude),
+        func.sum(Cliente.longitude)
+    ).join(Cliente, Ticket.id_cliente == Cliente.id)
+    query = _filtrar(query, bbox, estados, prioridades).group_by(*grupos)
+
+    celdas = {}
+    for fila in query:
+        x, y = fila[0], fila[1]
+        total, suma_lat, suma_lng = fila[-3], fila[-2], fila[-1]
+        celda = celdas.get((x, y))
+        if celda is None:
+            celda = celdas[(x, y)] = {"id": id_celda(zoom, x, y), "total": 0, "_lat": 0.0, "_lng": 0.0}
+        celda["total"] += total
+        celda["_lat"] += suma_lat
+        celda["_lng"] += suma_lng
+        posicion = 2
+        for campo in DESGLOSES:
+            if campo in desglose:
+                conteos = celda.setdefault(f"por_{campo}", {})
+                conteos[fila[posicion]] = conteos.get(fila[posicion], 0) + total
+                posicion += 1
+
+    resultado = []
+    for celda in celdas.values():
+        celda["lat"] = round(celda.pop("_lat") / celda["total"], 6)
+        celda["lng"] = round(celda.pop("_lng") / celda["total"], 6)
+        resultado.append(celda)
+    return resultado
+
+
+def tickets_en_celda(celda, estados=None, prioridades=None, limite=50, offset=0):
+    """
+    Tickets de una celda con los campos mínimos para listarlos al hacer click
+
+    Args:
+        celda (str): Identificador 'zoom:cx:cy'
+        estados (list, optional): Filtrar por estados
+        prioridades (list, optional): Filtrar por prioridades
+        limite (int): Máximo de tickets
+        offset (int): Desplazamiento para paginar
+
+    Returns:
+        tuple: (total, lista de tickets)
+
+    Raises:
+        CeldaInvalida: Si el identificador no es válido
+    """
+    zoom, x, y, bbox = limites_celda(celda)
+    cx, cy = _indices(zoom)
+    query = db.session.query(
+        Ticket.id, Ticket.titulo, Ticket.estado, Ticket.prioridad, Ticket.fecha_creacion,
+        Cliente.latitude, Cliente.longitude
+    ).join(Cliente, Ticket.id_cliente == Cliente.id)
+    # El bbox usa el índice/rango; la igualdad de índices descarta los bordes de la celda vecina
+    query = _filtrar(query, bbox, estados, prioridades).filter(cx == x, cy == y)
+
+    total = query.count()
+    filas = query.order_by(Ticket.fecha_creacion.desc(), Ticket.id.desc()).offset(offset).limit(limite).all()
+    return total, [
+        {
+            "ticket_id": fila.id,
+            "ticket_titulo": fila.titulo,
+            "ticket_estado": fila.estado,
+            "ticket_prioridad": fila.prioridad,
+            "ticket_fecha_creacion": fila.fecha_creacion.isoformat() if fila.fecha_creacion else None,
+            "lat": fila.latitude,
+            "lng": fila.longitude
+        }
+        for fila in filas
+    ]
+
+
+def construir_tile(z, x, y):
+    """
+    Densidad de tickets de un tile XYZ en una grilla de HEATMAP_TILE_GRID x HEATMAP_TILE_GRID,
+    con las filas en Web Mercator para que coincidan con los píxeles del mapa
+
+    Args:
+        z (int): Zoom
+        x (int): Columna del tile
+        y (int): Fila del tile
+
+    Returns:
+        dict: {"z", "x", "y", "grilla", "estados", "celdas": [[col, fila, total, [por estado]]], "total"}
+    """
+    n = HEATMAP_TILE_GRID
+    bbox = limites_tile(z, x, y)
+    oeste, _, este, _ = bbox
+    columna = _piso((Cliente.longitude - oeste) / ((este - oeste) / n))
+    # Borde inferior de cada fila, de norte a sur
+    fila = case(
+        *[(Cliente.latitude >= latitud_de_fila(y + (k + 1) / n, z), k) for k in range(n - 1)],
+        else_=n - 1
+    )
+    query = db.session.query(
+        columna.label('columna'), fila.label('fila'), Ticket.estado, func.count(Ticket.id)
+    ).join(Cliente, Ticket.id_cliente == Cliente.id)
+    query = _filtrar(query, bbox).group_by('columna', 'fila', Ticket.estado)
+
+    conteos = {}
+    estados = set()
+    for col, fil, estado, total in query:
+        clave = (min(col, n - 1), fil)
+        por_estado = conteos.setdefault(clave, {})
+        por_estado[estado] = por_estado.get(estado, 0) + total
+        estados.add(estado)
+
+    estados = sorted(estados)
+    celdas = [
+        [col, fil, sum(por_estado.values()), [por_estado.get(e, 0) for e in estados]]
+        for (col, fil), por_estado in sorted(conteos.items())
+    ]
+    return {
+        "z": z, "x": x, "y": y,
+        "grilla": n,
+        "estados": estados,
+        "celdas": celdas,
+        "total": sum(celda[2] for celda in celdas)
+    }
+
+
+def _serializar_tile(contenido):
+    datos = json.dumps(contenido, separators=(',', ':'))
+    return datos, hashlib.sha1(datos.encode('utf-8')).hexdigest()
+
+
+def obtener_tile(z, x, y):
+    """
+    Tile desde la caché o recién construido (y guardado si z <= HEATMAP_TILE_MAX_ZOOM)
+
+    Args:
+        z (int): Zoom
+        x (int): Columna
+        y (int): Fila
+
+    Returns:
+        tuple: (JSON del tile, etag, True si vino de la caché)
+    """
+    cacheable = z <= HEATMAP_TILE_MAX_ZOOM
+    tile = db.session.get(TileMapaCalor, (z, x, y)) if cacheable else None
+    if tile is not None and tile.fecha_generacion >= datetime.now() - timedelta(seconds=HEATMAP_TILE_TTL):
+        return tile.datos, tile.etag, True
+
+    datos, etag = _serializar_tile(construir_tile(z, x, y))
+    if cacheable:
+        if tile is None:
+            tile = TileMapaCalor(z=z, x=x, y=y)
+            db.session.add(tile)
+        tile.datos = datos
+        tile.etag = etag
+        tile.fecha_generacion = datetime.now()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Otro worker guardó el mismo tile a la vez
+            db.session.rollback()
+    return datos, etag, False
+
+
+def precalcular_tiles(zoom_maximo):
+    """
+    Construir y guardar los tiles con tickets de los zooms 0..zoom_maximo
+
+    Args:
+        zoom_maximo (int): Último zoom a precalcular (acotado a HEATMAP_TILE_MAX_ZOOM)
+
+    Returns:
+        int: Tiles generados
+    """
+    ubicaciones = _filtrar(
+        db.session.query(Cliente.latitude, Cliente.longitude).join(
+            Ticket, Ticket.id_cliente == Cliente.id
+        )
+    ).distinct().all()
+    ubicaciones = [punto for punto in (coordenadas(lat, lng) for lat, lng in ubicaciones) if punto]
+
+    generados = 0
+    for z in range(min(zoom_maximo, HEATMAP_TILE_MAX_ZOOM) + 1):
+        tiles = {tile_de_punto(lat, lng, z) for lat, lng in ubicaciones}
+        for x, y in sorted(tiles):
+            datos, etag = _serializar_tile(construir_tile(z, x, y))
+            db.session.merge(TileMapaCalor(
+                z=z, x=x, y=y, datos=datos, etag=etag, fecha_generacion=datetime.now()
+            ))
+            generados += 1
+        db.session.commit()
+    return generados
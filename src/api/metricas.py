@@ -0,0 +1,327 @@
+"""
+Métricas en formato de exposición de Prometheus para TiBACK
+Latencia y códigos por endpoint de la API, sockets conectados, emisiones WebSocket,
+pool de base de datos y latencia de integraciones externas. Cada hilo acumula en su
+propio fragmento sin locks; los fragmentos solo se suman al servir /metrics
+"""
+import hmac
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import g, request, Response
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+# /metrics exige `Authorization: Bearer <METRICS_TOKEN>`; sin token el endpoint no se registra
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_INTEGRACIONES = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# nombre: (tipo, ayuda, etiquetas, buckets)
+METRICAS = {
+    'tiback_http_requests_total': (
+        'counter', 'Peticiones a la API por endpoint, método y código', ('endpoint', 'method', 'status'), None),
+    'tiback_http_request_duration_seconds': (
+        'histogram', 'Latencia de las peticiones a la API', ('endpoint', 'method'), BUCKETS_LATENCIA),
+    'tiback_db_queries_total': (
+        'counter', 'Consultas SQL ejecutadas por endpoint', ('endpoint',), None),
+    'tiback_db_query_seconds_total': (
+        'counter', 'Tiempo acumulado en consultas SQL por endpoint', ('endpoint',), None),
+    'tiback_socketio_emits_total': (
+        'counter', 'Eventos emitidos por emit_websocket_event', ('event', 'destino'), None),
+    'tiback_socketio_emit_bytes_total': (
+        'counter', 'Bytes de payload JSON emitidos por evento', ('event',), None),
+    'tiback_socketio_emit_errors_total': (
+        'counter', 'Emisiones WebSocket fallidas por evento', ('event',), None),
+    'tiback_integration_request_duration_seconds': (
+        'histogram', 'Latencia de llamadas a integraciones externas', ('integracion', 'resultado'),
+        BUCKETS_INTEGRACIONES),
+}
+
+# Cada cuántos fragmentos nuevos se fusionan los de hilos terminados
+_COMPACTAR_CADA = 256
+
+
+class _Fragmento:
+    """Valores acumulados por un solo hilo; solo ese hilo los modifica"""
+    __slots__ = ('contadores', 'histogramas')
+
+    def __init__(self):
+        self.contadores = {}
+        self.histogramas = {}
+
+    def fusionar(self, otro):
+        for clave, valor in otro.contadores.copy().items():
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+        for clave, valores in otro.histogramas.copy().items():
+            actual = self.histogramas.get(clave)
+            if actual is None:
+                self.histogramas[clave] = list(valores)
+            else:
+                for i, valor in enumerate(valores):
+                    actual[i] += valor
+
+
+_local = threading.local()
+_fragmentos = []
+_retirados = _Fragmento()
+_registro_lock = threading.Lock()
+_colectores = []
+
+
+def _compactar():
+    """Fusionar los fragmentos de hilos terminados en _retirados (con _registro_lock tomado)"""
+    vivos = []
+    for hilo, fragmento in _fragmentos:
+        if hilo.is_alive():
+            vivos.append((hilo, fragmento))
+        else:
+            _retirados.fusionar(fragmento)
+    _fragmentos[:] = vivos
+
+
+def _fragmento():
+    fragmento = getattr(_local, 'fragmento', None)
+    if fragmento is None:
+        fragmento = _local.fragmento = _Fragmento()
+        # Solo la primera métrica de cada hilo toma el lock
+        with _registro_lock:
+            _fragmentos.append((threading.current_thread(), fragmento))
+            if len(_fragmentos) % _COMPACTAR_CADA == 0:
+                _compactar()
+    return fragmento
+
+
+def incrementar(nombre, etiquetas=(), valor=1):
+    """
+    Sumar a un contador
+
+    Args:
+        nombre (str): Métrica declarada en METRICAS
+        etiquetas (tuple): Valores de las etiquetas, en el orden declarado
+        valor (float): Cantidad a sumar
+    """
+    contadores = _fragmento().contadores
+    clave = (nombre, etiquetas)
+    contadores[clave] = contadores.get(clave, 0) + valor
+
+
+def observar(nombre, valor, etiquetas=()):
+    """
+    Registrar una observación en un histograma
+
+    Args:
+        nombre (str): Métrica declarada en METRICAS
+        valor (float): Valor observado (segundos)
+        etiquetas (tuple): Valores de las etiquetas, en el orden declarado
+    """
+    buckets = METRICAS[nombre][3]
+    histogramas = _fragmento().histogramas
+    clave = (nombre, etiquetas)
+    valores = histogramas.get(clave)
+    if valores is None:
+        # Un conteo por bucket (+Inf al final), suma y total
+        valores = histogramas[clave] = [0] * (len(buckets) + 3)
+    valores[bisect_left(buckets, valor)] += 1
+    valores[-2] += valor
+    valores[-1] += 1
+
+
+def registrar_colector(nombre, ayuda, fn):
+    """
+    Registrar un gauge que se calcula al servir /metrics
+
+    Args:
+        nombre (str): Nombre de la métrica
+        ayuda (str): Descripción
+        fn: Función sin argumentos que devuelve [(dict de etiquetas, valor)]
+    """
+    _colectores.append((nombre, ayuda, fn))
+
+
+def _destino(room):
+    """Tipo de room sin el ID (user_5 -> user), para acotar la cardinalidad"""
+    if not room:
+        return 'global'
+    base, _, sufijo = room.rpartition('_')
+    return base if sufijo.isdigit() else room
+
+
+def registrar_emision(event_name, data, room=None):
+    """
+    Contar una emisión WebSocket y el tamaño de su payload
+
+    Args:
+        event_name (str): Nombre del evento
+        data (dict): Payload emitido
+        room (str, optional): Room destino
+    """
+    incrementar('tiback_socketio_emits_total', (event_name, _destino(room)))
+    try:
+        tamano = len(json.dumps(data, default=str, separators=(',', ':')).encode('utf-8'))
+    except (TypeError, ValueError):
+        return
+    incrementar('tiback_socketio_emit_bytes_total', (event_name,), tamano)
+
+
+def registrar_error_emision(event_name):
+    incrementar('tiback_socketio_emit_errors_total', (event_name,))
+
+
+@contextmanager
+def medir_integracion(nombre):
+    """
+    Medir la latencia de una llamada a una integración externa
+
+    Args:
+        nombre (str): Integración (openai, cloudinary, vision...)
+    """
+    inicio = time.perf_counter()
+    resultado = 'error'
+    try:
+        yield
+        resultado = 'ok'
+    finally:
+        observar('tiback_integration_request_duration_seconds',
+                 time.perf_counter() - inicio, (nombre, resultado))
+
+
+def _agregado():
+    total = _Fragmento()
+    with _registro_lock:
+        _compactar()
+        total.fusionar(_retirados)
+        fragmentos = [fragmento for _, fragmento in _fragmentos]
+    for fragmento in fragmentos:
+        total.fusionar(fragmento)
+    return total
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(nombres, valores, extra=None):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _numero(valor):
+    if isinstance(valor, float):
+        return repr(round(valor, 6))
+    return str(valor)
+
+
+def exposicion():
+    """
+    Texto de todas las métricas en formato de exposición de Prometheus 0.0.4
+
+    Returns:
+        str: Métricas
+    """
+    total = _agregado()
+    por_metrica = {}
+    for (nombre, etiquetas), valor in total.contadores.items():
+        por_metrica.setdefault(nombre, []).append((etiquetas, valor))
+    for (nombre, etiquetas), valores in total.histogramas.items():
+        por_metrica.setdefault(nombre, []).append((etiquetas, valores))
+
+    lineas = []
+    for nombre, (tipo, ayuda, nombres, buckets) in METRICAS.items():
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+        for etiquetas, valor in sorted(por_metrica.get(nombre, [])):
+            if tipo != 'histogram':
+                lineas.append(f'{nombre}{_etiquetas(nombres, etiquetas)} {_numero(valor)}')
+                continue
+            acumulado = 0
+            for limite, conteo in zip(buckets + ('+Inf',), valor):
+                acumulado += conteo
+                le = f'le="{limite}"'
+                lineas.append(f'{nombre}_bucket{_etiquetas(nombres, etiquetas, le)} {acumulado}')
+            lineas.append(f'{nombre}_sum{_etiquetas(nombres, etiquetas)} {_numero(valor[-2])}')
+            lineas.append(f'{nombre}_count{_etiquetas(nombres, etiquetas)} {valor[-1]}')
+
+    for nombre, ayuda, fn in _colectores:
+        try:
+            muestras = fn()
+        except Exception as e:
+            print(f"Error calculando métrica {nombre}: {e}")
+            continue
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} gauge')
+        for etiquetas, valor in muestras:
+            lineas.append(f'{nombre}{_etiquetas(etiquetas.keys(), etiquetas.values())} {_numero(valor)}')
+    return '\n'.join(lineas) + '\n'
+
+
+def _pool_db(db):
+    def colector():
+        pool = db.engine.pool
+        muestras = []
+        for estado in ('size', 'checkedin', 'checkedout', 'overflow'):
+            fn = getattr(pool, estado, None)
+            if callable(fn):
+                muestras.append(({'estado': estado}, fn()))
+        return muestras
+    return colector
+
+
+def _carga_integraciones():
+    from api.integraciones import reporte
+    return [
+        ({'integracion': item['nombre']}, round(item['tiempo_ms'] / 1000, 6))
+        for item in reporte()['integraciones'] if item['tiempo_ms'] is not None
+    ]
+
+
+def init_app(app, db):
+    """
+    Medir las peticiones a /api y exponer GET /metrics (solo con METRICS_TOKEN)
+
+    Args:
+        app (Flask): Aplicación
+        db (SQLAlchemy): Extensión de base de datos, para las métricas del pool
+    """
+    if not METRICS_ENABLED:
+        return
+
+    registrar_colector('tiback_db_pool_connections', 'Conexiones del pool de SQLAlchemy por estado', _pool_db(db))
+    registrar_colector('tiback_integration_load_seconds', 'Tiempo de importación de cada integración cargada',
+                       _carga_integraciones)
+
+    @app.before_request
+    def _iniciar_medicion():
+        g.inicio_metricas = time.perf_counter()
+
+    @app.after_request
+    def _registrar_peticion(response):
+        inicio = g.get('inicio_metricas')
+        if inicio is None or not request.path.startswith('/api/'):
+            return response
+        endpoint = request.endpoint or 'sin_ruta'
+        observar('tiback_http_request_duration_seconds', time.perf_counter() - inicio,
+                 (endpoint, request.method))
+        incrementar('tiback_http_requests_total', (endpoint, request.method, str(response.status_code)))
+        contador = g.get('contador_consultas')
+        if contador is not None and contador.total:
+            incrementar('tiback_db_queries_total', (endpoint,), contador.total)
+            incrementar('tiback_db_query_seconds_total', (endpoint,), contador.tiempo_ms / 1000)
+        return response
+
+    if not METRICS_TOKEN:
+        print("⚠️ METRICS_TOKEN no configurado: GET /metrics queda deshabilitado")
+        return
+
+    def metrics():
+        autorizacion = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(autorizacion, f'Bearer {METRICS_TOKEN}'):
+            return Response('No autorizado\n', status=401, mimetype='text/plain')
+        return Response(exposicion(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    app.add_url_rule('/metrics', 'metrics', metrics, methods=['GET'])
@@ -1,8 +1,15 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import String, Boolean, ForeignKey, DateTime, Text
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from datetime import datetime
+from sqlalchemy import String, Boolean, ForeignKey, DateTime, Date, Text, LargeBinary, event, inspect, and_, or_, select, func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Mapped, mapped_column, relationship, backref, Session, object_session
+from datetime import datetime, date
+from bisect import bisect_left
 from typing import List
+import json
+import os
+import zlib
+from api.geo import coordenadas, tile_de_punto, codificar_geohash
 
 db = SQLAlchemy()
 
@@ -27,6 +34,8 @@ class Cliente(db.Model):
     direccion: Mapped[str] = mapped_column(String(500), nullable=False)
     latitude: Mapped[float] = mapped_column(nullable=True)
     longitude: Mapped[float] = mapped_column(nullable=True)
+    # Geohash de (latitude, longitude), indexado para búsquedas por cercanía; lo mantiene _actualizar_geohash
+    geohash: Mapped[str] = mapped_column(String(12), nullable=True, index=True)
     telefono: Mapped[str] = mapped_column(String(20), nullable=False)
     nombre: Mapped[str] = mapped_column(String(50), nullable=False)
     apellido: Mapped[str] = mapped_column(String(50), nullable=False)
@@ -98,10 +107,10 @@ class Supervisor(db.Model):
 class Comentarios(db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
     id_ticket: Mapped[int] = mapped_column(
-        ForeignKey("ticket.id"), nullable=False
+        ForeignKey("ticket.id", ondelete="CASCADE"), nullable=False, index=True
     )
     id_gestion: Mapped[int] = mapped_column(
-        ForeignKey("gestion.id"), nullable=True
+        ForeignKey("gestion.id", ondelete="CASCADE"), nullable=True
     )
     id_cliente: Mapped[int] = mapped_column(
         ForeignKey("cliente.id"), nullable=True
@@ -115,7 +124,9 @@ class Comentarios(db.Model):
     texto: Mapped[str] = mapped_column(Text, nullable=False)
     fecha_comentario: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     gestion = relationship("Gestion", back_populates="comentarios")
-    ticket = relationship("Ticket", backref="comentarios")
+    ticket = relationship(
+        "Ticket", backref=backref("comentarios", cascade="all", passive_deletes=True)
+    )
     cliente = relationship("Cliente")
     analista = relationship("Analista")
     supervisor = relationship("Supervisor")
@@ -142,11 +153,14 @@ class Comentarios(db.Model):
 
 class Asignacion(db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
-    id_ticket: Mapped[int] = mapped_column(ForeignKey("ticket.id"), nullable=False)
+    id_ticket: Mapped[int] = mapped_column(ForeignKey("ticket.id", ondelete="CASCADE"), nullable=False, index=True)
     id_supervisor: Mapped[int] = mapped_column(ForeignKey("supervisor.id"), nullable=False)
     id_analista: Mapped[int] = mapped_column(ForeignKey("analista.id"), nullable=False)
     fecha_asignacion: Mapped[datetime] = mapped_column(DateTime, nullable=False)
-    ticket = relationship("Ticket", backref="asignaciones")
+    ticket = relationship(
+        "Ticket", foreign_keys=[id_ticket],
+        backref=backref("asignaciones", cascade="all", passive_deletes=True)
+    )
     analista = relationship("Analista", back_populates="asignaciones")
     supervisor = relationship("Supervisor", back_populates="asignaciones")
 
@@ -175,28 +189,178 @@ class Administrador(db.Model):
         }
 
 
+class Credencial(db.Model):
+    """
+    Identidad unificada para login: una fila por (email, rol).
+    Se mantiene sincronizada desde Cliente, Analista, Supervisor y Administrador
+    mediante eventos del mapper, de modo que el login es una sola búsqueda indexada.
+    """
+    __tablename__ = 'credencial'
+    __table_args__ = (
+        db.UniqueConstraint('email', 'rol', name='uq_credencial_email_rol'),
+        db.UniqueConstraint('rol', 'id_usuario', name='uq_credencial_rol_usuario'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    email: Mapped[str] = mapped_column(String(120), nullable=False)
+    rol: Mapped[str] = mapped_column(String(20), nullable=False)
+    id_usuario: Mapped[int] = mapped_column(nullable=False)
+    contraseña_hash: Mapped[str] = mapped_column(String(255), nullable=False)
+
+    @classmethod
+    def buscar(cls, email, rol):
+        return cls.query.filter_by(email=email, rol=rol).first()
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "email": self.email,
+            "rol": self.rol,
+            "id_usuario": self.id_usuario
+        }
+
+
+class SesionRefresh(db.Model):
+    """
+    Sesión de login con refresh token opaco. Solo se guarda el SHA-256 del token;
+    al rotarlo se conserva el anterior para detectar su reutilización.
+    """
+    __tablename__ = 'sesion_refresh'
+    __table_args__ = (
+        db.UniqueConstraint('token_hash', name='uq_sesion_refresh_token_hash'),
+        db.Index('ix_sesion_refresh_rol_usuario', 'rol', 'id_usuario'),
+        db.Index('ix_sesion_refresh_fecha_revocacion', 'fecha_revocacion'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    rol: Mapped[str] = mapped_column(String(20), nullable=False)
+    id_usuario: Mapped[int] = mapped_column(nullable=False)
+    token_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    token_hash_anterior: Mapped[str] = mapped_column(String(64), nullable=True, index=True)
+    fecha_creacion: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    fecha_expiracion: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    fecha_rotacion: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    fecha_revocacion: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "rol": self.rol,
+            "id_usuario": self.id_usuario,
+            "fecha_creacion": self.fecha_creacion.isoformat() if self.fecha_creacion else None,
+            "fecha_expiracion": self.fecha_expiracion.isoformat() if self.fecha_expiracion else None,
+            "fecha_revocacion": self.fecha_revocacion.isoformat() if self.fecha_revocacion else None
+        }
+
+
+ROLES_POR_MODELO = {
+    Cliente: 'cliente',
+    Analista: 'analista',
+    Supervisor: 'supervisor',
+    Administrador: 'administrador'
+}
+
+
+def _insertar_credencial(mapper, connection, target):
+    connection.execute(Credencial.__table__.insert().values(
+        email=target.email,
+        rol=ROLES_POR_MODELO[mapper.class_],
+        id_usuario=target.id,
+        contraseña_hash=target.contraseña_hash
+    ))
+
+
+def _actualizar_credencial(mapper, connection, target):
+    estado = inspect(target)
+    if not (estado.attrs.email.history.has_changes() or estado.attrs.contraseña_hash.history.has_changes()):
+        return
+    tabla = Credencial.__table__
+    connection.execute(tabla.update().where(
+        tabla.c.rol == ROLES_POR_MODELO[mapper.class_],
+        tabla.c.id_usuario == target.id
+    ).values(email=target.email, contraseña_hash=target.contraseña_hash))
+
+
+def _eliminar_credencial(mapper, connection, target):
+    tabla = Credencial.__table__
+    connection.execute(tabla.delete().where(
+        tabla.c.rol == ROLES_POR_MODELO[mapper.class_],
+        tabla.c.id_usuario == target.id
+    ))
+
+
+def _actualizar_geohash(mapper, connection, target):
+    # Coordenadas ausentes, no numéricas o fuera de rango dejan el cliente sin geohash
+    punto = coordenadas(target.latitude, target.longitude)
+    if punto:
+        target.latitude, target.longitude = punto
+    target.geohash = codificar_geohash(*punto) if punto else None
+
+
+event.listen(Cliente, 'before_insert', _actualizar_geohash)
+event.listen(Cliente, 'before_update', _actualizar_geohash)
+
+
+for _modelo in ROLES_POR_MODELO:
+    event.listen(_modelo, 'after_insert', _insertar_credencial)
+    event.listen(_modelo, 'after_update', _actualizar_credencial)
+    event.listen(_modelo, 'after_delete', _eliminar_credencial)
+
+
 class Ticket(db.Model):
+    __table_args__ = (
+        db.Index('ix_ticket_estado_fecha_cierre', 'estado', 'fecha_cierre'),
+        # Tickets de los clientes encontrados por cercanía (api/cercania.py)
+        db.Index('ix_ticket_cliente_estado', 'id_cliente', 'estado'),
+        # Los ids archivados no deben reutilizarse (Postgres ya usa una secuencia)
+        {'sqlite_autoincrement': True},
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
     id_cliente: Mapped[int] = mapped_column(
         ForeignKey("cliente.id"), nullable=False
     )
-    estado: Mapped[str] = mapped_column(String(50), nullable=False)
+    # active_history: las estadísticas restan de la fila anterior aunque el ticket llegue expirado
+    estado: Mapped[str] = mapped_column(String(50), nullable=False, active_history=True)
     titulo: Mapped[str] = mapped_column(String(200), nullable=False)
     descripcion: Mapped[str] = mapped_column(String(1000), nullable=False)
     fecha_creacion: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     fecha_cierre: Mapped[datetime] = mapped_column(DateTime, nullable=True)
-    prioridad: Mapped[str] = mapped_column(String(20), nullable=False)
-    calificacion: Mapped[int] = mapped_column(nullable=True)
+    prioridad: Mapped[str] = mapped_column(String(20), nullable=False, active_history=True)
+    calificacion: Mapped[int] = mapped_column(nullable=True, active_history=True)
     comentario: Mapped[str] = mapped_column(String(500), nullable=True)
-    fecha_evaluacion: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    fecha_evaluacion: Mapped[datetime] = mapped_column(DateTime, nullable=True, active_history=True)
     url_imagen: Mapped[str] = mapped_column(String(500), nullable=True)
+    # Asignación vigente desnormalizada; se mantiene en la misma transacción que asigna/escala
+    current_asignacion_id: Mapped[int] = mapped_column(
+        ForeignKey("asignacion.id", ondelete="SET NULL", use_alter=True,
+                   name="fk_ticket_current_asignacion"), nullable=True
+    )
+    current_analista_id: Mapped[int] = mapped_column(
+        ForeignKey("analista.id", ondelete="SET NULL", name="fk_ticket_current_analista"),
+        nullable=True, index=True, active_history=True
+    )
+    # Versión para control de concurrencia optimista: cada UPDATE lleva WHERE version = ?
+    version: Mapped[int] = mapped_column(nullable=False, server_default='1')
+    __mapper_args__ = {"version_id_col": version}
     cliente = relationship("Cliente", back_populates="tickets")
+    asignacion_vigente = relationship(
+        "Asignacion", foreign_keys=[current_asignacion_id], viewonly=True
+    )
+
+    def actualizar_asignacion_actual(self):
+        """Recalcula current_asignacion_id/current_analista_id desde la tabla asignacion"""
+        asignacion = Asignacion.query.filter_by(id_ticket=self.id).order_by(
+            Asignacion.fecha_asignacion.desc(), Asignacion.id.desc()
+        ).first()
+        self.current_asignacion_id = asignacion.id if asignacion else None
+        self.current_analista_id = asignacion.id_analista if asignacion else None
 
     def serialize(self):
-        # Obtener la asignación más reciente
+        # Obtener la asignación vigente sin cargar todo el historial
         asignacion_actual = None
-        if self.asignaciones:
-            asignacion_mas_reciente = max(self.asignaciones, key=lambda x: x.fecha_asignacion)
+        if self.current_asignacion_id and self.asignacion_vigente:
+            asignacion_mas_reciente = self.asignacion_vigente
             asignacion_actual = {
                 "id": asignacion_mas_reciente.id,
                 "id_ticket": asignacion_mas_reciente.id_ticket,
@@ -220,6 +384,7 @@ class Ticket(db.Model):
             "comentario": self.comentario,
             "fecha_evaluacion": self.fecha_evaluacion.isoformat() if self.fecha_evaluacion else None,
             "url_imagen": self.url_imagen,
+            "version": self.version,
             "cliente": self.cliente.serialize() if self.cliente else None,
             "asignacion_actual": asignacion_actual,
             "comentarios": [c.serialize() for c in self.comentarios] if hasattr(self, 'comentarios') else []
@@ -227,12 +392,15 @@ class Ticket(db.Model):
 
 class Gestion(db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
-    id_ticket: Mapped[int] = mapped_column(ForeignKey("ticket.id"), nullable=False)
+    id_ticket: Mapped[int] = mapped_column(ForeignKey("ticket.id", ondelete="CASCADE"), nullable=False, index=True)
     fecha_cambio: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     Nota_de_caso: Mapped[str] = mapped_column(String(200), nullable=False)
-    ticket = relationship("Ticket", backref="gestiones")
+    ticket = relationship(
+        "Ticket", backref=backref("gestiones", cascade="all", passive_deletes=True)
+    )
     comentarios = relationship(
-        "Comentarios", back_populates="gestion", cascade="all, delete-orphan"
+        "Comentarios", back_populates="gestion", cascade="all, delete-orphan",
+        passive_deletes=True
     )
 
     def serialize(self):
@@ -242,3 +410,622 @@ class Gestion(db.Model):
             "fecha_cambio": self.fecha_cambio.isoformat() if self.fecha_cambio else None,
             "Nota_de_caso": self.Nota_de_caso,
         }
+
+
+class EventoTicket(db.Model):
+    """
+    Registro tipado de transiciones de un ticket, escrito por la máquina de estados.
+    Reemplaza la búsqueda de comentarios con texto fijo para decidir el flujo.
+    """
+    __tablename__ = 'evento_ticket'
+    __table_args__ = (
+        db.Index('ix_evento_ticket_ticket_tipo_fecha', 'id_ticket', 'tipo', 'fecha'),
+        db.Index('ix_evento_ticket_analista_tipo_fecha', 'id_analista', 'tipo', 'fecha'),
+    )
+
+    ASIGNADO = 'asignado'
+    ESCALADO = 'escalado'
+    SOLUCIONADO = 'solucionado'
+    REABIERTO = 'reabierto'
+    CERRADO = 'cerrado'
+    ESTADO_CAMBIADO = 'estado_cambiado'
+
+    TIPOS_POR_ESTADO = {
+        'solucionado': SOLUCIONADO,
+        'reabierto': REABIERTO,
+        'cerrado': CERRADO,
+        'cerrado_por_supervisor': CERRADO
+    }
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    id_ticket: Mapped[int] = mapped_column(
+        ForeignKey("ticket.id", ondelete="CASCADE"), nullable=False
+    )
+    tipo: Mapped[str] = mapped_column(String(30), nullable=False)
+    estado_anterior: Mapped[str] = mapped_column(String(50), nullable=True)
+    estado_nuevo: Mapped[str] = mapped_column(String(50), nullable=True)
+    id_analista: Mapped[int] = mapped_column(
+        ForeignKey("analista.id", ondelete="SET NULL"), nullable=True
+    )
+    rol_usuario: Mapped[str] = mapped_column(String(20), nullable=True)
+    id_usuario: Mapped[int] = mapped_column(nullable=True)
+    fecha: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    # Especialidad del analista al momento del evento (la usa el rollup de SLA)
+    especialidad: Mapped[str] = mapped_column(String(120), nullable=True)
+    ticket = relationship(
+        "Ticket", backref=backref("eventos", cascade="all", passive_deletes=True)
+    )
+
+    @classmethod
+    def tipo_para_estado(cls, estado):
+        return cls.TIPOS_POR_ESTADO.get((estado or '').lower(), cls.ESTADO_CAMBIADO)
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "id_ticket": self.id_ticket,
+            "tipo": self.tipo,
+            "estado_anterior": self.estado_anterior,
+            "estado_nuevo": self.estado_nuevo,
+            "id_analista": self.id_analista,
+            "rol_usuario": self.rol_usuario,
+            "id_usuario": self.id_usuario,
+            "fecha": self.fecha.isoformat() if self.fecha else None,
+            "especialidad": self.especialidad
+        }
+
+
+class TicketArchivado(db.Model):
+    """
+    Ticket cerrado movido fuera de las tablas activas. Conserva el mismo id del
+    ticket original; comentarios, gestiones y asignaciones se guardan como un
+    JSON comprimido con zlib en `historial`.
+    """
+    __tablename__ = 'ticket_archivado'
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    id_cliente: Mapped[int] = mapped_column(
+        ForeignKey("cliente.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    estado: Mapped[str] = mapped_column(String(50), nullable=False)
+    titulo: Mapped[str] = mapped_column(String(200), nullable=False)
+    descripcion: Mapped[str] = mapped_column(String(1000), nullable=False)
+    fecha_creacion: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    fecha_cierre: Mapped[datetime] = mapped_column(DateTime, nullable=True, index=True)
+    prioridad: Mapped[str] = mapped_column(String(20), nullable=False)
+    calificacion: Mapped[int] = mapped_column(nullable=True)
+    comentario: Mapped[str] = mapped_column(String(500), nullable=True)
+    fecha_evaluacion: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    url_imagen: Mapped[str] = mapped_column(String(500), nullable=True)
+    fecha_archivado: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    historial: Mapped[bytes] = mapped_column(LargeBinary, nullable=False, deferred=True)
+    cliente = relationship("Cliente")
+
+    def cargar_historial(self):
+        return json.loads(zlib.decompress(self.historial).decode('utf-8'))
+
+    def serialize(self):
+        historial = self.cargar_historial()
+        return {
+            "id": self.id,
+            "id_cliente": self.id_cliente,
+            "estado": self.estado,
+            "titulo": self.titulo,
+            "descripcion": self.descripcion,
+            "fecha_creacion": self.fecha_creacion.isoformat() if self.fecha_creacion else None,
+            "fecha_cierre": self.fecha_cierre.isoformat() if self.fecha_cierre else None,
+            "prioridad": self.prioridad,
+            "calificacion": self.calificacion,
+            "comentario": self.comentario,
+            "fecha_evaluacion": self.fecha_evaluacion.isoformat() if self.fecha_evaluacion else None,
+            "url_imagen": self.url_imagen,
+            "cliente": self.cliente.serialize() if self.cliente else None,
+            "asignacion_actual": historial.get("asignacion_actual"),
+            "comentarios": historial.get("comentarios", []),
+            "archivado": True,
+            "fecha_archivado": self.fecha_archivado.isoformat() if self.fecha_archivado else None
+        }
+
+
+# Zoom máximo cuyos tiles del mapa de calor se guardan; más allá se calculan en cada petición
+HEATMAP_TILE_MAX_ZOOM = int(os.getenv('HEATMAP_TILE_MAX_ZOOM', '16'))
+# Tiles (o clientes) por sentencia al invalidar en bloque
+TILES_POR_DELETE = 500
+
+
+class TileMapaCalor(db.Model):
+    """
+    Tile precalculado del mapa de calor: densidad de tickets por celda y estado en JSON.
+    Se borra en la misma transacción en la que cambia un ticket dentro de él
+    y se regenera en la siguiente lectura.
+    """
+    __tablename__ = 'tile_mapa_calor'
+
+    z: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    x: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    y: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    datos: Mapped[str] = mapped_column(Text, nullable=False)
+    etag: Mapped[str] = mapped_column(String(64), nullable=False)
+    fecha_generacion: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+def _invalidar_tiles(connection, puntos):
+    """Borrar, en todos los zooms cacheados, los tiles que contienen los puntos (lat, lng)"""
+    tabla = TileMapaCalor.__table__
+    tiles = set()
+    for lat, lng in filter(None, (coordenadas(*punto) for punto in puntos)):
+        for z in range(HEATMAP_TILE_MAX_ZOOM + 1):
+            tiles.add((z, *tile_de_punto(lat, lng, z)))
+    tiles = sorted(tiles)
+    # Por bloques para no armar un OR gigante con lotes de miles de clientes
+    for inicio in range(0, len(tiles), TILES_POR_DELETE):
+        connection.execute(tabla.delete().where(or_(*(
+            and_(tabla.c.z == z, tabla.c.x == x, tabla.c.y == y)
+            for z, x, y in tiles[inicio:inicio + TILES_POR_DELETE]
+        ))))
+
+
+def invalidar_tiles_clientes(connection, ids_cliente):
+    """
+    Borrar los tiles cacheados que contienen la ubicación de unos clientes
+    (tickets insertados o cambiados sin pasar por los eventos del mapper)
+
+    Args:
+        connection (Connection): Conexión de la transacción en curso
+        ids_cliente (iterable): IDs de cliente afectados
+    """
+    ids_cliente = list(set(ids_cliente))
+    puntos = []
+    for inicio in range(0, len(ids_cliente), TILES_POR_DELETE):
+        puntos.extend(connection.execute(select(Cliente.latitude, Cliente.longitude).where(
+            Cliente.id.in_(ids_cliente[inicio:inicio + TILES_POR_DELETE]),
+            Cliente.latitude.isnot(None), Cliente.longitude.isnot(None)
+        ).distinct()).all())
+    _invalidar_tiles(connection, puntos)
+
+
+def _ubicacion_cliente(connection, id_cliente):
+    fila = connection.execute(
+        select(Cliente.latitude, Cliente.longitude).where(Cliente.id == id_cliente)
+    ).first()
+    return (fila[0], fila[1]) if fila else (None, None)
+
+
+def _invalidar_tiles_ticket(mapper, connection, target):
+    _invalidar_tiles(connection, [_ubicacion_cliente(connection, target.id_cliente)])
+
+
+def _invalidar_tiles_cambio_estado(mapper, connection, target):
+    if inspect(target).attrs.estado.history.has_changes():
+        _invalidar_tiles_ticket(mapper, connection, target)
+
+
+def _invalidar_tiles_ubicacion(mapper, connection, target):
+    estado = inspect(target)
+    historial_lat = estado.attrs.latitude.history
+    historial_lng = estado.attrs.longitude.history
+    if not (historial_lat.has_changes() or historial_lng.has_changes()):
+        return
+    anterior = (
+        historial_lat.deleted[0] if historial_lat.deleted else target.latitude,
+        historial_lng.deleted[0] if historial_lng.deleted else target.longitude
+    )
+    _invalidar_tiles(connection, [anterior, (target.latitude, target.longitude)])
+
+
+event.listen(Ticket, 'after_insert', _invalidar_tiles_ticket)
+event.listen(Ticket, 'after_update', _invalidar_tiles_cambio_estado)
+event.listen(Ticket, 'after_delete', _invalidar_tiles_ticket)
+event.listen(Cliente, 'after_update', _invalidar_tiles_ubicacion)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _invalidar_tiles_masivo(orm_execute_state):
+    # UPDATE/DELETE masivos de tickets (archivado, purga) no pasan por los eventos del mapper:
+    # antes de ejecutarlos se invalidan los tiles de los clientes de las filas afectadas
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete) or \
+            orm_execute_state.bind_mapper is not inspect(Ticket):
+        return
+    connection = orm_execute_state.session.connection()
+    tabla = Ticket.__table__
+    consulta = select(Cliente.latitude, Cliente.longitude).join(
+        tabla, tabla.c.id_cliente == Cliente.id
+    ).where(Cliente.latitude.isnot(None), Cliente.longitude.isnot(None)).distinct()
+    condicion = orm_execute_state.statement.whereclause
+    if condicion is not None:
+        consulta = consulta.where(condicion)
+    _invalidar_tiles(connection, connection.execute(consulta).all())
+
+
+# ==================== ESTADÍSTICAS MATERIALIZADAS ====================
+
+# Límites superiores (horas) de las cubetas del histograma de tiempo de cierre; la última es abierta
+CUBETAS_CIERRE_HORAS = (0.25, 0.5, 1, 2, 4, 8, 12, 24, 48, 72, 120, 168, 336, 720)
+# Estados de ticket cerrado (estadísticas, archivo y búsquedas de tickets abiertos)
+ESTADOS_CIERRE = ('cerrado', 'cerrado_por_supervisor')
+# id_analista de las filas sin analista (las claves primarias no admiten NULL)
+SIN_ANALISTA = 0
+
+
+class EstadisticaTicketEstado(db.Model):
+    """Tickets activos por estado, prioridad y analista vigente; se suma y resta en cada transición"""
+    __tablename__ = 'estadistica_ticket_estado'
+
+    estado: Mapped[str] = mapped_column(String(50), primary_key=True)
+    prioridad: Mapped[str] = mapped_column(String(20), primary_key=True)
+    id_analista: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    total: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+class EstadisticaTicketDia(db.Model):
+    """Transiciones por día, prioridad y analista; solo crece (no se resta al archivar ni eliminar)"""
+    __tablename__ = 'estadistica_ticket_dia'
+
+    dia: Mapped[date] = mapped_column(Date, primary_key=True)
+    prioridad: Mapped[str] = mapped_column(String(20), primary_key=True)
+    id_analista: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    creados: Mapped[int] = mapped_column(nullable=False, default=0)
+    solucionados: Mapped[int] = mapped_column(nullable=False, default=0)
+    cerrados: Mapped[int] = mapped_column(nullable=False, default=0)
+    reabiertos: Mapped[int] = mapped_column(nullable=False, default=0)
+    # Suma de los tiempos de cierre de los cierres con fecha_creacion y fecha_cierre
+    segundos_cierre: Mapped[float] = mapped_column(nullable=False, default=0)
+
+
+class HistogramaTicketDia(db.Model):
+    """
+    Distribuciones por día, prioridad y analista: metrica 'cierre' (cubeta = índice en
+    CUBETAS_CIERRE_HORAS) y 'calificacion' (cubeta = calificación de 1 a 5)
+    """
+    __tablename__ = 'histograma_ticket_dia'
+
+    dia: Mapped[date] = mapped_column(Date, primary_key=True)
+    prioridad: Mapped[str] = mapped_column(String(20), primary_key=True)
+    id_analista: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    metrica: Mapped[str] = mapped_column(String(20), primary_key=True)
+    cubeta: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    total: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+def cubeta_cierre(segundos):
+    """Índice de la cubeta de CUBETAS_CIERRE_HORAS para un tiempo de cierre"""
+    return bisect_left(CUBETAS_CIERRE_HORAS, segundos / 3600)
+
+
+def sumar_estadistica(connection, modelo, claves, deltas):
+    """
+    Sumar deltas a una fila de una tabla de estadísticas, creándola si no existe (upsert atómico)
+
+    Args:
+        connection (Connection): Conexión de la transacción en curso
+        modelo: EstadisticaTicketEstado, EstadisticaTicketDia o HistogramaTicketDia
+        claves (dict): Valores de la clave primaria
+        deltas (dict): Columna -> cantidad a sumar
+    """
+    tabla = modelo.__table__
+    dialecto = connection.dialect.name
+    if dialecto in ('postgresql', 'sqlite'):
+        insertar = postgresql_insert if dialecto == 'postgresql' else sqlite_insert
+        sentencia = insertar(tabla).values(**claves, **deltas)
+        connection.execute(sentencia.on_conflict_do_update(
+            index_elements=list(claves),
+            set_={columna: tabla.c[columna] + sentencia.excluded[columna] for columna in deltas}
+        ))
+        return
+    condicion = and_(*(tabla.c[columna] == valor for columna, valor in claves.items()))
+    resultado = connection.execute(tabla.update().where(condicion).values(
+        {columna: tabla.c[columna] + valor for columna, valor in deltas.items()}
+    ))
+    if resultado.rowcount == 0:
+        connection.execute(tabla.insert().values(**claves, **deltas))
+
+
+def sumar_estadisticas(connection, modelo, filas):
+    """
+    Sumar deltas a varias filas de una tabla de estadísticas con un solo executemany
+
+    Args:
+        connection (Connection): Conexión de la transacción en curso
+        modelo: Tabla de estadísticas (como en sumar_estadistica)
+        filas (list): Pares (claves, deltas), todos con las mismas columnas
+    """
+    if not filas:
+        return
+    dialecto = connection.dialect.name
+    if dialecto not in ('postgresql', 'sqlite'):
+        for claves, deltas in filas:
+            sumar_estadistica(connection, modelo, claves, deltas)
+        return
+    tabla = modelo.__table__
+    claves, deltas = filas[0]
+    sentencia = (postgresql_insert if dialecto == 'postgresql' else sqlite_insert)(tabla)
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=list(claves),
+        set_={columna: tabla.c[columna] + sentencia.excluded[columna] for columna in deltas}
+    )
+    connection.execute(sentencia, [{**claves, **deltas} for claves, deltas in filas])
+
+
+def _anterior(historial, actual):
+    return historial.deleted[0] if historial.deleted else actual
+
+
+def _pendientes(target):
+    """Deltas de estadísticas de la sesión del ticket, acumulados hasta after_flush"""
+    return object_session(target).info.setdefault('estadisticas_pendientes', {})
+
+
+def _acumular(pendientes, modelo, claves, deltas):
+    clave = (modelo.__tablename__, tuple(claves[columna.name] for columna in modelo.__table__.primary_key))
+    if clave not in pendientes:
+        pendientes[clave] = (modelo, claves, {})
+    acumulados = pendientes[clave][2]
+    for columna, valor in deltas.items():
+        acumulados[columna] = acumulados.get(columna, 0) + valor
+
+
+def sumar_estadisticas_ordenadas(connection, pendientes):
+    """
+    Aplicar deltas acumulados en orden de (tabla, clave primaria): dos transacciones que
+    tocan las mismas filas bloquean en el mismo orden y no pueden interbloquearse
+
+    Args:
+        connection (Connection): Conexión de la transacción en curso
+        pendientes (dict): (tabla, valores de la clave) -> (modelo, claves, deltas)
+    """
+    for clave in sorted(pendientes):
+        modelo, claves, deltas = pendientes[clave]
+        # Una transición y su inversa en el mismo flush se anulan
+        if any(deltas.values()):
+            sumar_estadistica(connection, modelo, claves, deltas)
+
+
+def _sumar_estado(pendientes, estado, prioridad, id_analista, delta):
+    _acumular(pendientes, EstadisticaTicketEstado, {
+        'estado': estado, 'prioridad': prioridad, 'id_analista': id_analista or SIN_ANALISTA
+    }, {'total': delta})
+
+
+def _sumar_dia(pendientes, momento, target, deltas):
+    _acumular(pendientes, EstadisticaTicketDia, {
+        'dia': (momento or datetime.now()).date(),
+        'prioridad': target.prioridad,
+        'id_analista': target.current_analista_id or SIN_ANALISTA
+    }, deltas)
+
+
+def _sumar_histograma(pendientes, momento, target, metrica, cubeta, delta=1):
+    _acumular(pendientes, HistogramaTicketDia, {
+        'dia': (momento or datetime.now()).date(),
+        'prioridad': target.prioridad,
+        'id_analista': target.current_analista_id or SIN_ANALISTA,
+        'metrica': metrica,
+        'cubeta': cubeta
+    }, {'total': delta})
+
+
+def _estadisticas_ticket_creado(mapper, connection, target):
+    pendientes = _pendientes(target)
+    _sumar_estado(pendientes, target.estado, target.prioridad, target.current_analista_id, 1)
+    # Los creados no se atribuyen a un analista: casi nunca hay uno al crear
+    _acumular(pendientes, EstadisticaTicketDia, {
+        'dia': (target.fecha_creacion or datetime.now()).date(),
+        'prioridad': target.prioridad,
+        'id_analista': SIN_ANALISTA
+    }, {'creados': 1})
+
+
+def _estadisticas_ticket_actualizado(mapper, connection, target):
+    pendientes = _pendientes(target)
+    estado = inspect(target)
+    historial_estado = estado.attrs.estado.history
+    historial_prioridad = estado.attrs.prioridad.history
+    historial_analista = estado.attrs.current_analista_id.history
+    if historial_estado.has_changes() or historial_prioridad.has_changes() or historial_analista.has_changes():
+        _sumar_estado(
+            pendientes,
+            _anterior(historial_estado, target.estado),
+            _anterior(historial_prioridad, target.prioridad),
+            _anterior(historial_analista, target.current_analista_id),
+            -1
+        )
+        _sumar_estado(pendientes, target.estado, target.prioridad, target.current_analista_id, 1)
+
+    if historial_estado.has_changes():
+        anterior = (_anterior(historial_estado, None) or '').lower()
+        nuevo = (target.estado or '').lower()
+        if nuevo == 'solucionado':
+            _sumar_dia(pendientes, None, target, {'solucionados': 1})
+        elif nuevo == 'reabierto':
+            _sumar_dia(pendientes, None, target, {'reabiertos': 1})
+        elif nuevo in ESTADOS_CIERRE and anterior not in ESTADOS_CIERRE:
+            deltas = {'cerrados': 1}
+            if target.fecha_cierre and target.fecha_creacion:
+                segundos = max((target.fecha_cierre - target.fecha_creacion).total_seconds(), 0)
+                deltas['segundos_cierre'] = segundos
+                _sumar_histograma(pendientes, target.fecha_cierre, target, 'cierre', cubeta_cierre(segundos))
+            _sumar_dia(pendientes, target.fecha_cierre, target, deltas)
+
+    historial_calificacion = estado.attrs.calificacion.history
+    if historial_calificacion.has_changes():
+        anterior = _anterior(historial_calificacion, None)
+        if anterior:
+            fecha_anterior = _anterior(estado.attrs.fecha_evaluacion.history, target.fecha_evaluacion)
+            _sumar_histograma(pendientes, fecha_anterior, target, 'calificacion', anterior, -1)
+        if target.calificacion:
+            _sumar_histograma(pendientes, target.fecha_evaluacion, target, 'calificacion', target.calificacion)
+
+
+def _estadisticas_ticket_eliminado(mapper, connection, target):
+    _sumar_estado(_pendientes(target), target.estado, target.prioridad, target.current_analista_id, -1)
+
+
+event.listen(Ticket, 'after_insert', _estadisticas_ticket_creado)
+event.listen(Ticket, 'after_update', _estadisticas_ticket_actualizado)
+event.listen(Ticket, 'after_delete', _estadisticas_ticket_eliminado)
+
+
+@event.listens_for(Session, 'after_flush')
+def _aplicar_estadisticas(session, flush_context):
+    pendientes = session.info.pop('estadisticas_pendientes', None)
+    if pendientes:
+        sumar_estadisticas_ordenadas(session.connection(), pendientes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar_estadisticas(session, previous_transaction):
+    # Un flush fallido no llega a after_flush
+    session.info.pop('estadisticas_pendientes', None)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _estadisticas_masivas(orm_execute_state):
+    # Los DELETE masivos (purga, archivado) restan de los activos antes de ejecutarse;
+    # los UPDATE masivos no dicen qué filas cambian, así que se recalcula la foto completa
+    if orm_execute_state.bind_mapper is not inspect(Ticket):
+        return
+    # Los SELECT no tocan la foto: no se pide conexión (ni se abre transacción) para ellos
+    if orm_execute_state.is_delete:
+        connection = orm_execute_state.session.connection()
+        tabla = Ticket.__table__
+        condicion = orm_execute_state.statement.whereclause
+        consulta = select(tabla.c.estado, tabla.c.prioridad, tabla.c.current_analista_id, func.count()).group_by(
+            tabla.c.estado, tabla.c.prioridad, tabla.c.current_analista_id
+        )
+        if condicion is not None:
+            consulta = consulta.where(condicion)
+        pendientes = {}
+        for estado_ticket, prioridad, id_analista, total in connection.execute(consulta).all():
+            _sumar_estado(pendientes, estado_ticket, prioridad, id_analista, -total)
+        sumar_estadisticas_ordenadas(connection, pendientes)
+    elif orm_execute_state.is_update:
+        recalcular_estadisticas_estado(orm_execute_state.session.connection())
+
+
+def recalcular_estadisticas_estado(connection):
+    """
+    Reconstruir estadistica_ticket_estado desde la tabla ticket
+
+    Args:
+        connection (Connection): Conexión de la transacción en curso
+    """
+    tabla = Ticket.__table__
+    connection.execute(EstadisticaTicketEstado.__table__.delete())
+    connection.execute(EstadisticaTicketEstado.__table__.insert().from_select(
+        ['estado', 'prioridad', 'id_analista', 'total'],
+        select(
+            tabla.c.estado, tabla.c.prioridad,
+            func.coalesce(tabla.c.current_analista_id, SIN_ANALISTA), func.count()
+        ).group_by(tabla.c.estado, tabla.c.prioridad, func.coalesce(tabla.c.current_analista_id, SIN_ANALISTA))
+    ))
+
+
+# ==================== SLA / TIEMPOS DE RESOLUCIÓN ====================
+
+# Primer evento de cada tipo que cierra un tramo medido desde fecha_creacion del ticket
+METRICAS_SLA = {
+    EventoTicket.ASIGNADO: 'asignacion',
+    EventoTicket.SOLUCIONADO: 'solucion',
+    EventoTicket.CERRADO: 'cierre'
+}
+# Límites superiores (horas) de las columnas del histograma de metrica_sla_dia; la última es abierta
+CUBETAS_SLA_HORAS = (1, 4, 8, 24, 48, 72, 168, 336, 720)
+COLUMNAS_SLA = (
+    'hasta_1h', 'hasta_4h', 'hasta_8h', 'hasta_24h', 'hasta_48h',
+    'hasta_72h', 'hasta_7d', 'hasta_14d', 'hasta_30d', 'mas_30d'
+)
+
+
+class MetricaSlaDia(db.Model):
+    """
+    Rollup diario de tiempos desde la creación del ticket hasta su primera asignación,
+    primera solución y primer cierre, por analista, especialidad y prioridad.
+    El histograma va en columnas fijas (una por cubeta de CUBETAS_SLA_HORAS) para que
+    un rango de fechas se resuelva con un SUM por columna.
+    """
+    __tablename__ = 'metrica_sla_dia'
+
+    dia: Mapped[date] = mapped_column(Date, primary_key=True)
+    metrica: Mapped[str] = mapped_column(String(20), primary_key=True)
+    id_analista: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    especialidad: Mapped[str] = mapped_column(String(120), primary_key=True)
+    prioridad: Mapped[str] = mapped_column(String(20), primary_key=True)
+    muestras: Mapped[int] = mapped_column(nullable=False, default=0)
+    suma_segundos: Mapped[float] = mapped_column(nullable=False, default=0)
+    hasta_1h: Mapped[int] = mapped_column(nullable=False, default=0)
+    hasta_4h: Mapped[int] = mapped_column(nullable=False, default=0)
+    hasta_8h: Mapped[int] = mapped_column(nullable=False, default=0)
+    hasta_24h: Mapped[int] = mapped_column(nullable=False, default=0)
+    hasta_48h: Mapped[int] = mapped_column(nullable=False, default=0)
+    hasta_72h: Mapped[int] = mapped_column(nullable=False, default=0)
+    hasta_7d: Mapped[int] = mapped_column(nullable=False, default=0)
+    hasta_14d: Mapped[int] = mapped_column(nullable=False, default=0)
+    hasta_30d: Mapped[int] = mapped_column(nullable=False, default=0)
+    mas_30d: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+def fila_sla(metrica, momento, segundos, prioridad, id_analista, especialidad):
+    """
+    Clave y deltas de metrica_sla_dia para una duración
+
+    Returns:
+        tuple: (claves, deltas) para sumar_estadistica
+    """
+    segundos = max(segundos, 0)
+    return {
+        'dia': momento.date(),
+        'metrica': metrica,
+        'id_analista': id_analista or SIN_ANALISTA,
+        'especialidad': especialidad or '',
+        'prioridad': prioridad
+    }, {
+        'muestras': 1,
+        'suma_segundos': segundos,
+        COLUMNAS_SLA[bisect_left(CUBETAS_SLA_HORAS, segundos / 3600)]: 1
+    }
+
+
+def _especialidad_evento(mapper, connection, target):
+    if target.fecha is None:
+        target.fecha = datetime.now()
+    if target.especialidad is None and target.id_analista:
+        target.especialidad = connection.execute(
+            select(Analista.especialidad).where(Analista.id == target.id_analista)
+        ).scalar()
+
+
+def _registrar_sla(mapper, connection, target):
+    # Cuenta el primer evento de cada tipo por fecha (desempate por id), igual que
+    # sla.recalcular_sla; si llega uno anterior al ya contado, se reemplaza
+    metrica = METRICAS_SLA.get(target.tipo)
+    if metrica is None:
+        return
+    eventos = EventoTicket.__table__
+    primero = connection.execute(select(
+        eventos.c.id, eventos.c.fecha, eventos.c.id_analista, eventos.c.especialidad
+    ).where(
+        eventos.c.id_ticket == target.id_ticket,
+        eventos.c.tipo == target.tipo,
+        eventos.c.id != target.id
+    ).order_by(eventos.c.fecha, eventos.c.id).limit(1)).first()
+    if primero and (primero.fecha, primero.id) < (target.fecha, target.id):
+        return
+    ticket = connection.execute(
+        select(Ticket.fecha_creacion, Ticket.prioridad).where(Ticket.id == target.id_ticket)
+    ).first()
+    if not ticket or not ticket.fecha_creacion:
+        return
+    if primero:
+        claves, deltas = fila_sla(
+            metrica, primero.fecha, (primero.fecha - ticket.fecha_creacion).total_seconds(),
+            ticket.prioridad, primero.id_analista, primero.especialidad
+        )
+        sumar_estadistica(connection, MetricaSlaDia, claves, {columna: -valor for columna, valor in deltas.items()})
+    sumar_estadistica(connection, MetricaSlaDia, *fila_sla(
+        metrica, target.fecha, (target.fecha - ticket.fecha_creacion).total_seconds(),
+        ticket.prioridad, target.id_analista, target.especialidad
+    ))
+
+
+event.listen(EventoTicket, 'before_insert', _especialidad_evento)
+event.listen(EventoTicket, 'after_insert', _registrar_sla)
@@ -0,0 +1,320 @@
+"""
+Perfilado en caliente para TiBACK
+Perfilador por muestreo de todo el proceso durante N segundos en un hilo de fondo (salida en
+stacks colapsados, compatible con flamegraph.pl y speedscope) y cProfile por petición activado con
+un header firmado
+
+El muestreo es por proceso: con varios workers de gunicorn, iniciar, consultar y descargar pueden
+caer en procesos distintos (la respuesta incluye el pid). Para muestrear tráfico real hace falta
+que el proceso atienda otras peticiones mientras tanto: worker gthread o varios hilos.
+"""
+import cProfile
+import hashlib
+import hmac
+import io
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from flask import g, request
+
+PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', '1') == '1'
+PROFILER_MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', '60'))
+# Clave para firmar el header X-Perfil; sin ella el cProfile por petición queda desactivado
+# (la SECRET_KEY de la app puede ser un valor de ejemplo público)
+PROFILER_SECRET = os.getenv('PROFILER_SECRET', '')
+# Vigencia de una firma de X-Perfil
+PROFILER_SIGNATURE_TTL = int(os.getenv('PROFILER_SIGNATURE_TTL', '300'))
+# Peticiones perfiladas con cProfile a la vez y resultados que se conservan
+PROFILER_MAX_CONCURRENT = int(os.getenv('PROFILER_MAX_CONCURRENT', '2'))
+PROFILER_MAX_RESULTS = int(os.getenv('PROFILER_MAX_RESULTS', '20'))
+
+HEADER_PERFIL = 'X-Perfil'
+
+# Un hilo cuyo frame más interno está en estos módulos está bloqueado esperando (I/O, locks, colas)
+_MODULOS_EN_ESPERA = (
+    'threading.py', 'selectors.py', 'socket.py', 'socketserver.py', 'queue.py', 'ssl.py',
+    # concurrent/futures/thread.py: worker de un pool esperando tareas
+    'thread.py'
+)
+
+# Último muestreo del proceso; el hilo de fondo lo actualiza y las rutas lo consultan
+_muestreo = None
+_muestreo_lock = threading.Lock()
+_detener = threading.Event()
+_cprofile_cupos = threading.BoundedSemaphore(PROFILER_MAX_CONCURRENT)
+_resultados = OrderedDict()
+_resultados_lock = threading.Lock()
+_secuencia = itertools.count(1)
+
+
+class PerfiladorOcupado(Exception):
+    """Ya hay un muestreo en curso en este proceso"""
+
+
+class PerfiladorSinClave(Exception):
+    """PROFILER_SECRET no está configurado: no se firman headers X-Perfil"""
+
+
+def _pila(frame):
+    """Pila colapsada 'raiz;...;hoja' de un frame, con módulo:función"""
+    partes = []
+    while frame is not None:
+        codigo = frame.f_code
+        partes.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+        frame = frame.f_back
+    partes.reverse()
+    return ';'.join(partes)
+
+
+def _muestrear(estado, intervalo, incluir_inactivos):
+    """Bucle del hilo muestreador: acumula pilas en `estado` hasta el fin o hasta que se detenga"""
+    propio = threading.get_ident()
+    nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+    pilas = Counter()
+    try:
+        while time.time() < estado["fin"] and not _detener.is_set():
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                if not incluir_inactivos and os.path.basename(frame.f_code.co_filename) in _MODULOS_EN_ESPERA:
+                    continue
+                nombre = nombres.get(ident)
+                if nombre is None:
+                    nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+                    nombre = nombres.get(ident, str(ident))
+                pilas[f"{nombre};{_pila(frame)}"] += 1
+            estado["muestras"] += 1
+            _detener.wait(intervalo)
+    finally:
+        estado["texto"] = ''.join(f"{pila} {veces}\n" for pila, veces in pilas.most_common())
+        estado["terminado"] = time.time()
+
+
+def iniciar_muestreo(segundos, intervalo_ms=5, incluir_inactivos=False):
+    """
+    Muestrear en un hilo de fondo las pilas de todos los hilos del proceso durante un tiempo;
+    la petición que lo inicia vuelve de inmediato y el resultado se descarga al terminar
+
+    Args:
+        segundos (float): Duración del muestreo (acotada a PROFILER_MAX_SECONDS)
+        intervalo_ms (float): Milisegundos entre muestras
+        incluir_inactivos (bool): Incluir hilos bloqueados en I/O o locks
+
+    Returns:
+        dict: Estado del muestreo iniciado (ver estado_muestreo)
+
+    Raises:
+        PerfiladorOcupado: Si ya hay otro muestreo en curso
+    """
+    global _muestreo
+    with _muestreo_lock:
+        if _muestreo is not None and _muestreo["terminado"] is None:
+            raise PerfiladorOcupado()
+        _detener.clear()
+        inicio = time.time()
+        _muestreo = {
+            "pid": os.getpid(),
+            "inicio": inicio,
+            "fin": inicio + min(segundos, PROFILER_MAX_SECONDS),
+            "terminado": None,
+            "muestras": 0,
+            "texto": None
+        }
+        threading.Thread(
+            target=_muestrear, args=(_muestreo, max(intervalo_ms, 1) / 1000, incluir_inactivos),
+            name='perfilador-muestreo', daemon=True
+        ).start()
+        return estado_muestreo()
+
+
+def detener_muestreo():
+    """
+    Terminar antes de tiempo el muestreo en curso
+
+    Returns:
+        dict: Estado del muestreo, o None si nunca se inició uno en este proceso
+    """
+    _detener.set()
+    with _muestreo_lock:
+        estado = _muestreo
+    if estado is None:
+        return None
+    # El hilo termina en como mucho un intervalo; el texto se arma en su finally
+    limite = time.time() + 5
+    while estado["terminado"] is None and time.time() < limite:
+        time.sleep(0.01)
+    return estado_muestreo()
+
+
+def estado_muestreo():
+    """
+    Estado del último muestreo de este proceso, sin las pilas
+
+    Returns:
+        dict: {"pid", "en_curso", "inicio", "fin", "terminado", "muestras"}, o None si no hubo ninguno
+    """
+    estado = _muestreo
+    if estado is None:
+        return None
+    return {
+        "pid": estado["pid"],
+        "en_curso": estado["terminado"] is None,
+        "inicio": estado["inicio"],
+        "fin": estado["fin"],
+        "terminado": estado["terminado"],
+        "muestras": estado["muestras"]
+    }
+
+
+def resultado_muestreo():
+    """
+    Pilas del último muestreo terminado en este proceso
+
+    Returns:
+        tuple: (texto en formato de stacks colapsados, número de muestras), o None si no hay
+            ninguno terminado
+    """
+    estado = _muestreo
+    if estado is None or estado["terminado"] is None:
+        return None
+    return estado["texto"], estado["muestras"]
+
+
+def _clave():
+    return PROFILER_SECRET.encode('utf-8')
+
+
+def firmar(metodo, ruta, expira=None):
+    """
+    Generar el valor del header X-Perfil para perfilar una ruta concreta
+
+    Args:
+        metodo (str): Método HTTP
+        ruta (str): Ruta exacta de la petición (p. ej. /api/tickets)
+        expira (int, optional): Epoch de expiración; por defecto ahora + PROFILER_SIGNATURE_TTL
+
+    Returns:
+        str: '<expira>.<firma>'
+
+    Raises:
+        PerfiladorSinClave: Si PROFILER_SECRET no está configurado
+    """
+    if not PROFILER_SECRET:
+        raise PerfiladorSinClave()
+    expira = int(expira or time.time() + PROFILER_SIGNATURE_TTL)
+    mensaje = f"{expira}:{metodo.upper()}:{ruta}".encode('utf-8')
+    return f"{expira}.{hmac.new(_clave(), mensaje, hashlib.sha256).hexdigest()}"
+
+
+def firma_valida(valor, metodo, ruta):
+    """
+    Validar un header X-Perfil para la petición actual
+
+    Args:
+        valor (str): Valor del header
+        metodo (str): Método HTTP de la petición
+        ruta (str): Ruta de la petición
+
+    Returns:
+        bool: True si la firma corresponde y no expiró
+    """
+    if not PROFILER_SECRET:
+        return False
+    expira, _, firma = (valor or '').partition('.')
+    if not expira.isdigit() or int(expira) < time.time():
+        return False
+    esperado = firmar(metodo, ruta, int(expira)).partition('.')[2]
+    return hmac.compare_digest(firma, esperado)
+
+
+def _guardar(perfil, metodo, ruta, duracion_ms):
+    salida = io.StringIO()
+    pstats.Stats(perfil, stream=salida).sort_stats('cumulative').print_stats(40)
+    resultado = {
+        "id": next(_secuencia),
+        "metodo": metodo,
+        "ruta": ruta,
+        "duracion_ms": round(duracion_ms, 2),
+        "fecha": time.time(),
+        "estadisticas": salida.getvalue()
+    }
+    with _resultados_lock:
+        _resultados[resultado["id"]] = resultado
+        while len(_resultados) > PROFILER_MAX_RESULTS:
+            _resultados.popitem(last=False)
+    return resultado["id"]
+
+
+def listar_resultados():
+    """
+    Perfiles cProfile guardados en este proceso, sin el detalle
+
+    Returns:
+        list: [{"id", "metodo", "ruta", "duracion_ms", "fecha"}] del más reciente al más antiguo
+    """
+    with _resultados_lock:
+        items = list(_resultados.values())
+    return [{k: v for k, v in item.items() if k != "estadisticas"} for item in reversed(items)]
+
+
+def obtener_resultado(id_perfil):
+    """
+    Perfil cProfile guardado
+
+    Args:
+        id_perfil (int): ID devuelto en el header X-Perfil-Id
+
+    Returns:
+        dict: Perfil con las estadísticas de pstats, o None si ya no está
+    """
+    with _resultados_lock:
+        return _resultados.get(id_perfil)
+
+
+def init_app(app):
+    """
+    Perfilar con cProfile las peticiones que traen un header X-Perfil válido;
+    la respuesta incluye X-Perfil-Id para consultar el resultado
+
+    Args:
+        app (Flask): Aplicación
+    """
+    # Sin clave propia no se aceptan firmas X-Perfil
+    if not PROFILER_ENABLED or not PROFILER_SECRET:
+        return
+
+    @app.before_request
+    def _iniciar_perfil():
+        valor = request.headers.get(HEADER_PERFIL)
+        if not valor or not firma_valida(valor, request.method, request.path):
+            return
+        if not _cprofile_cupos.acquire(blocking=False):
+            g.perfil_ocupado = True
+            return
+        g.perfil = cProfile.Profile()
+        g.inicio_perfil = time.perf_counter()
+        g.perfil.enable()
+
+    @app.after_request
+    def _cerrar_perfil(response):
+        perfil = g.pop('perfil', None)
+        if perfil is not None:
+            perfil.disable()
+            _cprofile_cupos.release()
+            duracion_ms = (time.perf_counter() - g.inicio_perfil) * 1000
+            response.headers['X-Perfil-Id'] = str(_guardar(perfil, request.method, request.path, duracion_ms))
+        elif g.get('perfil_ocupado'):
+            response.headers['X-Perfil-Id'] = 'ocupado'
+        return response
+
+    @app.teardown_request
+    def _liberar_perfil(exc):
+        # Si after_request no llegó a correr
+        perfil = g.pop('perfil', None)
+        if perfil is not None:
+            perfil.disable()
+            _cprofile_cupos.release()
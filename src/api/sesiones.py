@@ -0,0 +1,226 @@
+"""
+Sesiones con refresh tokens opacos para TiBACK
+Los access tokens duran minutos; la sesión se renueva con un refresh token guardado
+en el servidor y se revoca sin consultar la base en cada petición (denylist en memoria)
+"""
+import hashlib
+import os
+import secrets
+from datetime import datetime, timedelta
+from api.models import db, SesionRefresh, Credencial
+from api.jwt_utils import (
+    generate_token, revoke_session_id, register_denylist_loader, ACCESS_TOKEN_EXPIRE_MINUTES
+)
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv('REFRESH_TOKEN_EXPIRE_DAYS', '14'))
+# Ventana en la que reusar el refresh token recién rotado no se considera robo
+# (dos pestañas renovando a la vez)
+REFRESH_REUSE_GRACE_SECONDS = int(os.getenv('REFRESH_REUSE_GRACE_SECONDS', '30'))
+
+
+def _hash_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _access_token(sesion, email):
+    return {
+        "token": generate_token(sesion.id_usuario, email, sesion.rol, session_id=sesion.id),
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }
+
+
+def _emitir(sesion, email):
+    """Access token ligado a una sesión nueva + su primer refresh token opaco (sin commit)"""
+    refresh = secrets.token_urlsafe(32)
+    sesion.token_hash = _hash_token(refresh)
+    sesion.fecha_rotacion = datetime.now()
+    db.session.flush()
+    return {**_access_token(sesion, email), "refresh_token": refresh}
+
+
+def _rotar(sesion, token_hash, email):
+    """
+    Rotar el refresh token con compare-and-swap sobre token_hash (sin commit): de dos
+    renovaciones simultáneas con el mismo token solo una cambia la fila
+
+    Returns:
+        dict: token, refresh_token y expires_in; None si otra petición rotó la sesión antes
+    """
+    refresh = secrets.token_urlsafe(32)
+    tabla = SesionRefresh.__table__
+    resultado = db.session.execute(tabla.update().where(
+        tabla.c.id == sesion.id, tabla.c.token_hash == token_hash
+    ).values(
+        token_hash=_hash_token(refresh), token_hash_anterior=token_hash, fecha_rotacion=datetime.now()
+    ))
+    # La fila cambió por fuera del ORM
+    db.session.expire(sesion)
+    if resultado.rowcount != 1:
+        return None
+    return {**_access_token(sesion, email), "refresh_token": refresh}
+
+
+def _credencial_vigente(sesion):
+    """Credencial del dueño de una sesión activa; None (revocándola si el usuario ya no existe) si no"""
+    if sesion.fecha_revocacion is not None or sesion.fecha_expiracion < datetime.now():
+        return None
+    # El usuario puede haber sido eliminado desde la última renovación
+    credencial = Credencial.query.filter_by(rol=sesion.rol, id_usuario=sesion.id_usuario).first()
+    if credencial is None:
+        revocar_sesion(sesion)
+    return credencial
+
+
+def crear_sesion(rol, id_usuario, email):
+    """
+    Abrir una sesión tras un login válido. No hace commit.
+
+    Args:
+        rol (str): Rol del usuario
+        id_usuario (int): ID del usuario en la tabla de su rol
+        email (str): Email para el access token
+
+    Returns:
+        dict: token, refresh_token y expires_in
+    """
+    ahora = datetime.now()
+    sesion = SesionRefresh(
+        rol=rol,
+        id_usuario=id_usuario,
+        token_hash='',
+        fecha_creacion=ahora,
+        fecha_expiracion=ahora + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    db.session.add(sesion)
+    return _emitir(sesion, email)
+
+
+def rotar_sesion(refresh_token):
+    """
+    Canjear un refresh token por un access token nuevo y rotar el refresh token.
+    Presentar un refresh token ya rotado revoca la sesión completa, salvo dentro de
+    REFRESH_REUSE_GRACE_SECONDS tras la rotación (otra pestaña renovó a la vez): entonces
+    se entrega un access token de la misma sesión sin volver a rotarla. No hace commit.
+
+    Args:
+        refresh_token (str): Refresh token opaco
+
+    Returns:
+        dict: token, refresh_token y expires_in; dentro de la ventana de gracia solo token,
+            expires_in y reutilizado=True (el refresh token vigente es el que recibió la otra
+            petición); None si el token no es válido
+    """
+    token_hash = _hash_token(refresh_token)
+    sesion = SesionRefresh.query.filter_by(token_hash=token_hash).first()
+    if sesion is None:
+        return _reutilizar(token_hash)
+
+    credencial = _credencial_vigente(sesion)
+    if credencial is None:
+        return None
+
+    tokens = _rotar(sesion, token_hash, credencial.email)
+    if tokens is None:
+        # Otra petición con el mismo token ganó la rotación: ahora es un token recién rotado
+        return _reutilizar(token_hash)
+    return tokens
+
+
+def _reutilizar(token_hash):
+    """Respuesta a un refresh token ya rotado: access token dentro de la ventana de gracia o revocación"""
+    reutilizada = SesionRefresh.query.filter_by(token_hash_anterior=token_hash).first()
+    if reutilizada is None:
+        return None
+    gracia = timedelta(seconds=REFRESH_REUSE_GRACE_SECONDS)
+    if reutilizada.fecha_rotacion is None or reutilizada.fecha_rotacion + gracia < datetime.now():
+        revocar_sesion(reutilizada)
+        return None
+    credencial = _credencial_vigente(reutilizada)
+    if credencial is None:
+        return None
+    return {**_access_token(reutilizada, credencial.email), "reutilizado": True}
+
+
+def revocar_sesion(sesion):
+    """
+    Revocar una sesión y rechazar de inmediato sus access tokens en este proceso. No hace commit.
+
+    Args:
+        sesion (SesionRefresh): Sesión a revocar
+    """
+    if sesion.fecha_revocacion is None:
+        sesion.fecha_revocacion = datetime.now()
+    revoke_session_id(sesion.id)
+
+
+def revocar_por_refresh_token(refresh_token):
+    """
+    Cerrar la sesión asociada a un refresh token (logout). No hace commit.
+
+    Args:
+        refresh_token (str): Refresh token opaco
+
+    Returns:
+        bool: True si existía la sesión
+    """
+    sesion = SesionRefresh.query.filter_by(token_hash=_hash_token(refresh_token)).first()
+    if sesion is None:
+        return False
+    revocar_sesion(sesion)
+    return True
+
+
+def revocar_sesiones_usuario(rol, id_usuario):
+    """
+    Revocar todas las sesiones activas de un usuario. No hace commit.
+
+    Args:
+        rol (str): Rol del usuario
+        id_usuario (int): ID del usuario
+
+    Returns:
+        int: Número de sesiones revocadas
+    """
+    sesiones = SesionRefresh.query.filter_by(
+        rol=rol, id_usuario=id_usuario, fecha_revocacion=None
+    ).all()
+    for sesion in sesiones:
+        revocar_sesion(sesion)
+    return len(sesiones)
+
+
+def cargar_sesiones_revocadas():
+    """
+    Sesiones revocadas cuyos access tokens aún podrían estar vigentes,
+    para sincronizar la denylist en memoria de jwt_utils
+
+    Returns:
+        dict: {sid: epoch hasta el que se rechaza}
+    """
+    ventana = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    desde = datetime.now() - ventana
+    try:
+        filas = db.session.query(SesionRefresh.id, SesionRefresh.fecha_revocacion).filter(
+            SesionRefresh.fecha_revocacion >= desde
+        ).all()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {sid: (revocada + ventana).timestamp() for sid, revocada in filas}
+
+
+def purgar_sesiones_expiradas():
+    """
+    Eliminar sesiones expiradas o revocadas hace más que la vida de un access token. No hace commit.
+
+    Returns:
+        int: Número de sesiones eliminadas
+    """
+    ahora = datetime.now()
+    return SesionRefresh.query.filter(
+        (SesionRefresh.fecha_expiracion < ahora) |
+        (SesionRefresh.fecha_revocacion < ahora - timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    ).delete(synchronize_session=False)
+
+
+register_denylist_loader(cargar_sesiones_revocadas)
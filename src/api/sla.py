@@ -0,0 +1,186 @@
+"""
+Analítica de SLA y tiempos de resolución para TiBACK
+Tiempo desde la creación del ticket hasta su primera asignación, primera solución y primer
+cierre, derivado del registro de transiciones (evento_ticket) y acumulado por día en
+metrica_sla_dia. Las consultas suman columnas de ese rollup; nunca recorren tickets.
+"""
+import json
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from api.models import (
+    db, Ticket, Analista, EventoTicket, TicketArchivado, MetricaSlaDia, METRICAS_SLA,
+    CUBETAS_SLA_HORAS, COLUMNAS_SLA, SIN_ANALISTA, fila_sla
+)
+from api.estadisticas import percentil_histograma, PERCENTILES
+
+METRICAS = tuple(METRICAS_SLA.values())
+AGRUPACIONES = ('analista', 'especialidad', 'prioridad', 'dia', 'semana', 'mes')
+
+
+def _clave_periodo(dia, agrupar):
+    if agrupar == 'semana':
+        return (dia - timedelta(days=dia.weekday())).isoformat()
+    if agrupar == 'mes':
+        return dia.strftime('%Y-%m')
+    return dia.isoformat()
+
+
+def _resumen_metrica(valores):
+    muestras = valores['muestras']
+    conteos = {i: valores[columna] for i, columna in enumerate(COLUMNAS_SLA)}
+    return {
+        "muestras": muestras,
+        "promedio_horas": round(valores['suma_segundos'] / muestras / 3600, 2) if muestras else None,
+        **{f"p{p}_horas": percentil_histograma(conteos, p, CUBETAS_SLA_HORAS) for p in PERCENTILES},
+        "histograma": {columna: valores[columna] for columna in COLUMNAS_SLA}
+    }
+
+
+def consultar(desde, hasta, agrupar=None, metrica=None, id_analista=None, especialidad=None, prioridad=None):
+    """
+    Tiempos de asignación, solución y cierre en un rango de días
+
+    Args:
+        desde (date): Primer día (por fecha en que terminó el tramo)
+        hasta (date): Último día, incluido
+        agrupar (str, optional): Una de AGRUPACIONES; sin agrupar devuelve solo el total
+        metrica (str, optional): Solo esta métrica de METRICAS
+        id_analista (int, optional): Filtrar por analista (0 = sin analista)
+        especialidad (str, optional): Filtrar por especialidad
+        prioridad (str, optional): Filtrar por prioridad
+
+    Returns:
+        dict: {"total": {metrica: resumen}, "grupos": [{"clave", ..., "metricas"}]}
+    """
+    sumas = [func.sum(MetricaSlaDia.muestras), func.sum(MetricaSlaDia.suma_segundos)] + [
+        func.sum(getattr(MetricaSlaDia, columna)) for columna in COLUMNAS_SLA
+    ]
+    columnas_grupo = {
+        'analista': MetricaSlaDia.id_analista,
+        'especialidad': MetricaSlaDia.especialidad,
+        'prioridad': MetricaSlaDia.prioridad
+    }
+    grupo = columnas_grupo.get(agrupar, MetricaSlaDia.dia if agrupar else None)
+
+    seleccion = [MetricaSlaDia.metrica] + ([grupo] if grupo is not None else [])
+    query = db.session.query(*seleccion, *sumas).filter(MetricaSlaDia.dia.between(desde, hasta))
+    if metrica:
+        query = query.filter(MetricaSlaDia.metrica == metrica)
+    if id_analista is not None:
+        query = query.filter(MetricaSlaDia.id_analista == id_analista)
+    if especialidad is not None:
+        query = query.filter(MetricaSlaDia.especialidad == especialidad)
+    if prioridad:
+        query = query.filter(MetricaSlaDia.prioridad == prioridad)
+    query = query.group_by(*seleccion)
+
+    total = defaultdict(lambda: defaultdict(int))
+    grupos = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+    nombres_valores = ('muestras', 'suma_segundos') + COLUMNAS_SLA
+    for fila in query:
+        nombre_metrica = fila[0]
+        valores = dict(zip(nombres_valores, fila[len(seleccion):]))
+        destinos = [total[nombre_metrica]]
+        if grupo is not None:
+            clave = fila[1]
+            if agrupar in ('dia', 'semana', 'mes'):
+                clave = _clave_periodo(clave, agrupar)
+            destinos.append(grupos[clave][nombre_metrica])
+        for destino in destinos:
+            for nombre, valor in valores.items():
+                destino[nombre] += valor or 0
+
+    def resumir(por_metrica):
+        return {nombre: _resumen_metrica(por_metrica[nombre]) for nombre in METRICAS if nombre in por_metrica}
+
+    resultado_grupos = [{"clave": clave, "metricas": resumir(por_metrica)} for clave, por_metrica in grupos.items()]
+    if agrupar == 'analista':
+        ids = [g["clave"] for g in resultado_grupos if g["clave"] != SIN_ANALISTA]
+        analistas = {a.id: a for a in Analista.query.filter(Analista.id.in_(ids))} if ids else {}
+        for g in resultado_grupos:
+            analista = analistas.get(g["clave"])
+            g["clave"] = g["clave"] if g["clave"] != SIN_ANALISTA else None
+            g["nombre"] = f"{analista.nombre} {analista.apellido}" if analista else None
+    resultado_grupos.sort(key=lambda g: (g["clave"] is None, g["clave"] if g["clave"] is not None else 0))
+
+    return {"total": resumir(total), "grupos": resultado_grupos}
+
+
+def recalcular_sla(tamano_lote=5000):
+    """
+    Reconstruir metrica_sla_dia desde evento_ticket y los historiales de ticket_archivado.
+    No hace commit.
+
+    Args:
+        tamano_lote (int): Filas leídas por lote
+
+    Returns:
+        int: Filas escritas
+    """
+    especialidades = dict(db.session.query(Analista.id, Analista.especialidad).all())
+    filas = defaultdict(lambda: defaultdict(float))
+
+    def sumar(tipo, fecha, fecha_creacion, prioridad, id_analista, especialidad):
+        # Eventos anteriores a evento_ticket.especialidad: la especialidad vigente del analista
+        if especialidad is None and id_analista:
+            especialidad = especialidades.get(id_analista)
+        claves, deltas = fila_sla(
+            METRICAS_SLA[tipo], fecha, (fecha - fecha_creacion).total_seconds(),
+            prioridad, id_analista, especialidad
+        )
+        destino = filas[tuple(claves.items())]
+        for columna, valor in deltas.items():
+            destino[columna] += valor
+
+    # Primer evento de cada tipo por ticket: el orden por fecha deja primero el que cuenta.
+    # La consulta viene ordenada por ticket, así que basta recordar los tipos del ticket actual
+    ticket_actual = None
+    vistos = set()
+    eventos = db.session.query(
+        EventoTicket.id_ticket, EventoTicket.tipo, EventoTicket.fecha, EventoTicket.id_analista,
+        EventoTicket.especialidad, Ticket.fecha_creacion, Ticket.prioridad
+    ).join(Ticket, EventoTicket.id_ticket == Ticket.id).filter(
+        EventoTicket.tipo.in_(list(METRICAS_SLA))
+    ).order_by(EventoTicket.id_ticket, EventoTicket.fecha, EventoTicket.id).execution_options(yield_per=tamano_lote)
+    for id_ticket, tipo, fecha, id_analista, especialidad, fecha_creacion, prioridad in eventos:
+        if id_ticket != ticket_actual:
+            ticket_actual = id_ticket
+            vistos.clear()
+        if tipo in vistos or not fecha_creacion:
+            continue
+        vistos.add(tipo)
+        sumar(tipo, fecha, fecha_creacion, prioridad, id_analista, especialidad)
+
+    archivados = db.session.query(
+        TicketArchivado.historial, TicketArchivado.fecha_creacion, TicketArchivado.prioridad
+    ).execution_options(yield_per=tamano_lote)
+    for comprimido, fecha_creacion, prioridad in archivados:
+        if not fecha_creacion:
+            continue
+        eventos_archivados = json.loads(zlib.decompress(comprimido).decode('utf-8')).get("eventos", [])
+        primeros = {}
+        for evento in sorted(
+            (e for e in eventos_archivados if e.get("tipo") in METRICAS_SLA and e.get("fecha")),
+            key=lambda e: (e["fecha"], e.get("id") or 0)
+        ):
+            primeros.setdefault(evento["tipo"], evento)
+        for tipo, evento in primeros.items():
+            sumar(
+                tipo, datetime.fromisoformat(evento["fecha"]), fecha_creacion, prioridad,
+                evento.get("id_analista"), evento.get("especialidad")
+            )
+
+    connection = db.session.connection()
+    tabla = MetricaSlaDia.__table__
+    connection.execute(tabla.delete())
+    registros = [
+        {**dict(claves), **{columna: 0 for columna in COLUMNAS_SLA}, **{
+            columna: int(valor) if columna != 'suma_segundos' else valor for columna, valor in deltas.items()
+        }}
+        for claves, deltas in filas.items()
+    ]
+    for inicio in range(0, len(registros), tamano_lote):
+        connection.execute(tabla.insert(), registros[inicio:inicio + tamano_lote])
+    return len(registros)
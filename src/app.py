@@ -4,15 +4,14 @@ This module takes care of starting the API Server, Loading the DB and Adding the
 import os
 from flask import Flask, request, jsonify, url_for, send_from_directory
 from dotenv import load_dotenv
-from flask_migrate import Migrate
-from flask_swagger import swagger
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
 from api.utils import APIException, generate_sitemap
 from api.models import db
-from api.routes import api
-from api.admin import setup_admin
+from api.routes import registrar_blueprints
 from api.commands import setup_commands
+from api.integraciones import medir_arranque, iniciar_precarga
+from api import consultas, metricas, perfilador
 
 # from models import Person
 # Cargar variables de entorno desde .env
@@ -61,22 +60,57 @@ else:
     app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-MIGRATE = Migrate(app, db, compare_type=True)
 db.init_app(app)
 
+# Conteo de consultas SQL por petición, Server-Timing y detección de N+1
+consultas.init_app(app)
+
+# Métricas de Prometheus en /metrics
+metricas.init_app(app, db)
+
+# cProfile por petición con el header firmado X-Perfil
+perfilador.init_app(app)
+
+# Flask-Migrate (y Alembic) solo hacen falta para los comandos `flask db ...`;
+# los workers web no pagan su importación
+if os.getenv("FLASK_RUN_FROM_CLI") == "true":
+    def setup_migrate(app):
+        from flask_migrate import Migrate
+        return Migrate(app, db, compare_type=True)
+    MIGRATE = medir_arranque('migrate', setup_migrate, app)
+
 # add the admin
-setup_admin(app)
+# Flask-Admin registra blueprints, que no pueden agregarse después de la primera
+# petición; por eso no es perezoso, pero puede desactivarse por despliegue
+if os.getenv("ENABLE_ADMIN", "1") == "1":
+    from api.admin import setup_admin
+    medir_arranque('admin', setup_admin, app)
 
 # add the admin
 setup_commands(app)
 
-# Add all endpoints form the API with a "api" prefix
-app.register_blueprint(api, url_prefix='/api')
+# Add the enabled endpoints (API_BLUEPRINTS) with a "api" prefix
+medir_arranque('blueprints', registrar_blueprints, app)
+
+# Precarga opcional de integraciones en segundo plano (INTEGRATIONS_PREWARM), nunca antes de un fork
+iniciar_precarga(app)
 
 # Función para obtener la instancia de socketio
 def get_socketio():
     return socketio
 
+def sockets_conectados():
+    """Sockets conectados por namespace y miembros de los rooms de rol, para /metrics"""
+    muestras = []
+    for namespace, rooms in list(socketio.server.manager.rooms.items()):
+        muestras.append(({'namespace': namespace, 'room': ''}, len(rooms.get(None, ()))))
+        for room, miembros in list(rooms.items()):
+            if room and room.startswith('role_'):
+                muestras.append(({'namespace': namespace, 'room': room}, len(miembros)))
+    return muestras
+
+metricas.registrar_colector('tiback_socketio_connected_sockets', 'Sockets conectados (room vacío = total)', sockets_conectados)
+
 # Eventos de WebSocket mejorados
 @socketio.on('connect')
 def handle_connect(auth=None):
@@ -10,6 +10,8 @@ const HeatmapComponent = () => {
     const markerClustererRef = useRef(null);
     const infoWindowRef = useRef(null);
     const heatmapLayerRef = useRef(null);
+    const fetchDataRef = useRef(null);
+    const idleTimerRef = useRef(null);
 
     // Estados principales
     const [rawData, setRawData] = useState([]);
@@ -81,74 +83,43 @@ const HeatmapComponent = () => {
         return colorMap[estadoLower] || '#6c757d';
     }, []);
 
-    // Función optimizada para calcular peso del heatmap
-    const calculateHeatmapWeight = useCallback((item) => {
-        let weight = 1; // Peso base original
+    // Función optimizada para calcular peso del heatmap: suma de los pesos por ticket de la celda
+    const calculateHeatmapWeight = useCallback((celda) => {
+        let weight = celda.total; // Peso base original (1 por ticket)
 
         // Peso por prioridad
         const priorityWeights = { 'alta': 3, 'media': 2, 'baja': 1 };
-        weight += priorityWeights[item.ticket_prioridad] || 0;
+        Object.entries(celda.por_prioridad || {}).forEach(([prioridad, cantidad]) => {
+            weight += (priorityWeights[prioridad] || 0) * cantidad;
+        });
 
         // Peso por estado
         const stateWeights = { 'en_proceso': 2, 'en_espera': 1.5, 'creado': 1 };
-        weight += stateWeights[item.ticket_estado] || 0;
-
-        return Math.max(0.5, Math.min(10, weight)); // Rango original
-    }, []);
+        Object.entries(celda.por_estado || {}).forEach(([estado, cantidad]) => {
+            weight += (stateWeights[estado] || 0) * cantidad;
+        });
 
-    // Función optimizada para procesar datos
-    const processTicketData = useCallback((ticketsData) => {
-        return ticketsData
-            .filter(ticket => {
-                const lat = ticket.latitud || ticket.cliente?.latitude;
-                const lng = ticket.longitud || ticket.cliente?.longitude;
-                return lat && lng && lat !== 0 && lng !== 0;
-            })
-            .map(ticket => {
-                const lat = ticket.latitud || ticket.cliente?.latitude;
-                const lng = ticket.longitud || ticket.cliente?.longitude;
-
-                return {
-                    lat: parseFloat(lat),
-                    lng: parseFloat(lng),
-                    ticket_id: ticket.id,
-                    ticket_titulo: ticket.titulo,
-                    ticket_descripcion: ticket.descripcion,
-                    ticket_estado: ticket.estado,
-                    ticket_prioridad: ticket.prioridad,
-                    ticket_fecha_creacion: ticket.fecha_creacion,
-                    cliente_nombre: ticket.cliente?.nombre || 'N/A',
-                    cliente_apellido: ticket.cliente?.apellido || '',
-                    cliente_email: ticket.cliente?.email || 'N/A',
-                    cliente_direccion: ticket.cliente?.direccion || 'N/A',
-                    cliente_telefono: ticket.cliente?.telefono || null
-                };
-            });
+        return Math.max(0.5, weight);
     }, []);
 
-    // Función optimizada para crear datos del heatmap
-    const createHeatmapData = useCallback((transformedData) => {
-        return transformedData.map((item) => {
-            // Añadir variación geográfica sutil para evitar superposición exacta
-            const latVariation = (Math.random() - 0.5) * 0.001; // ±0.0005 grados
-            const lngVariation = (Math.random() - 0.5) * 0.001;
-
-            return {
-                location: new window.google.maps.LatLng(
-                    item.lat + latVariation,
-                    item.lng + lngVariation
-                ),
-                weight: calculateHeatmapWeight(item)
-            };
-        });
+    // Función optimizada para crear datos del heatmap (una entrada por celda agregada en el servidor)
+    const createHeatmapData = useCallback((celdas) => {
+        return celdas.map((celda) => ({
+            location: new window.google.maps.LatLng(celda.lat, celda.lng),
+            weight: calculateHeatmapWeight(celda)
+        }));
     }, [calculateHeatmapWeight]);
 
+    const escapeHtml = useCallback((texto) => String(texto ?? '').replace(/[&<>"']/g, (c) => ({
+        '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+    })[c]), []);
+
     // Función optimizada para crear InfoWindow content
     const createInfoContent = useCallback((item) => {
         return `
             <div style="max-width: 300px; font-family: Arial, sans-serif;">
                 <div style="border-bottom: 1px solid #dee2e6; padding-bottom: 10px; margin-bottom: 10px;">
-                    <h6 style="margin: 0; color: #495057; font-weight: bold;">${item.ticket_titulo}</h6>
+                    <h6 style="margin: 0; color: #495057; font-weight: bold;">${escapeHtml(item.ticket_titulo)}</h6>
                 </div>
                 <div style="margin-bottom: 8px;">
                     <strong>Estado:</strong> 
@@ -159,7 +130,7 @@ const HeatmapComponent = () => {
                 <div style="margin-bottom: 8px;">
                     <strong>Descripción:</strong><br>
                     <span style="color: #6c757d; font-size: 0.9em;">
-                        ${item.ticket_descripcion ? item.ticket_descripcion.substring(0, 100) + '...' : 'Sin descripción'}
+                        ${item.ticket_descripcion ? escapeHtml(item.ticket_descripcion.substring(0, 100)) + '...' : 'Sin descripción'}
                     </span>
                 </div>
                 <div style="margin-bottom: 8px;">
@@ -182,43 +153,81 @@ const HeatmapComponent = () => {
                 </div>
                 <div style="margin-top: 10px; padding-top: 10px; border-top: 1px solid #dee2e6;">
                     <small style="color: #6c757d;">
-                        ID: ${item.ticket_id} | Cliente: ${item.cliente_nombre} ${item.cliente_apellido || ''}
+                        ID: ${item.ticket_id} | Cliente: ${escapeHtml(item.cliente_nombre)} ${escapeHtml(item.cliente_apellido)}
                     </small>
                 </div>
             </div>
         `;
-    }, [getMarkerColor]);
+    }, [getMarkerColor, escapeHtml]);
+
+    // Lista de tickets de una celda para el InfoWindow
+    const createCellInfoContent = useCallback((celda, detalle) => {
+        const filas = detalle.tickets.map((item) => `
+            <div style="padding: 6px 0; border-bottom: 1px solid #f1f3f5;">
+                <div style="font-weight: bold; color: #495057;">#${item.ticket_id} ${escapeHtml(item.ticket_titulo)}</div>
+                <small>
+                    <span style="color: ${getMarkerColor(item.ticket_estado)}; font-weight: bold;">${escapeHtml(item.ticket_estado).toUpperCase()}</span>
+                    • ${escapeHtml(item.ticket_prioridad).toUpperCase()}
+                    • ${new Date(item.ticket_fecha_creacion).toLocaleDateString('es-CO')}
+                </small>
+            </div>
+        `).join('');
+        const restantes = detalle.total - detalle.tickets.length;
+        return `
+            <div style="max-width: 320px; max-height: 300px; overflow-y: auto; font-family: Arial, sans-serif;">
+                <div style="border-bottom: 1px solid #dee2e6; padding-bottom: 10px; margin-bottom: 6px;">
+                    <h6 style="margin: 0; color: #495057; font-weight: bold;">${celda.total} tickets en esta zona</h6>
+                </div>
+                ${filas}
+                ${restantes > 0 ? `<small style="color: #6c757d;">y ${restantes} más. Acerca el mapa para ver el detalle.</small>` : ''}
+            </div>
+        `;
+    }, [getMarkerColor, escapeHtml]);
 
-    // Función optimizada para cargar datos
+    const authHeaders = useCallback(() => {
+        const token = store.auth.token;
+        if (!token) {
+            throw new Error('Token de autorización no encontrado');
+        }
+        return {
+            'Authorization': `Bearer ${token}`,
+            'Content-Type': 'application/json'
+        };
+    }, [store.auth.token]);
+
+    // Función optimizada para cargar datos: celdas agregadas del área visible
     const fetchHeatmapData = useCallback(async () => {
         try {
             setLoading(true);
             setError(null);
 
-            const token = store.auth.token;
-            if (!token) {
-                throw new Error('Token de autorización no encontrado');
+            const map = mapInstanceRef.current;
+            const bounds = map?.getBounds();
+            const params = new URLSearchParams({
+                zoom: String(map?.getZoom() ?? mapConfig.zoom),
+                desglose: 'estado,prioridad'
+            });
+            if (bounds) {
+                const ne = bounds.getNorthEast();
+                const sw = bounds.getSouthWest();
+                params.set('bbox', [sw.lng(), sw.lat(), ne.lng(), ne.lat()].map(v => v.toFixed(5)).join(','));
             }
 
             const backendUrl = import.meta.env.VITE_BACKEND_URL;
-            const response = await fetch(`${backendUrl}/api/tickets`, {
+            const response = await fetch(`${backendUrl}/api/heatmap?${params}`, {
                 method: 'GET',
-                headers: {
-                    'Authorization': `Bearer ${token}`,
-                    'Content-Type': 'application/json'
-                }
+                headers: authHeaders()
             });
 
             if (!response.ok) {
                 throw new Error(`Error ${response.status}: ${response.statusText}`);
             }
 
-            const ticketsData = await response.json();
-            const transformedData = processTicketData(ticketsData);
+            const data = await response.json();
+            setRawData(data.celdas);
 
-            setRawData(transformedData);
-
-            if (transformedData.length === 0) {
+            // Sin bbox se consultó el mundo entero: no hay ningún ticket ubicado
+            if (!bounds && data.total_tickets === 0) {
                 setError('No se encontraron tickets con ubicación geográfica. Los clientes necesitan tener coordenadas de latitud y longitud válidas en sus perfiles.');
             }
 
@@ -227,7 +236,40 @@ const HeatmapComponent = () => {
         } finally {
             setLoading(false);
         }
-    }, [store.auth.token, processTicketData]);
+    }, [authHeaders, mapConfig.zoom]);
+
+    // Detalle bajo demanda al hacer click en una celda
+    const openCellInfo = useCallback(async (celda, marker) => {
+        if (!infoWindowRef.current) return;
+        infoWindowRef.current.setContent('<div style="padding: 8px;">Cargando tickets...</div>');
+        infoWindowRef.current.open(mapInstanceRef.current, marker);
+
+        try {
+            const backendUrl = import.meta.env.VITE_BACKEND_URL;
+            const response = await fetch(`${backendUrl}/api/heatmap/celdas/${celda.id}?limite=20`, {
+                headers: authHeaders()
+            });
+            if (!response.ok) {
+                throw new Error(`Error ${response.status}: ${response.statusText}`);
+            }
+            const detalle = await response.json();
+
+            if (detalle.total === 1) {
+                const puntoResponse = await fetch(
+                    `${backendUrl}/api/heatmap/tickets/${detalle.tickets[0].ticket_id}`,
+                    { headers: authHeaders() }
+                );
+                if (!puntoResponse.ok) {
+                    throw new Error(`Error ${puntoResponse.status}: ${puntoResponse.statusText}`);
+                }
+                infoWindowRef.current.setContent(createInfoContent(await puntoResponse.json()));
+            } else {
+                infoWindowRef.current.setContent(createCellInfoContent(celda, detalle));
+            }
+        } catch (err) {
+            infoWindowRef.current.setContent(`<div style="padding: 8px; color: #dc3545;">${escapeHtml(err.message)}</div>`);
+        }
+    }, [authHeaders, createInfoContent, createCellInfoContent, escapeHtml]);
 
     // Función optimizada para inicializar el mapa
     const initializeMap = useCallback(() => {
@@ -262,6 +304,12 @@ const HeatmapComponent = () => {
             // Crear InfoWindow
             infoWindowRef.current = new window.google.maps.InfoWindow();
 
+            // Recargar las celdas del área visible al terminar de mover o hacer zoom
+            map.addListener('idle', () => {
+                clearTimeout(idleTimerRef.current);
+                idleTimerRef.current = setTimeout(() => fetchDataRef.current?.(), 250);
+            });
+
             // Crear MarkerClusterer
             if (window.MarkerClusterer) {
                 markerClustererRef.current = new window.MarkerClusterer(map, [], {
@@ -305,11 +353,13 @@ const HeatmapComponent = () => {
 
     // Función optimizada para actualizar marcadores y heatmap
     const updateMapData = useCallback(() => {
-        if (!mapInstanceRef.current || !rawData.length) return;
+        if (!mapInstanceRef.current) return;
 
         // Actualizar heatmap
         if (heatmapLayerRef.current && showHeatmap) {
             const heatmapData = createHeatmapData(rawData);
+            const maxWeight = heatmapData.reduce((max, punto) => Math.max(max, punto.weight), 0);
+            heatmapLayerRef.current.set('maxIntensity', Math.max(10, maxWeight));
             heatmapLayerRef.current.setData(heatmapData);
             heatmapLayerRef.current.setMap(mapInstanceRef.current);
         } else if (heatmapLayerRef.current) {
@@ -326,29 +376,25 @@ const HeatmapComponent = () => {
 
         // Crear nuevos marcadores si están habilitados
         if (showMarkers) {
-            const newMarkers = rawData.map((item) => {
+            // Un marcador por celda con la cantidad de tickets; el detalle se pide al hacer click
+            const newMarkers = rawData.map((celda) => {
                 const marker = new window.google.maps.Marker({
-                    position: { lat: item.lat, lng: item.lng },
+                    position: { lat: celda.lat, lng: celda.lng },
                     map: null,
-                    title: `Ticket #${item.ticket_id} - ${item.ticket_titulo}`,
+                    title: `${celda.total} tickets`,
+                    label: celda.total > 1 ? { text: String(celda.total), color: '#ffffff', fontSize: '11px' } : undefined,
                     icon: {
                         path: window.google.maps.SymbolPath.CIRCLE,
                         fillColor: '#dc3545',
                         fillOpacity: 0.8,
                         strokeColor: '#ffffff',
                         strokeWeight: 2,
-                        scale: 10
-                    },
-                    animation: window.google.maps.Animation.DROP
-                });
-
-                marker.addListener('click', () => {
-                    if (infoWindowRef.current) {
-                        infoWindowRef.current.setContent(createInfoContent(item));
-                        infoWindowRef.current.open(mapInstanceRef.current, marker);
+                        scale: celda.total > 1 ? 14 : 10
                     }
                 });
 
+                marker.addListener('click', () => openCellInfo(celda, marker));
+
                 return marker;
             });
 
@@ -359,36 +405,46 @@ const HeatmapComponent = () => {
             } else {
                 newMarkers.forEach(marker => marker.setMap(mapInstanceRef.current));
             }
-
-            // Ajustar bounds
-            if (newMarkers.length > 0) {
-                const bounds = new window.google.maps.LatLngBounds();
-                newMarkers.forEach(marker => bounds.extend(marker.getPosition()));
-                mapInstanceRef.current.fitBounds(bounds);
-            }
         }
-    }, [rawData, showMarkers, showHeatmap, createHeatmapData, createInfoContent]);
+    }, [rawData, showMarkers, showHeatmap, createHeatmapData, openCellInfo]);
 
     // Función optimizada para centrar en todos los puntos
-    const centerOnAllPoints = useCallback(() => {
-        if (!rawData.length || !mapInstanceRef.current) return;
+    // Los datos cargados son solo del área visible: se piden las celdas de todo el mundo a zoom bajo
+    const centerOnAllPoints = useCallback(async () => {
+        if (!mapInstanceRef.current) return;
 
         setIsTransitioning(true);
-        const bounds = new window.google.maps.LatLngBounds();
-        rawData.forEach(item => {
-            bounds.extend(new window.google.maps.LatLng(item.lat, item.lng));
-        });
+        try {
+            const backendUrl = import.meta.env.VITE_BACKEND_URL;
+            const response = await fetch(`${backendUrl}/api/heatmap?zoom=4`, { headers: authHeaders() });
+            if (!response.ok) {
+                throw new Error(`Error ${response.status}: ${response.statusText}`);
+            }
+            const { celdas } = await response.json();
+            if (!celdas.length) {
+                setIsTransitioning(false);
+                return;
+            }
 
-        mapInstanceRef.current.fitBounds(bounds);
+            const bounds = new window.google.maps.LatLngBounds();
+            celdas.forEach(celda => {
+                bounds.extend(new window.google.maps.LatLng(celda.lat, celda.lng));
+            });
 
-        const listener = window.google.maps.event.addListener(mapInstanceRef.current, 'bounds_changed', () => {
-            if (mapInstanceRef.current.getZoom() > 15) {
-                mapInstanceRef.current.setZoom(15);
-            }
-            window.google.maps.event.removeListener(listener);
+            mapInstanceRef.current.fitBounds(bounds);
+
+            const listener = window.google.maps.event.addListener(mapInstanceRef.current, 'bounds_changed', () => {
+                if (mapInstanceRef.current.getZoom() > 15) {
+                    mapInstanceRef.current.setZoom(15);
+                }
+                window.google.maps.event.removeListener(listener);
+                setIsTransitioning(false);
+            });
+        } catch (err) {
+            setError(err.message);
             setIsTransitioning(false);
-        });
-    }, [rawData]);
+        }
+    }, [authHeaders]);
 
     // Función optimizada para ir a ubicación
     const goToLocation = useCallback((lat, lng) => {
@@ -413,19 +469,33 @@ const HeatmapComponent = () => {
     }, [showHeatmap]);
 
     // Estadísticas calculadas
-    const stats = useMemo(() => ({
-        total: rawData.length,
-        enProceso: rawData.filter(t => t.ticket_estado.toLowerCase() === 'en_proceso').length,
-        solucionados: rawData.filter(t => t.ticket_estado.toLowerCase() === 'solucionado').length,
-        cerrados: rawData.filter(t => t.ticket_estado.toLowerCase() === 'cerrado').length
-    }), [rawData]);
+    const stats = useMemo(() => {
+        const porEstado = (estado) => rawData.reduce((suma, celda) => suma + (celda.por_estado?.[estado] || 0), 0);
+        return {
+            total: rawData.reduce((suma, celda) => suma + celda.total, 0),
+            enProceso: porEstado('en_proceso'),
+            solucionados: porEstado('solucionado'),
+            cerrados: porEstado('cerrado')
+        };
+    }, [rawData]);
+
+    // Zonas con más tickets del área visible
+    const topCells = useMemo(() => [...rawData].sort((a, b) => b.total - a.total).slice(0, 6), [rawData]);
+
+    useEffect(() => {
+        fetchDataRef.current = fetchHeatmapData;
+    }, [fetchHeatmapData]);
+
+    useEffect(() => () => clearTimeout(idleTimerRef.current), []);
 
     // Efectos optimizados
     useEffect(() => {
         if (isLoaded && !googleMapsError) {
             fetchHeatmapData();
         }
-    }, [isLoaded, googleMapsError, fetchHeatmapData]);
+        // Solo la carga inicial; después recarga el evento 'idle' del mapa
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [isLoaded, googleMapsError]);
 
     // Inicializar mapa cuando Google Maps esté listo
     useEffect(() => {
@@ -455,7 +525,7 @@ const HeatmapComponent = () => {
 
     // Actualizar datos del mapa cuando esté inicializado
     useEffect(() => {
-        if (mapInitialized && rawData.length > 0) {
+        if (mapInitialized) {
             updateMapData();
         }
     }, [mapInitialized, rawData, updateMapData]);
@@ -504,7 +574,7 @@ const HeatmapComponent = () => {
         );
     }
 
-    if (loading) {
+    if (loading && !mapInitialized) {
         return (
             <div className="d-flex justify-content-center align-items-center" style={{ height: '500px' }}>
                 <div className="text-center">
@@ -517,7 +587,7 @@ const HeatmapComponent = () => {
         );
     }
 
-    if (error) {
+    if (error && !mapInitialized) {
         return (
             <div className="alert alert-warning" role="alert">
                 <i className="fas fa-exclamation-triangle me-2"></i>
@@ -546,7 +616,8 @@ const HeatmapComponent = () => {
                                 Mapa de Calor - Tickets por Ubicación del Cliente
                             </h5>
                             <small className="text-muted">
-                                {stats.total} tickets ubicados según la dirección del cliente
+                                {stats.total} tickets en el área visible, ubicados según la dirección del cliente
+                                {loading && <span className="spinner-border spinner-border-sm ms-2" role="status"></span>}
                             </small>
                         </div>
                         <div className="d-flex gap-3">
@@ -575,6 +646,13 @@ const HeatmapComponent = () => {
                 </div>
             </div>
 
+            {error && (
+                <div className="alert alert-warning py-2" role="alert">
+                    <i className="fas fa-exclamation-triangle me-2"></i>
+                    {error}
+                </div>
+            )}
+
             {/* Controles */}
             <div className="d-flex justify-content-between align-items-center mb-3">
                 <div className="btn-group" role="group">
@@ -679,25 +757,27 @@ const HeatmapComponent = () => {
             </div>
 
             {/* Sugerencias de navegación */}
-            {rawData.length > 0 && (
+            {topCells.length > 0 && (
                 <div className="mt-3">
                     <h6>
                         <i className="fas fa-list me-2"></i>
                         Sugerencias de Navegación
                     </h6>
                     <div className="row">
-                        {rawData.slice(0, 6).map((item, index) => (
-                            <div key={index} className="col-md-4 mb-2">
+                        {topCells.map((celda) => (
+                            <div key={celda.id} className="col-md-4 mb-2">
                                 <div className="card h-100">
                                     <div className="card-body p-2">
-                                        <h6 className="card-title small mb-1">Ticket #{item.ticket_id}</h6>
-                                        <p className="card-text small text-muted mb-1">{item.ticket_titulo}</p>
+                                        <h6 className="card-title small mb-1">{celda.total} tickets</h6>
+                                        <p className="card-text small text-muted mb-1">
+                                            {Object.entries(celda.por_estado || {}).map(([estado, cantidad]) => `${estado}: ${cantidad}`).join(' • ')}
+                                        </p>
                                         <p className="card-text small text-muted mb-1">
-                                            <strong>Cliente:</strong> {item.cliente_nombre} {item.cliente_apellido}
+                                            <strong>Alta prioridad:</strong> {celda.por_prioridad?.alta || 0}
                                         </p>
                                         <button
                                             className="btn btn-outline-primary btn-sm w-100"
-                                            onClick={() => goToLocation(item.lat, item.lng)}
+                                            onClick={() => goToLocation(celda.lat, celda.lng)}
                                         >
                                             <i className="fas fa-map-marker-alt me-1"></i>
                                             Ir a ubicación
@@ -18,11 +18,18 @@ export function StoreProvider({ children }) {
         authActions.restoreSession(dispatch);
     }, []);
 
-    // Auto-refresh token when it's about to expire
+    // Auto-refresh token when it's about to expire (access tokens are short-lived)
     useEffect(() => {
-        if (store.auth.isAuthenticated && authActions.isTokenExpiringSoon()) {
+        if (!store.auth.isAuthenticated) return;
+        if (authActions.isTokenExpiringSoon()) {
             authActions.refresh(dispatch);
         }
+        const interval = setInterval(() => {
+            if (authActions.isTokenExpiringSoon()) {
+                authActions.refresh(dispatch);
+            }
+        }, 60 * 1000);
+        return () => clearInterval(interval);
     }, [store.auth.isAuthenticated]);
 
     // Provide the store, dispatch method, and auth functions to all child components.
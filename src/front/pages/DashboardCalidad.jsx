@@ -15,133 +15,66 @@ export function DashboardCalidad() {
             try {
                 setLoading(true);
                 const token = store.auth.token;
-
-                // Cargar analistas
-                const analistasResponse = await fetch(`${import.meta.env.VITE_BACKEND_URL}/api/analistas`, {
-                    headers: {
-                        'Authorization': `Bearer ${token}`,
-                        'Content-Type': 'application/json'
-                    }
-                });
-
-                if (analistasResponse.ok) {
+                const headers = {
+                    'Authorization': `Bearer ${token}`,
+                    'Content-Type': 'application/json'
+                };
+
+                // Estadísticas precalculadas en el backend: una consulta por período
+                // en lugar de descargar los tickets de cada analista
+                const hoy = new Date();
+                const haceDias = (dias) => {
+                    const fecha = new Date(hoy.getFullYear(), hoy.getMonth(), hoy.getDate() - (dias - 1));
+                    const mes = String(fecha.getMonth() + 1).padStart(2, '0');
+                    const dia = String(fecha.getDate()).padStart(2, '0');
+                    return `${fecha.getFullYear()}-${mes}-${dia}`;
+                };
+                const estadisticasUrl = (dias) =>
+                    `${import.meta.env.VITE_BACKEND_URL}/api/estadisticas/tickets?desde=${haceDias(dias)}&hasta=${haceDias(1)}`;
+
+                const [analistasResponse, ...periodosResponses] = await Promise.all([
+                    fetch(`${import.meta.env.VITE_BACKEND_URL}/api/analistas`, { headers }),
+                    fetch(estadisticasUrl(1), { headers }),
+                    fetch(estadisticasUrl(7), { headers }),
+                    fetch(estadisticasUrl(30), { headers })
+                ]);
+
+                if (analistasResponse.ok && periodosResponses.every(r => r.ok)) {
                     const analistasData = await analistasResponse.json();
-
-                    // Para cada analista, cargar sus métricas
-                    const analistasConMetricas = await Promise.all(
-                        analistasData.map(async (analista) => {
-                            try {
-                                // Cargar tickets del analista
-                                const ticketsResponse = await fetch(`${import.meta.env.VITE_BACKEND_URL}/api/tickets/analista/${analista.id}`, {
-                                    headers: {
-                                        'Authorization': `Bearer ${token}`,
-                                        'Content-Type': 'application/json'
-                                    }
-                                });
-
-                                if (ticketsResponse.ok) {
-                                    const tickets = await ticketsResponse.json();
-                                    console.log(`Tickets para analista ${analista.id}:`, tickets);
-
-                                    // Calcular métricas
-                                    const ticketsAsignados = tickets.length;
-                                    const ticketsSolucionados = tickets.filter(t => t.estado === 'solucionado').length;
-                                    const ticketsReabiertos = tickets.filter(t => t.estado === 'reabierto').length;
-                                    const ticketsCerrados = tickets.filter(t => t.estado === 'cerrado').length;
-
-                                    // Calcular calificación promedio
-                                    const ticketsConCalificacion = tickets.filter(t => t.calificacion && t.calificacion > 0);
-                                    const calificacionPromedio = ticketsConCalificacion.length > 0
-                                        ? (ticketsConCalificacion.reduce((sum, t) => sum + t.calificacion, 0) / ticketsConCalificacion.length)
-                                        : 0;
-
-                                    // Calcular tiempos de respuesta promedio
-                                    const ticketsConTiempo = tickets.filter(t => t.tiempo_respuesta);
-                                    const tiempoRespuestaPromedio = ticketsConTiempo.length > 0
-                                        ? (ticketsConTiempo.reduce((sum, t) => sum + t.tiempo_respuesta, 0) / ticketsConTiempo.length)
-                                        : 0;
-
-                                    // Calcular eficiencia (tickets cerrados / tickets asignados)
-                                    const eficiencia = ticketsAsignados > 0 ? (ticketsCerrados / ticketsAsignados) * 100 : 0;
-
-                                    // Calcular promedios por período
-                                    const ahora = new Date();
-                                    const haceUnDia = new Date(ahora.getTime() - 24 * 60 * 60 * 1000);
-                                    const haceUnaSemana = new Date(ahora.getTime() - 7 * 24 * 60 * 60 * 1000);
-                                    const haceUnMes = new Date(ahora.getTime() - 30 * 24 * 60 * 60 * 1000);
-
-                                    const ticketsHoy = tickets.filter(t => new Date(t.fecha_creacion) >= haceUnDia);
-                                    const ticketsSemana = tickets.filter(t => new Date(t.fecha_creacion) >= haceUnaSemana);
-                                    const ticketsMes = tickets.filter(t => new Date(t.fecha_creacion) >= haceUnMes);
-
-                                    const cerradosHoy = ticketsHoy.filter(t => t.estado === 'cerrado').length;
-                                    const cerradosSemana = ticketsSemana.filter(t => t.estado === 'cerrado').length;
-                                    const cerradosMes = ticketsMes.filter(t => t.estado === 'cerrado').length;
-
-                                    return {
-                                        ...analista,
-                                        metricas: {
-                                            ticketsAsignados,
-                                            ticketsSolucionados,
-                                            ticketsReabiertos,
-                                            ticketsCerrados,
-                                            calificacionPromedio: Math.round(calificacionPromedio * 10) / 10,
-                                            tiempoRespuestaPromedio: Math.round(tiempoRespuestaPromedio),
-                                            eficiencia: Math.round(eficiencia * 10) / 10,
-                                            cerradosPorDia: cerradosHoy,
-                                            cerradosPorSemana: cerradosSemana,
-                                            cerradosPorMes: cerradosMes,
-                                            satisfaccion: ticketsConCalificacion.length > 0
-                                                ? (ticketsConCalificacion.filter(t => t.calificacion >= 4).length / ticketsConCalificacion.length) * 100
-                                                : 0
-                                        }
-                                    };
-                                } else {
-                                    console.error(`Error al cargar tickets para analista ${analista.id}:`, ticketsResponse.status, ticketsResponse.statusText);
-                                    const errorText = await ticketsResponse.text();
-                                    console.error('Error del servidor:', errorText);
-                                    return {
-                                        ...analista,
-                                        metricas: {
-                                            ticketsAsignados: 0,
-                                            ticketsSolucionados: 0,
-                                            ticketsReabiertos: 0,
-                                            ticketsCerrados: 0,
-                                            calificacionPromedio: 0,
-                                            tiempoRespuestaPromedio: 0,
-                                            eficiencia: 0,
-                                            cerradosPorDia: 0,
-                                            cerradosPorSemana: 0,
-                                            cerradosPorMes: 0,
-                                            satisfaccion: 0
-                                        }
-                                    };
-                                }
-                            } catch (err) {
-                                console.error(`Error cargando métricas para analista ${analista.id}:`, err);
-                                return {
-                                    ...analista,
-                                    metricas: {
-                                        ticketsAsignados: 0,
-                                        ticketsSolucionados: 0,
-                                        ticketsReabiertos: 0,
-                                        ticketsCerrados: 0,
-                                        calificacionPromedio: 0,
-                                        tiempoRespuestaPromedio: 0,
-                                        eficiencia: 0,
-                                        cerradosPorDia: 0,
-                                        cerradosPorSemana: 0,
-                                        cerradosPorMes: 0,
-                                        satisfaccion: 0
-                                    }
-                                };
+                    const [dia, semana, mes] = await Promise.all(periodosResponses.map(r => r.json()));
+                    const porAnalista = (periodo, id) =>
+                        periodo.por_analista.find(a => a.id_analista === id);
+
+                    const analistasConMetricas = analistasData.map((analista) => {
+                        const estadisticas = porAnalista(mes, analista.id);
+                        const activosPorEstado = estadisticas?.activos_por_estado || {};
+                        const ticketsAsignados = estadisticas?.activos || 0;
+                        const ticketsCerrados = activosPorEstado.cerrado || 0;
+
+                        // Calcular eficiencia (tickets cerrados / tickets asignados)
+                        const eficiencia = ticketsAsignados > 0 ? (ticketsCerrados / ticketsAsignados) * 100 : 0;
+
+                        return {
+                            ...analista,
+                            metricas: {
+                                ticketsAsignados,
+                                ticketsSolucionados: activosPorEstado.solucionado || 0,
+                                ticketsReabiertos: activosPorEstado.reabierto || 0,
+                                ticketsCerrados,
+                                calificacionPromedio: Math.round((estadisticas?.calificacion.promedio || 0) * 10) / 10,
+                                tiempoRespuestaPromedio: Math.round(estadisticas?.tiempo_cierre_horas.promedio || 0),
+                                eficiencia: Math.round(eficiencia * 10) / 10,
+                                cerradosPorDia: porAnalista(dia, analista.id)?.cerrados || 0,
+                                cerradosPorSemana: porAnalista(semana, analista.id)?.cerrados || 0,
+                                cerradosPorMes: estadisticas?.cerrados || 0,
+                                satisfaccion: estadisticas?.calificacion.satisfaccion || 0
                             }
-                        })
-                    );
+                        };
+                    });
 
                     setAnalistas(analistasConMetricas);
                 } else {
-                    setError('Error al cargar los analistas');
+                    setError('Error al cargar las métricas de los analistas');
                 }
             } catch (err) {
                 setError(err.message);
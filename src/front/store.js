@@ -190,6 +190,10 @@ export const authActions = {
       
       // Guardar con nombre dinámico del rol
       localStorage.setItem(dynamicKey, data.token);
+      // Refresh token opaco para renovar el access token de vida corta
+      if (data.refresh_token) {
+        localStorage.setItem('refresh_token', data.refresh_token);
+      }
       // ELIMINADO: localStorage.setItem('user', JSON.stringify(data.user)); // VULNERABILIDAD
       // ELIMINADO: localStorage.setItem('role', data.role); // VULNERABILIDAD CRÍTICA
 
@@ -262,6 +266,18 @@ export const authActions = {
 
   // Logout
   logout: (dispatch) => {
+    // Revocar la sesión en el servidor (sin esperar respuesta)
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      fetch(`${import.meta.env.VITE_BACKEND_URL}/api/logout`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      }).catch(() => {});
+    }
+    localStorage.removeItem('refresh_token');
     // Limpiar todas las variables dinámicas posibles
     localStorage.removeItem('token');
     localStorage.removeItem('cliente');
@@ -278,28 +294,26 @@ export const authActions = {
   // Refresh token
   refresh: async (dispatch) => {
     try {
-      // Buscar token en cualquiera de las variables dinámicas
+      // Buscar token en cualquiera de las variables dinámicas (puede estar ya expirado)
       const possibleKeys = ['token', 'cliente', 'analista', 'supervisor', 'administrador', 'usuario'];
-      let token = null;
       let currentKey = null;
       
       for (const key of possibleKeys) {
-        const value = localStorage.getItem(key);
-        if (value && tokenUtils.isValid(value)) {
-          token = value;
+        if (localStorage.getItem(key)) {
           currentKey = key;
           break;
         }
       }
       
-      if (!token) return false;
+      const refreshToken = localStorage.getItem('refresh_token');
+      if (!refreshToken) return false;
 
       const response = await fetch(`${import.meta.env.VITE_BACKEND_URL}/api/refresh`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ token }),
+        body: JSON.stringify({ refresh_token: refreshToken }),
       });
 
       const data = await response.json();
@@ -319,6 +333,10 @@ export const authActions = {
       
       // Guardar nuevo token con nombre dinámico
       localStorage.setItem(dynamicKey, data.token);
+      // Sin refresh_token (reutilizado): otra pestaña ya guardó el refresh token vigente
+      if (data.refresh_token) {
+        localStorage.setItem('refresh_token', data.refresh_token);
+      }
 
       dispatch({
         type: 'auth_refresh_token',
@@ -330,6 +348,11 @@ export const authActions = {
       return true;
     } catch (error) {
       console.error('Error refreshing token:', error);
+      // Otra pestaña pudo haber renovado la sesión con el mismo refresh token
+      const refreshToken = localStorage.getItem('refresh_token');
+      if (refreshToken && !authActions.isTokenExpiringSoon()) {
+        return true;
+      }
       authActions.logout(dispatch);
       return false;
     }
@@ -359,6 +382,16 @@ export const authActions = {
           type: 'auth_restore_session',
           payload: { token }
         });
+      } else if (localStorage.getItem('refresh_token')) {
+        // Access token expirado: renovar con el refresh token
+        authActions.refresh(dispatch).then((ok) => {
+          const renewed = ok && possibleKeys.map((key) => localStorage.getItem(key)).find((value) => value && tokenUtils.isValid(value));
+          if (renewed) {
+            dispatch({ type: 'auth_restore_session', payload: { token: renewed } });
+          } else {
+            dispatch({ type: 'auth_loading', payload: false });
+          }
+        });
       } else {
         dispatch({ type: 'auth_loading', payload: false });
       }
@@ -390,7 +423,7 @@ export const authActions = {
       
       const now = Math.floor(Date.now() / 1000);
       const timeUntilExpiry = payload.exp - now;
-      return timeUntilExpiry < 3600; // 1 hour
+      return timeUntilExpiry < 120; // 2 minutos (access tokens de 15 minutos)
     } catch (error) {
       console.error('Error checking token expiry:', error);
       return true;